@@ -41,6 +41,27 @@ resource "aws_s3_bucket" "lambda_layer_bucket" {
   bucket = "${var.itc_database_prefix}-${var.env}-lambda-layer-bucket"  # Change to your desired bucket name
 }
 
+#############################################
+# Bucket for the scan checkpoints
+#############################################
+
+resource "aws_s3_bucket" "checkpoint_bucket" {
+  bucket = "${local.demand_pipeline_lambda_name}-checkpoints"
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "checkpoint_bucket_lifecycle" {
+  bucket = aws_s3_bucket.checkpoint_bucket.id
+
+  rule {
+    id     = "expire-abandoned-checkpoints" # Checkpoints of completed runs are deleted by the lambda itself
+    status = "Enabled"
+    filter {}
+    expiration {
+      days = var.checkpoint_retention_days
+    }
+  }
+}
+
 #############################################
 # Execution role for the lambda
 #############################################
@@ -92,6 +113,7 @@ resource "aws_iam_policy" "demand_pipeline_lambda_policy" {
             "dynamodb:UpdateItem",
             "dynamodb:Query",
             "dynamodb:Scan",
+            "dynamodb:DescribeTable",
           ],
           Resource : [
             "arn:aws:dynamodb:us-east-1:${var.source_account}:table/exchange-${var.source_env}-documents",
@@ -143,6 +165,14 @@ resource "aws_iam_policy" "demand_pipeline_lambda_policy" {
             "arn:aws:s3:::${aws_s3_bucket.lambda_layer_bucket.bucket}",
             "arn:aws:s3:::${aws_s3_bucket.lambda_layer_bucket.bucket}/*"
           ]
+        },
+        { # Scan checkpoints
+          Effect   = "Allow"
+          Action   = ["s3:GetObject", "s3:PutObject", "s3:DeleteObject", "s3:ListBucket"]
+          Resource = [
+            "arn:aws:s3:::${aws_s3_bucket.checkpoint_bucket.bucket}",
+            "arn:aws:s3:::${aws_s3_bucket.checkpoint_bucket.bucket}/*"
+          ]
         }
       ],
     )
@@ -212,12 +242,27 @@ resource "aws_lambda_function" "demand_pipeline_lambda" {
 
   environment {
     variables = {
-      LOCAL_MODE      = var.local_mode
-      ENV             = var.env
-      SOURCE_ENV      = var.source_env
-      SOURCE_ACCOUNT  = var.source_account
-      PG_ENDPOINT     = var.pg_endpoint
-      PG_SECRET_ARN   = var.pg_secret_arn
+      LOCAL_MODE        = var.local_mode
+      ENV               = var.env
+      SOURCE_ENV        = var.source_env
+      SOURCE_ACCOUNT    = var.source_account
+      PG_ENDPOINT       = var.pg_endpoint
+      PG_SECRET_ARN     = var.pg_secret_arn
+      SYNC_MODE         = var.sync_mode
+      LOAD_MODE         = var.load_mode
+      REBUILD_INDEXES   = var.rebuild_indexes
+      STREAMING_MODE    = var.streaming_mode
+      STREAM_BATCH_SIZE = var.stream_batch_size
+      SCAN_RCU_BUDGET   = var.scan_rcu_budget
+      SCAN_MAX_SEGMENTS = var.scan_max_segments
+      SCAN_WORKERS      = var.scan_workers
+      SCAN_CLIENT       = var.scan_client
+      BUILD_WORKERS     = var.build_workers
+      BUILD_TRACE       = var.build_trace
+      COLUMNAR_LOAD     = var.columnar_load
+      LATEST_REDUCTION  = var.latest_reduction
+      CHECKPOINT_STORE  = var.checkpoint_store
+      CHECKPOINT_BUCKET = aws_s3_bucket.checkpoint_bucket.bucket
     }
   }
 }
@@ -0,0 +1,93 @@
+"""
+Benchmark: build_cases_table_data with the compiled extraction plan vs. one extract_metadata_fields call
+per metadata attribute and item (how the case rows were built before).
+
+Runs entirely in memory on synthetic documents shaped like the documents table (see bench_fast_scan.py).
+
+    python benchmarks/bench_case_builder.py --items 50000 --repeat 3
+"""
+# Standard library imports
+import argparse
+import copy
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+# Local imports
+from bench_fast_scan import make_document
+from builders.case_builder import build_cases_table_data, extract_metadata_fields
+
+logger = logging.getLogger(__name__)
+
+
+def build_cases_per_attribute(items):
+    """Builds the case rows with extract_metadata_fields, as build_cases_table_data did before the plan."""
+    rows = []
+    for item in items:
+        try:
+            logger.debug(f"Processing document {item.get('documentId', 'unknown')}")
+            due_date = item['demandDetails']['demandResponseRelativeDueDate']
+            item['demandDetails']['demandResponseRelativeDueDate'] = float(due_date) if due_date else None
+            item['createdTs'] = float(item['createdTs'])
+            item['version'] = float(item['version'])
+            sending_firm_name = item['sendingFirm']['firmName']
+            if isinstance(sending_firm_name, str):
+                sending_firm_name = sending_firm_name.rstrip()
+            case_data = {
+                'documentId': item['documentId'],
+                'customerId': item['customerId'],
+                'version': item['version'],
+                'claimCoverage': item['claimInfo']['claimCoverage'],
+                'claimNumber': item['claimInfo']['claimNumber'],
+                'sendingFirm': sending_firm_name,
+                'recipientCarrier': item['recipientCarrier']['carrierCommonName']
+            }
+            rows.append(case_data)
+            case_data.update(extract_metadata_fields(
+                item, 'caseManagementMetadata', ['relatedInsuranceId', 'clientId', 'matterId', 'matterTechId',
+                                                 'matterName']))
+            case_data.update(extract_metadata_fields(
+                item, 'claimInfo', ['lossState', 'claimNumber', 'claimCoverage', 'claimant']))
+            case_data.update(extract_metadata_fields(item, 'sendingFirm', ['primaryContact', 'attorney']))
+        except Exception as e:
+            logger.error(f"Error processing item {item.get('documentId', 'unknown')}: {e}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50000, help="Number of synthetic documents")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per builder (the best run is reported)")
+    args = parser.parse_args()
+
+    # Keep the pipeline's INFO level, so debug messages are formatted but not emitted, as in the Lambda
+    logging.getLogger().setLevel(logging.INFO)
+    logging.getLogger("builders.case_builder").setLevel(logging.WARNING)
+    logging.getLogger("builders.build_trace").setLevel(logging.WARNING)
+
+    rng = random.Random(42)
+    items = [make_document(i, rng) for i in range(args.items)]
+
+    results = {}
+    for name, build in (("extract_metadata_fields", build_cases_per_attribute),
+                        ("compiled plan", build_cases_table_data)):
+        best = None
+        for _ in range(args.repeat):
+            batch = copy.deepcopy(items)
+            start = time.perf_counter()
+            rows = build(batch)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = rows
+        print(f"{name:24} {best:6.2f}s  ({len(rows)} rows, {args.items / best:,.0f} items/s)")
+
+    assert results["extract_metadata_fields"] == results["compiled plan"], "the builders disagree"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: loading raw.cases from row dictionaries (COPY encoded value by value) vs. from a record batch
+(COLUMNAR_LOAD=true: to_record_batch, then COPY encoded by pyarrow). Requires pyarrow.
+
+Connects with the same settings as the pipeline (see the README .env section, LOCAL_MODE=true),
+loads synthetic case rows with both paths and rolls every load back, so existing data is untouched.
+With --encode-only, no database is needed: only the CSV encoding of both paths is timed.
+
+    python benchmarks/bench_columnar_load.py --rows 200000 --repeat 3
+"""
+# Standard library imports
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+# Local imports
+from bench_copy_loader import CASE_HEADERS, make_case_rows
+from column_specs import get_column_types
+from utils import get_db_connection, insert_data_into_table, to_record_batch, _get_copy_formatter, \
+    _iter_copy_lines, _iter_record_batch_csv
+
+COLUMN_TYPES = get_column_types("cases")
+
+
+def encode_rows(rows):
+    formatters = [_get_copy_formatter(COLUMN_TYPES.get(col)) for col in CASE_HEADERS]
+    return sum(len(line) for line in _iter_copy_lines(CASE_HEADERS, rows, formatters))
+
+
+def encode_record_batch(rows):
+    batch = to_record_batch(CASE_HEADERS, rows, COLUMN_TYPES)
+    return sum(len(chunk) for chunk in _iter_record_batch_csv(batch))
+
+
+def load_rows(conn, rows):
+    insert_data_into_table(conn, "cases", CASE_HEADERS, rows)
+
+
+def load_record_batch(conn, rows):
+    insert_data_into_table(conn, "cases", CASE_HEADERS, to_record_batch(CASE_HEADERS, rows, COLUMN_TYPES))
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Number of synthetic case rows.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best run is reported.")
+    parser.add_argument("--encode-only", action="store_true", help="Time the CSV encoding without a database.")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    rows = make_case_rows(args.rows)
+    rows_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    batch = to_record_batch(CASE_HEADERS, rows, COLUMN_TYPES)
+    print(f"memory: {rows_bytes / args.rows:,.0f} bytes/row as dictionaries, "
+          f"{batch.nbytes / args.rows:,.0f} bytes/row as a record batch")
+
+    if args.encode_only:
+        results = {"rows": best_of(args.repeat, encode_rows, rows),
+                   "columnar": best_of(args.repeat, encode_record_batch, rows)}
+    else:
+        conn = get_db_connection()
+        try:
+            results = {}
+            for name, load in (("rows", load_rows), ("columnar", load_record_batch)):
+                results[name] = best_of(args.repeat, lambda: (load(conn, rows), conn.rollback()))
+        finally:
+            conn.rollback()
+            conn.close()
+
+    print(f"\n{'path':<10}{'best seconds':>14}{'rows/second':>14}")
+    for name, elapsed in results.items():
+        print(f"{name:<10}{elapsed:>14.2f}{args.rows / elapsed:>14.0f}")
+    print(f"\ncolumnar speedup: {results['rows'] / results['columnar']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
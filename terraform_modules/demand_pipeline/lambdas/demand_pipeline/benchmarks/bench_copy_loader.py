@@ -0,0 +1,93 @@
+"""
+Benchmark: COPY-based loader vs. the execute_values INSERT path for raw.cases.
+
+Connects with the same settings as the pipeline (see the README .env section, LOCAL_MODE=true),
+loads synthetic case rows with both methods and rolls every load back, so existing data is untouched.
+
+    python benchmarks/bench_copy_loader.py --rows 200000 --repeat 3
+"""
+# Standard library imports
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Local imports
+from utils import get_db_connection, insert_data_into_table, LOAD_METHOD_COPY, LOAD_METHOD_INSERT
+
+CASE_HEADERS = [
+    'documentId', 'customerId', 'version', 'matterTechId', 'matterName', 'claimCoverage',
+    'claimNumber', 'lossState', 'sendingFirm', 'recipientCarrier', 'assignedAttorney',
+    'assignedCaseCollaborator', 'assignedCaseManager', 'clientId', 'clientName', 'matterId',
+    'relatedInsuranceId'
+]
+
+
+def make_case_rows(row_count, seed=42):
+    """
+    Builds synthetic rows shaped like the output of build_cases_table_data.
+    """
+    rng = random.Random(seed)
+    states = ["CA", "NY", "TX", "FL", "WA", None]
+    rows = []
+    for i in range(row_count):
+        rows.append({
+            'documentId': f"doc-{i:08d}",
+            'customerId': f"cust-{rng.randint(1, 500)}",
+            'version': float(rng.randint(1, 5)),
+            'matterTechId': str(rng.randint(100000, 999999)),
+            'matterName': f"Smith v. Jones, \"Matter\" {i}",
+            'claimCoverage': rng.choice(["BI", "PD", "UM", ""]),
+            'claimNumber': f"CLM-{rng.randint(1, 10 ** 8)}",
+            'lossState': rng.choice(states),
+            'sendingFirm': f"Firm {rng.randint(1, 300)} LLP",
+            'recipientCarrier': f"Carrier {rng.randint(1, 50)}",
+            'assignedAttorney': "Jane Doe",
+            'assignedCaseCollaborator': [f"Manager {rng.randint(1, 40)}" for _ in range(rng.randint(0, 3))],
+            'assignedCaseManager': "John Roe",
+            'clientId': str(rng.randint(1, 10 ** 6)),
+            'clientName': "Client Name",
+            'matterId': str(rng.randint(1, 10 ** 6)),
+            'relatedInsuranceId': None,
+        })
+    return rows
+
+
+def run(conn, method, rows):
+    """
+    Loads the rows into raw.cases with the given method, rolls back and returns the elapsed seconds.
+    """
+    start = time.perf_counter()
+    insert_data_into_table(conn, "cases", CASE_HEADERS, rows, method=method)
+    elapsed = time.perf_counter() - start
+    conn.rollback()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Number of synthetic case rows.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method; the best run is reported.")
+    args = parser.parse_args()
+
+    rows = make_case_rows(args.rows)
+    conn = get_db_connection()
+    try:
+        results = {}
+        for method in (LOAD_METHOD_INSERT, LOAD_METHOD_COPY):
+            results[method] = min(run(conn, method, rows) for _ in range(args.repeat))
+
+        print(f"\n{'method':<10}{'best seconds':>14}{'rows/second':>14}")
+        for method, elapsed in results.items():
+            print(f"{method:<10}{elapsed:>14.2f}{args.rows / elapsed:>14.0f}")
+        print(f"\nCOPY speedup: {results[LOAD_METHOD_INSERT] / results[LOAD_METHOD_COPY]:.1f}x")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark: decoding scanned documents with boto3's TypeDeserializer (what Table.scan does for every item)
+vs. fast_scan.decode_item (the SCAN_CLIENT=client path), each followed by build_cases_table_data.
+
+Runs entirely in memory on synthetic pages in the DynamoDB wire format, shaped like the documents table:
+full items (as scanned before the column spec projections) and projected items (see column_specs).
+
+    python benchmarks/bench_fast_scan.py --items 20000 --repeat 3
+"""
+# Standard library imports
+import argparse
+import copy
+import logging
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Third-party imports
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+# Local imports
+from fast_scan import decode_item
+from column_specs import get_source_attributes
+from builders.case_builder import build_cases_table_data
+
+PAGE_SIZE = 1000
+
+
+def make_document(i, rng):
+    """
+    Builds a synthetic documents table item, with the large nested attributes the builders never load.
+    """
+    created_ts = Decimal(1700000000 + i)
+    return {
+        'documentId': f"doc-{i:08d}",
+        'customerId': f"cust-{rng.randint(1, 500)}",
+        'version': Decimal(rng.randint(1, 5)),
+        'createdTs': created_ts,
+        'demandDetails': {
+            'demandResponseRelativeDueDate': Decimal(rng.choice([15, 30, 45])),
+            'demandAmount': Decimal(f"{rng.randint(1000, 10 ** 6)}.{rng.randint(0, 99):02d}"),
+            'demandLetterText': "Lorem ipsum " * 40,
+        },
+        'attachments': [
+            {'sourceFileSize': Decimal(rng.randint(10 ** 4, 10 ** 7)), 'createdTs': created_ts,
+             'fileName': f"exhibit-{n}.pdf", 'pageCount': Decimal(rng.randint(1, 300))}
+            for n in range(rng.randint(3, 12))
+        ],
+        'documentStatusHistory': [
+            {'documentStatus': status, 'timestamp': created_ts + n, 'user': {'userId': f"u{n}"}}
+            for n, status in enumerate(["DocumentUploaded", "DocumentReceived", "DocumentReviewed"])
+        ],
+        'claimInfo': {'claimCoverage': rng.choice(["BI", "PD", "UM"]), 'claimNumber': f"CLM-{i}",
+                      'lossState': rng.choice(["CA", "NY", "TX"]),
+                      'claimant': {'firstName': "Jane", 'lastName': "Doe"}},
+        'caseManagementMetadata': {'relatedInsuranceId': f"ins-{i}", 'clientId': str(i), 'matterId': str(i),
+                                   'matterTechId': str(i), 'matterName': f"Doe v. Roe {i}",
+                                   'primaryContact': {'firstName': "Pat", 'lastName': "Lee"}},
+        'sendingFirm': {'firmName': f"Firm {rng.randint(1, 300)} LLP",
+                        'attorney': {'firstName': "Sam", 'lastName': "Roe"},
+                        'caseManagers': [{'firstName': "Alex", 'lastName': f"Kim {n}"} for n in range(2)]},
+        'recipientCarrier': {'carrierCommonName': f"Carrier {rng.randint(1, 50)}"},
+    }
+
+
+def project(item, paths):
+    """Keeps only the given attribute paths, as a ProjectionExpression would."""
+    projected = {}
+    for path in paths:
+        source, target = item, projected
+        names = path.split(".")
+        for name in names[:-1]:
+            source = source.get(name, {})
+            target = target.setdefault(name, {})
+        if names[-1] in source:
+            target[names[-1]] = source[names[-1]]
+    return projected
+
+
+def make_pages(item_count, projected, seed=42):
+    """Builds pages of wire-format items."""
+    rng = random.Random(seed)
+    serializer = TypeSerializer()
+    paths = get_source_attributes("cases")
+    pages = []
+    for start in range(0, item_count, PAGE_SIZE):
+        page = []
+        for i in range(start, min(start + PAGE_SIZE, item_count)):
+            item = make_document(i, rng)
+            if projected:
+                item = project(item, paths)
+            page.append({name: serializer.serialize(value) for name, value in item.items()})
+        pages.append(page)
+    return pages
+
+
+def decode_with_type_deserializer(page):
+    deserializer = TypeDeserializer()
+    return [{name: deserializer.deserialize(value) for name, value in item.items()} for item in page]
+
+
+def decode_with_fast_scan(page):
+    return [decode_item(item) for item in page]
+
+
+def run(pages, decode):
+    """
+    :return: Tuple of (decode seconds, build seconds, rows built).
+    """
+    decode_seconds = build_seconds = 0.0
+    row_count = 0
+    for page in pages:
+        t0 = time.perf_counter()
+        items = decode(page)
+        t1 = time.perf_counter()
+        row_count += len(build_cases_table_data(items))
+        t2 = time.perf_counter()
+        decode_seconds += t1 - t0
+        build_seconds += t2 - t1
+    return decode_seconds, build_seconds, row_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20000, help="Number of synthetic documents")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration (the best run is reported)")
+    args = parser.parse_args()
+
+    # The builders log every page at INFO
+    logging.disable(logging.INFO)
+
+    for projected in (False, True):
+        pages = make_pages(args.items, projected)
+        label = "projected items" if projected else "full items"
+        for name, decode in (("TypeDeserializer", decode_with_type_deserializer),
+                             ("fast_scan.decode_item", decode_with_fast_scan)):
+            best = None
+            for _ in range(args.repeat):
+                result = run(copy.deepcopy(pages), decode)
+                if best is None or sum(result[:2]) < sum(best[:2]):
+                    best = result
+            decode_seconds, build_seconds, row_count = best
+            print(f"{label:16} {name:22} decode {decode_seconds:6.2f}s  build {build_seconds:6.2f}s  "
+                  f"total {decode_seconds + build_seconds:6.2f}s  ({row_count} rows, "
+                  f"{args.items / (decode_seconds + build_seconds):,.0f} items/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Benchmark: finding the latest audit record of every document in raw.audit, at growing volumes.
+  correlated  - the former latest_audit CTE of curated.demands_archived: MAX("createdTs") looked up per audit row
+  distinct_on - derive_latest_table: SELECT DISTINCT ON ("documentId") into raw.audit_latest
+  incremental - derive_latest_table for the documents changed by an incremental sync (--changed of them)
+  refresh_old - REFRESH MATERIALIZED VIEW of the former curated.demands_archived, ranking raw.cases and raw.audit
+  refresh     - REFRESH MATERIALIZED VIEW curated.demands_archived, reading raw.cases_latest and raw.audit_latest
+Each query is timed without, then with audit_document_created_idx (19_create_index_management.sql).
+
+Connects with the same settings as the pipeline (see the README .env section, LOCAL_MODE=true). The raw tables read by
+curated.demands_archived are emptied and loaded with synthetic rows in a transaction that is rolled back, so existing
+data is untouched; the tables and the view are locked while it runs. PostgreSQL has no temporary materialized views,
+so the former view is created as curated.demands_archived_old inside that transaction. The latest tables are derived
+before the refreshes are timed. A query running longer than --timeout is cancelled.
+
+    python benchmarks/bench_latest_audit.py --documents 20000 --scales 1 10 100 --timeout 300
+"""
+# Standard library imports
+import argparse
+import os
+import random
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Local imports
+from column_specs import get_headers
+from latest_tables import derive_latest_table
+from utils import get_db_connection, insert_data_into_table
+
+AUDIT_HEADERS = get_headers("audit")
+CASES_HEADERS = get_headers("cases")
+METADATA_HEADERS = get_headers("metadata")
+AUDIT_INDEX = "audit_document_created_idx"
+AUDIT_INDEX_COLUMNS = '"documentId", "createdTs" DESC, "auditRecordId" COLLATE "C" DESC'
+
+CORRELATED_QUERY = """
+    SELECT COUNT(*)
+    FROM raw."audit" a
+    WHERE a."createdTs" = (
+        SELECT MAX(a2."createdTs")
+        FROM raw."audit" a2
+        WHERE a2."documentId" = a."documentId"
+    )
+"""
+
+ARCHIVED_VIEW = "curated.demands_archived"
+OLD_ARCHIVED_VIEW = "curated.demands_archived_old"
+
+# curated.demands_archived as created by 07_create_demands_archived_view.sql before raw.cases_latest and
+# raw.audit_latest existed
+OLD_ARCHIVED_VIEW_QUERY = """
+    WITH latest_cases AS (
+        SELECT
+            c."sendingFirm",
+            c."documentId" AS "precedentDocumentId",
+            c."matterName",
+            c."clientName",
+            c."recipientCarrier",
+            c."claimNumber",
+            c."claimCoverage",
+            c."lossState",
+            c."assignedCaseManager",
+            c."assignedAttorney",
+            m."demandUploadedTimeStamp",
+            m."demandArchivedTimeStamp",
+            m."demandIsDeliverable",
+            m."demandTemplateId",
+            ROW_NUMBER() OVER (PARTITION BY c."documentId" ORDER BY c."version" DESC) AS rn
+        FROM raw."cases" c
+        JOIN raw."metadata" m ON c."documentId" = m."documentId"
+        WHERE m."demandArchivedTimeStamp" IS NOT NULL
+    ),
+    latest_audit AS (
+        SELECT a."documentId", a."lastArchiveReason", a."lastArchiveComment"
+        FROM raw."audit" a
+        WHERE a."createdTs" = (
+            SELECT MAX(a2."createdTs")
+            FROM raw."audit" a2
+            WHERE a2."documentId" = a."documentId"
+        )
+    ),
+    latest_templates AS (
+        SELECT
+            t."templateId",
+            t."templateName",
+            CASE WHEN LOWER(t."templateName") LIKE '%client%' THEN 'YES' ELSE 'NO' END AS "client_level_flag",
+            ROW_NUMBER() OVER (PARTITION BY t."templateId" ORDER BY t."version" DESC) AS rn
+        FROM raw."templates" t
+        WHERE t."templateId" IS NOT NULL AND t."templateId" != ''
+    )
+    SELECT
+        to_timestamp(lc."demandArchivedTimeStamp") AS "demandArchivedDate",
+        lc."precedentDocumentId",
+        lc."sendingFirm",
+        lc."matterName",
+        lc."clientName",
+        lc."recipientCarrier",
+        lc."claimNumber",
+        lc."claimCoverage",
+        lc."lossState",
+        lc."assignedAttorney",
+        lc."assignedCaseManager",
+        COALESCE(la."lastArchiveReason", '') AS "lastArchiveReason",
+        COALESCE(la."lastArchiveComment", '') AS "lastArchiveComment"
+    FROM latest_cases lc
+    LEFT JOIN latest_audit la ON lc."precedentDocumentId" = la."documentId"
+    LEFT JOIN latest_templates t ON lc."demandTemplateId" = t."templateId" AND t.rn = 1
+    WHERE lc.rn = 1
+        AND (
+            lc."demandTemplateId" IS NULL
+            OR lc."demandTemplateId" = ''
+            OR (t."client_level_flag" != 'YES' AND t."templateId" IS NOT NULL AND t."templateId" != '')
+        )
+"""
+
+
+def make_audit_rows(document_count, records_per_document, seed=42):
+    """
+    Builds synthetic rows shaped like the output of build_audit_table_data: 1 to 2 * records_per_document - 1
+    records per document, with a few equal and missing createdTs.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(document_count):
+        for j in range(rng.randint(1, 2 * records_per_document - 1)):
+            rows.append({
+                'auditRecordId': f"audit-{i:08d}-{j:03d}",
+                'createdTs': None if rng.random() < 0.01 else 1700000000 + rng.randint(0, 10 ** 7),
+                'documentId': f"doc-{i:08d}",
+                'actionType': "DemandArchived",
+                'lastArchiveReason': rng.choice(["Duplicate", "Withdrawn", "Settled", None]),
+                'lastArchiveComment': f"Archived by user {rng.randint(1, 200)}",
+            })
+    return rows
+
+
+def make_case_rows(document_count, seed=42):
+    """
+    Builds synthetic raw.cases and raw.metadata rows for the documents of make_audit_rows: 1 to 3 versions per
+    document, and a demandArchivedTimeStamp for about half of them.
+
+    :return: Tuple of the case rows and the metadata rows.
+    """
+    rng = random.Random(seed)
+    cases, metadata = [], []
+    for i in range(document_count):
+        document_id = f"doc-{i:08d}"
+        for version in range(1, rng.randint(1, 3) + 1):
+            case = dict.fromkeys(CASES_HEADERS)
+            case.update({
+                'documentId': document_id,
+                'version': version,
+                'matterName': f"Matter {i} v{version}",
+                'sendingFirm': f"Firm {rng.randint(1, 50)}",
+                'clientName': f"Client {i}",
+            })
+            cases.append(case)
+        row = dict.fromkeys(METADATA_HEADERS)
+        row.update({
+            'documentType': "COMPOSITEDEMAND",
+            'documentId': document_id,
+            'demandUploadedTimeStamp': 1700000000 + rng.randint(0, 10 ** 7),
+            'demandArchivedTimeStamp': 1710000000 + rng.randint(0, 10 ** 7) if rng.random() < 0.5 else None,
+        })
+        metadata.append(row)
+    return cases, metadata
+
+
+def timed(conn, timeout, fn):
+    """
+    Runs fn(cur) under a savepoint, so a cancelled query leaves the transaction usable.
+
+    :return: Seconds taken, or None if the query ran longer than timeout seconds.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT bench;")
+        cur.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)};")
+        start = time.perf_counter()
+        try:
+            fn(cur)
+            elapsed = time.perf_counter() - start
+        except psycopg2.errors.QueryCanceled:
+            elapsed = None
+        cur.execute("ROLLBACK TO SAVEPOINT bench;")
+        cur.execute("SET LOCAL statement_timeout = 0;")
+    return elapsed
+
+
+def run_queries(conn, timeout, changed_ids):
+    return {
+        "correlated": timed(conn, timeout, lambda cur: cur.execute(CORRELATED_QUERY)),
+        "distinct_on": timed(conn, timeout, lambda cur: derive_latest_table(conn, "audit", AUDIT_HEADERS)),
+        "incremental": timed(conn, timeout,
+                             lambda cur: derive_latest_table(conn, "audit", AUDIT_HEADERS, changed_ids)),
+        "refresh_old": timed(conn, timeout, lambda cur: cur.execute(f"REFRESH MATERIALIZED VIEW {OLD_ARCHIVED_VIEW};")),
+        "refresh": timed(conn, timeout, lambda cur: cur.execute(f"REFRESH MATERIALIZED VIEW {ARCHIVED_VIEW};")),
+    }
+
+
+def run_scale(conn, rows, cases, metadata, changed, timeout):
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE raw.audit, raw.audit_latest, raw.cases, raw.cases_latest, raw.metadata, raw.templates;")
+    insert_data_into_table(conn, "audit", AUDIT_HEADERS, rows)
+    insert_data_into_table(conn, "cases", CASES_HEADERS, cases)
+    insert_data_into_table(conn, "metadata", METADATA_HEADERS, metadata)
+    # The refresh of curated.demands_archived follows the derivation of the latest tables, as in the pipeline
+    derive_latest_table(conn, "cases", CASES_HEADERS)
+    derive_latest_table(conn, "audit", AUDIT_HEADERS)
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE MATERIALIZED VIEW {OLD_ARCHIVED_VIEW} AS {OLD_ARCHIVED_VIEW_QUERY} WITH NO DATA;")
+        # The delete load mode keeps the index: drop it for the runs without it
+        cur.execute(f"DROP INDEX IF EXISTS raw.{AUDIT_INDEX};")
+        cur.execute("ANALYZE raw.audit, raw.audit_latest, raw.cases, raw.cases_latest, raw.metadata;")
+    document_ids = sorted({row['documentId'] for row in rows})
+    changed_ids = random.Random(7).sample(document_ids, min(changed, len(document_ids)))
+
+    results = {"without index": run_queries(conn, timeout, changed_ids)}
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE INDEX {AUDIT_INDEX} ON raw.audit ({AUDIT_INDEX_COLUMNS});")
+        cur.execute("ANALYZE raw.audit;")
+    index_seconds = time.perf_counter() - start
+    results["with index"] = run_queries(conn, timeout, changed_ids)
+    return results, index_seconds
+
+
+def format_seconds(seconds):
+    return f"{'timeout':>14}" if seconds is None else f"{seconds:>14.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20000,
+                        help="Documents with audit records at scale 1 (today's volume).")
+    parser.add_argument("--records-per-document", type=int, default=3,
+                        help="Average number of audit records per document.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Multiples of --documents.")
+    parser.add_argument("--changed", type=int, default=1000,
+                        help="Documents re-derived by the incremental query.")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds after which a query is cancelled.")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        for scale in args.scales:
+            rows = make_audit_rows(args.documents * scale, args.records_per_document)
+            cases, metadata = make_case_rows(args.documents * scale)
+            results, index_seconds = run_scale(conn, rows, cases, metadata, args.changed, args.timeout)
+            conn.rollback()
+
+            print(f"\nscale {scale}x: {args.documents * scale:,} documents, {len(rows):,} audit records, "
+                  f"{len(cases):,} case versions (index built in {index_seconds:.2f}s)")
+            print(f"{'query':<14}{'no index (s)':>14}{'index (s)':>14}")
+            for query in results["without index"]:
+                print(f"{query:<14}{format_seconds(results['without index'][query])}"
+                      f"{format_seconds(results['with index'][query])}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
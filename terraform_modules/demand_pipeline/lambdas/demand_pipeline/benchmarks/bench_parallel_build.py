@@ -0,0 +1,77 @@
+"""
+Benchmark: scaling of parallel_build (BUILD_WORKERS) by number of builder processes, for the cases,
+metadata and audit builders.
+
+Runs entirely in memory on synthetic items shaped like the documents and audit tables (see bench_fast_scan.py).
+The speedup is bounded by the vCPUs available: Lambda allocates them with the memory size (6 at 10240 MB).
+
+    python benchmarks/bench_parallel_build.py --items 200000 --workers 1 2 4 6 --repeat 3
+"""
+# Standard library imports
+import argparse
+import copy
+import logging
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+# Local imports
+from bench_fast_scan import make_document
+from parallel_build import parallel_build, DEFAULT_BUILD_MIN_CHUNK_SIZE
+from builders.case_builder import build_cases_table_data
+from builders.metadata_builder import build_metadata_table_data
+from builders.audit_builder import build_audit_table_data
+
+
+def make_audit_record(i, rng):
+    return {
+        'auditRecordId': f"aud-{i:08d}",
+        'createdTs': Decimal(1700000000 + i),
+        'documentId': f"doc-{rng.randint(0, i + 1):08d}",
+        'actionType': rng.choice(["DemandArchived", "DemandViewed", "DemandSent"]),
+        'payload': {'archiveReason': rng.choice(["Settled", "Withdrawn", None]), 'archiveComments': "Closed"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200000, help="Number of synthetic items per table")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 6], help="Process counts to compare")
+    parser.add_argument("--min-chunk-size", type=int, default=DEFAULT_BUILD_MIN_CHUNK_SIZE,
+                        help="Smallest chunk given to a process (BUILD_MIN_CHUNK_SIZE)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration (the best run is reported)")
+    args = parser.parse_args()
+
+    # The builders log every call at INFO
+    logging.disable(logging.INFO)
+    print(f"{os.cpu_count()} CPUs available")
+
+    rng = random.Random(42)
+    documents = [make_document(i, rng) for i in range(args.items)]
+    audit = [make_audit_record(i, rng) for i in range(args.items)]
+
+    for label, build_fn, items in (("raw.cases", build_cases_table_data, documents),
+                                   ("raw.metadata", build_metadata_table_data, documents),
+                                   ("raw.audit", build_audit_table_data, audit)):
+        baseline = None
+        for workers in args.workers:
+            best = None
+            for _ in range(args.repeat):
+                batch = copy.deepcopy(items)
+                start = time.perf_counter()
+                rows = parallel_build(build_fn, batch, workers=workers, min_chunk_size=args.min_chunk_size,
+                                      label=label)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            baseline = baseline or best
+            print(f"{label:13} workers={workers:<3} {best:6.2f}s  ({len(rows)} rows, "
+                  f"{args.items / best:,.0f} items/s, speedup {baseline / best:4.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 from itc_common_utilities.logger.logger_setup import setup_logger
 
+from builders.build_trace import BuildTrace
+
 # Initialize the logger
 logger = setup_logger(__name__)
 
 
-def build_audit_table_data(results):
+def build_audit_table_data(results, stats=None):
     """
     Processes scanned DynamoDB results by extracting 'archiveReason' and 'archiveComments'
     from the payload and building the final dataset for insertion.
@@ -18,16 +20,21 @@ def build_audit_table_data(results):
         auditRecordId, createdTs, documentId, actionType, lastArchiveReason, and lastArchiveComment.
 
     :param results: List of dictionaries from the DynamoDB scan.
+    :param stats: optional Counter the builder adds its counters to (see parallel_build.parallel_build).
     :return: List of processed dictionaries.
     """
     logger.info(f"Processing {len(results)} audit records...")
+    trace = BuildTrace("build_audit_table_data", len(results), id_attribute='auditRecordId')
 
     # Track counts for logging
     missing_payload_count = 0
     processed_count = 0
+    dynamodb_format_count = 0
 
     # Process each item to extract the additional fields from the payload.
-    for item in results:
+    for index, item in enumerate(results):
+        if trace.active and trace.is_traced(index, item):
+            trace.log(f"Audit record {item.get('auditRecordId')} payload: {item.get('payload')!r}")
         payload = item.get('payload')
         if payload and isinstance(payload, dict):
             processed_count += 1
@@ -36,7 +43,7 @@ def build_audit_table_data(results):
             archive_reason = payload.get('archiveReason')
             if isinstance(archive_reason, dict) and 'S' in archive_reason:
                 archive_reason_value = archive_reason['S']
-                logger.debug(f"Extracted archive reason in DynamoDB format for record {item.get('auditRecordId')}")
+                dynamodb_format_count += 1
             else:
                 archive_reason_value = archive_reason
             item['lastArchiveReason'] = archive_reason_value
@@ -45,7 +52,7 @@ def build_audit_table_data(results):
             archive_comments = payload.get('archiveComments')
             if isinstance(archive_comments, dict) and 'S' in archive_comments:
                 archive_comments_value = archive_comments['S']
-                logger.debug(f"Extracted archive comments in DynamoDB format for record {item.get('auditRecordId')}")
+                dynamodb_format_count += 1
             else:
                 archive_comments_value = archive_comments
             item['lastArchiveComment'] = archive_comments_value
@@ -54,7 +61,6 @@ def build_audit_table_data(results):
             missing_payload_count += 1
             item['lastArchiveReason'] = None
             item['lastArchiveComment'] = None
-            logger.debug(f"Missing or invalid payload for record {item.get('auditRecordId')}")
 
     logger.info(
         f"Processed {processed_count} records with valid payloads. Found {missing_payload_count} records with missing/invalid payloads.")
@@ -73,4 +79,6 @@ def build_audit_table_data(results):
         final_dataset.append(final_record)
 
     logger.info(f"Final audit dataset prepared with {len(final_dataset)} records.")
+    trace.finish(len(final_dataset), stats, processed_count=processed_count,
+                 missing_payload_count=missing_payload_count, dynamodb_format_count=dynamodb_format_count)
     return final_dataset
\ No newline at end of file
@@ -0,0 +1,135 @@
+import os
+import time
+from collections import Counter
+
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Which items the builders trace (log in full) on top of the failures they always log:
+#   errors  - none (default)
+#   sampled - every BUILD_TRACE_SAMPLE_EVERY-th item
+#   all     - every item
+BUILD_TRACE_ERRORS = "errors"
+BUILD_TRACE_SAMPLED = "sampled"
+BUILD_TRACE_ALL = "all"
+DEFAULT_BUILD_TRACE_SAMPLE_EVERY = 1000
+
+
+def get_build_trace_mode():
+    """
+    Reads the BUILD_TRACE environment variable.
+
+    :return: 'errors' (default), 'sampled' or 'all'.
+    """
+    mode = os.getenv("BUILD_TRACE", BUILD_TRACE_ERRORS).lower()
+    if mode not in (BUILD_TRACE_ERRORS, BUILD_TRACE_SAMPLED, BUILD_TRACE_ALL):
+        logger.warning(f"Invalid BUILD_TRACE '{mode}'. Falling back to '{BUILD_TRACE_ERRORS}'.")
+        mode = BUILD_TRACE_ERRORS
+    return mode
+
+
+def get_build_trace_sample_every():
+    """
+    Reads the BUILD_TRACE_SAMPLE_EVERY environment variable.
+
+    :return: Interval between the items traced in 'sampled' mode (default 1000).
+    """
+    sample_every = int(os.getenv("BUILD_TRACE_SAMPLE_EVERY", DEFAULT_BUILD_TRACE_SAMPLE_EVERY))
+    if sample_every <= 0:
+        logger.warning(f"Invalid BUILD_TRACE_SAMPLE_EVERY {sample_every}. "
+                       f"Falling back to {DEFAULT_BUILD_TRACE_SAMPLE_EVERY}.")
+        sample_every = DEFAULT_BUILD_TRACE_SAMPLE_EVERY
+    return sample_every
+
+
+def get_build_trace_ids():
+    """
+    Reads the BUILD_TRACE_IDS environment variable: comma-separated ids of records (e.g. a bad documentId)
+    traced whatever the mode.
+
+    :return: Frozenset of ids.
+    """
+    return frozenset(record_id.strip() for record_id in os.getenv("BUILD_TRACE_IDS", "").split(",")
+                     if record_id.strip())
+
+
+class BuildTrace:
+    """
+    Instrumentation of one builder call. The builders count what they see rather than logging every item, and
+    only format messages for the items selected by BUILD_TRACE/BUILD_TRACE_IDS:
+
+        trace = BuildTrace("build_audit_table_data", len(items), id_attribute='auditRecordId')
+        for index, item in enumerate(items):
+            traced = trace.active and trace.is_traced(index, item)
+            ...
+            if traced:
+                trace.log(f"Built row {row}")
+        trace.finish(len(rows), stats, success_count=..., error_count=...)
+
+    finish() logs a summary table of the counters and the throughput of the call.
+    """
+
+    def __init__(self, builder_name, item_count, id_attribute='documentId', mode=None, sample_every=None,
+                 trace_ids=None):
+        """
+        :param builder_name: name of the builder, used in the messages
+        :param item_count: number of items given to the builder
+        :param id_attribute: attribute identifying an item, matched against BUILD_TRACE_IDS
+        :param mode: trace mode, defaults to get_build_trace_mode()
+        :param sample_every: interval of the 'sampled' mode, defaults to get_build_trace_sample_every()
+        :param trace_ids: ids always traced, defaults to get_build_trace_ids()
+        """
+        mode = mode or get_build_trace_mode()
+        self.builder_name = builder_name
+        self.item_count = item_count
+        self.id_attribute = id_attribute
+        self.counters = Counter()
+        self._trace_all = mode == BUILD_TRACE_ALL
+        self._sample_every = (sample_every or get_build_trace_sample_every()) if mode == BUILD_TRACE_SAMPLED else 0
+        self._trace_ids = get_build_trace_ids() if trace_ids is None else frozenset(trace_ids)
+        # Checked before is_traced so the default mode costs one attribute read per item
+        self.active = bool(self._trace_all or self._sample_every or self._trace_ids)
+        self._start = time.perf_counter()
+
+    def is_traced(self, index, item):
+        """
+        :param index: position of the item in the builder's input
+        :param item: the item (a dict)
+        :return: True if the item's messages should be logged.
+        """
+        if self._trace_all or (self._sample_every and index % self._sample_every == 0):
+            return True
+        return bool(self._trace_ids) and isinstance(item, dict) and item.get(self.id_attribute) in self._trace_ids
+
+    def log(self, message):
+        """Logs a message of a traced item, at INFO so tracing needs no change of log level."""
+        self.counters["traced_messages"] += 1
+        logger.info(f"[{self.builder_name}] {message}")
+
+    def finish(self, row_count, stats=None, **counters):
+        """
+        Records the final counters of the builder, adds them to stats and logs the summary table.
+
+        :param row_count: number of rows built
+        :param stats: optional Counter of the caller (see parallel_build.parallel_build)
+        :param counters: counters of the builder (e.g. success_count, error_count)
+        """
+        self.counters.update(counters)
+        if stats is not None:
+            stats.update(counters)
+        elapsed = time.perf_counter() - self._start
+        logger.info(self.format_summary(row_count, elapsed))
+
+    def format_summary(self, row_count, elapsed):
+        """
+        :return: The summary table of the builder call as a multi-line string.
+        """
+        rows = [("items", self.item_count), ("rows", row_count), ("seconds", f"{elapsed:.3f}"),
+                ("items/s", f"{self.item_count / elapsed:,.0f}" if elapsed > 0 else "-")]
+        rows.extend(sorted(self.counters.items()))
+        width = max(len(name) for name, _ in rows)
+        lines = [f"{self.builder_name} summary"]
+        lines.extend(f"  {name:<{width}}  {value}" for name, value in rows)
+        return "\n".join(lines)
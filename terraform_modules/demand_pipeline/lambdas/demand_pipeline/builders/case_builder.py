@@ -1,7 +1,8 @@
-from decimal import Decimal
 import json
 from itc_common_utilities.logger.logger_setup import setup_logger
 
+from builders.build_trace import BuildTrace
+
 # Initialize the logger
 logger = setup_logger(__name__)
 
@@ -23,7 +24,7 @@ def extract_names_from_case_managers(item, field_name, list_key="caseManagers",
     # Get the parent field from the item.
     parent_field = item.get(field_name)
     if not parent_field:
-        logger.debug(f"Field '{field_name}' not found in item")
+        logger.debug("Field '%s' not found in item", field_name)
         return names
 
     # If parent_field is a string, try parsing it as JSON.
@@ -41,7 +42,7 @@ def extract_names_from_case_managers(item, field_name, list_key="caseManagers",
     # Now get the list from the parent field using the specified list_key.
     list_data = parent_field.get(list_key)
     if not list_data:
-        logger.debug(f"Key '{list_key}' not found in '{field_name}'")
+        logger.debug("Key '%s' not found in '%s'", list_key, field_name)
         return names
 
     # If list_data is a string, try parsing it as JSON.
@@ -60,20 +61,20 @@ def extract_names_from_case_managers(item, field_name, list_key="caseManagers",
 
     # Make sure items_list is a list.
     if not isinstance(items_list, list):
-        logger.debug(f"Expected list for '{list_key}' but got {type(items_list).__name__}")
+        logger.debug("Expected list for '%s' but got %s", list_key, type(items_list).__name__)
         return names
 
     # Iterate over each entry in the list.
     for entry in items_list:
         # Ensure each entry is a dict.
         if not isinstance(entry, dict):
-            logger.debug(f"Skipping non-dict entry in '{list_key}'")
+            logger.debug("Skipping non-dict entry in '%s'", list_key)
             continue
 
         # Unwrap the entry if it's in DynamoDB "M" format.
         details = entry.get("M", entry)
         if not isinstance(details, dict):
-            logger.debug(f"Skipping entry with invalid 'M' format in '{list_key}'")
+            logger.debug("Skipping entry with invalid 'M' format in '%s'", list_key)
             continue
 
         # Extract first and last names; check if they are dicts with an "S" key.
@@ -97,7 +98,7 @@ def extract_names_from_case_managers(item, field_name, list_key="caseManagers",
 
     # Dedupe the list while preserving order.
     names = list(dict.fromkeys(names))
-    logger.debug(f"Extracted {len(names)} unique names from '{field_name}.{list_key}'")
+    logger.debug("Extracted %d unique names from '%s.%s'", len(names), field_name, list_key)
     return names
 
 
@@ -178,85 +179,169 @@ def extract_metadata_fields(item, field_name, keys_to_extract):
     return extracted_data
 
 
-def build_cases_table_data(items):
+# Fields read from a metadata attribute:
+#   value     - metadata[key], unwrapping a DynamoDB {"S": ...} value
+#   full_name - "firstName lastName" of the map at metadata[key], set only when present
+#   name_list - deduplicated full names of the list at item[attribute][list_key] (see extract_names_from_case_managers)
+FIELD_VALUE = "value"
+FIELD_FULL_NAME = "full_name"
+FIELD_NAME_LIST = "name_list"
+
+# The columns taken from each metadata attribute of a document, in the order the attributes are applied
+# (a column set by a later attribute overrides an earlier one). Every attribute yields the same name fields,
+# as extract_metadata_fields does.
+_NAME_FIELDS = (
+    ('clientName', FIELD_FULL_NAME, 'claimant'),
+    ('assignedCaseManager', FIELD_FULL_NAME, 'primaryContact'),
+    ('assignedAttorney', FIELD_FULL_NAME, 'attorney'),
+    ('assignedCaseCollaborator', FIELD_NAME_LIST, ('sendingFirm', 'caseManagers')),
+)
+CASE_EXTRACTION_SPEC = (
+    ('caseManagementMetadata', tuple(
+        (key, FIELD_VALUE, key) for key in ('relatedInsuranceId', 'clientId', 'matterId', 'matterTechId', 'matterName')
+    ) + _NAME_FIELDS),
+    ('claimInfo', tuple(
+        (key, FIELD_VALUE, key) for key in ('lossState', 'claimNumber', 'claimCoverage', 'claimant')
+    ) + _NAME_FIELDS),
+    ('sendingFirm', tuple(
+        (key, FIELD_VALUE, key) for key in ('primaryContact', 'attorney')
+    ) + _NAME_FIELDS),
+)
+
+
+def _compile_metadata_attribute(field_name, fields):
+    """
+    Builds the accessor of one metadata attribute: it parses the attribute once and reads every field of it,
+    with the same results as extract_metadata_fields.
+
+    :param field_name: name of the metadata attribute (e.g. 'claimInfo')
+    :param fields: tuple of (column, kind, key) entries
+    :return: Function of (item, name_lists) returning the extracted columns; name_lists caches the name
+             lists of the item, which are shared by all its attributes.
+    """
+    value_fields = tuple((column, key) for column, kind, key in fields if kind == FIELD_VALUE)
+    full_name_fields = tuple((column, key) for column, kind, key in fields if kind == FIELD_FULL_NAME)
+    name_list_fields = tuple((column, key) for column, kind, key in fields if kind == FIELD_NAME_LIST)
+    empty_values = dict.fromkeys(column for column, _ in value_fields)
+
+    def extract(item, name_lists):
+        metadata = item.get(field_name)
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except json.JSONDecodeError:
+                logger.warning(f"Could not parse '{field_name}' as JSON.")
+                metadata = {}
+
+        if not isinstance(metadata, dict):
+            logger.warning(f"Expected dict for '{field_name}' but got {type(metadata).__name__}")
+            return dict(empty_values)
+
+        extracted = {}
+        for column, key in value_fields:
+            value = metadata.get(key)
+            extracted[column] = value.get('S') if isinstance(value, dict) else value
+        for column, key in full_name_fields:
+            person = metadata.get(key)
+            if person:
+                first_name = person.get('firstName', '')
+                last_name = person.get('lastName', '')
+                extracted[column] = f"{first_name} {last_name}".strip() or first_name
+        for column, (list_field_name, list_key) in name_list_fields:
+            names = name_lists.get((list_field_name, list_key))
+            if names is None:
+                names = extract_names_from_case_managers(item, field_name=list_field_name, list_key=list_key)
+                name_lists[(list_field_name, list_key)] = names
+            extracted[column] = names
+        return extracted
+
+    return extract
+
+
+def compile_extraction_plan(spec):
+    """
+    Turns an extraction spec into accessor functions, so the spec is interpreted once rather than per item. Each
+    metadata attribute is parsed once, and each name list built once per item however many attributes use it.
+
+    :param spec: tuple of (metadata attribute, fields) entries, see CASE_EXTRACTION_SPEC
+    :return: List of functions of (item, name_lists), one per attribute, to be applied in order.
+    """
+    return [_compile_metadata_attribute(field_name, fields) for field_name, fields in spec]
+
+
+_CASE_EXTRACTORS = compile_extraction_plan(CASE_EXTRACTION_SPEC)
+
+
+def build_cases_table_data(items, stats=None):
     """
     Transforms a list of document items into case data for storage.
 
     :param items: List of document items from DynamoDB.
+    :param stats: optional Counter the builder adds its counters to (see parallel_build.parallel_build).
     :return: List of transformed case data.
     """
     logger.info(f"Building case data from {len(items)} document items")
+    trace = BuildTrace("build_cases_table_data", len(items))
     cases_data_dict = []
     error_count = 0
     success_count = 0
+    missing_due_date_count = 0
 
-    for item in items:
+    for index, item in enumerate(items):
+        traced = trace.active and trace.is_traced(index, item)
         try:
-            document_id = item.get('documentId', 'unknown')
-            logger.debug(f"Processing document {document_id}")
-
             # Transform item fields
-            item['demandDetails']['demandResponseRelativeDueDate'] = (
-                float(item['demandDetails']['demandResponseRelativeDueDate'])
-                if item['demandDetails']['demandResponseRelativeDueDate']
-                else None
-            )
+            demand_details = item['demandDetails']
+            due_date = demand_details['demandResponseRelativeDueDate']
+            demand_details['demandResponseRelativeDueDate'] = float(due_date) if due_date else None
             item['createdTs'] = float(item['createdTs'])
             item['version'] = float(item['version'])
 
-            # Process nested structures
-            for attachment in item['attachments']:
-                attachment['sourceFileSize'] = float(attachment['sourceFileSize']) if isinstance(
-                    attachment['sourceFileSize'], Decimal) else attachment['sourceFileSize']
-                attachment['createdTs'] = float(attachment['createdTs'])
-
             # Extract sending firm name and remove trailing whitespace
-            sending_firm_name = item['sendingFirm']['firmName']
+            sending_firm = item['sendingFirm']
+            sending_firm_name = sending_firm['firmName']
             if isinstance(sending_firm_name, str):
                 sending_firm_name = sending_firm_name.rstrip()
 
             # Build case data
+            claim_info = item['claimInfo']
             case_data = {
                 'documentId': item['documentId'],
                 'customerId': item['customerId'],
                 'version': item['version'],
-                'claimCoverage': item['claimInfo']['claimCoverage'],
-                'claimNumber': item['claimInfo']['claimNumber'],
+                'claimCoverage': claim_info['claimCoverage'],
+                'claimNumber': claim_info['claimNumber'],
                 'sendingFirm': sending_firm_name,
                 'recipientCarrier': item['recipientCarrier']['carrierCommonName']
             }
 
             # Add easy case data
             cases_data_dict.append(case_data)
-            logger.debug(f"Added base case data for document {document_id}")
-
-            # Get the data from caseManagementMetadata field
-            keys_to_extract = ['relatedInsuranceId', 'clientId', 'matterId', 'matterTechId', 'matterName']
-            extracted_metadata = extract_metadata_fields(item, 'caseManagementMetadata', keys_to_extract)
-            case_data.update(extracted_metadata)
-            logger.debug(f"Added case management metadata for document {document_id}")
-
-            # Get the data from claimInfo field
-            keys_to_extract = ['lossState', 'claimNumber', 'claimCoverage', 'claimant']
-            extracted_metadata = extract_metadata_fields(item, 'claimInfo', keys_to_extract)
-            case_data.update(extracted_metadata)
-            logger.debug(f"Added claim info for document {document_id}")
-
-            # Get the data from sendingFirm field
-            keys_to_extract = ['primaryContact', 'attorney']
-            extracted_metadata = extract_metadata_fields(item, 'sendingFirm', keys_to_extract)
-            case_data.update(extracted_metadata)
-            logger.debug(f"Added sending firm info for document {document_id}")
+
+            # Add the caseManagementMetadata, claimInfo and sendingFirm fields
+            name_lists = {}
+            for extract in _CASE_EXTRACTORS:
+                case_data.update(extract(item, name_lists))
 
             success_count += 1
+            if traced:
+                trace.log(f"Built case row for document {case_data['documentId']}: {case_data}")
 
         except KeyError as e:
             error_count += 1
+            if e.args == ('demandResponseRelativeDueDate',):
+                missing_due_date_count += 1
             logger.error(f"Missing key {e} in item: {item.get('documentId', 'unknown')}")
+            if traced:
+                trace.log(f"Failed item: {item}")
         except Exception as e:
             error_count += 1
             logger.error(f"Error processing item {item.get('documentId', 'unknown')}: {e}")
+            if traced:
+                trace.log(f"Failed item: {item}")
 
     logger.info(f"Successfully processed {success_count} documents, encountered {error_count} errors")
     logger.info(f"Final case dataset contains {len(cases_data_dict)} records")
-    return cases_data_dict
\ No newline at end of file
+    trace.finish(len(cases_data_dict), stats, success_count=success_count, error_count=error_count,
+                 missing_due_date_count=missing_due_date_count)
+    return cases_data_dict
@@ -1,27 +1,32 @@
 from itc_common_utilities.logger.logger_setup import setup_logger
 
+from builders.build_trace import BuildTrace
+
 # Initialize the logger
 logger = setup_logger(__name__)
 
 
-def build_metadata_table_data(items):
+def build_metadata_table_data(items, stats=None):
     """
     Transforms a list of document items into metadata table data.
 
     :param items: List of document items from DynamoDB.
+    :param stats: optional Counter the builder adds its counters to (see parallel_build.parallel_build).
     :return: List of metadata table data.
     """
     logger.info(f"Building metadata table data from {len(items)} items")
+    trace = BuildTrace("build_metadata_table_data", len(items))
     metadata_table_dict = []
     success_count = 0
     error_count = 0
     receipt_ack_count = 0
     archived_count = 0
+    no_status_history_count = 0
 
-    for item in items:
+    for index, item in enumerate(items):
+        traced = trace.active and trace.is_traced(index, item)
         try:
             document_id = item.get('documentId', 'unknown')
-            logger.debug(f"Processing metadata for document {document_id}")
 
             metadata_data = {
                 'documentType': item.get('documentType'),
@@ -35,8 +40,8 @@ def build_metadata_table_data(items):
 
             # Extract document status history
             if isinstance(item.get('documentStatusHistory'), list):
-                logger.debug(
-                    f"Processing status history with {len(item['documentStatusHistory'])} entries for document {document_id}")
+                if traced:
+                    trace.log(f"Status history of document {document_id}: {item['documentStatusHistory']}")
 
                 for status in item['documentStatusHistory']:
                     if status.get('documentStatus') == 'DocumentReceived':
@@ -45,7 +50,6 @@ def build_metadata_table_data(items):
                             # Convert timestamp to int before assignment
                             metadata_data['receiptAckTimeStamp'] = int(float(ts))
                             receipt_ack_count += 1
-                            logger.debug(f"Found DocumentReceived status for document {document_id} at timestamp {ts}")
 
                     if status.get('documentStatus') == 'DocumentArchived':
                         ts = status.get('timestamp')
@@ -53,24 +57,31 @@ def build_metadata_table_data(items):
                             # Convert timestamp to int before assignment
                             metadata_data['demandArchivedTimeStamp'] = int(float(ts))
                             archived_count += 1
-                            logger.debug(f"Found DocumentArchived status for document {document_id} at timestamp {ts}")
             else:
-                logger.debug(f"No status history found for document {document_id}")
+                no_status_history_count += 1
 
             metadata_table_dict.append(metadata_data)
             success_count += 1
-            logger.debug(f"Successfully processed metadata for document {document_id}")
+            if traced:
+                trace.log(f"Built metadata row for document {document_id}: {metadata_data}")
 
         except KeyError as e:
             error_count += 1
             logger.error(f"Missing key {e} in item: {item.get('documentId', 'unknown')}")
+            if traced:
+                trace.log(f"Failed item: {item}")
         except Exception as e:
             error_count += 1
             logger.error(f"Error processing metadata for document {item.get('documentId', 'unknown')}: {e}")
+            if traced:
+                trace.log(f"Failed item: {item}")
 
     logger.info(f"Successfully processed {success_count} metadata records, encountered {error_count} errors")
     logger.info(
         f"Found {receipt_ack_count} documents with receipt acknowledgment and {archived_count} archived documents")
     logger.info(f"Final metadata dataset contains {len(metadata_table_dict)} records")
+    trace.finish(len(metadata_table_dict), stats, success_count=success_count, error_count=error_count,
+                 receipt_ack_count=receipt_ack_count, archived_count=archived_count,
+                 no_status_history_count=no_status_history_count)
 
     return metadata_table_dict
\ No newline at end of file
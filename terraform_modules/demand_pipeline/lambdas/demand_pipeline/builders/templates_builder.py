@@ -1,5 +1,7 @@
 from itc_common_utilities.logger.logger_setup import setup_logger
 
+from builders.build_trace import BuildTrace
+
 # Initialize the logger
 logger = setup_logger(__name__)
 
@@ -15,12 +17,12 @@ def build_templates_table_data(items):
         list: List of dictionaries with structured templates data.
     """
     logger.info(f"Building templates data from {len(items)} template items")
+    trace = BuildTrace("build_templates_table_data", len(items), id_attribute='templateId')
     templates_table_dict = []
     missing_data_count = 0
 
     for index, jsonitem in enumerate(items):
         template_id = jsonitem.get('templateId', 'unknown')
-        logger.debug(f"Processing template {template_id} (item {index + 1} of {len(items)})")
 
         templates_data = {}
         templates_data['templateId'] = jsonitem.get('templateId', None)
@@ -37,9 +39,11 @@ def build_templates_table_data(items):
             logger.warning(f"Template item {template_id} is missing required fields: {', '.join(missing_fields)}")
 
         templates_table_dict.append(templates_data)
-        logger.debug(f"Successfully processed template {template_id}")
+        if trace.active and trace.is_traced(index, jsonitem):
+            trace.log(f"Built template row {index + 1} of {len(items)}: {templates_data}")
 
     logger.info(f"Completed template data processing. Created {len(templates_table_dict)} template records")
     logger.info(f"Found {missing_data_count} templates with missing data fields")
+    trace.finish(len(templates_table_dict), missing_data_count=missing_data_count)
 
     return templates_table_dict
\ No newline at end of file
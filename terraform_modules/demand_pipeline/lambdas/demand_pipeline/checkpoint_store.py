@@ -0,0 +1,233 @@
+# Standard library imports
+import os
+import json
+from abc import ABC, abstractmethod
+
+# Third-party imports
+import boto3
+from botocore.exceptions import ClientError
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+CHECKPOINT_STORE_NONE = "none"
+CHECKPOINT_STORE_LOCAL = "local"
+CHECKPOINT_STORE_S3 = "s3"
+CHECKPOINT_STORE_POSTGRES = "postgres"
+
+DEFAULT_CHECKPOINT_DIR = "/tmp/demand_pipeline_checkpoints"
+DEFAULT_CHECKPOINT_PREFIX = "checkpoints"
+
+
+class CheckpointStore(ABC):
+    """
+    Key/value store for scan checkpoints. Keys are '/'-separated paths and values are bytes.
+
+    Implementations must make write() durable before returning, since a checkpoint is only
+    useful if it survives the invocation that wrote it.
+    """
+
+    @abstractmethod
+    def read(self, key):
+        """
+        :param key: checkpoint key
+        :return: The stored bytes, or None if the key does not exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def write(self, key, data):
+        """
+        :param key: checkpoint key
+        :param data: bytes to store, replacing any previous value
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_keys(self, prefix):
+        """
+        :param prefix: key prefix (e.g. '<run_id>/cases/')
+        :return: Sorted list of the keys starting with the prefix.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_prefix(self, prefix):
+        """
+        :param prefix: key prefix; every key starting with it is deleted
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Releases the resources held by the store. Stores without any (local files, S3) do nothing.
+        """
+
+    def read_json(self, key):
+        data = self.read(key)
+        return None if data is None else json.loads(data)
+
+    def write_json(self, key, value, default=None):
+        self.write(key, json.dumps(value, default=default).encode("utf-8"))
+
+
+class LocalFileCheckpointStore(CheckpointStore):
+    """
+    Stores checkpoints as files under a local directory. On Lambda, /tmp only survives while the
+    execution environment stays warm, so this store is mainly meant for local runs and tests.
+    """
+
+    def __init__(self, base_dir=DEFAULT_CHECKPOINT_DIR):
+        self.base_dir = base_dir
+
+    def _path(self, key):
+        return os.path.join(self.base_dir, *key.split("/"))
+
+    def read(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a half-written checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def list_keys(self, prefix):
+        keys = []
+        for root, _, files in os.walk(self.base_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                key = os.path.relpath(os.path.join(root, name), self.base_dir).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete_prefix(self, prefix):
+        for key in self.list_keys(prefix):
+            os.remove(self._path(key))
+
+
+class S3CheckpointStore(CheckpointStore):
+    """
+    Stores checkpoints as objects under a prefix of an S3 bucket.
+    """
+
+    def __init__(self, bucket, prefix=DEFAULT_CHECKPOINT_PREFIX, client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = client or boto3.client("s3")
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def read(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["Body"].read()
+
+    def write(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+
+    def list_keys(self, prefix):
+        keys = []
+        strip = len(self._object_key(""))
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            keys.extend(obj["Key"][strip:] for obj in page.get("Contents", []))
+        return sorted(keys)
+
+    def delete_prefix(self, prefix):
+        keys = self.list_keys(prefix)
+        # DeleteObjects accepts up to 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self._object_key(key)} for key in keys[start:start + 1000]]},
+            )
+
+
+class PostgresCheckpointStore(CheckpointStore):
+    """
+    Stores checkpoints in raw.scan_checkpoints. A dedicated autocommit connection is used, so the
+    checkpoints are kept even when the pipeline's own transaction is rolled back.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.autocommit = True
+
+    def read(self, key):
+        with self.conn.cursor() as cur:
+            cur.execute('SELECT "value" FROM raw.scan_checkpoints WHERE "key" = %s;', (key,))
+            row = cur.fetchone()
+        return None if row is None else bytes(row[0])
+
+    def write(self, key, data):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO raw.scan_checkpoints ("key", "value", "updatedAt") VALUES (%s, %s, now())
+                ON CONFLICT ("key") DO UPDATE SET "value" = EXCLUDED."value", "updatedAt" = EXCLUDED."updatedAt";
+                """,
+                (key, data)
+            )
+
+    def list_keys(self, prefix):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                'SELECT "key" FROM raw.scan_checkpoints WHERE starts_with("key", %s) ORDER BY "key";', (prefix,)
+            )
+            return [key for (key,) in cur.fetchall()]
+
+    def delete_prefix(self, prefix):
+        with self.conn.cursor() as cur:
+            cur.execute('DELETE FROM raw.scan_checkpoints WHERE starts_with("key", %s);', (prefix,))
+
+    def close(self):
+        self.conn.close()
+
+
+def get_checkpoint_store():
+    """
+    Builds the checkpoint store selected by the CHECKPOINT_STORE environment variable.
+
+    * 'none' (default): scans are not checkpointed.
+    * 'local': files under CHECKPOINT_DIR (default /tmp/demand_pipeline_checkpoints).
+    * 's3': objects under CHECKPOINT_PREFIX (default 'checkpoints') in CHECKPOINT_BUCKET.
+    * 'postgres': rows in raw.scan_checkpoints, through a separate autocommit connection.
+
+    :return: CheckpointStore, or None if scans are not checkpointed.
+    """
+    store_type = os.getenv("CHECKPOINT_STORE", CHECKPOINT_STORE_NONE).lower()
+    if store_type == CHECKPOINT_STORE_LOCAL:
+        store = LocalFileCheckpointStore(os.getenv("CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR))
+    elif store_type == CHECKPOINT_STORE_S3:
+        store = S3CheckpointStore(os.environ["CHECKPOINT_BUCKET"],
+                                  os.getenv("CHECKPOINT_PREFIX", DEFAULT_CHECKPOINT_PREFIX))
+    elif store_type == CHECKPOINT_STORE_POSTGRES:
+        from utils import get_db_connection  # Lazy import, only this store needs a database connection
+        store = PostgresCheckpointStore(get_db_connection())
+    else:
+        if store_type != CHECKPOINT_STORE_NONE:
+            logger.warning(f"Unknown CHECKPOINT_STORE '{store_type}'. Scans will not be checkpointed.")
+        return None
+
+    logger.info(f"Checkpointing scans to the '{store_type}' store.")
+    return store
@@ -0,0 +1,135 @@
+# Standard library imports
+from typing import NamedTuple
+
+# Columns of each raw table, in insert order, with the source attribute paths its builder reads to fill them.
+# Paths are dot-separated for nested map attributes. Attributes parsed as a whole by the builders (e.g. the
+# metadata maps that may also be stored as JSON strings, or lists of maps) are listed at their top level.
+# "types" lists the PostgreSQL type of every column that is not text, as information_schema reports it.
+COLUMN_SPECS = {
+    "cases": {
+        "columns": {
+            'documentId': ('documentId',),
+            'customerId': ('customerId',),
+            'version': ('version',),
+            'matterTechId': ('caseManagementMetadata',),
+            'matterName': ('caseManagementMetadata',),
+            'claimCoverage': ('claimInfo',),
+            'claimNumber': ('claimInfo',),
+            'lossState': ('claimInfo',),
+            'sendingFirm': ('sendingFirm.firmName',),
+            'recipientCarrier': ('recipientCarrier.carrierCommonName',),
+            'assignedAttorney': ('caseManagementMetadata', 'sendingFirm'),
+            'assignedCaseCollaborator': ('sendingFirm',),
+            'assignedCaseManager': ('caseManagementMetadata', 'sendingFirm'),
+            'clientId': ('caseManagementMetadata',),
+            'clientName': ('caseManagementMetadata', 'claimInfo', 'sendingFirm'),
+            'matterId': ('caseManagementMetadata',),
+            'relatedInsuranceId': ('caseManagementMetadata',),
+        },
+        # Read by the builder without being loaded: createdTs is the high-water mark, and documents
+        # without a demandResponseRelativeDueDate are rejected
+        "extra_attributes": ('createdTs', 'demandDetails.demandResponseRelativeDueDate'),
+        "types": {'version': 'integer', 'assignedCaseCollaborator': 'ARRAY'},
+    },
+    "metadata": {
+        "columns": {
+            'documentType': ('documentType',),
+            'documentId': ('documentId',),
+            'receiptAckTimeStamp': ('documentStatusHistory',),
+            'demandIsDeliverable': ('demandIsDeliverable',),
+            'demandTemplateId': ('demandTemplateId',),
+            'demandTemplatePinnedVersion': (),
+            'demandUploadedTimeStamp': ('createdTs',),
+            'demandArchivedTimeStamp': ('documentStatusHistory',),
+        },
+        "extra_attributes": (),
+        "types": {'receiptAckTimeStamp': 'bigint', 'demandIsDeliverable': 'boolean',
+                  'demandUploadedTimeStamp': 'bigint', 'demandArchivedTimeStamp': 'bigint'},
+    },
+    "templates": {
+        "columns": {
+            'templateId': ('templateId',),
+            'templateName': ('templateName',),
+            'version': ('version',),
+            'defaultDemandConfig': ('defaultDemandConfig',),
+        },
+        "extra_attributes": (),
+        "types": {'version': 'integer', 'defaultDemandConfig': 'jsonb'},
+    },
+    "audit": {
+        "columns": {
+            'auditRecordId': ('auditRecordId',),
+            'createdTs': ('createdTs',),
+            'documentId': ('documentId',),
+            'actionType': ('actionType',),
+            'lastArchiveReason': ('payload.archiveReason',),
+            'lastArchiveComment': ('payload.archiveComments',),
+        },
+        "extra_attributes": (),
+        "types": {'createdTs': 'bigint'},
+    },
+}
+
+
+class Projection(NamedTuple):
+    """ProjectionExpression of a scan, with its attribute name placeholders."""
+    expression: str
+    attribute_names: dict
+
+
+def get_headers(table_name):
+    """
+    :param table_name: name of the raw table (e.g. 'cases')
+    :return: List of the table's column names, in insert order.
+    """
+    return list(COLUMN_SPECS[table_name]["columns"])
+
+
+def get_column_types(table_name):
+    """
+    :param table_name: name of the raw table (e.g. 'cases')
+    :return: Dictionary of every column of the table to its PostgreSQL data type (e.g. 'bigint', 'text').
+    """
+    types = COLUMN_SPECS[table_name]["types"]
+    return {column: types.get(column, 'text') for column in COLUMN_SPECS[table_name]["columns"]}
+
+
+def get_source_attributes(table_name):
+    """
+    :param table_name: name of the raw table (e.g. 'cases')
+    :return: Sorted list of the minimal attribute paths to read, with paths nested under another one removed.
+    """
+    spec = COLUMN_SPECS[table_name]
+    paths = {path for sources in spec["columns"].values() for path in sources}
+    paths.update(spec["extra_attributes"])
+    # DynamoDB rejects overlapping paths, and the parent already returns everything below it
+    return sorted(path for path in paths
+                  if not any(path.startswith(f"{other}.") for other in paths))
+
+
+def build_projection(paths):
+    """
+    Builds a ProjectionExpression reading the given attribute paths. Every name goes through a placeholder,
+    so reserved words (e.g. 'version') and special characters need no special handling.
+
+    :param paths: list of dot-separated attribute paths
+    :return: Projection
+    """
+    placeholders = {}
+    expressions = []
+    for path in paths:
+        parts = []
+        for name in path.split("."):
+            if name not in placeholders:
+                placeholders[name] = f"#p{len(placeholders)}"
+            parts.append(placeholders[name])
+        expressions.append(".".join(parts))
+    return Projection(", ".join(expressions), {placeholder: name for name, placeholder in placeholders.items()})
+
+
+def get_projection(table_name):
+    """
+    :param table_name: name of the raw table (e.g. 'cases')
+    :return: Projection reading only the attributes the table's builder needs.
+    """
+    return build_projection(get_source_attributes(table_name))
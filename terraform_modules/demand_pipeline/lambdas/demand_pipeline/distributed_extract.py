@@ -0,0 +1,121 @@
+# Standard library imports
+import concurrent.futures
+
+# Local imports
+from resumable_scan import plan_checkpointed_segments, scan_checkpointed_segment, read_checkpointed_rows
+from rate_limiter import get_scan_rate_limiter
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Actions of a distributed extraction, passed in the Lambda event
+ACTION_PLAN = "plan"
+ACTION_SCAN_PARTITION = "scan_partition"
+ACTION_MERGE = "merge"
+
+# Status of a worker; IN_PROGRESS means the partition was checkpointed and must be invoked again
+PARTITION_STATUS_COMPLETE = "COMPLETE"
+PARTITION_STATUS_IN_PROGRESS = "IN_PROGRESS"
+
+
+def plan_partitions(checkpointers, tables, total_segments=None):
+    """
+    Splits every table into scan segments and describes one worker invocation per segment.
+
+    :param checkpointers: dictionary of table name to ScanCheckpointer, all for the same run
+    :param tables: dictionary of table name to DynamoDB Table resource object
+    :param total_segments: (Optional) number of segments per table, chosen from each table's size if None
+    :return: List of partition events, each with the 'action', 'run_id', 'table_name', 'segment' and 'total_segments'.
+    """
+    partitions = []
+    for table_name, checkpointer in checkpointers.items():
+        table_segments = plan_checkpointed_segments(tables[table_name], checkpointer, total_segments)
+        partitions.extend(
+            {
+                "action": ACTION_SCAN_PARTITION,
+                "run_id": checkpointer.run_id,
+                "table_name": table_name,
+                "segment": segment_index,
+                "total_segments": table_segments,
+            }
+            for segment_index in range(table_segments)
+        )
+    logger.info(f"Planned {len(partitions)} scan partitions across {len(checkpointers)} tables.")
+    return partitions
+
+
+def scan_partition(partition, checkpointer, table, build_fn, filter_expression=None, projection_expression=None,
+                   watermark_attribute=None, deadline=None):
+    """
+    Worker step: scans one segment of one table, builds its rows and writes them to the checkpoint store.
+    A retried worker resumes the segment from its last checkpoint.
+
+    :param partition: partition event from plan_partitions
+    :param checkpointer: ScanCheckpointer for the partition's table and run
+    :param table: DynamoDB Table resource object
+    :param build_fn: builder turning a list of items into a list of rows
+    :param filter_expression: (Optional) DynamoDB filter expression object
+    :param projection_expression: (Optional) A string of attributes to retrieve
+    :param watermark_attribute: (Optional) attribute whose high-water mark is tracked
+    :param deadline: (Optional) time.monotonic() value at which the scan stops
+    :return: Dictionary with the 'status' and the partition's 'items' and 'rows' counts.
+    """
+    # The table's read capacity budget is split evenly between its workers
+    rate_limiter = get_scan_rate_limiter(scanners=partition["total_segments"])
+    state = scan_checkpointed_segment(
+        table, checkpointer, build_fn, partition["segment"], partition["total_segments"],
+        filter_expression=filter_expression,
+        projection_expression=projection_expression,
+        watermark_attribute=watermark_attribute,
+        rate_limiter=rate_limiter,
+        deadline=deadline,
+    )
+    return {"status": PARTITION_STATUS_COMPLETE, "items": state["items"], "rows": state["rows"]}
+
+
+def collect_partitions(checkpointer, high_water_mark=None):
+    """
+    Merge step: reads back the rows written by every worker of a table.
+
+    :param checkpointer: ScanCheckpointer for the table and run
+    :param high_water_mark: the previously stored high-water mark
+    :return: Tuple of (list of rows, high-water mark).
+    :raises ValueError: if the table was not planned, a partition is unfinished, or the row counts don't match.
+    """
+    total_segments = checkpointer.load_total_segments()
+    if total_segments is None:
+        raise ValueError(f"No scan partitions were planned for raw.{checkpointer.table_name} in run "
+                         f"{checkpointer.run_id}.")
+
+    segment_states = {segment_index: checkpointer.load_segment(segment_index)
+                      for segment_index in range(total_segments)}
+    unfinished = [segment_index for segment_index, state in segment_states.items()
+                  if state is None or not state["done"]]
+    if unfinished:
+        raise ValueError(f"Scan partitions {unfinished} of raw.{checkpointer.table_name} are not finished.")
+
+    logger.info(f"Merging {total_segments} scan partitions of raw.{checkpointer.table_name}...")
+    return read_checkpointed_rows(checkpointer, segment_states, high_water_mark)
+
+
+def run_local_distributed_extract(invoke, run_id, max_workers=None):
+    """
+    Runs a distributed extraction in-process, doing what the orchestrator's Step Function does with a Map state:
+    plan the partitions, run the workers concurrently (again while any is IN_PROGRESS), then merge.
+
+    :param invoke: callable taking a Lambda event and returning the handler's result (e.g. main.handler with no context)
+    :param run_id: identifier of the run
+    :param max_workers: (Optional) number of workers running at once
+    :return: The result of the merge step.
+    """
+    plan = invoke({"action": ACTION_PLAN, "run_id": run_id})
+    pending = plan["partitions"]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending:
+            results = list(executor.map(invoke, pending))
+            pending = [partition for partition, result in zip(pending, results)
+                       if result["status"] == PARTITION_STATUS_IN_PROGRESS]
+    return invoke({"action": ACTION_MERGE, "run_id": run_id})
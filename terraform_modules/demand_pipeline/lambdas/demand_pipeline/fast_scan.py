@@ -0,0 +1,149 @@
+# Standard library imports
+import os
+
+# Third-party imports
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Which API the scans go through: "resource" (boto3 Table.scan) or "client" (low-level client + decode_item)
+SCAN_CLIENT_RESOURCE = "resource"
+SCAN_CLIENT_LOW_LEVEL = "client"
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def get_scan_client_mode():
+    """
+    Reads the SCAN_CLIENT environment variable.
+
+    :return: 'resource' (default) or 'client'.
+    """
+    mode = os.getenv("SCAN_CLIENT", SCAN_CLIENT_RESOURCE).lower()
+    if mode not in (SCAN_CLIENT_RESOURCE, SCAN_CLIENT_LOW_LEVEL):
+        logger.warning(f"Invalid SCAN_CLIENT '{mode}'. Falling back to '{SCAN_CLIENT_RESOURCE}'.")
+        mode = SCAN_CLIENT_RESOURCE
+    return mode
+
+
+def _decode_number(value):
+    # DynamoDB sends numbers as strings; whole numbers become int (exact), the others float
+    if "." in value or "e" in value or "E" in value:
+        return float(value)
+    return int(value)
+
+
+def _decode_map(value):
+    return {name: decode_value(attribute) for name, attribute in value.items()}
+
+
+def _decode_list(value):
+    return [decode_value(attribute) for attribute in value]
+
+
+_DECODERS = {
+    "S": lambda value: value,
+    "N": _decode_number,
+    "BOOL": lambda value: value,
+    "NULL": lambda value: None,
+    "M": _decode_map,
+    "L": _decode_list,
+    "SS": set,
+    "NS": lambda value: {_decode_number(number) for number in value},
+    "B": bytes,
+    "BS": lambda value: {bytes(binary) for binary in value},
+}
+
+
+def decode_value(attribute):
+    """
+    Decodes one attribute value from the DynamoDB wire format (e.g. {"N": "3"}).
+
+    Unlike boto3's TypeDeserializer, numbers become int or float instead of Decimal, and binary values
+    plain bytes instead of Binary.
+
+    :param attribute: single-entry dictionary of type tag to value
+    :return: The Python value.
+    """
+    (type_tag, value), = attribute.items()
+    return _DECODERS[type_tag](value)
+
+
+def decode_item(item):
+    """
+    Decodes a DynamoDB item from the wire format.
+
+    :param item: dictionary of attribute name to wire-format value
+    :return: Dictionary of attribute name to Python value (see decode_value).
+    """
+    return {name: decode_value(attribute) for name, attribute in item.items()}
+
+
+def _build_condition(condition, attribute_names, attribute_values):
+    """
+    Renders a boto3 condition (e.g. Attr('x').gt(1)) into a condition expression string,
+    adding its placeholders to the given dictionaries.
+    """
+    built = ConditionExpressionBuilder().build_expression(condition)
+    attribute_names.update(built.attribute_name_placeholders)
+    attribute_values.update(
+        {placeholder: _serializer.serialize(value) for placeholder, value in built.attribute_value_placeholders.items()}
+    )
+    return built.condition_expression
+
+
+class FastScanTable:
+    """
+    Stands in for a boto3 Table resource in the scan helpers, scanning through the low-level client.
+
+    scan() takes and returns the same arguments as Table.scan, but the items are decoded by decode_item:
+    numbers come back as int/float rather than Decimal, and nothing is walked twice. The keys of the pages
+    (ExclusiveStartKey/LastEvaluatedKey) still go through boto3's exact types, so checkpoints keep working.
+    Every other attribute (e.g. table_size_bytes) is read from the wrapped Table.
+    """
+
+    def __init__(self, table, client):
+        """
+        :param table: boto3 DynamoDB Table resource
+        :param client: low-level boto3 DynamoDB client with the same credentials and region
+        """
+        self._table = table
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+    def scan(self, **kwargs):
+        request = {"TableName": self._table.name}
+        attribute_names = dict(kwargs.pop("ExpressionAttributeNames", None) or {})
+        attribute_values = {}
+
+        filter_expression = kwargs.pop("FilterExpression", None)
+        if isinstance(filter_expression, ConditionBase):
+            filter_expression = _build_condition(filter_expression, attribute_names, attribute_values)
+        if filter_expression is not None:
+            request["FilterExpression"] = filter_expression
+
+        exclusive_start_key = kwargs.pop("ExclusiveStartKey", None)
+        if exclusive_start_key is not None:
+            request["ExclusiveStartKey"] = {name: _serializer.serialize(value)
+                                            for name, value in exclusive_start_key.items()}
+
+        request.update(kwargs)
+        if attribute_names:
+            request["ExpressionAttributeNames"] = attribute_names
+        if attribute_values:
+            request["ExpressionAttributeValues"] = attribute_values
+
+        response = self._client.scan(**request)
+        response["Items"] = [decode_item(item) for item in response.get("Items", [])]
+        if "LastEvaluatedKey" in response:
+            response["LastEvaluatedKey"] = {name: _deserializer.deserialize(value)
+                                            for name, value in response["LastEvaluatedKey"].items()}
+        return response
@@ -0,0 +1,124 @@
+# Standard library imports
+import os
+
+# Local imports
+from column_specs import get_column_types
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# How raw.cases_latest and raw.audit_latest are filled:
+#   sql      - derived from the raw tables with DISTINCT ON once they are loaded (default)
+#   pipeline - reduced in the pipeline from the built rows with a hash map, and loaded like a raw table
+LATEST_REDUCTION_SQL = "sql"
+LATEST_REDUCTION_PIPELINE = "pipeline"
+
+# Tables holding the latest row per document of a raw table, keyed by raw table name.
+# - latest_table: table in the raw schema read by the curated views instead of the raw table.
+# - order_by: columns ranking the rows of a document, latest first. As with ORDER BY ... DESC in PostgreSQL,
+#   NULL ranks above any value; text columns are compared byte by byte (COLLATE "C"), as Python compares str.
+# - not_null: rows with NULL in these columns never count as the latest (as with MAX(), which skips NULLs).
+LATEST_TABLES = {
+    "cases": {
+        "latest_table": "cases_latest",
+        "order_by": ("version",),
+        "not_null": (),
+    },
+    "audit": {
+        "latest_table": "audit_latest",
+        "order_by": ("createdTs", "auditRecordId"),
+        "not_null": ("createdTs",),
+    },
+}
+LATEST_KEY_COLUMN = "documentId"
+
+
+def get_latest_reduction():
+    """
+    Reads the LATEST_REDUCTION environment variable.
+
+    :return: 'sql' (default) or 'pipeline'.
+    """
+    reduction = os.getenv("LATEST_REDUCTION", LATEST_REDUCTION_SQL).lower()
+    if reduction not in (LATEST_REDUCTION_SQL, LATEST_REDUCTION_PIPELINE):
+        logger.warning(f"Invalid LATEST_REDUCTION '{reduction}'. Falling back to '{LATEST_REDUCTION_SQL}'.")
+        reduction = LATEST_REDUCTION_SQL
+    return reduction
+
+
+def _rank(row, order_by):
+    # NULL ranks first in descending order; the flag keeps None out of the value comparisons
+    return tuple((1, 0) if row.get(column) is None else (0, row.get(column)) for column in order_by)
+
+
+def reduce_latest_rows(table_name, rows):
+    """
+    Keeps the latest row of every document, in one pass over the built rows: each document's best rank so far
+    is kept in a dictionary. Among rows of equal rank, the first one is kept. Rows without a documentId are
+    dropped, as no curated view can join them.
+
+    :param table_name: 'cases' or 'audit'
+    :param rows: list of built rows (dictionaries)
+    :return: List of the latest rows, in the order their documents first appear.
+    """
+    spec = LATEST_TABLES[table_name]
+    order_by = spec["order_by"]
+    not_null = spec["not_null"]
+    latest = {}
+    for row in rows:
+        document_id = row.get(LATEST_KEY_COLUMN)
+        if document_id is None or any(row.get(column) is None for column in not_null):
+            continue
+        rank = _rank(row, order_by)
+        current = latest.get(document_id)
+        if current is None or rank > current[0]:
+            latest[document_id] = (rank, row)
+    logger.info(f"Reduced {len(rows)} {table_name} rows to the latest rows of {len(latest)} documents.")
+    return [row for _, row in latest.values()]
+
+
+def derive_latest_table(conn, table_name, headers, document_ids=None):
+    """
+    Fills raw.<table>_latest from the raw table with DISTINCT ON, ranking the rows like reduce_latest_rows.
+    This does not commit, so the latest rows are replaced in the same transaction as the raw rows.
+
+    :param conn: psycopg2 connection object
+    :param table_name: 'cases' or 'audit'
+    :param headers: columns of the raw table (the latest table has the same columns)
+    :param document_ids: only re-derive these documents (e.g. those changed by an incremental sync), or None
+                         to replace every row
+    :return: Number of rows inserted into the latest table.
+    """
+    spec = LATEST_TABLES[table_name]
+    latest_table = spec["latest_table"]
+    columns = ", ".join(f'"{col}"' for col in headers)
+    conditions = [f'"{col}" IS NOT NULL' for col in (LATEST_KEY_COLUMN,) + spec["not_null"]]
+    params = ()
+    if document_ids is not None:
+        conditions.append(f'"{LATEST_KEY_COLUMN}" = ANY(%s)')
+        params = (list(document_ids),)
+    column_types = get_column_types(table_name)
+    order_by = ", ".join(f'"{col}" COLLATE "C" DESC' if column_types[col] == "text" else f'"{col}" DESC'
+                         for col in spec["order_by"])
+
+    with conn.cursor() as cur:
+        if document_ids is None:
+            cur.execute(f"DELETE FROM raw.{latest_table}")
+        else:
+            cur.execute(f'DELETE FROM raw.{latest_table} WHERE "{LATEST_KEY_COLUMN}" = ANY(%s)', params)
+        cur.execute(
+            f"""
+            INSERT INTO raw.{latest_table} ({columns})
+            SELECT DISTINCT ON ("{LATEST_KEY_COLUMN}") {columns}
+            FROM raw.{table_name}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY "{LATEST_KEY_COLUMN}", {order_by}
+            """,
+            params
+        )
+        inserted_count = cur.rowcount
+    logger.info(f"Derived {inserted_count} rows of raw.{latest_table} from raw.{table_name}.")
+    return inserted_count
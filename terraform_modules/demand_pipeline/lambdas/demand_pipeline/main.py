@@ -1,13 +1,30 @@
 # Standard library imports
 import os
+import sys
 import time
+from decimal import Decimal
 
 # Local imports
 from builders.case_builder import build_cases_table_data
 from builders.metadata_builder import build_metadata_table_data
 from builders.templates_builder import build_templates_table_data
 from builders.audit_builder import build_audit_table_data
-from utils import get_dynamo_table, scan_dynamo_table, parallel_scan_dynamo_table, insert_data_and_validate, get_db_connection
+from utils import get_dynamo_table, scan_dynamo_table, parallel_scan_dynamo_table, insert_data_and_validate, get_db_connection, \
+    upsert_data_and_validate, get_load_mode, get_streaming_mode, get_stream_batch_size, iter_parallel_scan_pages, \
+    iter_batches, stream_data_and_validate, get_columnar_load, to_record_batch
+from scan_scheduler import run_table_extractions
+from parallel_build import get_build_workers, parallel_builder
+from column_specs import get_headers, get_projection, get_column_types
+from latest_tables import LATEST_TABLES, LATEST_KEY_COLUMN, LATEST_REDUCTION_PIPELINE, get_latest_reduction, \
+    reduce_latest_rows, derive_latest_table
+from checkpoint_store import get_checkpoint_store
+from resumable_scan import ScanCheckpointer, ScanTimeBudgetExceeded, resumable_parallel_scan, \
+    get_checkpoint_time_margin
+from distributed_extract import ACTION_PLAN, ACTION_SCAN_PARTITION, ACTION_MERGE, PARTITION_STATUS_IN_PROGRESS, \
+    plan_partitions, scan_partition, collect_partitions, run_local_distributed_extract
+from sync_state import INCREMENTAL_TABLES, SYNC_MODE_INCREMENTAL, FINGERPRINTED_TABLES, get_sync_mode, \
+    get_high_water_marks, set_high_water_mark, record_table_fingerprints, compute_high_water_mark, \
+    get_incremental_start
 
 import boto3
 from boto3.dynamodb.conditions import Attr
@@ -23,130 +40,331 @@ logger = setup_logger(__name__)
 # if os.path.exists('.env'):
 #     load_dotenv()
 
-def main():
+# Columns loaded into each raw table, in insert order (see column_specs)
+CASE_HEADERS = get_headers("cases")
+METADATA_HEADERS = get_headers("metadata")
+TEMPLATES_HEADERS = get_headers("templates")
+AUDIT_HEADERS = get_headers("audit")
+
+# Attributes read from each source table: only those the builders need
+CASES_PROJECTION = get_projection("cases")
+METADATA_PROJECTION = get_projection("metadata")
+TEMPLATES_PROJECTION = get_projection("templates")
+AUDIT_PROJECTION = get_projection("audit")
+
+# Status returned to the Step Function; IN_PROGRESS means the scans were checkpointed and the run must be invoked again
+RUN_STATUS_COMPLETE = "COMPLETE"
+RUN_STATUS_IN_PROGRESS = "IN_PROGRESS"
+
+
+def segmented_extraction(label, table, build_fn, checkpointer=None, deadline=None, watermark_attribute=None,
+                         high_water_mark=None, **scan_kwargs):
     """
-    Main entry point for processing DynamoDB tables.
+    Describes the extraction of a table read with the parallel segmented scan, for run_table_extractions.
+
+    :param label: name used in the logs (e.g. 'Documents')
+    :param table: DynamoDB Table resource object
+    :param build_fn: builder turning a list of items into a list of rows
+    :param checkpointer: (Optional) ScanCheckpointer. If given, the scan is resumable and builds its rows page by page.
+    :param deadline: (Optional) time.monotonic() value at which a checkpointed scan stops
+    :param watermark_attribute: (Optional) attribute whose high-water mark a checkpointed scan tracks
+    :param high_water_mark: the previously stored high-water mark
+    :param scan_kwargs: extra arguments for the scan (filter_expression, projection_expression)
+    :return: Tuple of (label, scan_fn, build_fn).
     """
-    # Record overall start time
-    overall_start_time = time.perf_counter()
+    if checkpointer is None:
+        return label, lambda executor: parallel_scan_dynamo_table(table, executor=executor, **scan_kwargs), build_fn
+
+    def scan_fn(executor):
+        return resumable_parallel_scan(table, checkpointer, build_fn, watermark_attribute=watermark_attribute,
+                                       high_water_mark=high_water_mark, executor=executor, deadline=deadline,
+                                       **scan_kwargs)
+    return label, scan_fn, None
+
+
+def extraction_high_water_mark(extraction, table_name, high_water_marks):
+    """
+    :param extraction: result of extract_table
+    :param table_name: 'cases' or 'audit'
+    :param high_water_marks: dictionary returned by get_high_water_marks
+    :return: The new high-water mark of the table, or None if nothing was scanned.
+    """
+    if extraction["items"] is None:
+        # Checkpointed scans track the mark page by page
+        return extraction["high_water_mark"]
+    return compute_high_water_mark(
+        extraction["items"], INCREMENTAL_TABLES[table_name]["watermark_attribute"], high_water_marks.get(table_name)
+    )
+
+
+def get_source_tables():
+    """
+    Initializes the DynamoDB table resources of SOURCE_ENV in SOURCE_ACCOUNT.
 
-    # Retrieve the environment variable
+    :return: Dictionary with the 'documents', 'metadata', 'templates' and 'audit' Table resources.
+    """
     SOURCE_ENV = os.getenv("SOURCE_ENV", "beta")  # Default to "beta" if ENV is not set
     SOURCE_ACCOUNT = os.getenv("SOURCE_ACCOUNT")
     logger.info(f"Running in SOURCE_ENV: {SOURCE_ENV}, SOURCE_ACCOUNT: {SOURCE_ACCOUNT}")
 
-    # Initialize tables
     logger.info("Initializing DynamoDB table resources...")
-    documents_table = get_dynamo_table(f'exchange-{SOURCE_ENV}-documents', SOURCE_ACCOUNT)
-    metadata_table = get_dynamo_table(f'exchange-{SOURCE_ENV}-documents-metadata', SOURCE_ACCOUNT)
-    templates_table = get_dynamo_table(f'exchange-{SOURCE_ENV}-templates', SOURCE_ACCOUNT)
-    audit_table = get_dynamo_table(f'exchange-{SOURCE_ENV}-documents-audit', SOURCE_ACCOUNT)
+    return {
+        "documents": get_dynamo_table(f'exchange-{SOURCE_ENV}-documents', SOURCE_ACCOUNT),
+        "metadata": get_dynamo_table(f'exchange-{SOURCE_ENV}-documents-metadata', SOURCE_ACCOUNT),
+        "templates": get_dynamo_table(f'exchange-{SOURCE_ENV}-templates', SOURCE_ACCOUNT),
+        "audit": get_dynamo_table(f'exchange-{SOURCE_ENV}-documents-audit', SOURCE_ACCOUNT),
+    }
 
-    # -------------------- Scanning Documents Table --------------------
-    sts = boto3.client("sts")
-    logger.debug("Caller identity: %s", sts.get_caller_identity())
 
-    logger.info("Scanning Documents Table...")
-    t0 = time.perf_counter()
-    document_items = parallel_scan_dynamo_table(documents_table) #, global_max_rows=500)
-    t1 = time.perf_counter()
-    logger.info(f"Documents Table scan completed in {t1 - t0:.2f} seconds. Retrieved {len(document_items)} items.")
-
-    logger.info("Building case data...")
-    build_start = time.perf_counter()
-    cases = build_cases_table_data(document_items)
-    build_end = time.perf_counter()
-    logger.info(f"Case data built in {build_end - build_start:.2f} seconds. Generated {len(cases)} case records.")
-    case_headers = [
-        'documentId', 'customerId', 'version', 'matterTechId', 'matterName', 'claimCoverage',
-        'claimNumber', 'lossState', 'sendingFirm', 'recipientCarrier', 'assignedAttorney',
-        'assignedCaseCollaborator', 'assignedCaseManager','clientId', 'clientName', 'matterId',
-        'relatedInsuranceId'
-    ]
-
-    # -------------------- Scanning Metadata Table --------------------
-    logger.info("Scanning Metadata Table...")
-    t0 = time.perf_counter()
-    metadata_items = scan_dynamo_table(metadata_table)
-    t1 = time.perf_counter()
-    logger.info(f"Metadata Table scan completed in {t1 - t0:.2f} seconds. Retrieved {len(metadata_items)} items.")
-
-    logger.info("Building metadata data...")
-    build_start = time.perf_counter()
-    metadata = build_metadata_table_data(metadata_items)
-    build_end = time.perf_counter()
-    logger.info(f"Metadata data built in {build_end - build_start:.2f} seconds. Generated {len(metadata)} metadata records.")
-    metadata_headers = [
-        'documentType', 'documentId', 'receiptAckTimeStamp', 'demandIsDeliverable',
-        'demandTemplateId', 'demandTemplatePinnedVersion', 'demandUploadedTimeStamp',
-        'demandArchivedTimeStamp'
-    ]
-
-    # -------------------- Scanning Templates Table --------------------
-    logger.info("Scanning Templates Table...")
-    t0 = time.perf_counter()
-    templates_items = scan_dynamo_table(templates_table)
-    t1 = time.perf_counter()
-    logger.info(f"Templates Table scan completed in {t1 - t0:.2f} seconds. Retrieved {len(templates_items)} items.")
-
-    logger.info("Building templates data...")
-    build_start = time.perf_counter()
-    templates = build_templates_table_data(templates_items)
-    build_end = time.perf_counter()
-    logger.info(f"Templates data built in {build_end - build_start:.2f} seconds. Generated {len(templates)} template records.")
-    templates_headers = [
-        'templateId', 'templateName', 'version', 'defaultDemandConfig'
-    ]
-
-    # -------------------- Scanning Audits Table --------------------
-    logger.info("Scanning Audits Table with filter for 'DemandArchived' actions...")
+def get_scan_filters(high_water_marks, incremental):
+    """
+    Builds the filters of the documents and audit scans. In the incremental sync mode only records newer
+    than the high-water marks (minus the lookback window) are returned. The filter is applied by DynamoDB after
+    reading each page, so the scans still read, and consume read capacity for, the whole tables.
+
+    :param high_water_marks: dictionary returned by get_high_water_marks
+    :param incremental: whether the run is an incremental sync
+    :return: Tuple of (documents filter or None, audit filter).
+    """
+    cases_start = None
+    audit_start = None
+    if incremental:
+        cases_start = get_incremental_start(high_water_marks, "cases")
+        audit_start = get_incremental_start(high_water_marks, "audit")
+
+    documents_filter = None
+    if cases_start is not None:
+        logger.info(f"Only scanning documents with createdTs > {cases_start}.")
+        documents_filter = Attr(INCREMENTAL_TABLES["cases"]["watermark_attribute"]).gt(cases_start)
+
+    audit_filter = Attr('actionType').eq('DemandArchived')
+    if audit_start is not None:
+        logger.info(f"Only scanning audit records with createdTs > {audit_start}.")
+        audit_filter = audit_filter & Attr(INCREMENTAL_TABLES["audit"]["watermark_attribute"]).gt(audit_start)
+
+    return documents_filter, audit_filter
+
+
+def stream_table(conn, table_name, pages, build_fn, headers, batch_size, load_mode, key_columns=None,
+                 watermark_attribute=None, high_water_mark=None):
+    """
+    Streams scanned pages through a builder and into raw.<table_name> in fixed-size batches.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the raw table
+    :param pages: iterable of lists of DynamoDB items (e.g. from iter_parallel_scan_pages)
+    :param build_fn: builder turning a list of items into a list of rows
+    :param headers: list of column names to insert
+    :param batch_size: number of items built and loaded at a time
+    :param load_mode: 'delete' or 'swap'
+    :param key_columns: if given, each batch is upserted on these columns (incremental sync)
+    :param watermark_attribute: if given, the high-water mark of this attribute is tracked across batches
+    :param high_water_mark: the previously stored high-water mark
+    :return: Tuple of (number of rows loaded, high-water mark).
+    """
+    def build_batches():
+        nonlocal high_water_mark
+        for batch in iter_batches(pages, batch_size):
+            if watermark_attribute is not None:
+                high_water_mark = compute_high_water_mark(batch, watermark_attribute, high_water_mark)
+            yield build_fn(batch)
+
     t0 = time.perf_counter()
-    audit_items = parallel_scan_dynamo_table(
-        audit_table,
-        filter_expression=Attr('actionType').eq('DemandArchived'),
-        projection_expression='auditRecordId, createdTs, documentId, actionType, lastArchiveReason, lastArchiveComment',
-        # global_max_rows=500
-    )
+    row_count = stream_data_and_validate(conn, table_name, headers, build_batches(), load_mode, key_columns)
     t1 = time.perf_counter()
-    logger.info(f"Audits Table scan completed in {t1 - t0:.2f} seconds. Retrieved {len(audit_items)} items.")
+    logger.info(f"Streamed {row_count} rows into raw.{table_name} in {t1 - t0:.2f} seconds.")
+    return row_count, high_water_mark
+
+
+def run_streaming_sync(conn, documents_table, metadata_table, templates_table, audit_table, sync_mode, load_mode,
+                       high_water_marks, documents_filter, audit_filter):
+    """
+    Scans, builds and loads each table in batches instead of holding every table in memory.
+
+    All tables are loaded in one transaction, which is committed once every table has been validated.
+
+    :param conn: psycopg2 connection object, or None to open one
+    :param documents_table: DynamoDB documents table
+    :param metadata_table: DynamoDB documents metadata table
+    :param templates_table: DynamoDB templates table
+    :param audit_table: DynamoDB documents audit table
+    :param sync_mode: 'full' or 'incremental'
+    :param load_mode: 'delete' or 'swap'
+    :param high_water_marks: dictionary returned by get_high_water_marks
+    :param documents_filter: filter expression for the documents scan, or None
+    :param audit_filter: filter expression for the audit scan
+    """
+    incremental = sync_mode == SYNC_MODE_INCREMENTAL
+    batch_size = get_stream_batch_size()
+    logger.info(f"Streaming tables into the database in batches of {batch_size} rows...")
+
+    if conn is None:
+        logger.info("Connecting to the PostgreSQL database...")
+        conn = get_db_connection()
+
+    try:
+        logger.info("Streaming Documents Table into raw.cases...")
+        cases_count, cases_high_water_mark = stream_table(
+            conn, "cases",
+            iter_parallel_scan_pages(documents_table, filter_expression=documents_filter,
+                                     projection_expression=CASES_PROJECTION),
+            build_cases_table_data, CASE_HEADERS, batch_size, load_mode,
+            key_columns=INCREMENTAL_TABLES["cases"]["key_columns"] if incremental else None,
+            watermark_attribute=INCREMENTAL_TABLES["cases"]["watermark_attribute"],
+            high_water_mark=high_water_marks.get("cases"),
+        )
+        # The streamed rows are not held, so the latest rows are derived from the loaded table
+        load_latest_table(conn, "cases", CASE_HEADERS)
+
+        logger.info("Streaming Metadata Table into raw.metadata...")
+        stream_table(
+            conn, "metadata", iter_parallel_scan_pages(metadata_table, projection_expression=METADATA_PROJECTION),
+            build_metadata_table_data, METADATA_HEADERS, batch_size, load_mode,
+        )
+
+        logger.info("Streaming Templates Table into raw.templates...")
+        stream_table(
+            conn, "templates",
+            iter_parallel_scan_pages(templates_table, total_segments=1, projection_expression=TEMPLATES_PROJECTION),
+            build_templates_table_data, TEMPLATES_HEADERS, batch_size, load_mode,
+        )
+
+        logger.info("Streaming Audits Table into raw.audit...")
+        audit_count, audit_high_water_mark = stream_table(
+            conn, "audit",
+            iter_parallel_scan_pages(audit_table, filter_expression=audit_filter,
+                                     projection_expression=AUDIT_PROJECTION),
+            build_audit_table_data, AUDIT_HEADERS, batch_size, load_mode,
+            key_columns=INCREMENTAL_TABLES["audit"]["key_columns"] if incremental else None,
+            watermark_attribute=INCREMENTAL_TABLES["audit"]["watermark_attribute"],
+            high_water_mark=high_water_marks.get("audit"),
+        )
+        load_latest_table(conn, "audit", AUDIT_HEADERS)
+
+        # Record the high-water marks in the same transaction as the data they describe.
+        if cases_high_water_mark is not None:
+            set_high_water_mark(conn, "cases", cases_high_water_mark, sync_mode, cases_count)
+        if audit_high_water_mark is not None:
+            set_high_water_mark(conn, "audit", audit_high_water_mark, sync_mode, audit_count)
+        # Fingerprint the loaded tables, so the orchestrator can skip refreshing views over unchanged data
+        record_table_fingerprints(conn, FINGERPRINTED_TABLES)
+
+        conn.commit()
+        logger.info("All table loads validated. Transaction committed successfully.")
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error encountered. Transaction rolled back. Reason: {e}")
+        raise e
+
+    finally:
+        conn.close()
+        logger.info("Database connection closed.")
+
+
+def load_latest_table(conn, table_name, headers, latest_rows=None, document_ids=None, load_mode=None):
+    """
+    Replaces the rows of raw.<table>_latest (the latest row per document read by the curated views) once
+    raw.<table> is loaded, in the same transaction.
+
+    :param conn: psycopg2 connection object
+    :param table_name: 'cases' or 'audit'
+    :param headers: columns of the raw table
+    :param latest_rows: rows reduced by reduce_latest_rows, loaded as they are; if None, the latest rows are
+                        derived from the raw table
+    :param document_ids: documents changed by an incremental sync, the only ones derived again; None for all
+    :param load_mode: 'delete' or 'swap', for latest_rows
+    """
+    latest_table = LATEST_TABLES[table_name]["latest_table"]
+    start = time.perf_counter()
+    if latest_rows is not None:
+        insert_data_and_validate(conn, latest_table, headers, latest_rows, load_mode=load_mode)
+    else:
+        derive_latest_table(conn, table_name, headers, document_ids)
+    logger.info(f"raw.{latest_table} replaced in {time.perf_counter() - start:.2f} seconds.")
 
-    logger.info("Building audit data...")
-    build_start = time.perf_counter()
-    audit = build_audit_table_data(audit_items)
-    build_end = time.perf_counter()
-    logger.info(f"Audit data built in {build_end - build_start:.2f} seconds. Generated {len(audit)} audit records.")
-    audit_headers = [
-        'auditRecordId', 'createdTs', 'documentId', 'actionType', 'lastArchiveReason', 'lastArchiveComment'
-    ]
 
-    # -------------------- Database Insertion --------------------
-    logger.info("Connecting to the PostgreSQL database...")
-    conn = get_db_connection()
+def load_raw_tables(conn, sync_mode, load_mode, cases, metadata, templates, audit, cases_high_water_mark,
+                    audit_high_water_mark):
+    """
+    Loads the four raw tables and records the high-water marks in one transaction, validating the row
+    counts of every table. The transaction is committed if everything matches, and the connection is closed.
 
+    :param conn: psycopg2 connection object
+    :param sync_mode: 'full' or 'incremental'
+    :param load_mode: 'delete' or 'swap'
+    :param cases: rows of raw.cases
+    :param metadata: rows of raw.metadata
+    :param templates: rows of raw.templates
+    :param audit: rows of raw.audit
+    :param cases_high_water_mark: new high-water mark of raw.cases, or None
+    :param audit_high_water_mark: new high-water mark of raw.audit, or None
+    """
+    incremental = sync_mode == SYNC_MODE_INCREMENTAL
+    # The latest row per document: an incremental sync derives it again for the changed documents only,
+    # a full sync either reduces the built rows here (LATEST_REDUCTION=pipeline) or derives it in SQL
+    cases_latest = audit_latest = cases_documents = audit_documents = None
+    if incremental:
+        cases_documents = {row.get(LATEST_KEY_COLUMN) for row in cases} - {None}
+        audit_documents = {row.get(LATEST_KEY_COLUMN) for row in audit} - {None}
+    elif get_latest_reduction() == LATEST_REDUCTION_PIPELINE:
+        cases_latest = reduce_latest_rows("cases", cases)
+        audit_latest = reduce_latest_rows("audit", audit)
+    if get_columnar_load():
+        # Typed record batches are encoded into CSV by pyarrow instead of value by value
+        cases, metadata, templates, audit = (
+            to_record_batch(headers, rows, get_column_types(table_name))
+            for table_name, headers, rows in (("cases", CASE_HEADERS, cases), ("metadata", METADATA_HEADERS, metadata),
+                                              ("templates", TEMPLATES_HEADERS, templates),
+                                              ("audit", AUDIT_HEADERS, audit))
+        )
+        if cases_latest is not None:
+            cases_latest = to_record_batch(CASE_HEADERS, cases_latest, get_column_types("cases"))
+            audit_latest = to_record_batch(AUDIT_HEADERS, audit_latest, get_column_types("audit"))
+        logger.info("Converted the built rows into record batches for the columnar load.")
     try:
         logger.info("Starting database transaction for cases data insertion...")
         insert_data_start = time.perf_counter()
-        insert_data_and_validate(conn, "cases", case_headers, cases)
+        if incremental:
+            upsert_data_and_validate(conn, "cases", CASE_HEADERS, cases, INCREMENTAL_TABLES["cases"]["key_columns"])
+        else:
+            insert_data_and_validate(conn, "cases", CASE_HEADERS, cases, load_mode=load_mode)
         insert_data_end = time.perf_counter()
         logger.info(f"Cases data insert transaction completed in {insert_data_end - insert_data_start:.2f} seconds.")
+        if not incremental or cases_documents:
+            load_latest_table(conn, "cases", CASE_HEADERS, cases_latest, cases_documents, load_mode)
 
         logger.info("Starting database transaction for metadata insertion...")
         insert_data_start = time.perf_counter()
-        insert_data_and_validate(conn, "metadata", metadata_headers, metadata)
+        insert_data_and_validate(conn, "metadata", METADATA_HEADERS, metadata, load_mode=load_mode)
         insert_data_end = time.perf_counter()
         logger.info(f"Metadata data insert transaction completed in {insert_data_end - insert_data_start:.2f} seconds.")
 
         logger.info("Starting database transaction for templates insertion...")
         insert_data_start = time.perf_counter()
-        insert_data_and_validate(conn, "templates", templates_headers, templates)
+        insert_data_and_validate(conn, "templates", TEMPLATES_HEADERS, templates, load_mode=load_mode)
         insert_data_end = time.perf_counter()
         logger.info(f"Templates data insert transaction completed in {insert_data_end - insert_data_start:.2f} seconds.")
 
         logger.info("Starting database transaction for audit insertion...")
         insert_data_start = time.perf_counter()
-        insert_data_and_validate(conn, "audit", audit_headers, audit)
+        if incremental:
+            upsert_data_and_validate(conn, "audit", AUDIT_HEADERS, audit, INCREMENTAL_TABLES["audit"]["key_columns"])
+        else:
+            insert_data_and_validate(conn, "audit", AUDIT_HEADERS, audit, load_mode=load_mode)
         insert_data_end = time.perf_counter()
         logger.info(f"Audit data insert transaction completed in {insert_data_end - insert_data_start:.2f} seconds.")
+        if not incremental or audit_documents:
+            load_latest_table(conn, "audit", AUDIT_HEADERS, audit_latest, audit_documents, load_mode)
+
+        # Record the high-water marks in the same transaction as the data they describe.
+        # A full refresh re-bases the marks so a later incremental run continues from here.
+        if cases_high_water_mark is not None:
+            set_high_water_mark(conn, "cases", cases_high_water_mark, sync_mode, len(cases))
+        if audit_high_water_mark is not None:
+            set_high_water_mark(conn, "audit", audit_high_water_mark, sync_mode, len(audit))
+        # Fingerprint the loaded tables, so the orchestrator can skip refreshing views over unchanged data
+        record_table_fingerprints(conn, FINGERPRINTED_TABLES)
 
         # If all insertions matched their row counts, commit once at the end
         conn.commit()
@@ -161,21 +379,305 @@ def main():
         conn.close()
         logger.info("Database connection closed.")
 
-    overall_end_time = time.perf_counter()
-    logger.info(f"Total execution time: {overall_end_time - overall_start_time:.2f} seconds.")
+
+def main(run_id=None, deadline=None):
+    """
+    Main entry point for processing DynamoDB tables.
+
+    :param run_id: (Optional) identifier shared by the invocations of one run, under which scans are checkpointed.
+                   Defaults to the SCAN_RUN_ID environment variable.
+    :param deadline: (Optional) time.monotonic() value at which checkpointed scans stop
+    :return: Dictionary with the run 'status': 'COMPLETE', or 'IN_PROGRESS' if the scans stopped at the deadline
+             and the run must be invoked again to resume them.
+    """
+    # Record overall start time
+    overall_start_time = time.perf_counter()
+
+    # Full refresh reloads every raw table; incremental only upserts documents newer than the high-water mark
+    SYNC_MODE = get_sync_mode()
+    incremental = SYNC_MODE == SYNC_MODE_INCREMENTAL
+    logger.info(f"Running in SYNC_MODE: {SYNC_MODE}")
+
+    # Full reloads either delete and re-insert in place, or swap in a validated staging table
+    LOAD_MODE = get_load_mode()
+    logger.info(f"Running in LOAD_MODE: {LOAD_MODE}")
+
+    # Initialize tables
+    tables = get_source_tables()
+    documents_table = tables["documents"]
+    metadata_table = tables["metadata"]
+    templates_table = tables["templates"]
+    audit_table = tables["audit"]
+
+    # -------------------- Scanning Documents Table --------------------
+    sts = boto3.client("sts")
+    logger.debug("Caller identity: %s", sts.get_caller_identity())
+
+    # -------------------- Reading High-Water Marks --------------------
+    conn = None
+    high_water_marks = {}
+    if incremental:
+        logger.info("Connecting to the PostgreSQL database to read high-water marks...")
+        conn = get_db_connection()
+        high_water_marks = get_high_water_marks(conn, INCREMENTAL_TABLES.keys())
+        conn.rollback()  # Don't hold a transaction open while scanning
+
+    documents_filter, audit_filter = get_scan_filters(high_water_marks, incremental)
+
+    # -------------------- Streaming Mode --------------------
+    # Each table flows from the scan through its builder into the database in fixed-size batches
+    if get_streaming_mode():
+        run_streaming_sync(conn, documents_table, metadata_table, templates_table, audit_table, SYNC_MODE, LOAD_MODE,
+                           high_water_marks, documents_filter, audit_filter)
+        overall_end_time = time.perf_counter()
+        logger.info(f"Total execution time: {overall_end_time - overall_start_time:.2f} seconds.")
+        return {"status": RUN_STATUS_COMPLETE}
+
+    # -------------------- Scan Checkpoints --------------------
+    # Checkpointed scans resume where an earlier invocation of the same run stopped
+    checkpointers = {}
+    checkpoint_store = get_checkpoint_store()
+    try:
+        run_id = run_id or os.getenv("SCAN_RUN_ID")
+        if checkpoint_store is not None and not run_id:
+            logger.warning("A checkpoint store is configured but no run_id was given. Scans will not be checkpointed.")
+        elif checkpoint_store is not None:
+            logger.info(f"Checkpointing scans under run_id {run_id}.")
+            checkpointers = {
+                table_name: ScanCheckpointer(checkpoint_store, run_id, table_name)
+                for table_name in ("cases", "metadata", "audit")
+            }
+
+        # -------------------- Builders --------------------
+        # With BUILD_WORKERS > 1, the rows of the large tables are built in chunks by forked processes, once every scan
+        # thread has been joined. Checkpointed scans build their rows page by page in the scan threads, so they keep the
+        # single-process builders.
+        build_after_scans = get_build_workers() > 1
+        build_cases = build_cases_table_data if "cases" in checkpointers else \
+            parallel_builder(build_cases_table_data, label="raw.cases")
+        build_metadata = build_metadata_table_data if "metadata" in checkpointers else \
+            parallel_builder(build_metadata_table_data, label="raw.metadata")
+        build_audit = build_audit_table_data if "audit" in checkpointers else \
+            parallel_builder(build_audit_table_data, label="raw.audit")
+
+        # -------------------- Scanning Tables --------------------
+        # The four extractions are independent, so they run concurrently; their scan segments share one worker pool
+        try:
+            extractions = run_table_extractions({
+                "cases": segmented_extraction(
+                    "Documents", documents_table, build_cases,
+                    checkpointer=checkpointers.get("cases"),
+                    deadline=deadline,
+                    watermark_attribute=INCREMENTAL_TABLES["cases"]["watermark_attribute"],
+                    high_water_mark=high_water_marks.get("cases"),
+                    filter_expression=documents_filter,
+                    projection_expression=CASES_PROJECTION,
+                ),
+                "metadata": segmented_extraction(
+                    "Metadata", metadata_table, build_metadata,
+                    checkpointer=checkpointers.get("metadata"),
+                    deadline=deadline,
+                    projection_expression=METADATA_PROJECTION,
+                ),
+                "templates": (
+                    "Templates",
+                    lambda executor: scan_dynamo_table(templates_table, projection_expression=TEMPLATES_PROJECTION),
+                    build_templates_table_data,
+                ),
+                "audit": segmented_extraction(
+                    "Audits", audit_table, build_audit,
+                    checkpointer=checkpointers.get("audit"),
+                    deadline=deadline,
+                    watermark_attribute=INCREMENTAL_TABLES["audit"]["watermark_attribute"],
+                    high_water_mark=high_water_marks.get("audit"),
+                    filter_expression=audit_filter,
+                    projection_expression=AUDIT_PROJECTION,
+                ),
+            }, build_after_scans=build_after_scans)
+        except ScanTimeBudgetExceeded as e:
+            logger.warning(f"Scans checkpointed before the time limit; the run will resume on the next invocation. {e}")
+            if conn is not None:
+                conn.close()
+            return {"status": RUN_STATUS_IN_PROGRESS}
+
+        cases = extractions["cases"]["rows"]
+        metadata = extractions["metadata"]["rows"]
+        templates = extractions["templates"]["rows"]
+        audit = extractions["audit"]["rows"]
+
+        cases_high_water_mark = extraction_high_water_mark(extractions["cases"], "cases", high_water_marks)
+        audit_high_water_mark = extraction_high_water_mark(extractions["audit"], "audit", high_water_marks)
+
+        # -------------------- Database Insertion --------------------
+        if conn is None:
+            logger.info("Connecting to the PostgreSQL database...")
+            conn = get_db_connection()
+        load_raw_tables(conn, SYNC_MODE, LOAD_MODE, cases, metadata, templates, audit, cases_high_water_mark,
+                        audit_high_water_mark)
+
+        # The loaded data is committed, so the run's checkpoints are no longer needed
+        for checkpointer in checkpointers.values():
+            checkpointer.clear()
+
+        overall_end_time = time.perf_counter()
+        logger.info(f"Total execution time: {overall_end_time - overall_start_time:.2f} seconds.")
+        return {"status": RUN_STATUS_COMPLETE}
+    finally:
+        if checkpoint_store is not None:
+            checkpoint_store.close()
+
+
+def partition_scan_specs(tables, sync_mode, high_water_marks):
+    """
+    Describes how the distributed workers scan and build each partitioned table.
+
+    :param tables: dictionary returned by get_source_tables
+    :param sync_mode: 'full' or 'incremental'
+    :param high_water_marks: dictionary of table name to Decimal high-water mark
+    :return: Dictionary of table name to the keyword arguments of scan_partition (except the partition and checkpointer).
+    """
+    documents_filter, audit_filter = get_scan_filters(high_water_marks, sync_mode == SYNC_MODE_INCREMENTAL)
+    return {
+        "cases": {
+            "table": tables["documents"],
+            "build_fn": build_cases_table_data,
+            "filter_expression": documents_filter,
+            "projection_expression": CASES_PROJECTION,
+            "watermark_attribute": INCREMENTAL_TABLES["cases"]["watermark_attribute"],
+        },
+        "metadata": {
+            "table": tables["metadata"],
+            "build_fn": build_metadata_table_data,
+            "projection_expression": METADATA_PROJECTION,
+        },
+        "audit": {
+            "table": tables["audit"],
+            "build_fn": build_audit_table_data,
+            "filter_expression": audit_filter,
+            "projection_expression": AUDIT_PROJECTION,
+            "watermark_attribute": INCREMENTAL_TABLES["audit"]["watermark_attribute"],
+        },
+    }
+
+
+def run_distributed_action(event, deadline=None):
+    """
+    Runs one step of a distributed extraction, where every scan segment is handled by its own invocation:
+
+    * 'plan': reads the high-water marks, splits the tables into segments and returns one partition event per segment.
+    * 'scan_partition': scans one segment, builds its rows and writes them to the checkpoint store.
+    * 'merge': reads back every partition, validates the row counts, scans the small templates table and loads
+      everything in one transaction.
+
+    The steps of a run share the checkpoint store (CHECKPOINT_STORE) under the event's 'run_id'.
+
+    :param event: Lambda event with the 'action' and 'run_id' (and the partition fields for 'scan_partition')
+    :param deadline: (Optional) time.monotonic() value at which a worker's scan stops
+    :return: Dictionary with the 'status', plus the 'partitions' for 'plan'.
+    """
+    store = get_checkpoint_store()
+    if store is None:
+        raise ValueError("Distributed extraction needs a checkpoint store. Set CHECKPOINT_STORE.")
+    try:
+        return _run_distributed_step(event, store, deadline)
+    finally:
+        store.close()
+
+
+def _run_distributed_step(event, store, deadline):
+    """
+    Runs the event's action of run_distributed_action on the given checkpoint store.
+    """
+    action = event["action"]
+    run_id = event["run_id"]
+    plan_key = f"{run_id}/plan.json"
+    tables = get_source_tables()
+
+    if action == ACTION_PLAN:
+        # The sync mode and high-water marks are fixed once per run, so every worker scans with the same filters
+        run_plan = store.read_json(plan_key)
+        if run_plan is None:
+            sync_mode = get_sync_mode()
+            high_water_marks = {}
+            if sync_mode == SYNC_MODE_INCREMENTAL:
+                conn = get_db_connection()
+                try:
+                    high_water_marks = get_high_water_marks(conn, INCREMENTAL_TABLES.keys())
+                finally:
+                    conn.close()
+            run_plan = {
+                "sync_mode": sync_mode,
+                "high_water_marks": {name: str(mark) for name, mark in high_water_marks.items()},
+            }
+            store.write_json(plan_key, run_plan)
+        checkpointers = {table_name: ScanCheckpointer(store, run_id, table_name)
+                         for table_name in ("cases", "metadata", "audit")}
+        source_tables = {"cases": tables["documents"], "metadata": tables["metadata"], "audit": tables["audit"]}
+        return {"status": RUN_STATUS_COMPLETE, "partitions": plan_partitions(checkpointers, source_tables)}
+
+    run_plan = store.read_json(plan_key)
+    if run_plan is None:
+        raise ValueError(f"Run {run_id} has no plan. Invoke the '{ACTION_PLAN}' action first.")
+    high_water_marks = {name: Decimal(mark) for name, mark in run_plan["high_water_marks"].items()}
+    specs = partition_scan_specs(tables, run_plan["sync_mode"], high_water_marks)
+
+    if action == ACTION_SCAN_PARTITION:
+        table_name = event["table_name"]
+        logger.info(f"Scanning partition {event['segment']}/{event['total_segments']} of raw.{table_name}...")
+        try:
+            return scan_partition(event, ScanCheckpointer(store, run_id, table_name), deadline=deadline,
+                                  **specs[table_name])
+        except ScanTimeBudgetExceeded as e:
+            logger.warning(f"Partition checkpointed before the time limit; it will resume on the next invocation. {e}")
+            return {"status": PARTITION_STATUS_IN_PROGRESS}
+
+    if action == ACTION_MERGE:
+        merged = {}
+        for table_name in specs:
+            merged[table_name] = collect_partitions(ScanCheckpointer(store, run_id, table_name),
+                                                    high_water_marks.get(table_name))
+        templates = build_templates_table_data(scan_dynamo_table(tables["templates"], projection_expression=TEMPLATES_PROJECTION))
+
+        logger.info("Connecting to the PostgreSQL database...")
+        load_raw_tables(
+            get_db_connection(), run_plan["sync_mode"], get_load_mode(),
+            merged["cases"][0], merged["metadata"][0], templates, merged["audit"][0],
+            merged["cases"][1], merged["audit"][1],
+        )
+        store.delete_prefix(f"{run_id}/")
+        logger.info(f"Cleared the staged partitions of run {run_id}.")
+        return {"status": RUN_STATUS_COMPLETE}
+
+    raise ValueError(f"Unknown action '{action}'.")
 
 
 def handler(event, context):
     """
-    AWS Lambda entry point. This calls the main function.
+    AWS Lambda entry point. This calls the main function, or runs one step of a distributed extraction
+    when the event has an 'action' (see run_distributed_action).
+
+    The event may carry a 'run_id' (the Step Function passes its execution name) under which the scans are
+    checkpointed. Checkpointed scans stop CHECKPOINT_TIME_MARGIN_SECONDS before the Lambda's timeout.
     """
     logger.info("Lambda handler invoked")
-    main()
-    logger.info("Lambda execution completed")
+    event = event or {}
+    deadline = None
+    if context is not None:
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - get_checkpoint_time_margin()
+    if event.get("action"):
+        result = run_distributed_action(event, deadline=deadline)
+    else:
+        result = main(run_id=event.get("run_id"), deadline=deadline)
+    logger.info(f"Lambda execution completed with status {result['status']}")
+    return result
 
 
 # Entry point for local execution
 if __name__ == '__main__':
     logger.info("Starting script execution")
-    main()
-    logger.info("Script execution completed")
\ No newline at end of file
+    if "--distributed" in sys.argv:
+        # Plays the Step Function's part: plan, run the partition workers on local threads, then merge
+        run_local_distributed_extract(lambda event: handler(event, None), os.getenv("SCAN_RUN_ID", "local"))
+    else:
+        main()
+    logger.info("Script execution completed")
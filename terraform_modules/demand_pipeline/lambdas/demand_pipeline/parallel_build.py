@@ -0,0 +1,172 @@
+# Standard library imports
+import gc
+import os
+import pickle
+import traceback
+import multiprocessing
+from collections import Counter
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Builder processes per table (1 builds in the calling thread)
+DEFAULT_BUILD_WORKERS = 1
+# Smallest chunk worth a process: below it, the fork and the transfer of the rows cost more than they save
+DEFAULT_BUILD_MIN_CHUNK_SIZE = 10000
+
+
+def get_build_workers():
+    """
+    Reads the number of builder processes from the BUILD_WORKERS environment variable.
+
+    :return: Number of processes building a table's rows (default 1, i.e. no parallel build).
+    """
+    build_workers = int(os.getenv("BUILD_WORKERS", DEFAULT_BUILD_WORKERS))
+    if build_workers <= 0:
+        logger.warning(f"Invalid BUILD_WORKERS {build_workers}. Falling back to {DEFAULT_BUILD_WORKERS}.")
+        build_workers = DEFAULT_BUILD_WORKERS
+    return build_workers
+
+
+def get_build_min_chunk_size():
+    """
+    Reads the BUILD_MIN_CHUNK_SIZE environment variable.
+
+    :return: Smallest number of items given to a builder process (default 10000).
+    """
+    min_chunk_size = int(os.getenv("BUILD_MIN_CHUNK_SIZE", DEFAULT_BUILD_MIN_CHUNK_SIZE))
+    if min_chunk_size <= 0:
+        logger.warning(f"Invalid BUILD_MIN_CHUNK_SIZE {min_chunk_size}. "
+                       f"Falling back to {DEFAULT_BUILD_MIN_CHUNK_SIZE}.")
+        min_chunk_size = DEFAULT_BUILD_MIN_CHUNK_SIZE
+    return min_chunk_size
+
+
+def split_chunks(items, chunk_count):
+    """
+    Splits a list into contiguous chunks of nearly equal size, so concatenating the results keeps the order.
+
+    :param items: list to split
+    :param chunk_count: number of chunks
+    :return: List of chunk_count slices of items.
+    """
+    size, remainder = divmod(len(items), chunk_count)
+    chunks = []
+    start = 0
+    for index in range(chunk_count):
+        end = start + size + (1 if index < remainder else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def _build_chunk(build_fn, chunk, connection):
+    """
+    Runs in the builder process: builds the rows of one chunk and sends them back pickled, with the
+    builder's counters, or the traceback of the error.
+    """
+    try:
+        stats = Counter()
+        rows = build_fn(chunk, stats=stats)
+        payload = ("ok", rows, dict(stats))
+    except BaseException:
+        payload = ("error", traceback.format_exc(), None)
+    try:
+        connection.send_bytes(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+    finally:
+        connection.close()
+
+
+def _get_context():
+    # Forked processes inherit the scanned items without pickling them. The fork is only safe with no other
+    # thread running (run_table_extractions with build_after_scans calls the builders once the scan threads are
+    # joined). Lambda has no /dev/shm, so only processes and pipes are used (no Pool or Queue, which need semaphores).
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+def parallel_build(build_fn, items, workers=None, min_chunk_size=None, label=None):
+    """
+    Builds rows with a builder split over several processes, each building one contiguous chunk of the items.
+    The rows come back in the order of the items, and the builder's counters (see the stats parameter of
+    the builders) are summed over the chunks and logged.
+
+    Falls back to calling the builder directly with a single worker or when the items do not fill two chunks.
+    Unlike a direct call, the items are not modified by the builder. The processes are forked, so call it from a
+    process with no other thread running.
+
+    :param build_fn: builder of (items, stats=None) returning a list of rows
+    :param items: list of scanned items
+    :param workers: number of processes, defaults to get_build_workers()
+    :param min_chunk_size: smallest chunk given to a process, defaults to get_build_min_chunk_size()
+    :param label: name of the table for logging, defaults to the builder's name
+    :return: List of rows.
+    """
+    workers = workers or get_build_workers()
+    min_chunk_size = min_chunk_size or get_build_min_chunk_size()
+    chunk_count = min(workers, len(items) // min_chunk_size)
+    if chunk_count <= 1:
+        return build_fn(items)
+
+    label = label or getattr(build_fn, "__name__", "builder")
+    context = _get_context()
+    processes = []
+    # Keep the collector of the forked processes off the inherited objects: walking them would copy
+    # every page of the parent's heap into each process
+    gc.freeze()
+    try:
+        for chunk in split_chunks(items, chunk_count):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_build_chunk, args=(build_fn, chunk, sender), daemon=True)
+            process.start()
+            sender.close()
+            processes.append((process, receiver))
+    finally:
+        gc.unfreeze()
+
+    rows = []
+    stats = Counter()
+    errors = []
+    # Read every pipe before joining: a process blocks until its rows are read
+    for index, (process, receiver) in enumerate(processes):
+        try:
+            status, result, chunk_stats = pickle.loads(receiver.recv_bytes())
+        except EOFError:
+            status, result, chunk_stats = "error", "the process exited without returning rows", None
+        finally:
+            receiver.close()
+        process.join()
+        if status != "ok":
+            errors.append(f"chunk {index} (exit code {process.exitcode}): {result}")
+            continue
+        rows.extend(result)
+        stats.update(chunk_stats)
+
+    if errors:
+        raise RuntimeError(f"{label}: {len(errors)} of {chunk_count} build processes failed:\n" + "\n".join(errors))
+
+    counters = ", ".join(f"{name}={count}" for name, count in sorted(stats.items()))
+    logger.info(f"{label}: built {len(rows)} rows from {len(items)} items in {chunk_count} processes ({counters})")
+    return rows
+
+
+def parallel_builder(build_fn, label=None):
+    """
+    Wraps a builder so its calls go through parallel_build, for the scan helpers taking a build_fn.
+
+    :param build_fn: builder of (items, stats=None) returning a list of rows
+    :param label: name of the table for logging
+    :return: The wrapped builder, or build_fn itself when BUILD_WORKERS is 1.
+    """
+    workers = get_build_workers()
+    if workers <= 1:
+        return build_fn
+    min_chunk_size = get_build_min_chunk_size()
+
+    def build(items):
+        return parallel_build(build_fn, items, workers=workers, min_chunk_size=min_chunk_size, label=label)
+
+    return build
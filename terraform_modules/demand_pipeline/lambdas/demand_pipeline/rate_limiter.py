@@ -0,0 +1,100 @@
+# Standard library imports
+import os
+import threading
+import time
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Seconds of unused budget that can be saved up and spent in a burst
+DEFAULT_BURST_SECONDS = 1.0
+
+# Tolerance for floating point error when the bucket is refilled to exactly one token
+TOKEN_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that keeps the average rate of consumed units under a budget.
+
+    The bucket refills at `rate` tokens per second, up to `rate * burst_seconds` tokens. The cost of a
+    DynamoDB request is only known from its response (ConsumedCapacity), so callers wait for the bucket
+    to be non-empty with acquire() before a request and pay the actual cost with consume() afterwards.
+    The balance may go negative, in which case the next callers wait until it has been paid back.
+    """
+
+    def __init__(self, rate, burst_seconds=DEFAULT_BURST_SECONDS, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: Budget in units (e.g. read capacity units) per second.
+        :param burst_seconds: Seconds of budget that can be accumulated while idle.
+        :param clock: Monotonic clock, replaceable in tests.
+        :param sleep: Sleep function, replaceable in tests.
+        """
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}.")
+        self.rate = float(rate)
+        self.capacity = self.rate * burst_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+        self.consumed = 0.0
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """
+        Blocks until the bucket holds at least one token.
+
+        :return: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1 - TOKEN_EPSILON:
+                    self.waited_seconds += waited
+                    return waited
+                wait_time = (1 - self._tokens) / self.rate
+            self._sleep(wait_time)
+            waited += wait_time
+
+    def consume(self, units):
+        """
+        Takes the given number of units out of the bucket.
+
+        :param units: Units actually consumed by the request.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= units
+            self.consumed += units
+
+
+def get_scan_rate_limiter(scanners=1):
+    """
+    Builds the read capacity limiter for a table scan from the SCAN_RCU_BUDGET environment variable.
+
+    SCAN_RCU_BUDGET is the number of read capacity units per second a single table scan may consume
+    across all of its segments. If it is unset or 0, scans are not rate limited.
+
+    :param scanners: number of processes sharing the table's budget, each with its own limiter
+                     (e.g. the workers of a distributed scan, one per segment)
+    :return: TokenBucket, or None if scans are not rate limited.
+    """
+    budget = float(os.getenv("SCAN_RCU_BUDGET", "0") or 0)
+    if budget <= 0:
+        return None
+    if scanners > 1:
+        logger.info(f"Limiting this scan to {budget / scanners:g} of the table's {budget:g} RCUs per second.")
+        return TokenBucket(budget / scanners)
+    logger.info(f"Limiting each table scan to {budget:g} RCUs per second.")
+    return TokenBucket(budget)
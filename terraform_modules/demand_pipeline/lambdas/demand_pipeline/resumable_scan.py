@@ -0,0 +1,297 @@
+# Standard library imports
+import os
+import time
+import concurrent.futures
+from decimal import Decimal
+
+# Third-party imports
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+# Local imports
+from utils import choose_total_segments, _build_scan_kwargs, _scan_with_backoff, _log_rate_limiter_usage, \
+    _json_default
+from rate_limiter import get_scan_rate_limiter
+from sync_state import compute_high_water_mark
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Seconds kept free at the end of an invocation for building and loading once the scans stop
+DEFAULT_CHECKPOINT_TIME_MARGIN_SECONDS = 180
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+class ScanTimeBudgetExceeded(Exception):
+    """
+    Raised when a checkpointed scan stops before the Lambda's deadline. Everything scanned so far
+    has been checkpointed, so the next invocation of the same run resumes from there.
+    """
+
+
+def get_checkpoint_time_margin():
+    """
+    Reads the CHECKPOINT_TIME_MARGIN_SECONDS environment variable.
+
+    :return: Seconds before the Lambda's deadline at which checkpointed scans stop (default 180).
+    """
+    return float(os.getenv("CHECKPOINT_TIME_MARGIN_SECONDS", DEFAULT_CHECKPOINT_TIME_MARGIN_SECONDS))
+
+
+def _serialize_key(key):
+    """Converts a LastEvaluatedKey to DynamoDB JSON, which keeps number attributes exact."""
+    return {name: _serializer.serialize(value) for name, value in key.items()}
+
+
+def _deserialize_key(key):
+    """Converts a checkpointed LastEvaluatedKey back into an ExclusiveStartKey."""
+    return {name: _deserializer.deserialize(value) for name, value in key.items()}
+
+
+class ScanCheckpointer:
+    """
+    Reads and writes the checkpoints of one table's scan within a run.
+
+    Layout under '<run_id>/<table_name>/':
+    * manifest.json: the number of segments, kept fixed for the whole run.
+    * segment-NNNNN/state.json: the segment's next ExclusiveStartKey, its number of batches,
+      its high-water mark and whether it is done.
+    * segment-NNNNN/batch-NNNNNNNN.json: the rows built from one scanned page.
+
+    A batch is written before the state that counts it, so a crash in between only leaves a
+    batch that the resumed scan overwrites.
+    """
+
+    def __init__(self, store, run_id, table_name):
+        """
+        :param store: CheckpointStore
+        :param run_id: identifier shared by every invocation of the same run (e.g. the Step Function execution name)
+        :param table_name: name of the raw table the scan feeds
+        """
+        self.store = store
+        self.run_id = run_id
+        self.table_name = table_name
+        self.prefix = f"{run_id}/{table_name}/"
+
+    def _segment_prefix(self, segment_index):
+        return f"{self.prefix}segment-{segment_index:05d}/"
+
+    def load_total_segments(self):
+        manifest = self.store.read_json(f"{self.prefix}manifest.json")
+        return None if manifest is None else manifest["total_segments"]
+
+    def save_total_segments(self, total_segments):
+        self.store.write_json(f"{self.prefix}manifest.json", {"total_segments": total_segments})
+
+    def load_segment(self, segment_index):
+        return self.store.read_json(f"{self._segment_prefix(segment_index)}state.json")
+
+    def save_segment(self, segment_index, state):
+        self.store.write_json(f"{self._segment_prefix(segment_index)}state.json", state)
+
+    def save_batch(self, segment_index, batch_number, rows):
+        self.store.write_json(f"{self._segment_prefix(segment_index)}batch-{batch_number:08d}.json", rows,
+                              default=_json_default)
+
+    def iter_batches(self, segment_states):
+        """
+        Reads back the batches counted by the given segment states, in segment order.
+
+        :param segment_states: dictionary of segment index to state
+        :return: Generator of lists of rows.
+        """
+        for segment_index in sorted(segment_states):
+            for batch_number in range(segment_states[segment_index]["batches"]):
+                key = f"{self._segment_prefix(segment_index)}batch-{batch_number:08d}.json"
+                batch = self.store.read_json(key)
+                if batch is None:
+                    raise ValueError(f"Checkpointed batch {key} is missing.")
+                yield batch
+
+    def clear(self):
+        """Deletes every checkpoint of this table's scan in the run."""
+        self.store.delete_prefix(self.prefix)
+        logger.info(f"Cleared scan checkpoints under {self.prefix}.")
+
+
+def scan_checkpointed_segment(table, checkpointer, build_fn, segment_index, total_segments, limit=1000,
+                              filter_expression=None, projection_expression=None, watermark_attribute=None,
+                              rate_limiter=None, deadline=None):
+    """
+    Scans one segment page by page, building each page into rows and checkpointing the rows together with
+    the segment's LastEvaluatedKey. A segment with a saved state restarts from its last ExclusiveStartKey,
+    and a finished one is skipped.
+
+    :param table: DynamoDB Table resource object.
+    :param checkpointer: ScanCheckpointer for this table and run.
+    :param build_fn: builder turning a list of items into a list of rows.
+    :param segment_index: index of the segment to scan.
+    :param total_segments: number of segments the table is split into.
+    :param limit: Maximum number of items to fetch per API call.
+    :param filter_expression: (Optional) DynamoDB filter expression object.
+    :param projection_expression: (Optional) A string of attributes to retrieve.
+    :param watermark_attribute: (Optional) attribute whose high-water mark is tracked across pages.
+    :param rate_limiter: (Optional) TokenBucket charged with the consumed read capacity.
+    :param deadline: (Optional) time.monotonic() value after which no new page is requested.
+    :return: The segment state (see ScanCheckpointer).
+    :raises ScanTimeBudgetExceeded: if the deadline is reached before the segment is finished.
+    """
+    state = checkpointer.load_segment(segment_index) or {
+        "exclusive_start_key": None, "batches": 0, "items": 0, "rows": 0, "high_water_mark": None, "done": False,
+    }
+    if state["done"]:
+        logger.info(f"Segment {segment_index} was already scanned ({state['items']} items). Skipping.")
+        return state
+
+    scan_kwargs = _build_scan_kwargs(segment_index, total_segments, limit, filter_expression,
+                                     projection_expression, return_consumed_capacity=rate_limiter is not None)
+    if state["exclusive_start_key"] is not None:
+        logger.info(f"Segment {segment_index}: resuming after {state['items']} items.")
+        scan_kwargs['ExclusiveStartKey'] = _deserialize_key(state["exclusive_start_key"])
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise ScanTimeBudgetExceeded(
+                f"Segment {segment_index} of raw.{checkpointer.table_name} stopped after {state['items']} items "
+                f"to stay within the time limit."
+            )
+
+        response = _scan_with_backoff(table, scan_kwargs, segment_index, rate_limiter)
+        page_items = response.get('Items', [])
+        if page_items:
+            if watermark_attribute is not None:
+                current = state["high_water_mark"]
+                segment_mark = compute_high_water_mark(
+                    page_items, watermark_attribute, Decimal(current) if current is not None else None)
+                state["high_water_mark"] = str(segment_mark) if segment_mark is not None else None
+            rows = build_fn(page_items)
+            checkpointer.save_batch(segment_index, state["batches"], rows)
+            state["batches"] += 1
+            state["items"] += len(page_items)
+            state["rows"] += len(rows)
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        state["exclusive_start_key"] = _serialize_key(last_evaluated_key) if last_evaluated_key else None
+        state["done"] = last_evaluated_key is None
+        checkpointer.save_segment(segment_index, state)
+        if state["done"]:
+            break
+        scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    logger.info(f"Segment {segment_index} finished scanning. Total items from this segment: {state['items']}")
+    return state
+
+
+def read_checkpointed_rows(checkpointer, segment_states, high_water_mark=None):
+    """
+    Reads back the rows of finished segments and validates them against the row counts of the segment states.
+
+    :param checkpointer: ScanCheckpointer for this table and run.
+    :param segment_states: dictionary of segment index to state
+    :param high_water_mark: the previously stored high-water mark
+    :return: Tuple of (list of rows, high-water mark).
+    """
+    rows = [row for batch in checkpointer.iter_batches(segment_states) for row in batch]
+    expected_rows = sum(state["rows"] for state in segment_states.values())
+    if len(rows) != expected_rows:
+        raise ValueError(
+            f"Checkpointed rows of raw.{checkpointer.table_name} don't match: {expected_rows} rows were built, "
+            f"but {len(rows)} rows were read back."
+        )
+
+    for state in segment_states.values():
+        if state["high_water_mark"] is not None:
+            segment_mark = Decimal(state["high_water_mark"])
+            if high_water_mark is None or segment_mark > high_water_mark:
+                high_water_mark = segment_mark
+    logger.info(f"Read {len(rows)} checkpointed rows of raw.{checkpointer.table_name}.")
+    return rows, high_water_mark
+
+
+def resumable_parallel_scan(
+    table,
+    checkpointer,
+    build_fn,
+    total_segments=None,
+    limit=1000,
+    filter_expression=None,
+    projection_expression=None,
+    watermark_attribute=None,
+    high_water_mark=None,
+    executor=None,
+    rate_limiter=None,
+    deadline=None,
+):
+    """
+    Parallel scan that checkpoints every segment after each page, so a retried invocation resumes
+    where the previous one stopped instead of scanning (and paying for) the table again.
+
+    Each scanned page is built into rows straight away, and the rows are checkpointed together with
+    the segment's LastEvaluatedKey. Segments finished by an earlier invocation are skipped and
+    unfinished ones restart from their last ExclusiveStartKey.
+
+    :param table: DynamoDB Table resource object.
+    :param checkpointer: ScanCheckpointer for this table and run.
+    :param build_fn: builder turning a list of items into a list of rows.
+    :param total_segments: Number of segments for a new scan (chosen by choose_total_segments if None).
+                           A resumed scan keeps the number of segments it started with.
+    :param limit: Maximum number of items to fetch per API call.
+    :param filter_expression: (Optional) DynamoDB filter expression object.
+    :param projection_expression: (Optional) A string of attributes to retrieve.
+    :param watermark_attribute: (Optional) attribute whose high-water mark is tracked across pages.
+    :param high_water_mark: the previously stored high-water mark.
+    :param executor: (Optional) Executor to run the segments on. If None, one thread per segment is used.
+    :param rate_limiter: (Optional) TokenBucket shared by the segments. If None, built from SCAN_RCU_BUDGET.
+    :param deadline: (Optional) time.monotonic() value after which no new page is requested; the scan
+                     then raises ScanTimeBudgetExceeded.
+    :return: Tuple of (list of rows, high-water mark).
+    """
+    total_segments = plan_checkpointed_segments(table, checkpointer, total_segments, limit)
+    if rate_limiter is None:
+        rate_limiter = get_scan_rate_limiter()
+
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=total_segments)
+    try:
+        futures = {
+            executor.submit(scan_checkpointed_segment, table, checkpointer, build_fn, segment_index, total_segments,
+                            limit, filter_expression, projection_expression, watermark_attribute, rate_limiter,
+                            deadline): segment_index
+            for segment_index in range(total_segments)
+        }
+        # Let every segment reach its own checkpoint before raising the first error
+        concurrent.futures.wait(futures)
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
+    segment_states = {segment_index: future.result() for future, segment_index in futures.items()}
+
+    _log_rate_limiter_usage(table, rate_limiter)
+    return read_checkpointed_rows(checkpointer, segment_states, high_water_mark)
+
+
+def plan_checkpointed_segments(table, checkpointer, total_segments=None, limit=1000):
+    """
+    Fixes the number of segments of a checkpointed scan for the whole run.
+
+    :param table: DynamoDB Table resource object.
+    :param checkpointer: ScanCheckpointer for this table and run.
+    :param total_segments: Number of segments for a new scan (chosen by choose_total_segments if None).
+    :param limit: Maximum number of items to fetch per API call.
+    :return: The number of segments saved by an earlier invocation of the run, or the new one.
+    """
+    saved_segments = checkpointer.load_total_segments()
+    if saved_segments is not None:
+        logger.info(f"Resuming checkpointed scan of raw.{checkpointer.table_name} with {saved_segments} segments...")
+        return saved_segments
+
+    if total_segments is None:
+        total_segments = choose_total_segments(table, limit)
+    checkpointer.save_total_segments(total_segments)
+    logger.info(f"Starting checkpointed scan of raw.{checkpointer.table_name} with {total_segments} segments...")
+    return total_segments
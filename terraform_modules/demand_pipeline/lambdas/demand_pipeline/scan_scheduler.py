@@ -0,0 +1,125 @@
+# Standard library imports
+import os
+import time
+import concurrent.futures
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+# Scan segments running at once across all concurrent table scans
+DEFAULT_SCAN_WORKERS = 16
+
+
+def get_scan_workers():
+    """
+    Reads the shared scan worker budget from the SCAN_WORKERS environment variable.
+
+    :return: Maximum number of scan segments running at the same time across all tables (default 16).
+    """
+    scan_workers = int(os.getenv("SCAN_WORKERS", DEFAULT_SCAN_WORKERS))
+    if scan_workers <= 0:
+        logger.warning(f"Invalid SCAN_WORKERS {scan_workers}. Falling back to {DEFAULT_SCAN_WORKERS}.")
+        scan_workers = DEFAULT_SCAN_WORKERS
+    return scan_workers
+
+
+def extract_table(label, scan_fn, build_fn, segment_executor, build=True):
+    """
+    Scans one DynamoDB table and builds its rows, timing both steps.
+
+    :param label: name used in the logs (e.g. 'Documents')
+    :param scan_fn: callable taking the shared segment executor and returning the scanned items
+    :param build_fn: builder turning the scanned items into rows. If None, the scan builds its rows as it goes
+                     (see resumable_parallel_scan) and scan_fn returns a tuple of (rows, high-water mark).
+    :param segment_executor: executor shared by the scan segments of all tables
+    :param build: if False, only the scan runs and 'rows' is None until build_table is called
+    :return: Dictionary with the scanned 'items', the built 'rows', and 'scan_seconds'/'build_seconds'.
+             When the scan built the rows itself, 'items' is None and 'high_water_mark' holds its high-water mark.
+    """
+    logger.info(f"Scanning {label} Table...")
+    t0 = time.perf_counter()
+    if build_fn is None:
+        rows, high_water_mark = scan_fn(segment_executor)
+        t1 = time.perf_counter()
+        logger.info(f"{label} Table scan completed in {t1 - t0:.2f} seconds. Generated {len(rows)} records.")
+        return {"items": None, "rows": rows, "high_water_mark": high_water_mark, "scan_seconds": t1 - t0,
+                "build_seconds": 0.0}
+
+    items = scan_fn(segment_executor)
+    t1 = time.perf_counter()
+    logger.info(f"{label} Table scan completed in {t1 - t0:.2f} seconds. Retrieved {len(items)} items.")
+
+    result = {"items": items, "rows": None, "scan_seconds": t1 - t0, "build_seconds": 0.0}
+    if build:
+        build_table(label, build_fn, result)
+    return result
+
+
+def build_table(label, build_fn, result):
+    """
+    Builds the rows of a scanned table, timing the build.
+
+    :param label: name used in the logs (e.g. 'Documents')
+    :param build_fn: builder turning the scanned items into rows
+    :param result: result of extract_table, whose 'rows' and 'build_seconds' are set
+    :return: The updated result.
+    """
+    logger.info(f"Building {label.lower()} data...")
+    t0 = time.perf_counter()
+    result["rows"] = build_fn(result["items"])
+    result["build_seconds"] = time.perf_counter() - t0
+    logger.info(f"{label} data built in {result['build_seconds']:.2f} seconds. "
+                f"Generated {len(result['rows'])} records.")
+    return result
+
+
+def run_table_extractions(extractions, scan_workers=None, build_after_scans=False):
+    """
+    Runs independent table extractions (scan + build) concurrently.
+
+    Each extraction gets its own thread, while the scan segments of every table are run on one shared
+    pool of `scan_workers` threads. The number of requests in flight therefore stays within the same
+    budget however many tables are being scanned, and the total wall time is roughly that of the slowest
+    table instead of the sum of all of them.
+
+    With build_after_scans, the rows are built one table after the other in the calling thread, once every
+    scan thread has been joined. Builders that fork processes (see parallel_build) need this: a process forked
+    while other threads are running can inherit a lock one of them holds (e.g. in a boto3 connection pool)
+    and deadlock.
+
+    :param extractions: dictionary of table name to (label, scan_fn, build_fn), see extract_table
+    :param scan_workers: size of the shared segment pool (defaults to get_scan_workers())
+    :param build_after_scans: if True, build the rows after all the scans instead of in each table's thread
+    :return: Dictionary of table name to the result of extract_table.
+    """
+    if scan_workers is None:
+        scan_workers = get_scan_workers()
+
+    logger.info(f"Extracting {len(extractions)} tables concurrently with {scan_workers} shared scan workers...")
+    start = time.perf_counter()
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=scan_workers) as segment_executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(extractions)) as table_executor:
+            futures = {
+                table_executor.submit(extract_table, label, scan_fn, build_fn, segment_executor,
+                                      build=not build_after_scans): table_name
+                for table_name, (label, scan_fn, build_fn) in extractions.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+    if build_after_scans:
+        for table_name, (label, scan_fn, build_fn) in extractions.items():
+            if build_fn is not None:
+                build_table(label, build_fn, results[table_name])
+    elapsed = time.perf_counter() - start
+
+    for table_name, result in results.items():
+        logger.info(
+            f"raw.{table_name}: scan {result['scan_seconds']:.2f}s, build {result['build_seconds']:.2f}s, "
+            f"{len(result['rows'])} records."
+        )
+    logger.info(f"All table extractions completed in {elapsed:.2f} seconds.")
+    return results
@@ -0,0 +1,166 @@
+# Standard library imports
+import os
+from decimal import Decimal
+
+# Shared Logger
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger
+logger = setup_logger(__name__)
+
+SYNC_MODE_FULL = "full"
+SYNC_MODE_INCREMENTAL = "incremental"
+
+# Raw tables that can be synced incrementally, keyed by table name.
+# - watermark_attribute: DynamoDB attribute compared against the stored high-water mark.
+# - key_columns: columns that identify a row in raw.<table> when upserting changed documents.
+INCREMENTAL_TABLES = {
+    "cases": {
+        "watermark_attribute": "createdTs",
+        "key_columns": ["documentId", "version"],
+    },
+    "audit": {
+        "watermark_attribute": "createdTs",
+        "key_columns": ["auditRecordId"],
+    },
+}
+
+# Raw tables written by the pipeline. Their content fingerprints are recorded after every load, so the orchestrator
+# can skip refreshing the materialized views whose raw tables did not change.
+FINGERPRINTED_TABLES = ["cases", "cases_latest", "metadata", "templates", "audit", "audit_latest"]
+
+
+def get_sync_mode():
+    """
+    Reads the sync mode from the SYNC_MODE environment variable.
+
+    :return: 'full' (default) or 'incremental'.
+    """
+    sync_mode = os.getenv("SYNC_MODE", SYNC_MODE_FULL).lower()
+    if sync_mode not in (SYNC_MODE_FULL, SYNC_MODE_INCREMENTAL):
+        logger.warning(f"Unknown SYNC_MODE '{sync_mode}'. Falling back to '{SYNC_MODE_FULL}'.")
+        sync_mode = SYNC_MODE_FULL
+    return sync_mode
+
+
+def get_lookback_seconds():
+    """
+    Reads the incremental lookback window from the SYNC_LOOKBACK_SECONDS environment variable.
+
+    Items written shortly before the previous run may not have been visible to its scan, so the
+    incremental scan starts this many seconds before the stored high-water mark. Upserts are
+    idempotent, so re-reading the overlap is safe.
+
+    :return: Lookback window in seconds as a Decimal.
+    """
+    return Decimal(os.getenv("SYNC_LOOKBACK_SECONDS", "3600"))
+
+
+def get_high_water_marks(conn, table_names):
+    """
+    Retrieves the stored high-water marks for the given raw tables.
+
+    :param conn: psycopg2 connection object
+    :param table_names: list of raw table names (e.g. ['cases', 'audit'])
+    :return: Dictionary of table name to Decimal high-water mark. Tables that were never synced are omitted.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            'SELECT "tableName", "highWaterMark" FROM raw.sync_state WHERE "tableName" = ANY(%s);',
+            (list(table_names),)
+        )
+        rows = cur.fetchall()
+
+    high_water_marks = {table_name: mark for table_name, mark in rows if mark is not None}
+    logger.info(f"Loaded high-water marks: {high_water_marks}")
+    return high_water_marks
+
+
+def set_high_water_mark(conn, table_name, high_water_mark, sync_mode, row_count):
+    """
+    Records the high-water mark for a raw table. This does not commit, so the mark is
+    stored in the same transaction as the data it describes.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the raw table
+    :param high_water_mark: largest watermark attribute value loaded
+    :param sync_mode: sync mode that produced the load ('full' or 'incremental')
+    :param row_count: number of rows written by this sync
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO raw.sync_state ("tableName", "highWaterMark", "syncMode", "rowCount", "updatedAt")
+            VALUES (%s, %s, %s, %s, now())
+            ON CONFLICT ("tableName") DO UPDATE SET
+                "highWaterMark" = EXCLUDED."highWaterMark",
+                "syncMode" = EXCLUDED."syncMode",
+                "rowCount" = EXCLUDED."rowCount",
+                "updatedAt" = EXCLUDED."updatedAt";
+            """,
+            (table_name, high_water_mark, sync_mode, row_count)
+        )
+    logger.info(f"Recorded high-water mark {high_water_mark} for raw.{table_name} ({sync_mode}, {row_count} rows).")
+
+
+def record_table_fingerprints(conn, table_names):
+    """
+    Records the content fingerprint and row count of the given raw tables in raw.table_fingerprints, with
+    raw.record_table_fingerprint (17_create_raw_table_fingerprints.sql). This does not commit, so the fingerprints
+    are stored in the same transaction as the data they describe. If the function is not installed yet, nothing is
+    recorded and the orchestrator keeps refreshing every view.
+
+    :param conn: psycopg2 connection object
+    :param table_names: list of raw table names (e.g. FINGERPRINTED_TABLES)
+    :return: Dictionary of table name to fingerprint.
+    """
+    fingerprints = {}
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regprocedure('raw.record_table_fingerprint(text)') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            logger.warning("raw.record_table_fingerprint does not exist. Table fingerprints are not recorded.")
+            return fingerprints
+        for table_name in table_names:
+            cur.execute("SELECT raw.record_table_fingerprint(%s);", (table_name,))
+            fingerprints[table_name] = cur.fetchone()[0]
+    logger.info(f"Recorded fingerprints of {len(fingerprints)} raw tables: {fingerprints}")
+    return fingerprints
+
+
+def compute_high_water_mark(items, attribute, current=None):
+    """
+    Finds the largest value of the watermark attribute across the scanned items.
+
+    :param items: List of DynamoDB items.
+    :param attribute: Name of the watermark attribute (e.g. 'createdTs').
+    :param current: The previously stored high-water mark, returned when no item is newer.
+    :return: The new high-water mark as a Decimal, or None if nothing has been seen.
+    """
+    high_water_mark = current
+    for item in items:
+        value = item.get(attribute)
+        if value is None:
+            continue
+        try:
+            value = Decimal(str(value))
+        except ArithmeticError:
+            logger.warning(f"Ignoring non-numeric {attribute} value {value!r} for document {item.get('documentId')}")
+            continue
+        if high_water_mark is None or value > high_water_mark:
+            high_water_mark = value
+    return high_water_mark
+
+
+def get_incremental_start(high_water_marks, table_name):
+    """
+    Works out the lower bound for an incremental scan of a raw table.
+
+    :param high_water_marks: Dictionary returned by get_high_water_marks.
+    :param table_name: name of the raw table
+    :return: Decimal lower bound (exclusive), or None if the table has no mark and needs a full scan.
+    """
+    high_water_mark = high_water_marks.get(table_name)
+    if high_water_mark is None:
+        logger.warning(f"No high-water mark stored for raw.{table_name}. Falling back to a full scan.")
+        return None
+    return Decimal(high_water_mark) - get_lookback_seconds()
@@ -0,0 +1,76 @@
+import logging
+import sys
+import os
+from collections import Counter
+from decimal import Decimal
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from builders.build_trace import BuildTrace
+from builders.metadata_builder import build_metadata_table_data
+from builders.case_builder import build_cases_table_data
+
+
+def make_documents(count):
+    return [{'documentId': f"doc{i}", 'createdTs': Decimal(i),
+             'documentStatusHistory': [{'documentStatus': 'DocumentReceived', 'timestamp': Decimal(i)}]}
+            for i in range(count)]
+
+
+def trace_messages(caplog):
+    return [record.getMessage() for record in caplog.records
+            if record.name == "builders.build_trace" and record.getMessage().startswith("[")]
+
+
+def test_default_mode_logs_only_the_summary(monkeypatch, caplog):
+    """Without BUILD_TRACE no item is traced, and the counters end up in the summary table and in stats."""
+    monkeypatch.delenv("BUILD_TRACE", raising=False)
+    monkeypatch.delenv("BUILD_TRACE_IDS", raising=False)
+    stats = Counter()
+
+    with caplog.at_level(logging.INFO):
+        build_metadata_table_data(make_documents(5) + [{'documentId': 'no-history'}], stats=stats)
+
+    assert trace_messages(caplog) == []
+    summary = next(record.getMessage() for record in caplog.records
+                   if record.getMessage().startswith("build_metadata_table_data summary"))
+    assert "  items                    6" in summary
+    assert "  no_status_history_count  1" in summary
+    assert stats["receipt_ack_count"] == 5 and stats["success_count"] == 6
+
+
+def test_sampled_mode_traces_every_nth_item(monkeypatch, caplog):
+    """BUILD_TRACE=sampled traces the items at multiples of BUILD_TRACE_SAMPLE_EVERY."""
+    monkeypatch.setenv("BUILD_TRACE", "sampled")
+    monkeypatch.setenv("BUILD_TRACE_SAMPLE_EVERY", "3")
+
+    with caplog.at_level(logging.INFO):
+        build_metadata_table_data(make_documents(7))
+
+    built = [message for message in trace_messages(caplog) if "Built metadata row" in message]
+    assert [message.split()[6].rstrip(":") for message in built] == ["doc0", "doc3", "doc6"]
+
+
+def test_trace_ids_log_a_bad_record(monkeypatch, caplog):
+    """BUILD_TRACE_IDS traces the listed records only, including the full item when it fails."""
+    monkeypatch.setenv("BUILD_TRACE", "errors")
+    monkeypatch.setenv("BUILD_TRACE_IDS", "bad, other")
+    items = [{'documentId': 'good'}, {'documentId': 'bad', 'demandDetails': {}}]
+
+    with caplog.at_level(logging.INFO):
+        rows = build_cases_table_data(items)
+
+    assert rows == []
+    messages = trace_messages(caplog)
+    assert len(messages) == 1
+    assert messages[0].startswith("[build_cases_table_data] Failed item: {'documentId': 'bad'")
+
+
+def test_is_traced_matches_ids_only_in_dict_items():
+    trace = BuildTrace("builder", 2, mode="errors", trace_ids=["x"])
+
+    assert trace.active
+    assert trace.is_traced(5, {'documentId': 'x'})
+    assert not trace.is_traced(0, {'documentId': 'y'})
+    assert not BuildTrace("builder", 2, mode="errors", trace_ids=[]).active
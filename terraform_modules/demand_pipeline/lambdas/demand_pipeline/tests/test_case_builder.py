@@ -0,0 +1,106 @@
+import copy
+import json
+import sys
+import os
+from decimal import Decimal
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from builders.case_builder import build_cases_table_data, extract_metadata_fields
+
+
+def build_cases_with_extract_metadata_fields(items):
+    """The case rows as built with one extract_metadata_fields call per metadata attribute and item."""
+    rows = []
+    for item in items:
+        try:
+            due_date = item['demandDetails']['demandResponseRelativeDueDate']
+            item['demandDetails']['demandResponseRelativeDueDate'] = float(due_date) if due_date else None
+            item['createdTs'] = float(item['createdTs'])
+            item['version'] = float(item['version'])
+            sending_firm_name = item['sendingFirm']['firmName']
+            if isinstance(sending_firm_name, str):
+                sending_firm_name = sending_firm_name.rstrip()
+            case_data = {
+                'documentId': item['documentId'],
+                'customerId': item['customerId'],
+                'version': item['version'],
+                'claimCoverage': item['claimInfo']['claimCoverage'],
+                'claimNumber': item['claimInfo']['claimNumber'],
+                'sendingFirm': sending_firm_name,
+                'recipientCarrier': item['recipientCarrier']['carrierCommonName']
+            }
+            rows.append(case_data)
+            case_data.update(extract_metadata_fields(
+                item, 'caseManagementMetadata', ['relatedInsuranceId', 'clientId', 'matterId', 'matterTechId',
+                                                 'matterName']))
+            case_data.update(extract_metadata_fields(
+                item, 'claimInfo', ['lossState', 'claimNumber', 'claimCoverage', 'claimant']))
+            case_data.update(extract_metadata_fields(item, 'sendingFirm', ['primaryContact', 'attorney']))
+        except Exception:
+            pass
+    return rows
+
+
+def make_document(document_id, **overrides):
+    item = {
+        'documentId': document_id,
+        'customerId': 'cust1',
+        'version': Decimal(2),
+        'createdTs': Decimal(1700000000),
+        'demandDetails': {'demandResponseRelativeDueDate': Decimal(30)},
+        'claimInfo': {'claimCoverage': 'BI', 'claimNumber': 'C-1', 'lossState': 'TX',
+                      'claimant': {'firstName': 'Jane', 'lastName': 'Doe'}},
+        'caseManagementMetadata': {'relatedInsuranceId': 'ins1', 'clientId': 'cl1', 'matterId': 'm1',
+                                   'matterTechId': 'mt1', 'matterName': 'Doe v. Roe',
+                                   'primaryContact': {'firstName': 'Pat', 'lastName': 'Lee'}},
+        'sendingFirm': {'firmName': 'Firm LLP  ', 'attorney': {'firstName': 'Sam', 'lastName': ''},
+                        'caseManagers': [{'firstName': 'Alex', 'lastName': 'Kim'},
+                                         {'firstName': 'Alex', 'lastName': 'Kim'}]},
+        'recipientCarrier': {'carrierCommonName': 'Carrier'},
+    }
+    item.update(overrides)
+    return item
+
+
+DOCUMENTS = [
+    make_document('plain'),
+    make_document('dynamodb-wrapped', caseManagementMetadata={
+        'clientId': {'S': 'cl2'}, 'matterName': {'S': 'Wrapped'}, 'matterId': 7}),
+    make_document('json-strings', caseManagementMetadata=json.dumps({'clientId': 'cl3', 'attorney': {
+        'firstName': 'Kai', 'lastName': 'Ito'}})),
+    make_document('bad-json', caseManagementMetadata="{not json"),
+    make_document('no-metadata', caseManagementMetadata=None),
+    make_document('wrapped-managers', sendingFirm={
+        'firmName': 'Wrapped Firm', 'primaryContact': {'firstName': 'Lou', 'lastName': 'Park'},
+        'caseManagers': {'L': [{'M': {'firstName': {'S': 'Ana'}, 'lastName': {'S': 'Ruiz'}}}, 'skipped']}}),
+    make_document('string-claimant', claimInfo={'claimCoverage': 'PD', 'claimNumber': 'C-9',
+                                                'claimant': 'Jane Doe'}),
+    make_document('missing-due-date', demandDetails={}),
+    make_document('no-due-date', demandDetails={'demandResponseRelativeDueDate': None}),
+]
+
+
+def test_compiled_extraction_matches_extract_metadata_fields():
+    """Every fixture, including malformed ones and partially built rows, gives the same rows as before."""
+    rows = build_cases_table_data(copy.deepcopy(DOCUMENTS))
+
+    assert rows == build_cases_with_extract_metadata_fields(copy.deepcopy(DOCUMENTS))
+    assert [row['documentId'] for row in rows] == [
+        'plain', 'dynamodb-wrapped', 'json-strings', 'bad-json', 'no-metadata', 'wrapped-managers',
+        'string-claimant', 'no-due-date'
+    ]
+
+
+def test_compiled_extraction_columns():
+    """Later attributes override earlier ones and the case managers are deduplicated."""
+    plain, wrapped, json_strings = build_cases_table_data(copy.deepcopy(DOCUMENTS[:3]))
+
+    assert plain['sendingFirm'] == 'Firm LLP'
+    assert plain['clientName'] == 'Jane Doe'
+    assert plain['assignedCaseManager'] == 'Pat Lee'
+    assert plain['assignedAttorney'] == 'Sam'
+    assert plain['assignedCaseCollaborator'] == ['Alex Kim']
+    assert (wrapped['clientId'], wrapped['matterName'], wrapped['matterId']) == ('cl2', 'Wrapped', 7)
+    assert (json_strings['clientId'], json_strings['assignedAttorney']) == ('cl3', 'Sam')
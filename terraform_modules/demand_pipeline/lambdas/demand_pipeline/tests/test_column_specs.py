@@ -0,0 +1,88 @@
+import copy
+import sys
+import os
+from decimal import Decimal
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from column_specs import get_headers, get_source_attributes, build_projection
+from builders.case_builder import build_cases_table_data
+from builders.metadata_builder import build_metadata_table_data
+from builders.audit_builder import build_audit_table_data
+
+
+def project(item, paths):
+    """Returns what DynamoDB sends back for the item with a ProjectionExpression of the given paths."""
+    projected = {}
+    for path in paths:
+        source, target = item, projected
+        names = path.split(".")
+        for name in names[:-1]:
+            if not isinstance(source.get(name), dict):
+                break
+            source = source[name]
+            target = target.setdefault(name, {})
+        else:
+            if names[-1] in source:
+                target[names[-1]] = copy.deepcopy(source[names[-1]])
+    return projected
+
+
+DOCUMENT_ITEM = {
+    'documentId': 'doc1',
+    'customerId': 'cust1',
+    'version': Decimal(3),
+    'createdTs': Decimal(1700000000),
+    'demandDetails': {'demandResponseRelativeDueDate': Decimal(30), 'demandLetter': 'x' * 1000},
+    'attachments': [{'sourceFileSize': Decimal(1024), 'createdTs': Decimal(1700000000), 'name': 'a.pdf'}],
+    'documentStatusHistory': [{'documentStatus': 'DocumentReceived', 'timestamp': Decimal(1700000100)}],
+    'claimInfo': {'claimCoverage': 'BI', 'claimNumber': 'C-1', 'lossState': 'TX',
+                  'claimant': {'firstName': 'Jane', 'lastName': 'Doe'}},
+    'caseManagementMetadata': {'relatedInsuranceId': 'ins1', 'clientId': 'cl1', 'matterId': 'm1',
+                               'matterTechId': 'mt1', 'matterName': 'Doe v. Roe',
+                               'primaryContact': {'firstName': 'Pat', 'lastName': 'Lee'}},
+    'sendingFirm': {'firmName': 'Firm LLP  ', 'attorney': {'firstName': 'Sam', 'lastName': 'Roe'},
+                    'caseManagers': [{'firstName': 'Alex', 'lastName': 'Kim'}]},
+    'recipientCarrier': {'carrierCommonName': 'Carrier', 'address': {'street': '1 Main St'}},
+}
+
+
+def test_headers_keep_the_raw_table_column_order():
+    """The insert order of every raw table is unchanged."""
+    assert get_headers("cases") == [
+        'documentId', 'customerId', 'version', 'matterTechId', 'matterName', 'claimCoverage',
+        'claimNumber', 'lossState', 'sendingFirm', 'recipientCarrier', 'assignedAttorney',
+        'assignedCaseCollaborator', 'assignedCaseManager', 'clientId', 'clientName', 'matterId',
+        'relatedInsuranceId'
+    ]
+    assert get_headers("audit") == [
+        'auditRecordId', 'createdTs', 'documentId', 'actionType', 'lastArchiveReason', 'lastArchiveComment'
+    ]
+
+
+def test_projection_uses_placeholders_and_no_overlapping_paths():
+    """Nested paths under an attribute read as a whole are dropped and every name is a placeholder."""
+    projection = build_projection(['sendingFirm', 'version', 'payload.archiveReason', 'payload.archiveComments'])
+
+    assert projection.expression == "#p0, #p1, #p2.#p3, #p2.#p4"
+    assert projection.attribute_names == {
+        "#p0": "sendingFirm", "#p1": "version", "#p2": "payload", "#p3": "archiveReason", "#p4": "archiveComments"
+    }
+
+    paths = get_source_attributes("cases")
+    assert "sendingFirm" in paths and "sendingFirm.firmName" not in paths
+    assert "attachments" not in paths and "documentStatusHistory" not in paths
+
+
+def test_projected_items_build_the_same_rows():
+    """Every table's builder produces the same rows from the projected items as from the full items."""
+    audit_item = {'auditRecordId': 'aud1', 'createdTs': Decimal(1700000200), 'documentId': 'doc1',
+                  'actionType': 'DemandArchived', 'actor': {'userId': 'u1'},
+                  'payload': {'archiveReason': 'Settled', 'archiveComments': 'Done', 'before': {'x': 1}}}
+
+    for table_name, builder, item in (("cases", build_cases_table_data, DOCUMENT_ITEM),
+                                      ("metadata", build_metadata_table_data, DOCUMENT_ITEM),
+                                      ("audit", build_audit_table_data, audit_item)):
+        projected = project(item, get_source_attributes(table_name))
+        assert builder([projected]) == builder([copy.deepcopy(item)]), table_name
@@ -0,0 +1,95 @@
+import copy
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fast_scan import FastScanTable, decode_item
+from builders.case_builder import build_cases_table_data
+from builders.metadata_builder import build_metadata_table_data
+from builders.audit_builder import build_audit_table_data
+
+DOCUMENT_ITEM = {
+    'documentId': 'doc1',
+    'customerId': 'cust1',
+    'version': Decimal(3),
+    'createdTs': Decimal('1700000000.25'),
+    'demandIsDeliverable': True,
+    'demandTemplateId': None,
+    'tags': {'a', 'b'},
+    'demandDetails': {'demandResponseRelativeDueDate': Decimal(30)},
+    'documentStatusHistory': [{'documentStatus': 'DocumentReceived', 'timestamp': Decimal(1700000100)}],
+    'claimInfo': {'claimCoverage': 'BI', 'claimNumber': 'C-1', 'lossState': 'TX',
+                  'claimant': {'firstName': 'Jane', 'lastName': 'Doe'}},
+    'caseManagementMetadata': {'clientId': 'cl1', 'matterId': 'm1', 'matterName': 'Doe v. Roe'},
+    'sendingFirm': {'firmName': 'Firm LLP', 'caseManagers': [{'firstName': 'Alex', 'lastName': 'Kim'}]},
+    'recipientCarrier': {'carrierCommonName': 'Carrier'},
+}
+
+AUDIT_ITEM = {'auditRecordId': 'aud1', 'createdTs': Decimal(1700000200), 'documentId': 'doc1',
+              'actionType': 'DemandArchived', 'payload': {'archiveReason': 'Settled', 'archiveComments': None}}
+
+
+def to_wire(item):
+    serializer = TypeSerializer()
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+
+def test_decode_item_matches_type_deserializer_with_native_numbers():
+    """Values equal boto3's, with int/float numbers instead of Decimal."""
+    wire = to_wire(DOCUMENT_ITEM)
+    deserializer = TypeDeserializer()
+
+    decoded = decode_item(wire)
+
+    assert decoded == {name: deserializer.deserialize(value) for name, value in wire.items()}
+    assert type(decoded['version']) is int
+    assert type(decoded['createdTs']) is float
+    assert type(decoded['documentStatusHistory'][0]['timestamp']) is int
+
+
+def test_builders_produce_the_same_rows_from_decoded_items():
+    """The rows loaded do not depend on which scan path decoded the items."""
+    deserializer = TypeDeserializer()
+    for builder, item in ((build_cases_table_data, DOCUMENT_ITEM), (build_metadata_table_data, DOCUMENT_ITEM),
+                          (build_audit_table_data, AUDIT_ITEM)):
+        wire = to_wire(item)
+        boto3_items = [{name: deserializer.deserialize(value) for name, value in wire.items()}]
+        assert builder([decode_item(copy.deepcopy(wire))]) == builder(boto3_items)
+
+
+def test_fast_scan_table_translates_resource_arguments():
+    """Conditions, start keys and projection placeholders are sent in wire format; keys come back as boto3 types."""
+    table = MagicMock()
+    table.name = "exchange-beta-documents"
+    client = MagicMock()
+    client.scan.return_value = {
+        "Items": [to_wire({"documentId": "doc2", "createdTs": Decimal(5)})],
+        "LastEvaluatedKey": {"documentId": {"S": "doc2"}},
+    }
+    fast_table = FastScanTable(table, client)
+
+    response = fast_table.scan(
+        Segment=1, TotalSegments=4, Limit=100,
+        FilterExpression=Attr("createdTs").gt(Decimal(3)),
+        ProjectionExpression="#p0, #p1",
+        ExpressionAttributeNames={"#p0": "documentId", "#p1": "createdTs"},
+        ExclusiveStartKey={"documentId": "doc1"},
+    )
+
+    request = client.scan.call_args.kwargs
+    assert request["TableName"] == "exchange-beta-documents"
+    assert request["FilterExpression"] == "#n0 > :v0"
+    assert request["ExpressionAttributeNames"] == {"#p0": "documentId", "#p1": "createdTs", "#n0": "createdTs"}
+    assert request["ExpressionAttributeValues"] == {":v0": {"N": "3"}}
+    assert request["ExclusiveStartKey"] == {"documentId": {"S": "doc1"}}
+    assert (request["Segment"], request["TotalSegments"], request["Limit"]) == (1, 4, 100)
+
+    assert response["Items"] == [{"documentId": "doc2", "createdTs": 5}]
+    assert response["LastEvaluatedKey"] == {"documentId": "doc2"}
@@ -0,0 +1,78 @@
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from latest_tables import reduce_latest_rows, derive_latest_table
+from main import load_raw_tables, CASE_HEADERS, AUDIT_HEADERS
+
+
+def test_reduce_latest_cases_keeps_the_highest_version():
+    """NULL versions rank first (as in ORDER BY version DESC), ties keep the first row, rows without a documentId go."""
+    rows = [
+        {'documentId': 'doc1', 'version': Decimal(1), 'matterName': 'old'},
+        {'documentId': 'doc2', 'version': 3, 'matterName': 'first'},
+        {'documentId': 'doc1', 'version': Decimal(2), 'matterName': 'new'},
+        {'documentId': 'doc2', 'version': 3.0, 'matterName': 'tie'},
+        {'documentId': 'doc3', 'version': 5, 'matterName': 'numbered'},
+        {'documentId': 'doc3', 'version': None, 'matterName': 'unnumbered'},
+        {'documentId': None, 'version': 9},
+    ]
+
+    latest = reduce_latest_rows("cases", rows)
+
+    assert [row['matterName'] for row in latest] == ['new', 'first', 'unnumbered']
+
+
+def test_reduce_latest_audit_skips_missing_timestamps():
+    """The latest audit record has the largest createdTs; records without one never count, ties go to the larger id."""
+    rows = [
+        {'auditRecordId': 'a1', 'documentId': 'doc1', 'createdTs': Decimal(10)},
+        {'auditRecordId': 'a2', 'documentId': 'doc1', 'createdTs': None},
+        {'auditRecordId': 'a4', 'documentId': 'doc2', 'createdTs': Decimal(7)},
+        {'auditRecordId': 'a3', 'documentId': 'doc2', 'createdTs': Decimal(7)},
+        {'auditRecordId': 'a5', 'documentId': 'doc3', 'createdTs': None},
+    ]
+
+    latest = reduce_latest_rows("audit", rows)
+
+    assert [row['auditRecordId'] for row in latest] == ['a1', 'a4']
+
+
+def test_derive_latest_table_only_replaces_changed_documents():
+    """With document ids, only those documents are deleted and derived again from the raw table."""
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+
+    derive_latest_table(conn, "audit", ["auditRecordId", "documentId", "createdTs"], document_ids=["doc1"])
+
+    delete_call, insert_call = cur.execute.call_args_list
+    assert delete_call.args == ('DELETE FROM raw.audit_latest WHERE "documentId" = ANY(%s)', (["doc1"],))
+    query = " ".join(insert_call.args[0].split())
+    assert query == ('INSERT INTO raw.audit_latest ("auditRecordId", "documentId", "createdTs") '
+                     'SELECT DISTINCT ON ("documentId") "auditRecordId", "documentId", "createdTs" FROM raw.audit '
+                     'WHERE "documentId" IS NOT NULL AND "createdTs" IS NOT NULL AND "documentId" = ANY(%s) '
+                     'ORDER BY "documentId", "createdTs" DESC, "auditRecordId" COLLATE "C" DESC')
+    conn.commit.assert_not_called()
+
+
+@patch("main.derive_latest_table")
+@patch("main.set_high_water_mark")
+@patch("main.insert_data_and_validate")
+def test_pipeline_reduction_loads_the_reduced_rows(mock_insert, mock_set_high_water_mark, mock_derive, monkeypatch):
+    """LATEST_REDUCTION=pipeline loads the reduced rows after each raw table instead of deriving them in SQL."""
+    monkeypatch.setenv("LATEST_REDUCTION", "pipeline")
+    cases = [{'documentId': 'doc1', 'version': 1}, {'documentId': 'doc1', 'version': 2}]
+    audit = [{'auditRecordId': 'a1', 'documentId': 'doc1', 'createdTs': 5}]
+
+    load_raw_tables(MagicMock(), "full", "delete", cases, [], [], audit, None, None)
+
+    loaded = [(c.args[1], c.args[3]) for c in mock_insert.call_args_list]
+    assert loaded == [("cases", cases), ("cases_latest", [cases[1]]), ("metadata", []), ("templates", []),
+                      ("audit", audit), ("audit_latest", audit)]
+    assert mock_insert.call_args_list[1].args[2] == CASE_HEADERS
+    assert mock_insert.call_args_list[5].args[2] == AUDIT_HEADERS
+    mock_derive.assert_not_called()
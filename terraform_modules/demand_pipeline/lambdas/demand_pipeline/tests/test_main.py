@@ -1,13 +1,14 @@
 import pytest
 import sys
 import os
+from decimal import Decimal
 from unittest.mock import patch, MagicMock
 
 # You may need the following depending on your local path structure
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import the function under test
-from main import main as main_function
+from main import main as main_function, run_distributed_action
 
 
 @pytest.fixture
@@ -136,15 +137,17 @@ def test_main_function_successfully_processes_data(
         mock_audit_table        # audit
     ]
 
-    # Mock parallel_scan_dynamo_table for documents and audit
-    mock_parallel_scan_dynamo_table.side_effect = [
-        mock_scan_data["documents_items"],
-        mock_scan_data["audit_items"],
-    ]
+    # The tables are scanned concurrently, so the scans are mocked per table rather than by call order.
+    # Mock parallel_scan_dynamo_table for documents, metadata and audit
+    parallel_scan_items = {
+        id(mock_documents_table): mock_scan_data["documents_items"],
+        id(mock_metadata_table): mock_scan_data["metadata_items"],
+        id(mock_audit_table): mock_scan_data["audit_items"],
+    }
+    mock_parallel_scan_dynamo_table.side_effect = lambda table, **kwargs: parallel_scan_items[id(table)]
 
-    # Mock scan_dynamo_table for metadata and templates
+    # Mock scan_dynamo_table for templates
     mock_scan_dynamo_table.side_effect = [
-        mock_scan_data["metadata_items"],
         mock_scan_data["templates_items"],
     ]
 
@@ -165,8 +168,12 @@ def test_main_function_successfully_processes_data(
 
     # -------------------- Verify --------------------
     assert mock_get_dynamo_table.call_count == 4
-    assert mock_parallel_scan_dynamo_table.call_count == 2
-    assert mock_scan_dynamo_table.call_count == 2
+    assert mock_parallel_scan_dynamo_table.call_count == 3
+    assert mock_scan_dynamo_table.call_count == 1
+
+    # Every parallel scan runs its segments on the shared worker pool
+    for scan_call in mock_parallel_scan_dynamo_table.call_args_list:
+        assert scan_call.kwargs["executor"] is not None
 
     mock_build_cases_table_data.assert_called_once_with(mock_scan_data["documents_items"])
     mock_build_metadata_table_data.assert_called_once_with(mock_scan_data["metadata_items"])
@@ -246,14 +253,8 @@ def test_main_with_empty_scans(
     ]
 
     # Empty lists from the scans
-    mock_parallel_scan_dynamo_table.side_effect = [
-        [],  # documents
-        [],  # audit
-    ]
-    mock_scan_dynamo_table.side_effect = [
-        [],  # metadata
-        [],  # templates
-    ]
+    mock_parallel_scan_dynamo_table.return_value = []  # documents, metadata, audit
+    mock_scan_dynamo_table.return_value = []  # templates
 
     # Builders return empty lists
     mock_build_cases_table_data.return_value = []
@@ -281,3 +282,291 @@ def test_main_with_empty_scans(
         assert data_arg == []
 
     mock_db_connection.close.assert_called_once()
+
+
+@patch("main.set_high_water_mark")
+@patch("main.get_high_water_marks")
+@patch("main.get_db_connection")
+@patch("main.upsert_data_and_validate")
+@patch("main.insert_data_and_validate")
+@patch("main.build_audit_table_data")
+@patch("main.build_templates_table_data")
+@patch("main.build_metadata_table_data")
+@patch("main.build_cases_table_data")
+@patch("main.scan_dynamo_table")
+@patch("main.parallel_scan_dynamo_table")
+@patch("boto3.client")
+@patch("main.get_dynamo_table")
+def test_main_incremental_sync_upserts_changed_documents(
+    mock_get_dynamo_table,
+    mock_boto_client,
+    mock_parallel_scan_dynamo_table,
+    mock_scan_dynamo_table,
+    mock_build_cases_table_data,
+    mock_build_metadata_table_data,
+    mock_build_templates_table_data,
+    mock_build_audit_table_data,
+    mock_insert_data_and_validate,
+    mock_upsert_data_and_validate,
+    mock_get_db_connection,
+    mock_get_high_water_marks,
+    mock_set_high_water_mark,
+    mock_db_connection,
+    mock_built_data,
+    monkeypatch,
+):
+    """
+    Test that SYNC_MODE=incremental only scans documents and audit records newer than the
+    stored high-water marks, upserts them, and records the new high-water marks.
+    """
+    monkeypatch.setenv("SYNC_MODE", "incremental")
+    monkeypatch.setenv("SYNC_LOOKBACK_SECONDS", "100")
+
+    mock_boto_client.return_value = MagicMock()
+    documents_table, metadata_table, templates_table, audit_table = MagicMock(), MagicMock(), MagicMock(), MagicMock()
+    mock_get_dynamo_table.side_effect = [documents_table, metadata_table, templates_table, audit_table]
+    mock_get_high_water_marks.return_value = {"cases": Decimal("1000"), "audit": Decimal("2000")}
+
+    # Only the changed documents and audit records come back from the filtered scans
+    def parallel_scan(table, filter_expression=None, **kwargs):
+        if table is documents_table:
+            return [{"documentId": "doc1", "createdTs": Decimal("1500")}]
+        if table is audit_table:
+            return [{"auditRecordId": "aud1", "createdTs": Decimal("2500")}]
+        return []
+
+    mock_parallel_scan_dynamo_table.side_effect = parallel_scan
+    mock_scan_dynamo_table.return_value = []
+
+    mock_build_cases_table_data.return_value = mock_built_data["cases"]
+    mock_build_metadata_table_data.return_value = mock_built_data["metadata"]
+    mock_build_templates_table_data.return_value = mock_built_data["templates"]
+    mock_build_audit_table_data.return_value = mock_built_data["audit"]
+    mock_get_db_connection.return_value = mock_db_connection
+
+    main_function()
+
+    # The same connection is reused for reading the marks and loading the data
+    mock_get_db_connection.assert_called_once()
+
+    # The documents and audit scans are filtered on createdTs; metadata is still scanned in full
+    filters = {id(c.args[0]): c.kwargs.get("filter_expression") for c in mock_parallel_scan_dynamo_table.call_args_list}
+    assert filters[id(documents_table)] is not None
+    assert filters[id(audit_table)] is not None
+    assert filters[id(metadata_table)] is None
+
+    # Cases and audit are upserted by key; metadata and templates are still fully reloaded
+    upserted_tables = [c[0][1] for c in mock_upsert_data_and_validate.call_args_list]
+    assert upserted_tables == ["cases", "audit"]
+    assert mock_upsert_data_and_validate.call_args_list[0][0][4] == ["documentId", "version"]
+    inserted_tables = [c[0][1] for c in mock_insert_data_and_validate.call_args_list]
+    assert inserted_tables == ["metadata", "templates"]
+
+    # The new high-water marks are the largest createdTs values scanned
+    recorded = {c[0][1]: c[0][2] for c in mock_set_high_water_mark.call_args_list}
+    assert recorded == {"cases": Decimal("1500"), "audit": Decimal("2500")}
+
+    mock_db_connection.commit.assert_called_once()
+    mock_db_connection.close.assert_called_once()
+
+
+@patch("main.set_high_water_mark")
+@patch("main.get_db_connection")
+@patch("main.stream_data_and_validate")
+@patch("main.build_audit_table_data")
+@patch("main.build_templates_table_data")
+@patch("main.build_metadata_table_data")
+@patch("main.build_cases_table_data")
+@patch("main.iter_parallel_scan_pages")
+@patch("main.parallel_scan_dynamo_table")
+@patch("boto3.client")
+@patch("main.get_dynamo_table")
+def test_main_streaming_mode_loads_tables_in_batches(
+    mock_get_dynamo_table,
+    mock_boto_client,
+    mock_parallel_scan_dynamo_table,
+    mock_iter_parallel_scan_pages,
+    mock_build_cases_table_data,
+    mock_build_metadata_table_data,
+    mock_build_templates_table_data,
+    mock_build_audit_table_data,
+    mock_stream_data_and_validate,
+    mock_get_db_connection,
+    mock_set_high_water_mark,
+    mock_db_connection,
+    monkeypatch,
+):
+    """
+    Test that STREAMING_MODE=true feeds every scanned page through the builders and into the
+    loader in batches of STREAM_BATCH_SIZE rows, without collecting whole tables first.
+    """
+    monkeypatch.setenv("STREAMING_MODE", "true")
+    monkeypatch.setenv("STREAM_BATCH_SIZE", "2")
+
+    mock_boto_client.return_value = MagicMock()
+    mock_get_dynamo_table.side_effect = [MagicMock(), MagicMock(), MagicMock(), MagicMock()]
+
+    # Documents arrive in two pages of uneven size; the other tables in one page each
+    mock_iter_parallel_scan_pages.side_effect = [
+        iter([[{"documentId": "doc1", "createdTs": Decimal("10")}],
+              [{"documentId": "doc2", "createdTs": Decimal("30")}, {"documentId": "doc3", "createdTs": Decimal("20")}]]),
+        iter([[{"documentId": "doc1"}]]),
+        iter([[{"templateId": "tmpl1"}]]),
+        iter([[{"auditRecordId": "aud1", "createdTs": Decimal("40")}]]),
+    ]
+    for builder in (mock_build_cases_table_data, mock_build_metadata_table_data,
+                    mock_build_templates_table_data, mock_build_audit_table_data):
+        builder.side_effect = lambda items: [dict(item) for item in items]
+
+    loaded = {}
+
+    def consume_batches(conn, table_name, headers, batches, load_mode, key_columns):
+        loaded[table_name] = [len(batch) for batch in batches]
+        return sum(loaded[table_name])
+
+    mock_stream_data_and_validate.side_effect = consume_batches
+    mock_get_db_connection.return_value = mock_db_connection
+
+    main_function()
+
+    # Nothing goes through the list-based scan
+    mock_parallel_scan_dynamo_table.assert_not_called()
+
+    # Pages are regrouped into batches of STREAM_BATCH_SIZE before they are built and loaded
+    assert loaded == {"cases": [2, 1], "metadata": [1], "templates": [1], "audit": [1]}
+    assert [len(c[0][0]) for c in mock_build_cases_table_data.call_args_list] == [2, 1]
+
+    # High-water marks are tracked across batches
+    recorded = {c[0][1]: c[0][2] for c in mock_set_high_water_mark.call_args_list}
+    assert recorded == {"cases": Decimal("30"), "audit": Decimal("40")}
+
+    mock_db_connection.commit.assert_called_once()
+    mock_db_connection.close.assert_called_once()
+
+
+@patch("main.insert_data_and_validate")
+@patch("main.get_db_connection")
+@patch("main.build_audit_table_data")
+@patch("main.build_templates_table_data")
+@patch("main.build_metadata_table_data")
+@patch("main.build_cases_table_data")
+@patch("main.scan_dynamo_table")
+@patch("main.get_dynamo_table")
+def test_distributed_extract_merges_every_partition(
+    mock_get_dynamo_table,
+    mock_scan_dynamo_table,
+    mock_build_cases_table_data,
+    mock_build_metadata_table_data,
+    mock_build_templates_table_data,
+    mock_build_audit_table_data,
+    mock_get_db_connection,
+    mock_insert_data_and_validate,
+    mock_db_connection,
+    tmp_path,
+    monkeypatch,
+):
+    """
+    Test that a distributed extraction run in-process plans one worker per segment, that each worker
+    stages its own partition, and that the merge step loads the rows of every partition once.
+    """
+    from main import handler
+    from distributed_extract import run_local_distributed_extract
+    from checkpoint_store import LocalFileCheckpointStore
+
+    monkeypatch.setenv("CHECKPOINT_STORE", "local")
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setenv("SCAN_TOTAL_SEGMENTS", "3")
+
+    def make_table(prefix):
+        table = MagicMock()
+
+        def fake_scan(Segment, TotalSegments, Limit, ExclusiveStartKey=None, **projection_and_filter):
+            if ExclusiveStartKey is None:
+                return {"Items": [{"documentId": f"{prefix}{Segment}-a", "auditRecordId": f"{prefix}{Segment}-a",
+                                   "createdTs": Decimal(Segment)}],
+                        "LastEvaluatedKey": {"documentId": f"{prefix}{Segment}-a"}}
+            return {"Items": [{"documentId": f"{prefix}{Segment}-b", "auditRecordId": f"{prefix}{Segment}-b",
+                               "createdTs": Decimal(Segment)}]}
+
+        table.scan.side_effect = fake_scan
+        return table
+
+    tables = {"documents": make_table("doc"), "metadata": make_table("meta"), "audit": make_table("aud")}
+    mock_get_dynamo_table.side_effect = lambda name, account: next(
+        (table for suffix, table in (("-documents-metadata", tables["metadata"]),
+                                     ("-documents-audit", tables["audit"]),
+                                     ("-documents", tables["documents"]))
+         if name.endswith(suffix)), MagicMock())
+    mock_scan_dynamo_table.return_value = [{"templateId": "tmpl1"}]
+    for builder in (mock_build_cases_table_data, mock_build_metadata_table_data,
+                    mock_build_templates_table_data, mock_build_audit_table_data):
+        builder.side_effect = lambda items: [dict(item) for item in items]
+    mock_get_db_connection.return_value = mock_db_connection
+
+    result = run_local_distributed_extract(lambda event: handler(event, None), "run-1", max_workers=4)
+
+    assert result == {"status": "COMPLETE"}
+    # Three segments per table, each scanned by its own worker
+    for table in tables.values():
+        assert sorted(c.kwargs["Segment"] for c in table.scan.call_args_list) == [0, 0, 1, 1, 2, 2]
+
+    loaded = {c[0][1]: c[0][3] for c in mock_insert_data_and_validate.call_args_list}
+    assert sorted(row["documentId"] for row in loaded["cases"]) == [
+        "doc0-a", "doc0-b", "doc1-a", "doc1-b", "doc2-a", "doc2-b"
+    ]
+    assert len(loaded["metadata"]) == 6
+    assert len(loaded["audit"]) == 6
+    assert len(loaded["templates"]) == 1
+    mock_db_connection.commit.assert_called_once()
+
+    # The staged partitions are removed once the load is committed
+    assert LocalFileCheckpointStore(str(tmp_path)).list_keys("") == []
+
+
+def test_record_table_fingerprints_skips_a_missing_function():
+    """Fingerprints are recorded per table, and nothing fails before 17_create_raw_table_fingerprints.sql is applied."""
+    from sync_state import record_table_fingerprints
+
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchone.side_effect = [(True,), ("fp-cases",), ("fp-audit",)]
+
+    assert record_table_fingerprints(conn, ["cases", "audit"]) == {"cases": "fp-cases", "audit": "fp-audit"}
+    assert cur.execute.call_args_list[1].args == ("SELECT raw.record_table_fingerprint(%s);", ("cases",))
+    conn.commit.assert_not_called()
+
+    cur.reset_mock()
+    cur.fetchone.side_effect = [(False,)]
+    assert record_table_fingerprints(conn, ["cases"]) == {}
+    assert cur.execute.call_count == 1
+
+
+@patch("main.run_table_extractions", side_effect=RuntimeError("scan failed"))
+@patch("main.get_checkpoint_store")
+@patch("boto3.client")
+@patch("main.get_source_tables")
+def test_main_closes_the_checkpoint_store_when_the_run_fails(mock_get_source_tables, mock_boto_client,
+                                                             mock_get_checkpoint_store, mock_run_table_extractions,
+                                                             monkeypatch):
+    """The checkpoint store's connection is released even when the scans raise."""
+    monkeypatch.delenv("STREAMING_MODE", raising=False)
+    monkeypatch.delenv("SYNC_MODE", raising=False)
+    store = mock_get_checkpoint_store.return_value
+
+    with pytest.raises(RuntimeError, match="scan failed"):
+        main_function(run_id="run-1")
+
+    store.close.assert_called_once()
+
+
+@patch("main.get_checkpoint_store")
+@patch("main.get_source_tables")
+def test_distributed_action_closes_the_checkpoint_store(mock_get_source_tables, mock_get_checkpoint_store):
+    """Every distributed step closes its checkpoint store, including a step that fails."""
+    store = mock_get_checkpoint_store.return_value
+    store.read_json.return_value = {"sync_mode": "full", "high_water_marks": {}}
+
+    with pytest.raises(ValueError, match="Unknown action"):
+        run_distributed_action({"action": "unknown", "run_id": "run-1"})
+
+    store.close.assert_called_once()
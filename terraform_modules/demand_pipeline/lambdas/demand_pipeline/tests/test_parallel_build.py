@@ -0,0 +1,76 @@
+import copy
+import logging
+import sys
+import os
+from decimal import Decimal
+
+import pytest
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from parallel_build import parallel_build, split_chunks
+from builders.case_builder import build_cases_table_data
+from builders.audit_builder import build_audit_table_data
+
+
+def make_documents(count):
+    documents = []
+    for i in range(count):
+        documents.append({
+            'documentId': f"doc{i}",
+            'customerId': 'cust1',
+            'version': Decimal(1),
+            'createdTs': Decimal(1700000000 + i),
+            'demandDetails': {'demandResponseRelativeDueDate': Decimal(30)},
+            'claimInfo': {'claimCoverage': 'BI', 'claimNumber': f"C-{i}",
+                          'claimant': {'firstName': 'Jane', 'lastName': f"Doe {i}"}},
+            'caseManagementMetadata': {'clientId': f"cl{i}"},
+            'sendingFirm': {'firmName': 'Firm', 'caseManagers': [{'firstName': 'Alex', 'lastName': 'Kim'}]},
+            'recipientCarrier': {'carrierCommonName': 'Carrier'},
+        })
+    # Every seventh document is missing its carrier and counted as an error
+    for document in documents[::7]:
+        del document['recipientCarrier']
+    return documents
+
+
+def failing_builder(items, stats=None):
+    raise ValueError("cannot build")
+
+
+def test_split_chunks_keeps_order_and_balances_sizes():
+    """Chunks are contiguous and differ in size by at most one item."""
+    chunks = split_chunks(list(range(10)), 3)
+
+    assert chunks == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert split_chunks([1], 3) == [[1], [], []]
+
+
+def test_parallel_build_matches_a_direct_build_and_sums_the_counters(caplog):
+    """The rows come back in item order and the success/error counters cover every chunk."""
+    documents = make_documents(50)
+
+    with caplog.at_level(logging.INFO, logger="parallel_build"):
+        rows = parallel_build(build_cases_table_data, copy.deepcopy(documents), workers=4, min_chunk_size=5,
+                              label="raw.cases")
+
+    assert rows == build_cases_table_data(copy.deepcopy(documents))
+    assert [row['documentId'] for row in rows] == [f"doc{i}" for i in range(50) if i % 7]
+    assert "in 4 processes (error_count=8, missing_due_date_count=0, success_count=42)" in caplog.text
+
+
+def test_parallel_build_falls_back_to_a_direct_call_for_small_inputs():
+    """Below two chunks' worth of items, the builder runs in the calling process."""
+    audit = [{'auditRecordId': 'a1', 'payload': {'archiveReason': 'Settled'}}]
+
+    rows = parallel_build(build_audit_table_data, audit, workers=4, min_chunk_size=5)
+
+    assert rows[0]['lastArchiveReason'] == 'Settled'
+    assert audit[0]['lastArchiveReason'] == 'Settled'
+
+
+def test_parallel_build_raises_builder_errors():
+    """An exception in a build process fails the build with the process's traceback."""
+    with pytest.raises(RuntimeError, match="2 of 2 build processes failed(.|\n)*cannot build"):
+        parallel_build(failing_builder, list(range(10)), workers=2, min_chunk_size=5, label="raw.audit")
@@ -0,0 +1,61 @@
+import pytest
+import sys
+import os
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rate_limiter import TokenBucket, get_scan_rate_limiter
+
+
+class FakeClock:
+    """Clock whose sleep advances time instead of blocking."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_holds_consumption_under_budget():
+    """Consuming 10 units per request against a 20 units/second budget allows two requests per second."""
+    clock = FakeClock()
+    bucket = TokenBucket(20, burst_seconds=1.0, clock=clock, sleep=clock.sleep)
+
+    for _ in range(10):
+        bucket.acquire()
+        bucket.consume(10)
+
+    # The last request may start once the 20 units of burst plus 20/second cover the 90 units
+    # consumed before it, with one token to spare
+    assert clock.now == pytest.approx(3.55)
+    assert bucket.consumed == 100
+    assert bucket.waited_seconds == pytest.approx(clock.now)
+
+
+def test_token_bucket_waits_off_debt_from_large_requests():
+    """A request costing more than the balance puts the bucket in debt until it has been paid back."""
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst_seconds=1.0, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    bucket.consume(50)  # balance is now -40
+    waited = bucket.acquire()
+
+    assert waited == pytest.approx(4.1)
+
+
+def test_get_scan_rate_limiter_reads_budget(monkeypatch):
+    """SCAN_RCU_BUDGET enables the limiter; unset or 0 disables it."""
+    monkeypatch.delenv("SCAN_RCU_BUDGET", raising=False)
+    assert get_scan_rate_limiter() is None
+
+    monkeypatch.setenv("SCAN_RCU_BUDGET", "0")
+    assert get_scan_rate_limiter() is None
+
+    monkeypatch.setenv("SCAN_RCU_BUDGET", "250")
+    assert get_scan_rate_limiter().rate == 250
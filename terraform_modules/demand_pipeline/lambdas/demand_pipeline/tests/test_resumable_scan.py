@@ -0,0 +1,104 @@
+import pytest
+import sys
+import os
+import time
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from checkpoint_store import CheckpointStore, LocalFileCheckpointStore, PostgresCheckpointStore
+from resumable_scan import ScanCheckpointer, ScanTimeBudgetExceeded, resumable_parallel_scan
+
+
+def build_rows(items):
+    return [{"documentId": item["documentId"]} for item in items]
+
+
+def make_table(fail_after_first_page=False):
+    """Two pages per segment; optionally fails when asked for any segment's second page."""
+    table = MagicMock()
+
+    def fake_scan(Segment, TotalSegments, Limit, ExclusiveStartKey=None):
+        if ExclusiveStartKey is None:
+            return {
+                "Items": [{"documentId": f"s{Segment}-p0", "createdTs": Decimal(Segment * 10)}],
+                "LastEvaluatedKey": {"documentId": f"s{Segment}-p0"},
+            }
+        if fail_after_first_page:
+            raise RuntimeError("invocation timed out")
+        return {"Items": [{"documentId": f"s{Segment}-p1", "createdTs": Decimal(Segment * 10 + 1)}]}
+
+    table.scan.side_effect = fake_scan
+    return table
+
+
+def test_local_checkpoint_store_round_trip(tmp_path):
+    """Values are read back as written, listed by prefix and deleted by prefix."""
+    store = LocalFileCheckpointStore(str(tmp_path))
+    store.write_json("run-1/cases/manifest.json", {"total_segments": 2})
+    store.write("run-1/audit/manifest.json", b"{}")
+    store.write("run-2/cases/manifest.json", b"{}")
+
+    assert store.read_json("run-1/cases/manifest.json") == {"total_segments": 2}
+    assert store.read("run-1/missing.json") is None
+    assert store.list_keys("run-1/") == ["run-1/audit/manifest.json", "run-1/cases/manifest.json"]
+
+    store.delete_prefix("run-1/")
+    assert store.list_keys("") == ["run-2/cases/manifest.json"]
+
+
+def test_resumed_scan_continues_from_last_evaluated_key(tmp_path):
+    """A retried scan skips nothing already checkpointed and rescans nothing either."""
+    checkpointer = ScanCheckpointer(LocalFileCheckpointStore(str(tmp_path)), "run-1", "cases")
+
+    with pytest.raises(RuntimeError, match="invocation timed out"):
+        resumable_parallel_scan(make_table(fail_after_first_page=True), checkpointer, build_rows, total_segments=2,
+                                watermark_attribute="createdTs")
+
+    table = make_table()
+    rows, high_water_mark = resumable_parallel_scan(table, checkpointer, build_rows, total_segments=5,
+                                                    watermark_attribute="createdTs")
+
+    # The resumed run keeps the original two segments and only asks for the pages it had not checkpointed
+    assert {call.kwargs["TotalSegments"] for call in table.scan.call_args_list} == {2}
+    assert sorted(call.kwargs["ExclusiveStartKey"]["documentId"] for call in table.scan.call_args_list) == [
+        "s0-p0", "s1-p0"
+    ]
+    assert [row["documentId"] for row in rows] == ["s0-p0", "s0-p1", "s1-p0", "s1-p1"]
+    assert high_water_mark == Decimal(11)
+
+    checkpointer.clear()
+    assert checkpointer.store.list_keys("run-1/") == []
+
+
+def test_scan_stops_at_deadline(tmp_path):
+    """Past the deadline no page is requested and the caller is told to invoke the run again."""
+    checkpointer = ScanCheckpointer(LocalFileCheckpointStore(str(tmp_path)), "run-1", "cases")
+    table = make_table()
+
+    with pytest.raises(ScanTimeBudgetExceeded):
+        resumable_parallel_scan(table, checkpointer, build_rows, total_segments=2, deadline=time.monotonic() - 1)
+
+    table.scan.assert_not_called()
+    assert checkpointer.load_total_segments() == 2
+
+
+def test_checkpoint_stores_close_their_resources(tmp_path):
+    """The Postgres store closes its dedicated connection; the local store has nothing to release."""
+    conn = MagicMock()
+    PostgresCheckpointStore(conn).close()
+    conn.close.assert_called_once()
+
+    LocalFileCheckpointStore(str(tmp_path)).close()
+
+
+def test_partial_checkpoint_store_fails_when_instantiated():
+    """A store missing one of the abstract methods is rejected up front, not in the middle of a scan."""
+    class WriteOnlyStore(CheckpointStore):
+        def write(self, key, data):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        WriteOnlyStore()
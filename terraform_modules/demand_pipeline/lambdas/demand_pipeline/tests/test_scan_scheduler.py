@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import threading
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scan_scheduler import run_table_extractions
+
+
+def test_extractions_run_concurrently_on_a_shared_segment_pool():
+    """Four slow scans finish in about the time of one, and all get the same segment executor."""
+    executors = []
+    lock = threading.Lock()
+
+    def slow_scan(items):
+        def scan(executor):
+            with lock:
+                executors.append(executor)
+            time.sleep(0.3)
+            return items
+        return scan
+
+    def build(items):
+        return [{"value": item} for item in items]
+
+    start = time.perf_counter()
+    results = run_table_extractions({
+        "cases": ("Documents", slow_scan([1, 2]), build),
+        "metadata": ("Metadata", slow_scan([3]), build),
+        "templates": ("Templates", slow_scan([]), build),
+        "audit": ("Audits", slow_scan([4]), build),
+    }, scan_workers=4)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.9  # sequentially this would take at least 1.2s
+    assert len(set(map(id, executors))) == 1
+    assert results["cases"]["rows"] == [{"value": 1}, {"value": 2}]
+    assert results["templates"]["items"] == []
+    assert results["audit"]["scan_seconds"] >= 0.3
+
+
+def test_shared_segment_pool_bounds_scan_concurrency():
+    """Segments submitted by every table never run on more threads than the worker budget."""
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def segment():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    def scan(executor):
+        futures = [executor.submit(segment) for _ in range(5)]
+        for future in futures:
+            future.result()
+        return []
+
+    run_table_extractions({name: (name, scan, list) for name in ["a", "b", "c", "d"]}, scan_workers=3)
+
+    assert peak <= 3
+
+
+def test_build_after_scans_runs_the_builders_once_every_scan_thread_is_joined():
+    """With build_after_scans, the builders run in the calling thread after all the scans have finished."""
+    scans_done = []
+    builds = []
+
+    def scan(name, delay):
+        def scan_fn(executor):
+            time.sleep(delay)
+            scans_done.append(name)
+            return [name]
+        return scan_fn
+
+    def build(items):
+        builds.append((threading.current_thread() is threading.main_thread(), len(scans_done)))
+        return [{"value": item} for item in items]
+
+    results = run_table_extractions({
+        "cases": ("Documents", scan("cases", 0.0), build),
+        "audit": ("Audits", scan("audit", 0.2), build),
+        "templates": ("Templates", lambda executor: ([{"value": "t"}], None), None),
+    }, scan_workers=2, build_after_scans=True)
+
+    assert builds == [(True, 2), (True, 2)]
+    assert results["cases"]["rows"] == [{"value": "cases"}]
+    assert results["audit"]["rows"] == [{"value": "audit"}]
+    assert results["templates"]["rows"] == [{"value": "t"}]
+    assert results["audit"]["build_seconds"] >= 0.0
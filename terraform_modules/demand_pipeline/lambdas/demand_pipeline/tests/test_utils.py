@@ -0,0 +1,320 @@
+import pytest
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import CopyRowStream, _iter_copy_lines, _get_copy_formatter, _copy_rows, swap_data_into_table, \
+    iter_parallel_scan_pages, iter_batches, choose_total_segments, _scan_with_backoff, SCAN_MAX_RETRIES, \
+    to_record_batch, _iter_record_batch_csv, _insert_rows, get_columnar_load, insert_data_into_table
+import utils
+
+
+@pytest.fixture
+def column_types():
+    """Fixture mirroring information_schema.columns for a few raw.cases/raw.templates columns."""
+    return {
+        "documentId": "text",
+        "version": "integer",
+        "assignedCaseCollaborator": "ARRAY",
+        "defaultDemandConfig": "jsonb",
+        "demandIsDeliverable": "boolean",
+    }
+
+
+def encode(headers, rows, column_types):
+    formatters = [_get_copy_formatter(column_types.get(col)) for col in headers]
+    return "".join(_iter_copy_lines(headers, rows, formatters))
+
+
+def test_copy_lines_distinguish_null_from_empty_string(column_types):
+    """None must be an unquoted empty field (NULL) and '' a quoted empty field."""
+    lines = encode(["documentId", "version"], [{"documentId": "", "version": None}], column_types)
+    assert lines == '"",\n'
+
+
+def test_copy_lines_encode_arrays_json_and_integers(column_types):
+    """text[] values become array literals, dicts become JSON and floats are rounded for integer columns."""
+    headers = ["documentId", "version", "assignedCaseCollaborator", "defaultDemandConfig", "demandIsDeliverable"]
+    rows = [{
+        "documentId": 'doc,"1"',
+        "version": 3.0,
+        "assignedCaseCollaborator": ['Jane "JD" Doe', None],
+        "defaultDemandConfig": {"days": Decimal("30")},
+        "demandIsDeliverable": True,
+    }]
+
+    lines = encode(headers, rows, column_types)
+
+    assert lines == (
+        '"doc,""1""",'
+        '"3",'
+        '"{""Jane \\""JD\\"" Doe"",NULL}",'
+        '"{""days"": 30}",'
+        '"t"\n'
+    )
+
+
+def test_copy_row_stream_reads_in_chunks():
+    """The stream hands out exactly the requested number of characters until the rows run out."""
+    stream = CopyRowStream(["abc\n", "defgh\n", "ij\n"])
+
+    chunks = []
+    while True:
+        chunk = stream.read(4)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    assert chunks == ["abc\n", "defg", "h\nij", "\n"]
+    assert stream.line_count == 3
+
+
+def test_copy_rows_streams_csv_to_copy_expert():
+    """_copy_rows looks up the column types and sends a CSV COPY for the quoted headers."""
+    cur = MagicMock()
+    cur.fetchall.return_value = [("documentId", "text"), ("version", "integer")]
+    sent = {}
+
+    def fake_copy_expert(sql, stream, size):
+        sent["sql"] = sql
+        sent["data"] = stream.read()
+
+    cur.copy_expert.side_effect = fake_copy_expert
+
+    copied = _copy_rows(cur, "cases", ["documentId", "version"], [{"documentId": "doc1", "version": 2.0}])
+
+    assert copied == 1
+    assert sent["sql"] == 'COPY raw.cases ("documentId", "version") FROM STDIN WITH (FORMAT csv)'
+    assert sent["data"] == '"doc1","2"\n'
+
+
+def test_record_batch_columns_are_typed_and_rounded_like_copy(column_types):
+    """Integers are rounded half away from zero, booleans stay booleans, and stray types are formatted."""
+    pa = pytest.importorskip("pyarrow")
+    headers = ["documentId", "version", "assignedCaseCollaborator", "defaultDemandConfig", "demandIsDeliverable"]
+    rows = [
+        {"documentId": "doc1", "version": 3.5, "assignedCaseCollaborator": ["A"], "demandIsDeliverable": True},
+        {"documentId": 5, "version": -2.5, "defaultDemandConfig": {"days": Decimal("30")}},
+        {"documentId": None, "version": None, "demandIsDeliverable": False},
+    ]
+
+    batch = to_record_batch(headers, rows, column_types)
+
+    assert batch.schema.field("version").type == pa.int64()
+    assert batch.schema.field("demandIsDeliverable").type == pa.bool_()
+    assert batch.column("version").to_pylist() == [4, -3, None]
+    assert batch.column("documentId").to_pylist() == ["doc1", "5", None]
+    assert batch.column("assignedCaseCollaborator").to_pylist() == ['{"A"}', None, None]
+    assert batch.column("defaultDemandConfig").to_pylist() == [None, '{"days": 30}', None]
+
+
+def test_record_batch_csv_matches_row_by_row_copy(column_types):
+    """Without booleans (t/f vs true/false), both paths send PostgreSQL the same CSV."""
+    pytest.importorskip("pyarrow")
+    headers = ["documentId", "version", "assignedCaseCollaborator", "defaultDemandConfig"]
+    rows = [
+        {"documentId": 'doc,"1"\nnext', "version": 3.0, "assignedCaseCollaborator": ['Jane "JD" Doe', None],
+         "defaultDemandConfig": {"days": Decimal("30")}},
+        {"documentId": "", "version": Decimal("1700000000.5"), "assignedCaseCollaborator": []},
+        {"documentId": None},
+    ]
+
+    batch = to_record_batch(headers, rows, column_types)
+    csv = b"".join(_iter_record_batch_csv(batch, chunk_rows=2)).decode()
+
+    assert csv == encode(headers, rows, column_types)
+
+
+def test_insert_rows_copies_record_batches():
+    """A record batch is streamed to copy_expert without looking up the column types."""
+    pytest.importorskip("pyarrow")
+    batch = to_record_batch(["documentId", "version"], [{"documentId": "d1", "version": 2}],
+                            {"documentId": "text", "version": "integer"})
+    cur = MagicMock()
+    sent = []
+    cur.copy_expert.side_effect = lambda query, stream, size: sent.append((query, stream.read()))
+
+    _insert_rows(cur, "cases", ["documentId", "version"], batch)
+
+    cur.execute.assert_not_called()
+    assert sent == [('COPY raw.cases ("documentId", "version") FROM STDIN WITH (FORMAT csv)', b'"d1","2"\n')]
+
+
+def test_columnar_load_needs_pyarrow(monkeypatch):
+    """COLUMNAR_LOAD=true falls back to the row-by-row load when pyarrow is missing."""
+    monkeypatch.setenv("COLUMNAR_LOAD", "true")
+    monkeypatch.setattr(utils, "pa", None)
+
+    assert get_columnar_load() is False
+
+
+def test_swap_validates_staging_before_truncating_raw_table():
+    """A staging row count mismatch rolls back before raw.<table> is truncated."""
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("documentId", "text")]
+    cur.fetchone.return_value = (0,)
+
+    with pytest.raises(ValueError, match="Row count mismatch in staging"):
+        swap_data_into_table(conn, "cases", ["documentId"], [{"documentId": "doc1"}])
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    assert any(sql.startswith("CREATE TEMP TABLE cases_staging") for sql in executed)
+    assert not any(sql.startswith("TRUNCATE") for sql in executed)
+    conn.rollback.assert_called_once()
+
+
+def test_swap_rebuilds_nonessential_indexes_around_the_truncate(monkeypatch):
+    """The managed indexes are dropped right before the TRUNCATE and built again after the insert."""
+    monkeypatch.delenv("REBUILD_INDEXES", raising=False)
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("documentId", "text")]
+    cur.fetchone.side_effect = [(1,), (True,), (1,), (1,)]
+    cur.rowcount = 1
+
+    swap_data_into_table(conn, "cases", ["documentId"], [{"documentId": "doc1"}])
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    start = executed.index("SELECT raw.drop_nonessential_indexes(%s);")
+    assert executed[start:start + 4] == ["SELECT raw.drop_nonessential_indexes(%s);", "TRUNCATE raw.cases;",
+                                         'INSERT INTO raw.cases ("documentId") SELECT "documentId" FROM cases_staging;',
+                                         "SELECT raw.create_managed_indexes(%s);"]
+
+
+def test_delete_mode_keeps_indexes(monkeypatch):
+    """The delete load mode never drops indexes, so readers keep seeing the previous rows."""
+    monkeypatch.delenv("REBUILD_INDEXES", raising=False)
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("documentId", "text")]
+
+    insert_data_into_table(conn, "cases", ["documentId"], [{"documentId": "doc1"}])
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    assert not any("indexes" in sql for sql in executed)
+
+
+def test_swap_keeps_indexes_when_rebuild_is_disabled(monkeypatch):
+    """With REBUILD_INDEXES=false the indexes are left alone."""
+    monkeypatch.setenv("REBUILD_INDEXES", "false")
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("documentId", "text")]
+    cur.fetchone.return_value = (1,)
+    cur.rowcount = 1
+
+    swap_data_into_table(conn, "cases", ["documentId"], [{"documentId": "doc1"}])
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    assert not any("indexes" in sql for sql in executed)
+
+
+def test_iter_parallel_scan_pages_yields_every_page():
+    """Every page of every segment is yielded, following LastEvaluatedKey."""
+    table = MagicMock()
+
+    def fake_scan(Segment, TotalSegments, Limit, ExclusiveStartKey=None):
+        if ExclusiveStartKey is None:
+            return {"Items": [f"s{Segment}-p0"], "LastEvaluatedKey": "next"}
+        return {"Items": [f"s{Segment}-p1"]}
+
+    table.scan.side_effect = fake_scan
+
+    pages = list(iter_parallel_scan_pages(table, total_segments=3, limit=1, max_buffered_pages=1))
+
+    assert sorted(item for page in pages for item in page) == [
+        "s0-p0", "s0-p1", "s1-p0", "s1-p1", "s2-p0", "s2-p1"
+    ]
+
+
+def test_iter_parallel_scan_pages_raises_segment_errors():
+    """A failing segment is raised to the consumer instead of returning a partial scan."""
+    table = MagicMock()
+    table.scan.side_effect = RuntimeError("scan failed")
+
+    with pytest.raises(RuntimeError, match="scan failed"):
+        list(iter_parallel_scan_pages(table, total_segments=2))
+
+
+def test_iter_batches_regroups_pages():
+    """Pages of any size are regrouped into fixed-size batches."""
+    pages = [[1, 2, 3], [], [4], [5, 6, 7, 8]]
+
+    assert list(iter_batches(pages, 3)) == [[1, 2, 3], [4, 5, 6], [7, 8]]
+
+
+@pytest.mark.parametrize(
+    "table_size_bytes, item_count, cpu_count, expected",
+    [
+        (0, 0, 2, 1),                         # empty (or not yet described) table
+        (10 * 1024 ** 2, 2000, 2, 1),         # smaller than one segment's worth of data
+        (300 * 1024 ** 2, 500000, 2, 5),      # one segment per 64 MB
+        (300 * 1024 ** 2, 3000, 2, 3),        # no more segments than pages of items
+        (10 * 1024 ** 3, 5000000, 1, 4),      # capped by the CPUs available
+        (10 * 1024 ** 3, 5000000, 16, 16),    # capped by SCAN_MAX_SEGMENTS
+    ],
+)
+def test_choose_total_segments(monkeypatch, table_size_bytes, item_count, cpu_count, expected):
+    """The segment count follows the table size, bounded by its pages, the CPUs and SCAN_MAX_SEGMENTS."""
+    monkeypatch.delenv("SCAN_TOTAL_SEGMENTS", raising=False)
+    monkeypatch.delenv("SCAN_MAX_SEGMENTS", raising=False)
+    monkeypatch.setattr(os, "cpu_count", lambda: cpu_count)
+    table = MagicMock(table_size_bytes=table_size_bytes, item_count=item_count)
+
+    assert choose_total_segments(table, limit=1000) == expected
+
+
+def test_choose_total_segments_override(monkeypatch):
+    """SCAN_TOTAL_SEGMENTS skips DescribeTable."""
+    monkeypatch.setenv("SCAN_TOTAL_SEGMENTS", "7")
+
+    assert choose_total_segments(MagicMock()) == 7
+
+
+def _throttled():
+    return ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "slow down"}}, "Scan")
+
+
+@patch("utils.time.sleep")
+@patch("utils.random.uniform", side_effect=lambda low, high: high)
+def test_scan_backoff_grows_per_attempt_not_per_segment(mock_uniform, mock_sleep):
+    """Throttled pages back off by attempt number with full jitter, whatever the segment index."""
+    table = MagicMock()
+    table.scan.side_effect = [_throttled(), _throttled(), _throttled(), {"Items": [1]}]
+
+    response = _scan_with_backoff(table, {"Segment": 4}, segment_index=4)
+
+    assert response == {"Items": [1]}
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.5, 1.0, 2.0]
+    assert all(c.args[0] == 0 for c in mock_uniform.call_args_list)
+
+
+@patch("utils.time.sleep")
+def test_scan_backoff_gives_up_after_max_retries(mock_sleep):
+    """A page that stays throttled is raised after SCAN_MAX_RETRIES retries."""
+    table = MagicMock()
+    table.scan.side_effect = _throttled()
+
+    with pytest.raises(ClientError):
+        _scan_with_backoff(table, {}, segment_index=0)
+
+    assert table.scan.call_count == SCAN_MAX_RETRIES + 1
+
+
+def test_scan_charges_consumed_capacity_to_rate_limiter():
+    """Each page's ConsumedCapacity is charged to the shared rate limiter."""
+    table = MagicMock()
+    table.scan.return_value = {"Items": [], "ConsumedCapacity": {"CapacityUnits": 12.5}}
+    rate_limiter = MagicMock()
+
+    _scan_with_backoff(table, {}, segment_index=0, rate_limiter=rate_limiter)
+
+    rate_limiter.acquire.assert_called_once()
+    rate_limiter.consume.assert_called_once_with(12.5)
@@ -1,7 +1,12 @@
 # Standard library imports
 import os
 import time
+import math
+import queue
 import random
+import itertools
+import threading
+from decimal import Decimal, ROUND_HALF_UP
 
 # Third-party imports
 import json
@@ -10,10 +15,22 @@ from psycopg2.extras import execute_values
 import pandas as pd
 import base64
 
+# pyarrow comes with the AWS SDK for pandas layer; without it the columnar load is unavailable
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pc = pa_csv = None
+
 import boto3
 import concurrent.futures
 from botocore.exceptions import BotoCoreError, ClientError
 
+# Local imports
+from rate_limiter import get_scan_rate_limiter
+from fast_scan import FastScanTable, get_scan_client_mode, SCAN_CLIENT_LOW_LEVEL
+
 # Shared Logger
 from itc_common_utilities.logger.logger_setup import setup_logger
 
@@ -23,69 +40,109 @@ logger = setup_logger(__name__)
 # Create DynamoDB resource
 dynamodb = boto3.resource('dynamodb')
 
+# Parallel scan segment count: used when the table cannot be described, otherwise chosen per table from
+# its size (one segment per SEGMENT_TARGET_BYTES), capped by the CPUs available and SCAN_MAX_SEGMENTS
+DEFAULT_TOTAL_SEGMENTS = 5
+SEGMENT_TARGET_BYTES = 64 * 1024 * 1024
+SEGMENTS_PER_CPU = 4
+DEFAULT_MAX_SCAN_SEGMENTS = 16
+
+# Throttled scan requests are retried with exponential backoff and full jitter, per attempt
+THROTTLING_ERROR_CODES = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+SCAN_BACKOFF_BASE = 0.5
+SCAN_MAX_BACKOFF = 30.0
+SCAN_MAX_RETRIES = 10
+
+# Load rows with COPY by default; "insert" keeps the execute_values path
+LOAD_METHOD_COPY = "copy"
+LOAD_METHOD_INSERT = "insert"
+
+# How insert_data_and_validate replaces a raw table: "delete" deletes and re-inserts in place,
+# "swap" loads a temp staging table, validates it and swaps it in with TRUNCATE + INSERT ... SELECT
+LOAD_MODE_DELETE = "delete"
+LOAD_MODE_SWAP = "swap"
+
+# Number of characters handed to COPY per read of the row stream
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# PostgreSQL column types that need their values rounded to whole numbers before COPY
+INTEGER_COLUMN_TYPES = {"smallint", "integer", "bigint"}
+JSON_COLUMN_TYPES = {"json", "jsonb"}
+
+# Streaming mode: number of built rows handed to the loader at a time
+DEFAULT_STREAM_BATCH_SIZE = 1000
+
+# Columnar load: rows of a record batch encoded into CSV at a time by pyarrow
+COLUMNAR_CHUNK_ROWS = 65536
+# Largest integer a float64 holds exactly; integer columns beyond it are formatted value by value
+MAX_EXACT_FLOAT_INTEGER = 2 ** 53
+
 
 def get_dynamo_table(table_name, account_id=None):
     """
     Retrieves a DynamoDB table resource, possibly in another account via STS AssumeRole.
     If local_mode=True, no role is assumed; the local/default credentials are used.
 
+    With SCAN_CLIENT=client the resource is wrapped in a FastScanTable, which scans through the
+    low-level client (with the same credentials) and decodes items without boto3's TypeDeserializer.
+
     :param table_name: The name of the DynamoDB table.
     :param account_id: If provided and SOURCE_ENV != "sandbox", attempts to assume a role in that account.
-    :return: DynamoDB Table resource or None if an error occurs.
+    :return: DynamoDB Table resource (or FastScanTable) or None if an error occurs.
     """
     try:
         # 1) If local_mode is True, simply use local credentials
         # Determine whether we're running locally. You can set LOCAL_MODE=true in your .env file.
         local_mode = os.environ.get("LOCAL_MODE", "false").lower() == "true"
 
-        if local_mode:
-            dynamodb = boto3.resource("dynamodb")
-            table = dynamodb.Table(table_name)
-            logger.info(f"Accessing table '{table_name}' in local mode with default credentials.")
-            return table
-
         # 2) Otherwise, fallback to existing logic using SOURCE_ENV
         SOURCE_ENV = os.getenv("SOURCE_ENV", "sandbox")  # Default to "sandbox" if not set
 
+        if local_mode:
+            session_kwargs = {}
+            logger.info(f"Accessing table '{table_name}' in local mode with default credentials.")
+
         # If sandbox or no account_id was provided, use the default credentials
-        if SOURCE_ENV == "sandbox" or not account_id:
-            dynamodb = boto3.resource("dynamodb")
-            table = dynamodb.Table(table_name)
+        elif SOURCE_ENV == "sandbox" or not account_id:
+            session_kwargs = {}
             logger.info(f"Accessing table '{table_name}' in the *current* account (sandbox/default).")
-            return table
 
         # 3) If not local_mode and we have an account_id (and not sandbox), assume the cross-account role
-        role_arn = f"arn:aws:iam::{account_id}:role/DataScienceCrossAccountDDBAccess"
-        sts_client = boto3.client("sts")
-        assumed = sts_client.assume_role(
-            RoleArn=role_arn,
-            RoleSessionName="CrossAccountSession"
-        )
-
-        creds = assumed["Credentials"]
-
-        dynamodb_xacct = boto3.resource(
-            "dynamodb",
-            region_name="us-east-1",
-            aws_access_key_id=creds["AccessKeyId"],
-            aws_secret_access_key=creds["SecretAccessKey"],
-            aws_session_token=creds["SessionToken"]
-        )
-
-        table = dynamodb_xacct.Table(table_name)
-        logger.info(f"Accessing table '{table_name}' in account {account_id} via assumed role.")
+        else:
+            role_arn = f"arn:aws:iam::{account_id}:role/DataScienceCrossAccountDDBAccess"
+            sts_client = boto3.client("sts")
+            assumed = sts_client.assume_role(
+                RoleArn=role_arn,
+                RoleSessionName="CrossAccountSession"
+            )
+
+            creds = assumed["Credentials"]
+            session_kwargs = {
+                "region_name": "us-east-1",
+                "aws_access_key_id": creds["AccessKeyId"],
+                "aws_secret_access_key": creds["SecretAccessKey"],
+                "aws_session_token": creds["SessionToken"],
+            }
+            logger.info(f"Accessing table '{table_name}' in account {account_id} via assumed role.")
+
+        table = boto3.resource("dynamodb", **session_kwargs).Table(table_name)
+        if get_scan_client_mode() == SCAN_CLIENT_LOW_LEVEL:
+            logger.info(f"Scanning table '{table_name}' through the low-level client.")
+            return FastScanTable(table, boto3.client("dynamodb", **session_kwargs))
         return table
 
     except (BotoCoreError, ClientError) as e:
         logger.error(f"Error initializing table '{table_name}': {e}")
         return None
 
-def scan_dynamo_table(table, max_items=None):
+
+def scan_dynamo_table(table, max_items=None, projection_expression=None):
     """
     Scans a DynamoDB table and retrieves items up to a maximum number if specified.
 
     :param table: DynamoDB Table resource.
     :param max_items: Maximum number of items to retrieve. If None, retrieves all items.
+    :param projection_expression: (Optional) A string of attributes to retrieve, or a Projection (see column_specs).
     :return: List of items from the table or an empty list if an error occurs.
     """
     if not table:
@@ -93,6 +150,7 @@ def scan_dynamo_table(table, max_items=None):
         return []
 
     scan_params = {}
+    _apply_projection(scan_params, projection_expression)
     total_processed = 0
     items = []
 
@@ -138,26 +196,178 @@ def scan_dynamo_table(table, max_items=None):
     logger.info(f"Scan completed in {elapsed_time:.2f} seconds.")
     return items
 
+def choose_total_segments(table, limit=1000):
+    """
+    Chooses the number of parallel scan segments for a table.
+
+    The table size and item count come from DescribeTable (refreshed by DynamoDB about every six hours).
+    The table gets one segment per SEGMENT_TARGET_BYTES, but no more segments than it has pages of
+    `limit` items, SEGMENTS_PER_CPU per CPU available to the Lambda, or SCAN_MAX_SEGMENTS.
+    SCAN_TOTAL_SEGMENTS overrides the choice.
+
+    :param table: DynamoDB Table resource object.
+    :param limit: Maximum number of items fetched per API call.
+    :return: Number of segments.
+    """
+    override = os.getenv("SCAN_TOTAL_SEGMENTS")
+    if override:
+        return max(1, int(override))
+
+    try:
+        table_size_bytes = int(table.table_size_bytes or 0)
+        item_count = int(table.item_count or 0)
+    except (BotoCoreError, ClientError) as e:
+        logger.warning(f"Could not describe table {table.table_name}: {e}. Using {DEFAULT_TOTAL_SEGMENTS} segments.")
+        return DEFAULT_TOTAL_SEGMENTS
+
+    max_segments = int(os.getenv("SCAN_MAX_SEGMENTS", DEFAULT_MAX_SCAN_SEGMENTS))
+    cpu_segments = (os.cpu_count() or 1) * SEGMENTS_PER_CPU
+    size_segments = math.ceil(table_size_bytes / SEGMENT_TARGET_BYTES)
+    page_segments = math.ceil(item_count / limit)
+    total_segments = max(1, min(size_segments, page_segments, cpu_segments, max_segments))
+
+    logger.info(
+        f"Using {total_segments} segments for {table.table_name} "
+        f"({item_count} items, {table_size_bytes / 1024 / 1024:.1f} MB, {os.cpu_count()} CPUs)."
+    )
+    return total_segments
+
+
+def _apply_projection(scan_kwargs, projection_expression):
+    """
+    Adds a projection to scan parameters.
+
+    :param scan_kwargs: dictionary of scan parameters, updated in place
+    :param projection_expression: None, a string of attributes, or a (expression, attribute names) Projection
+    """
+    if projection_expression is None:
+        return
+    if isinstance(projection_expression, str):
+        scan_kwargs['ProjectionExpression'] = projection_expression
+        return
+    expression, attribute_names = projection_expression
+    scan_kwargs['ProjectionExpression'] = expression
+    # boto3 adds the placeholders of the filter expression to this dictionary, so every request gets its own copy
+    scan_kwargs['ExpressionAttributeNames'] = dict(attribute_names)
+
+
+def _build_scan_kwargs(segment_index, total_segments, limit, filter_expression=None, projection_expression=None,
+                       return_consumed_capacity=False):
+    """
+    Builds the keyword arguments for scanning one segment of a table.
+
+    :param segment_index: The current segment number (0-indexed).
+    :param total_segments: The total number of segments for parallel scan.
+    :param limit: Maximum number of items to fetch per API call.
+    :param filter_expression: (Optional) DynamoDB filter expression object.
+    :param projection_expression: (Optional) A string of attributes to retrieve, or a Projection (see column_specs).
+    :param return_consumed_capacity: Whether responses should report the capacity units they consumed.
+    :return: Dictionary of scan parameters.
+    """
+    scan_kwargs = {
+        'Segment': segment_index,
+        'TotalSegments': total_segments,
+        'Limit': limit
+    }
+    if filter_expression is not None:
+        scan_kwargs['FilterExpression'] = filter_expression
+    _apply_projection(scan_kwargs, projection_expression)
+    if return_consumed_capacity:
+        scan_kwargs['ReturnConsumedCapacity'] = 'TOTAL'
+    return scan_kwargs
+
+
+def _backoff_delay(attempt):
+    """
+    Computes the sleep before retrying a throttled request ("full jitter" exponential backoff).
+
+    :param attempt: Number of throttled attempts so far for this request (0-indexed).
+    :return: Seconds to sleep, drawn uniformly between 0 and the exponential cap.
+    """
+    return random.uniform(0, min(SCAN_MAX_BACKOFF, SCAN_BACKOFF_BASE * 2 ** attempt))
+
+
+def _scan_with_backoff(table, scan_kwargs, segment_index, rate_limiter=None):
+    """
+    Fetches one page of a segment, retrying throttled requests with per-attempt exponential backoff.
+
+    :param table: DynamoDB Table resource object.
+    :param scan_kwargs: Scan parameters, including ExclusiveStartKey for later pages.
+    :param segment_index: The segment being scanned (used for logging).
+    :param rate_limiter: (Optional) TokenBucket shared by the segments of the scan, charged with the
+                         capacity units each page consumed.
+    :return: The scan response.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            response = table.scan(**scan_kwargs)
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in THROTTLING_ERROR_CODES and attempt < SCAN_MAX_RETRIES:
+                sleep_time = _backoff_delay(attempt)
+                attempt += 1
+                logger.warning(
+                    f"Segment {segment_index}: {error_code} (attempt {attempt}). Sleeping for {sleep_time:.2f}s...")
+                time.sleep(sleep_time)
+                continue  # retry the same scan_kwargs
+            # Some other error, or still throttled after SCAN_MAX_RETRIES attempts
+            logger.error(f"Segment {segment_index}: ClientError: {e}")
+            raise
+        except BotoCoreError as e:
+            # handle other BotoCore-level errors
+            logger.error(f"Segment {segment_index}: BotoCoreError: {e}")
+            raise
+
+        if rate_limiter is not None:
+            rate_limiter.consume(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+        return response
+
+
+def _log_rate_limiter_usage(table, rate_limiter):
+    """
+    Logs how many capacity units a rate-limited scan consumed and how long it waited for budget.
+    """
+    if rate_limiter is not None:
+        logger.info(
+            f"Scan of {table.table_name} consumed {rate_limiter.consumed:.1f} RCUs "
+            f"and waited {rate_limiter.waited_seconds:.2f}s for budget."
+        )
+
+
 def parallel_scan_dynamo_table(
     table,
-    total_segments=5,
+    total_segments=None,
     global_max_rows=None,
     limit=1000,
     filter_expression=None,
     projection_expression=None,
+    rate_limiter=None,
+    executor=None,
 ):
     """
     Performs a parallel DynamoDB scan on a given table.
 
     :param table: DynamoDB Table resource object (e.g. boto3.resource('dynamodb').Table('table_name')).
     :param total_segments: Total number of parallel segments to use for the scan.
+                           If None, it is chosen from the table size by choose_total_segments.
     :param global_max_rows: Global maximum number of items across all segments.
                             If None, scans the entire table.
     :param limit: Maximum number of items to fetch per API call.
     :param filter_expression: (Optional) DynamoDB filter expression object (e.g. Attr('field').eq(value)).
-    :param projection_expression: (Optional) A string of attributes to retrieve (e.g. 'field1,field2').
+    :param projection_expression: (Optional) A string of attributes to retrieve (e.g. 'field1,field2'), or a Projection.
+    :param rate_limiter: (Optional) TokenBucket holding the consumed RCUs of all segments under a budget.
+                         If None, one is built from SCAN_RCU_BUDGET (no limit if unset).
+    :param executor: (Optional) Executor to run the segments on, e.g. a pool shared by several concurrent
+                     table scans. If None, a pool with one thread per segment is created for this scan.
     :return: List of scanned items (potentially filtered).
     """
+    if total_segments is None:
+        total_segments = choose_total_segments(table, limit)
+    if rate_limiter is None:
+        rate_limiter = get_scan_rate_limiter()
 
     def scan_segment(segment_index, total_segments, limit, max_items=None):
         """
@@ -174,38 +384,11 @@ def parallel_scan_dynamo_table(
         total_processed = 0
 
         # Prepare the scan parameters
-        scan_kwargs = {
-            'Segment': segment_index,
-            'TotalSegments': total_segments,
-            'Limit': limit
-        }
-        if filter_expression is not None:
-            scan_kwargs['FilterExpression'] = filter_expression
-        if projection_expression is not None:
-            scan_kwargs['ProjectionExpression'] = projection_expression
-
-        backoff_base = 1.0
-        max_backoff = 30.0  # some reasonable cap
+        scan_kwargs = _build_scan_kwargs(segment_index, total_segments, limit, filter_expression,
+                                         projection_expression, return_consumed_capacity=rate_limiter is not None)
 
         while True:
-            try:
-                response = table.scan(**scan_kwargs)
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ProvisionedThroughputExceededException':
-                    # Exponential backoff
-                    sleep_time = min(backoff_base * 2 ** segment_index, max_backoff)
-                    sleep_time += random.uniform(0, 1)  # jitter
-                    logger.warning(f"Segment {segment_index}: Throughput exceeded. Sleeping for {sleep_time:.2f}s...")
-                    time.sleep(sleep_time)
-                    continue  # retry the same scan_kwargs
-                else:
-                    # Some other error - re-raise or handle differently
-                    logger.error(f"Segment {segment_index}: ClientError: {e}")
-                    raise
-            except BotoCoreError as e:
-                # handle other BotoCore-level errors
-                logger.error(f"Segment {segment_index}: BotoCoreError: {e}")
-                raise
+            response = _scan_with_backoff(table, scan_kwargs, segment_index, rate_limiter)
 
             page_items = response.get('Items', [])
             scanned_this_page = len(page_items)
@@ -239,7 +422,11 @@ def parallel_scan_dynamo_table(
     try:
         # Use a ThreadPoolExecutor to scan each segment in parallel
         logger.info(f"Starting parallel scan with {total_segments} segments...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=total_segments) as executor:
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=total_segments)
+        futures = []
+        try:
             futures = [
                 executor.submit(
                     scan_segment,
@@ -259,6 +446,12 @@ def parallel_scan_dynamo_table(
                 if global_max_rows is not None and len(results) >= global_max_rows:
                     logger.info(f"Reached global max rows limit of {global_max_rows}. Stopping collection.")
                     break
+        finally:
+            # Segments still waiting for a worker in a shared pool are no longer needed
+            for future in futures:
+                future.cancel()
+            if own_executor:
+                executor.shutdown(wait=True)
     except (ClientError, BotoCoreError) as e:
         logger.error(f"Error during parallel scan: {e}")
         return []
@@ -267,9 +460,128 @@ def parallel_scan_dynamo_table(
     if global_max_rows is not None:
         results = results[:global_max_rows]
 
+    _log_rate_limiter_usage(table, rate_limiter)
     logger.info(f"Total items returned from parallel scan: {len(results)}")
     return results
 
+def iter_parallel_scan_pages(
+    table,
+    total_segments=None,
+    limit=1000,
+    filter_expression=None,
+    projection_expression=None,
+    max_buffered_pages=None,
+    rate_limiter=None,
+):
+    """
+    Performs a parallel DynamoDB scan and yields each page of items as soon as it arrives.
+
+    Unlike parallel_scan_dynamo_table, the items are never collected into one list. The segment
+    threads hand their pages over through a bounded queue, so a segment pauses once
+    max_buffered_pages pages are waiting, and memory is bounded by the queue and not the table size.
+    Errors raised while scanning a segment are re-raised to the consumer instead of returning a
+    partial result, and closing the generator stops the remaining segments.
+
+    :param table: DynamoDB Table resource object.
+    :param total_segments: Total number of parallel segments to use for the scan.
+                           If None, it is chosen from the table size by choose_total_segments.
+    :param limit: Maximum number of items to fetch per API call.
+    :param filter_expression: (Optional) DynamoDB filter expression object (e.g. Attr('field').eq(value)).
+    :param projection_expression: (Optional) A string of attributes to retrieve (e.g. 'field1,field2'), or a Projection.
+    :param max_buffered_pages: Maximum number of pages waiting to be consumed. Defaults to 2 per segment.
+    :param rate_limiter: (Optional) TokenBucket holding the consumed RCUs of all segments under a budget.
+                         If None, one is built from SCAN_RCU_BUDGET (no limit if unset).
+    :return: Generator of lists of items, one per scanned page.
+    """
+    if total_segments is None:
+        total_segments = choose_total_segments(table, limit)
+    if rate_limiter is None:
+        rate_limiter = get_scan_rate_limiter()
+    if max_buffered_pages is None:
+        max_buffered_pages = total_segments * 2
+
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    stop_event = threading.Event()
+    segment_done = object()
+
+    def put_page(entry):
+        # Wait while the consumer is behind, but give up once the generator has been closed
+        while not stop_event.is_set():
+            try:
+                pages.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment_index):
+        scan_kwargs = _build_scan_kwargs(segment_index, total_segments, limit, filter_expression,
+                                         projection_expression, return_consumed_capacity=rate_limiter is not None)
+        segment_items = 0
+        try:
+            while not stop_event.is_set():
+                response = _scan_with_backoff(table, scan_kwargs, segment_index, rate_limiter)
+                page_items = response.get('Items', [])
+                segment_items += len(page_items)
+                if page_items and not put_page(page_items):
+                    return
+
+                if 'LastEvaluatedKey' not in response:
+                    break
+
+                # Update ExclusiveStartKey for next page
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except Exception as e:
+            put_page(e)
+            return
+
+        logger.info(f"Segment {segment_index} finished scanning. Total items from this segment: {segment_items}")
+        put_page(segment_done)
+
+    logger.info(f"Starting streaming parallel scan with {total_segments} segments...")
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=total_segments)
+    try:
+        for segment_index in range(total_segments):
+            executor.submit(scan_segment, segment_index)
+
+        remaining_segments = total_segments
+        total_items = 0
+        while remaining_segments:
+            entry = pages.get()
+            if entry is segment_done:
+                remaining_segments -= 1
+                continue
+            if isinstance(entry, Exception):
+                logger.error(f"Error during streaming parallel scan: {entry}")
+                raise entry
+            total_items += len(entry)
+            yield entry
+
+        _log_rate_limiter_usage(table, rate_limiter)
+        logger.info(f"Total items streamed from parallel scan: {total_items}")
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=True)
+
+
+def iter_batches(pages, batch_size):
+    """
+    Regroups an iterable of pages into lists of exactly batch_size items (the last one may be shorter).
+
+    :param pages: Iterable of lists of items (e.g. from iter_parallel_scan_pages).
+    :param batch_size: Number of items per batch.
+    :return: Generator of lists of items.
+    """
+    batch = []
+    for page in pages:
+        batch.extend(page)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    if batch:
+        yield batch
+
+
 def get_secret():
     logger.info("Getting secrets from AWS Secrets Manager.")
 
@@ -361,7 +673,399 @@ def get_db_connection():
         logger.error(f"Error connecting to the database: {e}")
         raise
 
-def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_file_path="output.csv"):
+def _build_row_values(headers, data):
+    """
+    Prepares a list of tuples corresponding to each row's values in the same order as headers.
+
+    :param headers: list of column names to insert
+    :param data: list of dictionaries where keys are column names
+    :return: List of tuples ready for execute_values.
+    """
+    if is_record_batch(data):
+        data = data.to_pylist()
+    values = []
+    for row in data:
+        row_values = []
+        for col in headers:
+            value = row.get(col)
+            # Convert dictionaries to JSON strings
+            if isinstance(value, dict):
+                value = json.dumps(value)
+            row_values.append(value)
+        values.append(tuple(row_values))
+    return values
+
+
+def _json_default(value):
+    """
+    JSON serializer for the DynamoDB Decimal values that can appear inside nested maps.
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _format_float(value):
+    """
+    Formats a float the way PostgreSQL prints it, so NaN and infinities are accepted by COPY.
+    """
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return repr(value)
+
+
+def _format_array_literal(values):
+    """
+    Formats a Python list as a PostgreSQL array literal (e.g. text[] columns like assignedCaseCollaborator).
+    """
+    elements = []
+    for element in values:
+        if element is None:
+            elements.append("NULL")
+        else:
+            element = str(element).replace("\\", "\\\\").replace('"', '\\"')
+            elements.append(f'"{element}"')
+    return "{" + ",".join(elements) + "}"
+
+
+def _format_copy_text(value):
+    """
+    Converts a non-null Python value into the text PostgreSQL expects for it,
+    mirroring how psycopg2 adapts the same value for execute_values.
+    """
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, float):
+        return _format_float(value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (list, tuple)):
+        return _format_array_literal(value)
+    return str(value)
+
+
+def _format_copy_integer(value):
+    """
+    Rounds numeric values for integer columns. INSERT applies an assignment cast
+    (e.g. version 3.0 -> 3), but COPY rejects anything that is not a whole number.
+    """
+    if isinstance(value, (float, Decimal)) and not isinstance(value, bool):
+        try:
+            return str(int(Decimal(str(value)).to_integral_value(rounding=ROUND_HALF_UP)))
+        except (ArithmeticError, ValueError):
+            return _format_copy_text(value)
+    return _format_copy_text(value)
+
+
+def _format_copy_json(value):
+    """
+    Serializes dictionaries and lists for json/jsonb columns. Strings are assumed to already be JSON.
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    return _format_copy_text(value)
+
+
+def _get_copy_formatter(data_type):
+    """
+    Picks the value formatter for a PostgreSQL column type from information_schema.columns.
+    """
+    if data_type in INTEGER_COLUMN_TYPES:
+        return _format_copy_integer
+    if data_type in JSON_COLUMN_TYPES:
+        return _format_copy_json
+    return _format_copy_text
+
+
+def _get_column_types(cur, table_name):
+    """
+    Looks up the data type of every column in raw.<table_name>.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :return: Dictionary of column name to data type (e.g. {'version': 'integer'}).
+    """
+    cur.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = 'raw' AND table_name = %s;",
+        (table_name,)
+    )
+    return dict(cur.fetchall())
+
+
+def _iter_copy_lines(headers, data, formatters):
+    """
+    Yields one CSV line per row. Every non-null value is quoted, so an unquoted empty
+    field unambiguously means NULL while a quoted empty field stays an empty string.
+    """
+    for row in data:
+        fields = []
+        for col, formatter in zip(headers, formatters):
+            value = row.get(col)
+            if value is None:
+                fields.append("")
+            else:
+                fields.append('"' + formatter(value).replace('"', '""') + '"')
+        yield ",".join(fields) + "\n"
+
+
+class CopyRowStream:
+    """
+    Minimal file-like object that feeds COPY ... FROM STDIN from a generator of CSV lines,
+    so rows are encoded as they are sent instead of being buffered in memory first.
+    The lines may also be bytes (e.g. chunks of CSV encoded by pyarrow), with empty=b"".
+    """
+
+    def __init__(self, lines, empty=""):
+        self._lines = iter(lines)
+        self._empty = empty
+        self._buffer = empty
+        self.line_count = 0
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size is None or size < 0 or length < size:
+            try:
+                line = next(self._lines)
+            except StopIteration:
+                break
+            self.line_count += 1
+            chunks.append(line)
+            length += len(line)
+
+        data = self._empty.join(chunks)
+        if size is None or size < 0:
+            self._buffer = self._empty
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy_rows(cur, table_name, headers, data, target=None):
+    """
+    Streams rows into raw.<table_name> with COPY ... FROM STDIN (CSV format).
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: iterable of dictionaries where keys are column names
+    :param target: table to copy into instead of raw.<table_name> (e.g. a staging table with the same columns)
+    :return: Number of rows copied.
+    """
+    target = target or f"raw.{table_name}"
+    column_types = _get_column_types(cur, table_name)
+    formatters = [_get_copy_formatter(column_types.get(col)) for col in headers]
+
+    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
+    columns = ", ".join(quoted_headers)
+    copy_query = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    stream = CopyRowStream(_iter_copy_lines(headers, data, formatters))
+    cur.copy_expert(copy_query, stream, size=COPY_BUFFER_SIZE)
+    logger.info(f"Copied {stream.line_count} rows into {target}.")
+    return stream.line_count
+
+
+def get_columnar_load():
+    """
+    Reads the COLUMNAR_LOAD environment variable.
+
+    :return: True if the built rows should be converted into record batches and loaded from them.
+    """
+    columnar = os.getenv("COLUMNAR_LOAD", "false").lower() == "true"
+    if columnar and pa is None:
+        logger.warning("COLUMNAR_LOAD is set but pyarrow is not installed. Loading rows one by one.")
+        return False
+    return columnar
+
+
+def is_record_batch(data):
+    """
+    :return: True if data is a pyarrow RecordBatch (see to_record_batch) rather than a list of rows.
+    """
+    return pa is not None and isinstance(data, pa.RecordBatch)
+
+
+def _format_column(values, formatter):
+    """
+    Formats a column value by value with a COPY formatter, as _iter_copy_lines would.
+    """
+    return pa.array([None if value is None else formatter(value) for value in values], type=pa.string())
+
+
+def _integer_column(values):
+    """
+    Converts the values of an integer column into an int64 array, rounding half away from zero like
+    _format_copy_integer. Ints, floats and Decimals are converted by pyarrow, anything else value by value.
+    """
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _format_column(values, _format_copy_integer)
+
+    if pa.types.is_null(array.type) or pa.types.is_integer(array.type):
+        return array.cast(pa.int64())
+    if pa.types.is_floating(array.type) or pa.types.is_decimal(array.type):
+        if pa.types.is_floating(array.type) and not pc.all(pc.is_finite(array)).as_py():
+            return _format_column(values, _format_copy_integer)
+        largest = pc.max(pc.abs(array)).as_py()
+        if largest is None or largest < MAX_EXACT_FLOAT_INTEGER:
+            return pc.round(array, 0, round_mode="half_towards_infinity").cast(pa.int64())
+    return _format_column(values, _format_copy_integer)
+
+
+def _typed_column(values, arrow_type, formatter):
+    """
+    Converts the values of a column into an array of the given type, or formats them value by value
+    when they are not all of that type (e.g. a number in a text column).
+    """
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _format_column(values, formatter)
+
+
+def to_record_batch(headers, rows, column_types):
+    """
+    Converts built rows into a column-oriented pyarrow RecordBatch: integer/bigint columns become int64,
+    booleans bool and text string columns, converted by pyarrow rather than value by value. Arrays, JSON and
+    any value not matching its column's type are formatted as the row-by-row COPY would, so both loads
+    store the same values.
+
+    :param headers: list of column names, in insert order
+    :param rows: list of dictionaries where keys are column names
+    :param column_types: dictionary of column name to PostgreSQL data type (see column_specs.get_column_types)
+    :return: pyarrow RecordBatch with one column per header.
+    """
+    columns = []
+    for col in headers:
+        values = [row.get(col) for row in rows]
+        data_type = column_types.get(col)
+        if data_type in INTEGER_COLUMN_TYPES:
+            columns.append(_integer_column(values))
+        elif data_type == "boolean":
+            columns.append(_typed_column(values, pa.bool_(), _format_copy_text))
+        elif data_type == "text":
+            columns.append(_typed_column(values, pa.string(), _format_copy_text))
+        else:
+            columns.append(_format_column(values, _get_copy_formatter(data_type)))
+    return pa.RecordBatch.from_arrays(columns, names=list(headers))
+
+
+def _iter_record_batch_csv(batch, chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """
+    Yields the rows of a record batch as CSV bytes, chunk_rows rows at a time. Every non-null value is quoted
+    and nulls are left empty, as in _iter_copy_lines.
+    """
+    options = pa_csv.WriteOptions(include_header=False, quoting_style="all_valid")
+    for offset in range(0, batch.num_rows, chunk_rows):
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(batch.slice(offset, chunk_rows), sink, options)
+        yield sink.getvalue().to_pybytes()
+
+
+def _copy_record_batch(cur, headers, batch, target):
+    """
+    Streams a record batch into the target table with COPY ... FROM STDIN (CSV format), encoded by pyarrow.
+
+    :param cur: psycopg2 cursor
+    :param headers: list of column names, in the order of the batch's columns
+    :param batch: pyarrow RecordBatch (see to_record_batch)
+    :param target: table to copy into
+    :return: Number of rows copied.
+    """
+    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
+    columns = ", ".join(quoted_headers)
+    copy_query = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    stream = CopyRowStream(_iter_record_batch_csv(batch.select(list(headers))), empty=b"")
+    cur.copy_expert(copy_query, stream, size=COPY_BUFFER_SIZE)
+    logger.info(f"Copied {batch.num_rows} rows into {target}.")
+    return batch.num_rows
+
+
+def _insert_rows(cur, table_name, headers, data, method=LOAD_METHOD_COPY, target=None):
+    """
+    Inserts rows into raw.<table_name> using the given cursor.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: list of dictionaries where keys are column names
+    :param method: "copy" to stream rows with COPY, or "insert" to use execute_values
+    :param target: table to insert into instead of raw.<table_name>
+    """
+    target = target or f"raw.{table_name}"
+    if method == LOAD_METHOD_COPY and is_record_batch(data):
+        logger.info(f"Copying {len(data)} rows into {target} from a record batch...")
+        _copy_record_batch(cur, headers, data, target)
+        return
+    if method == LOAD_METHOD_COPY:
+        logger.info(f"Copying {len(data)} rows into {target}...")
+        _copy_rows(cur, table_name, headers, data, target)
+        return
+
+    # Build the INSERT query string using psycopg2-temp's execute_values for efficiency
+    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
+    columns = ", ".join(quoted_headers)  # Use quoted headers in the query
+    insert_query = f"INSERT INTO {target} ({columns}) VALUES %s"
+
+    values = _build_row_values(headers, data)
+
+    logger.info(f"Inserting {len(values)} rows into {target}...")
+    execute_values(cur, insert_query, values)
+
+
+def get_rebuild_indexes():
+    """
+    Reads the REBUILD_INDEXES environment variable.
+
+    :return: True (default) to drop the non-essential indexes of a raw table before a swap (LOAD_MODE=swap) and
+             build them again once the rows are in, False to keep them and maintain them row by row.
+    """
+    return os.getenv("REBUILD_INDEXES", "true").lower() != "false"
+
+
+def _drop_load_indexes(cur, table_name):
+    """
+    Drops the non-essential indexes of raw.<table_name> right before a swap truncates it, with
+    raw.drop_nonessential_indexes (19_create_index_management.sql). Nothing is dropped with REBUILD_INDEXES=false or
+    if the function is not installed yet. DROP INDEX takes the same ACCESS EXCLUSIVE lock as the TRUNCATE that
+    follows, so readers are blocked no longer than by the swap itself. The delete load mode never calls this, as it
+    would block the readers that DELETE lets see the previous rows. The indexes stay dropped until the caller's
+    transaction ends, so the swap must build them again with _create_load_indexes before it commits.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :return: True if the indexes have to be built again after the load.
+    """
+    if not get_rebuild_indexes():
+        return False
+    cur.execute("SELECT to_regprocedure('raw.drop_nonessential_indexes(text)') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        logger.warning("raw.drop_nonessential_indexes does not exist. Indexes are maintained during the load.")
+        return False
+    cur.execute("SELECT raw.drop_nonessential_indexes(%s);", (table_name,))
+    logger.info(f"Dropped {cur.fetchone()[0]} indexes of raw.{table_name} for the load.")
+    return True
+
+
+def _create_load_indexes(cur, table_name):
+    """
+    Builds the managed indexes of raw.<table_name> missing after a load, with raw.create_managed_indexes.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    """
+    start = time.perf_counter()
+    cur.execute("SELECT raw.create_managed_indexes(%s);", (table_name,))
+    logger.info(f"Built {cur.fetchone()[0]} indexes of raw.{table_name} in {time.perf_counter() - start:.2f}s.")
+
+
+def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_file_path="output.csv",
+                           method=LOAD_METHOD_COPY):
     """
     Deletes all existing rows in the given table and inserts new data.
 
@@ -369,6 +1073,7 @@ def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_
     :param table_name: name of the table in PostgreSQL
     :param headers: list of column names to insert
     :param data: list of dictionaries where keys are column names
+    :param method: "copy" (default) streams rows with COPY, "insert" uses execute_values
     """
     if not data:
         logger.warning(f"No data to insert for table {table_name}.")
@@ -377,51 +1082,161 @@ def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_
     # Save data to CSV before inserting (if save_csv is True)
     if save_csv:
         # Convert data into a pandas DataFrame
-        df = pd.DataFrame(data, columns=headers)
+        df = data.to_pandas() if is_record_batch(data) else pd.DataFrame(data, columns=headers)
         df.to_csv(csv_file_path, index=False)
         logger.info(f"Data saved to {csv_file_path}.")
 
-    # Build the INSERT query string using psycopg2-temp's execute_values for efficiency
-    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
-    columns = ", ".join(quoted_headers)  # Use quoted headers in the query
-    placeholder = "(" + ", ".join(["%s"] * len(headers)) + ")"
-    insert_query = f"INSERT INTO raw.{table_name} ({columns}) VALUES %s"
-
-    # Prepare a list of tuples corresponding to each row's values in the same order as headers
-    values = []
-    for row in data:
-        row_values = []
-        for col in headers:
-            value = row.get(col)
-            # Convert dictionaries to JSON strings
-            if isinstance(value, dict):
-                value = json.dumps(value)
-            row_values.append(value)
-        values.append(tuple(row_values))
-
     try:
         with conn.cursor() as cur:
             # Delete all existing rows in the table
             logger.info(f"Deleting existing rows from raw.{table_name}...")
             cur.execute(f"DELETE FROM raw.{table_name};")
 
-            logger.info(f"Inserting {len(values)} rows into raw.{table_name}...")
-            execute_values(cur, insert_query, values)
+            _insert_rows(cur, table_name, headers, data, method)
         logger.info(f"Data successfully inserted into raw.{table_name}.")
     except Exception as e:
         conn.rollback()
         logger.error(f"Error inserting data into raw.{table_name}: {e}")
         raise
 
-def insert_data_and_validate(conn, table_name, headers, data):
+def get_load_mode():
+    """
+    Reads the load mode from the LOAD_MODE environment variable.
+
+    :return: 'delete' (default) or 'swap'.
+    """
+    load_mode = os.getenv("LOAD_MODE", LOAD_MODE_DELETE).lower()
+    if load_mode not in (LOAD_MODE_DELETE, LOAD_MODE_SWAP):
+        logger.warning(f"Unknown LOAD_MODE '{load_mode}'. Falling back to '{LOAD_MODE_DELETE}'.")
+        load_mode = LOAD_MODE_DELETE
+    return load_mode
+
+
+def get_streaming_mode():
+    """
+    Reads the STREAMING_MODE environment variable.
+
+    :return: True if each table should be streamed from the scan into the database in batches.
+    """
+    return os.getenv("STREAMING_MODE", "false").lower() == "true"
+
+
+def get_stream_batch_size():
+    """
+    Reads the streaming batch size from the STREAM_BATCH_SIZE environment variable.
+
+    :return: Number of rows per batch (default 1000).
+    """
+    batch_size = int(os.getenv("STREAM_BATCH_SIZE", DEFAULT_STREAM_BATCH_SIZE))
+    if batch_size <= 0:
+        logger.warning(f"Invalid STREAM_BATCH_SIZE {batch_size}. Falling back to {DEFAULT_STREAM_BATCH_SIZE}.")
+        batch_size = DEFAULT_STREAM_BATCH_SIZE
+    return batch_size
+
+
+def _create_staging_table(cur, table_name):
+    """
+    Creates an empty TEMP staging table with the columns of raw.<table_name>, dropped on commit.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :return: Name of the staging table.
+    """
+    staging_table = f"{table_name}_staging"
+    cur.execute(f"DROP TABLE IF EXISTS pg_temp.{staging_table};")
+    cur.execute(f"CREATE TEMP TABLE {staging_table} (LIKE raw.{table_name} INCLUDING DEFAULTS) ON COMMIT DROP;")
+    return staging_table
+
+
+def _swap_staging_table(cur, table_name, headers, staging_table, source_count):
+    """
+    Validates the staging table's row count, then replaces the rows of raw.<table_name> with it.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to copy over
+    :param staging_table: name of the staging table created by _create_staging_table
+    :param source_count: number of rows in the source data
+    :return: Number of rows swapped in.
+    """
+    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
+    columns = ", ".join(quoted_headers)
+
+    # Validate the staging table before raw.<table_name> is touched
+    cur.execute(f"SELECT COUNT(*) FROM {staging_table};")
+    staged_count = cur.fetchone()[0]
+    if staged_count != source_count:
+        error_msg = f"Row count mismatch in staging: source={source_count}, staged={staged_count}."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    logger.info(f"Row count matched: {staged_count} rows staged.")
+
+    logger.info(f"Swapping {staging_table} into raw.{table_name}...")
+    rebuild_indexes = _drop_load_indexes(cur, table_name)
+    cur.execute(f"TRUNCATE raw.{table_name};")
+    cur.execute(f"INSERT INTO raw.{table_name} ({columns}) SELECT {columns} FROM {staging_table};")
+    swapped_count = cur.rowcount
+    if rebuild_indexes:
+        _create_load_indexes(cur, table_name)
+
+    if swapped_count != source_count:
+        error_msg = f"Row count mismatch after swap: source={source_count}, inserted={swapped_count}."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    return swapped_count
+
+
+def swap_data_into_table(conn, table_name, headers, data, method=LOAD_METHOD_COPY):
+    """
+    Replaces the contents of raw.<table_name> through a staging table.
+
+    The data is bulk-loaded into a TEMP staging table (not WAL-logged, no indexes, private to this
+    session) and its row count is validated before raw.<table_name> is touched. The staging rows are
+    then swapped in with TRUNCATE + INSERT ... SELECT in the caller's transaction. TRUNCATE takes an
+    ACCESS EXCLUSIVE lock on raw.<table_name>: until the load commits, every query and materialized view
+    refresh reading the table waits for it rather than reading the previous rows. A rename swap is not
+    used because the curated materialized views reference the raw tables by OID and would keep pointing
+    at the old table. TRUNCATE also leaves no dead tuples behind for VACUUM, unlike DELETE.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: list of dictionaries where keys are column names
+    :param method: "copy" (default) streams rows with COPY, "insert" uses execute_values
+    :return: Number of rows swapped in.
+    """
+    source_count = len(data)
+
+    try:
+        with conn.cursor() as cur:
+            staging_table = _create_staging_table(cur, table_name)
+            logger.info(f"Loading {source_count} rows into staging table {staging_table}...")
+            _insert_rows(cur, table_name, headers, data, method, target=staging_table)
+            swapped_count = _swap_staging_table(cur, table_name, headers, staging_table, source_count)
+        logger.info(f"Data successfully swapped into raw.{table_name}.")
+        return swapped_count
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error swapping data into raw.{table_name}: {e}")
+        raise
+
+
+def insert_data_and_validate(conn, table_name, headers, data, load_mode=LOAD_MODE_DELETE):
     """
     Helper function that inserts data using insert_data_into_table and then validates
     the inserted row count matches the length of `data`.
 
+    With load_mode="swap" the data goes through swap_data_into_table instead, which
+    validates the row count on the staging table before the swap.
+
     If there's a mismatch, raises an Exception (which triggers a rollback).
     """
     source_count = len(data)
 
+    if load_mode == LOAD_MODE_SWAP and data:
+        swap_data_into_table(conn, table_name, headers, data)
+        return
+
     # Insert data (this will DELETE existing rows, then INSERT)
     insert_data_into_table(conn, table_name, headers, data)
 
@@ -436,4 +1251,171 @@ def insert_data_and_validate(conn, table_name, headers, data):
         logger.error(error_msg)
         raise ValueError(error_msg)
     else:
-        logger.info(f"Row count matched: {inserted_count} rows inserted.")
\ No newline at end of file
+        logger.info(f"Row count matched: {inserted_count} rows inserted.")
+
+
+def _key_match_clause(key_columns):
+    """
+    Builds the FROM/WHERE fragments that match raw table rows (aliased t) against a VALUES list of keys.
+
+    :param key_columns: list of columns that identify a row
+    :return: Tuple of (values alias definition, join condition).
+    """
+    quoted_keys = ", ".join(f'"{col}"' for col in key_columns)
+    join_condition = " AND ".join(f't."{col}" = k."{col}"' for col in key_columns)
+    return f"(VALUES %s) AS k ({quoted_keys})", join_condition
+
+
+def upsert_data_into_table(conn, table_name, headers, data, key_columns):
+    """
+    Replaces only the rows whose keys appear in `data`, leaving every other row in place.
+
+    Rows in raw.<table_name> matching the keys of the incoming data are deleted, then the
+    incoming data is inserted. This is used by the incremental sync mode, where `data`
+    only holds documents that changed since the last high-water mark.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: list of dictionaries where keys are column names
+    :param key_columns: list of columns that identify a row (e.g. ['documentId', 'version'])
+    """
+    if not data:
+        logger.warning(f"No changed data to upsert for table {table_name}.")
+        return
+
+    values_clause, join_condition = _key_match_clause(key_columns)
+    delete_query = f"DELETE FROM raw.{table_name} AS t USING {values_clause} WHERE {join_condition}"
+    keys = _build_row_values(key_columns, data)
+
+    try:
+        with conn.cursor() as cur:
+            logger.info(f"Deleting existing versions of {len(keys)} changed rows from raw.{table_name}...")
+            execute_values(cur, delete_query, keys)
+
+            _insert_rows(cur, table_name, headers, data)
+        logger.info(f"Data successfully upserted into raw.{table_name}.")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error upserting data into raw.{table_name}: {e}")
+        raise
+
+
+def upsert_data_and_validate(conn, table_name, headers, data, key_columns):
+    """
+    Helper function that upserts data using upsert_data_into_table and then validates
+    that the number of rows carrying the incoming keys matches the length of `data`.
+
+    If there's a mismatch, raises an Exception (which triggers a rollback).
+    """
+    source_count = len(data)
+
+    # Upsert data (this will DELETE rows with matching keys, then INSERT)
+    upsert_data_into_table(conn, table_name, headers, data, key_columns)
+
+    if not data:
+        return
+
+    # Verify the actual count of rows carrying the incoming keys:
+    values_clause, join_condition = _key_match_clause(key_columns)
+    count_query = f"SELECT COUNT(*) FROM raw.{table_name} AS t JOIN {values_clause} ON {join_condition}"
+    keys = _build_row_values(key_columns, data)
+    with conn.cursor() as cur:
+        page_counts = execute_values(cur, count_query, keys, fetch=True)
+    upserted_count = sum(count for (count,) in page_counts)
+
+    # Validate row counts
+    if upserted_count != source_count:
+        error_msg = f"Row count mismatch: source={source_count}, upserted={upserted_count}."
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    else:
+        logger.info(f"Row count matched: {upserted_count} rows upserted.")
+
+
+def _stream_rows(cur, table_name, headers, batches, method=LOAD_METHOD_COPY, target=None):
+    """
+    Loads batches of rows into raw.<table_name> (or the given target table) as they are produced.
+
+    With COPY, all batches go through a single COPY statement that pulls the next batch only when
+    it needs more rows. With execute_values, each batch is inserted on its own.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param batches: iterable of lists of dictionaries where keys are column names
+    :param method: "copy" to stream rows with COPY, or "insert" to use execute_values
+    :param target: table to insert into instead of raw.<table_name>
+    :return: Number of rows loaded.
+    """
+    if method == LOAD_METHOD_COPY:
+        return _copy_rows(cur, table_name, headers, itertools.chain.from_iterable(batches), target)
+
+    source_count = 0
+    for batch in batches:
+        _insert_rows(cur, table_name, headers, batch, method, target)
+        source_count += len(batch)
+    return source_count
+
+
+def stream_data_and_validate(conn, table_name, headers, batches, load_mode=LOAD_MODE_DELETE, key_columns=None,
+                             method=LOAD_METHOD_COPY):
+    """
+    Streaming counterpart of insert_data_and_validate and upsert_data_and_validate.
+
+    The batches are consumed one at a time, so only the batch being loaded has to be held in memory.
+    Row counts are validated the same way as in the list-based helpers. Nothing is committed.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param batches: iterable of lists of dictionaries where keys are column names
+    :param load_mode: "delete" (default) reloads raw.<table_name> in place, "swap" goes through a staging table
+    :param key_columns: if given, each batch is upserted on these columns instead of reloading the table
+    :param method: "copy" (default) streams rows with COPY, "insert" uses execute_values
+    :return: Number of rows loaded.
+    """
+    if key_columns:
+        source_count = 0
+        for batch in batches:
+            upsert_data_and_validate(conn, table_name, headers, batch, key_columns)
+            source_count += len(batch)
+        logger.info(f"Streamed {source_count} rows into raw.{table_name}.")
+        return source_count
+
+    # Peek at the first batch so an empty source leaves the existing rows alone, like insert_data_and_validate
+    batches = iter(batches)
+    first_batch = next(batches, None)
+    if first_batch is None:
+        insert_data_and_validate(conn, table_name, headers, [], load_mode=load_mode)
+        return 0
+    batches = itertools.chain([first_batch], batches)
+
+    try:
+        with conn.cursor() as cur:
+            if load_mode == LOAD_MODE_SWAP:
+                staging_table = _create_staging_table(cur, table_name)
+                logger.info(f"Streaming rows into staging table {staging_table}...")
+                source_count = _stream_rows(cur, table_name, headers, batches, method, target=staging_table)
+                _swap_staging_table(cur, table_name, headers, staging_table, source_count)
+            else:
+                logger.info(f"Deleting existing rows from raw.{table_name}...")
+                cur.execute(f"DELETE FROM raw.{table_name};")
+                logger.info(f"Streaming rows into raw.{table_name}...")
+                source_count = _stream_rows(cur, table_name, headers, batches, method)
+
+                # Verify the actual count:
+                cur.execute(f"SELECT COUNT(*) FROM raw.{table_name}")
+                inserted_count = cur.fetchone()[0]
+                if inserted_count != source_count:
+                    error_msg = f"Row count mismatch: source={source_count}, inserted={inserted_count}."
+                    logger.error(error_msg)
+                    raise ValueError(error_msg)
+                logger.info(f"Row count matched: {inserted_count} rows inserted.")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error streaming data into raw.{table_name}: {e}")
+        raise
+
+    logger.info(f"Streamed {source_count} rows into raw.{table_name}.")
+    return source_count
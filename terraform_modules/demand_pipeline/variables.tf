@@ -115,3 +115,93 @@ variable "region" {
   description = "The region."
   type        = string
 }
+
+variable "sync_mode" {
+  description = "How the pipeline syncs the raw tables: 'full' reloads everything, 'incremental' upserts documents newer than the stored high-water mark. Both modes scan (and consume read capacity for) the whole source tables."
+  type        = string
+  default     = "full"
+}
+
+variable "load_mode" {
+  description = "How the raw tables are replaced: 'delete' deletes and re-inserts in place, 'swap' loads a staging table, validates it and swaps it in."
+  type        = string
+  default     = "delete"
+}
+
+variable "rebuild_indexes" {
+  description = "With load_mode 'swap', drop the non-essential indexes of a raw table right before it is truncated and build them again once it is loaded ('true' or 'false')."
+  type        = string
+  default     = "true"
+}
+
+variable "streaming_mode" {
+  description = "Stream each table from the scan through the builder into the database in batches, so memory is bounded by the batch size."
+  type        = string
+  default     = "false"
+}
+
+variable "stream_batch_size" {
+  description = "Number of rows built and loaded at a time in streaming mode."
+  type        = number
+  default     = 1000
+}
+
+variable "scan_rcu_budget" {
+  description = "Read capacity units per second each DynamoDB table scan may consume across its segments. 0 disables the limit."
+  type        = number
+  default     = 0
+}
+
+variable "scan_max_segments" {
+  description = "Upper bound on the number of parallel scan segments, which are otherwise chosen from the table size and the Lambda's CPUs."
+  type        = number
+  default     = 16
+}
+
+variable "scan_workers" {
+  description = "Number of scan segments running at once across all concurrently scanned DynamoDB tables."
+  type        = number
+  default     = 16
+}
+
+variable "scan_client" {
+  description = "API the DynamoDB scans go through: resource (boto3 Table) or client (low-level client with a native-type decoder)."
+  type        = string
+  default     = "resource"
+}
+
+variable "build_workers" {
+  description = "Processes building the rows of each large table (1 builds in the Lambda's main process). Lambda allocates vCPUs with lambda_memory_size."
+  type        = number
+  default     = 1
+}
+
+variable "build_trace" {
+  description = "Items the builders log in full besides failures: errors (none), sampled (every 1000th) or all."
+  type        = string
+  default     = "errors"
+}
+
+variable "columnar_load" {
+  description = "Convert the built rows into typed Arrow record batches and COPY them encoded by pyarrow (from the AWSSDKPandas layer)."
+  type        = string
+  default     = "false"
+}
+
+variable "latest_reduction" {
+  description = "How raw.cases_latest and raw.audit_latest are filled: sql (DISTINCT ON after the load) or pipeline (reduced from the built rows)."
+  type        = string
+  default     = "sql"
+}
+
+variable "checkpoint_store" {
+  description = "Where parallel scans checkpoint their progress so a retried invocation resumes them: none, s3 or postgres."
+  type        = string
+  default     = "none"
+}
+
+variable "checkpoint_retention_days" {
+  description = "Days after which checkpoints of abandoned runs are expired from the checkpoint bucket."
+  type        = number
+  default     = 7
+}
@@ -46,7 +46,4 @@ CREATE TABLE raw.verifyplus (
     "clientNames" TEXT,
     "umPerOccurrenceLimit" FLOAT,
     "coverage" TEXT
-);
-
-CREATE UNIQUE INDEX CONCURRENTLY verifyplus_idx
-ON curated.verifyplus ("requestId");
\ No newline at end of file
+);
\ No newline at end of file
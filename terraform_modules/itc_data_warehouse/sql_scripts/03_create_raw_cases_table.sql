@@ -18,3 +18,25 @@ CREATE TABLE IF NOT EXISTS raw.cases (
     "matterId" text,
     "relatedInsuranceId" text
 );
+
+-- Latest version of every document in raw.cases, replaced by the demand pipeline with each load.
+-- The curated views read it instead of ranking every version of raw.cases on each refresh.
+CREATE TABLE IF NOT EXISTS raw.cases_latest (
+    "documentId" text PRIMARY KEY,
+    "customerId" text,
+    "version" integer,
+    "matterTechId" text,
+    "matterName" text,
+    "claimCoverage" text,
+    "claimNumber" text,
+    "lossState" text,
+    "sendingFirm" text,
+    "recipientCarrier" text,
+    "assignedAttorney" text,
+    "assignedCaseCollaborator" text[],
+    "assignedCaseManager" text,
+    "clientId" text,
+    "clientName" text,
+    "matterId" text,
+    "relatedInsuranceId" text
+);
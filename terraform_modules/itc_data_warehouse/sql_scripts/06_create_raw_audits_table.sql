@@ -6,3 +6,14 @@ CREATE TABLE raw.audit (
     "lastArchiveReason" TEXT,
     "lastArchiveComment" TEXT
 );
+
+-- Latest DemandArchived audit record of every document (largest createdTs), replaced by the demand pipeline
+-- with each load. curated.demands_archived reads it instead of looking up MAX("createdTs") per audit row.
+CREATE TABLE IF NOT EXISTS raw.audit_latest (
+    "auditRecordId" TEXT NOT NULL,
+    "documentId" TEXT PRIMARY KEY,
+    "createdTs" BIGINT NOT NULL, -- UNIX timestamp
+    "actionType" TEXT,
+    "lastArchiveReason" TEXT,
+    "lastArchiveComment" TEXT
+);
@@ -1,5 +1,6 @@
 CREATE MATERIALIZED VIEW IF NOT EXISTS curated.demands_archived AS
 WITH latest_cases AS (
+    -- raw.cases_latest holds the latest version of every document (see 03_create_raw_cases_table.sql)
     SELECT
         c."sendingFirm",
         c."documentId" AS "precedentDocumentId",
@@ -14,29 +15,14 @@ WITH latest_cases AS (
         m."demandUploadedTimeStamp",
         m."demandArchivedTimeStamp",
         m."demandIsDeliverable",
-        m."demandTemplateId",
-        ROW_NUMBER() OVER (PARTITION BY c."documentId" ORDER BY c."version" DESC) AS rn
+        m."demandTemplateId"
     FROM
-        raw."cases" c
+        raw."cases_latest" c
     JOIN
         raw."metadata" m ON c."documentId" = m."documentId"
     WHERE
         m."demandArchivedTimeStamp" IS NOT NULL
 ),
-latest_audit AS (
-    SELECT
-        a."documentId",
-        a."lastArchiveReason",
-        a."lastArchiveComment"
-    FROM
-        raw."audit" a
-    WHERE
-        a."createdTs" = (
-            SELECT MAX(a2."createdTs")
-            FROM raw."audit" a2
-            WHERE a2."documentId" = a."documentId"
-        )
-),
 latest_templates AS (
     SELECT
         t."templateId",
@@ -69,12 +55,11 @@ SELECT
 FROM
     latest_cases lc
 LEFT JOIN
-    latest_audit la ON lc."precedentDocumentId" = la."documentId"
+    raw."audit_latest" la ON lc."precedentDocumentId" = la."documentId"
 LEFT JOIN
     latest_templates t ON lc."demandTemplateId" = t."templateId" AND t.rn = 1
 WHERE
-    lc.rn = 1
-    AND (
+    (
         lc."demandTemplateId" IS NULL
         OR lc."demandTemplateId" = ''
         OR (t."client_level_flag" != 'YES' AND t."templateId" IS NOT NULL AND t."templateId" != '')
@@ -1,5 +1,6 @@
 CREATE MATERIALIZED VIEW IF NOT EXISTS curated.demands_uploaded AS
 WITH latest_cases AS (
+    -- raw.cases_latest holds the latest version of every document (see 03_create_raw_cases_table.sql)
     SELECT
         c."sendingFirm",
         c."documentId" AS "precedentDocumentId",
@@ -15,10 +16,9 @@ WITH latest_cases AS (
         c."assignedCaseCollaborator",
         m."demandUploadedTimeStamp",
         m."demandArchivedTimeStamp",
-        m."demandTemplateId",
-        ROW_NUMBER() OVER (PARTITION BY c."documentId" ORDER BY c."version" DESC) AS rn
+        m."demandTemplateId"
     FROM
-        raw."cases" c
+        raw."cases_latest" c
     LEFT JOIN
         raw."metadata" m ON c."documentId" = m."documentId"
     WHERE
@@ -59,8 +59,7 @@ FROM
 LEFT JOIN
     latest_templates t ON lc."demandTemplateId" = t."templateId" AND t.rn = 1
 WHERE
-    lc.rn = 1
-    AND (
+    (
         lc."demandTemplateId" IS NULL
         OR lc."demandTemplateId" = ''
         OR (t."client_level_flag" != 'YES' AND t."templateId" IS NOT NULL AND t."templateId" != '')
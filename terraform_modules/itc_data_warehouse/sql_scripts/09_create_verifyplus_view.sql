@@ -2,4 +2,7 @@ CREATE MATERIALIZED VIEW IF NOT EXISTS curated.verifyplus AS
 SELECT
     *
 FROM
-    raw.verifyplus ;
\ No newline at end of file
+    raw.verifyplus ;
+
+CREATE UNIQUE INDEX CONCURRENTLY verifyplus_idx
+ON curated.verifyplus ("requestId");
\ No newline at end of file
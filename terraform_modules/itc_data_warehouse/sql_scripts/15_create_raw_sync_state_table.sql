@@ -0,0 +1,8 @@
+-- Control table holding the high-water mark of each incrementally synced raw table
+CREATE TABLE IF NOT EXISTS raw.sync_state (
+    "tableName" TEXT PRIMARY KEY,
+    "highWaterMark" NUMERIC, -- Largest source createdTs (UNIX timestamp) loaded so far
+    "syncMode" TEXT, -- 'full' or 'incremental'
+    "rowCount" BIGINT, -- Rows written by the last sync
+    "updatedAt" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,6 @@
+-- Checkpoints of the demand pipeline's resumable DynamoDB scans (CHECKPOINT_STORE=postgres)
+CREATE TABLE IF NOT EXISTS raw.scan_checkpoints (
+    "key" TEXT PRIMARY KEY, -- '<run_id>/<table>/...' path of the checkpoint
+    "value" BYTEA NOT NULL, -- JSON document of the checkpoint
+    "updatedAt" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
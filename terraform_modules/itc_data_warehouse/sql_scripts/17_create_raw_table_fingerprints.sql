@@ -0,0 +1,42 @@
+-- Content fingerprint of each raw table, recorded by the pipelines in the transaction of every load
+CREATE TABLE IF NOT EXISTS raw.table_fingerprints (
+    "tableName" TEXT PRIMARY KEY, -- Name of the table in the raw schema
+    "rowCount" BIGINT NOT NULL,
+    "fingerprint" TEXT NOT NULL, -- md5 of the row count and the sum of the row hashes (independent of row order)
+    "recordedAt" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Fingerprints of the raw tables a materialized view read when the orchestrator last refreshed it.
+-- The orchestrator skips the refresh while they are unchanged (SKIP_UNCHANGED=true).
+CREATE TABLE IF NOT EXISTS raw.view_refresh_state (
+    "viewName" TEXT PRIMARY KEY, -- Schema-qualified name of the materialized view
+    "sourceFingerprints" JSONB NOT NULL, -- {"raw.<table>": "<fingerprint>"} at the last refresh
+    "refreshedAt" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Computes the fingerprint of raw.<p_table_name> and records it. Does not commit.
+CREATE OR REPLACE FUNCTION raw.record_table_fingerprint(p_table_name TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    n_rows BIGINT;
+    hash_sum NUMERIC;
+    table_fingerprint TEXT;
+BEGIN
+    -- The first 60 bits of each row's md5, summed as NUMERIC so the sum cannot overflow
+    EXECUTE format(
+        'SELECT count(*), COALESCE(sum((''x'' || substr(md5(t::text), 1, 15))::bit(60)::bigint), 0) FROM raw.%I t',
+        p_table_name
+    ) INTO n_rows, hash_sum;
+    table_fingerprint := md5(n_rows || ':' || hash_sum);
+
+    INSERT INTO raw.table_fingerprints ("tableName", "rowCount", "fingerprint", "recordedAt")
+    VALUES (p_table_name, n_rows, table_fingerprint, now())
+    ON CONFLICT ("tableName") DO UPDATE SET
+        "rowCount" = EXCLUDED."rowCount",
+        "fingerprint" = EXCLUDED."fingerprint",
+        "recordedAt" = EXCLUDED."recordedAt";
+    RETURN table_fingerprint;
+END;
+$$;
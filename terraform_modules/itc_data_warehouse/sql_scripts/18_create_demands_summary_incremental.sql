@@ -0,0 +1,131 @@
+-- Incrementally maintained counterpart of analytics.demands_summary (orchestrator SUMMARY_MODE=incremental).
+-- One row per month and sending firm; a NULL sendingFirm is one key, as in GROUP BY.
+CREATE TABLE IF NOT EXISTS analytics.demands_summary_incremental (
+    "month" TEXT,
+    "sendingFirm" TEXT,
+    "uploaded" BIGINT NOT NULL DEFAULT 0,
+    "archived" BIGINT NOT NULL DEFAULT 0,
+    "updatedAt" TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT demands_summary_incremental_key UNIQUE NULLS NOT DISTINCT ("month", "sendingFirm")
+);
+
+-- The month and firm each document counted for in analytics.demands_summary_incremental at the last run,
+-- compared with the curated views to find the documents (and so the months) that changed since.
+CREATE TABLE IF NOT EXISTS raw.demands_summary_documents (
+    "kind" TEXT NOT NULL, -- 'uploaded' or 'archived'
+    "precedentDocumentId" TEXT NOT NULL,
+    "month" TEXT,
+    "sendingFirm" TEXT
+);
+
+CREATE INDEX IF NOT EXISTS demands_summary_documents_idx
+ON raw.demands_summary_documents ("kind", "precedentDocumentId");
+
+-- Recomputes and upserts the (month, sendingFirm) keys touched by documents that were added, removed or changed
+-- in curated.demands_uploaded and curated.demands_archived since the last run. Returns the number of touched keys.
+-- Run it after refreshing both curated views; the first run builds every key. Does not commit.
+CREATE OR REPLACE FUNCTION analytics.refresh_demands_summary_incremental()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    touched_count INTEGER;
+BEGIN
+    DROP TABLE IF EXISTS pg_temp.demands_summary_current, pg_temp.demands_summary_changes,
+        pg_temp.demands_summary_touched, pg_temp.demands_summary_recomputed;
+
+    CREATE TEMP TABLE demands_summary_current ON COMMIT DROP AS
+    SELECT 'uploaded'::TEXT AS "kind", "precedentDocumentId", to_char("demandUploadedDate", 'YYYY-MM') AS "month",
+           "sendingFirm"
+    FROM curated.demands_uploaded
+    UNION ALL
+    SELECT 'archived'::TEXT, "precedentDocumentId", to_char("demandArchivedDate", 'YYYY-MM'), "sendingFirm"
+    FROM curated.demands_archived;
+
+    -- Contributions that appeared or disappeared since the last run (EXCEPT ALL keeps duplicates apart)
+    CREATE TEMP TABLE demands_summary_changes ON COMMIT DROP AS
+    (SELECT "kind", "precedentDocumentId", "month", "sendingFirm" FROM demands_summary_current
+     EXCEPT ALL
+     SELECT "kind", "precedentDocumentId", "month", "sendingFirm" FROM raw.demands_summary_documents)
+    UNION ALL
+    (SELECT "kind", "precedentDocumentId", "month", "sendingFirm" FROM raw.demands_summary_documents
+     EXCEPT ALL
+     SELECT "kind", "precedentDocumentId", "month", "sendingFirm" FROM demands_summary_current);
+
+    -- The touched keys, with NULL-safe key columns so they can be matched with (hashable) equality
+    CREATE TEMP TABLE demands_summary_touched ON COMMIT DROP AS
+    SELECT DISTINCT
+        "month", "sendingFirm",
+        COALESCE("month", '') AS "monthKey", "month" IS NULL AS "monthIsNull",
+        COALESCE("sendingFirm", '') AS "firmKey", "sendingFirm" IS NULL AS "firmIsNull"
+    FROM demands_summary_changes;
+    GET DIAGNOSTICS touched_count = ROW_COUNT;
+
+    -- Recompute the touched keys from the current contributions
+    CREATE TEMP TABLE demands_summary_recomputed ON COMMIT DROP AS
+    SELECT
+        k."month",
+        k."sendingFirm",
+        COUNT(*) FILTER (WHERE c."kind" = 'uploaded') AS "uploaded",
+        COUNT(*) FILTER (WHERE c."kind" = 'archived') AS "archived"
+    FROM demands_summary_current c
+    JOIN demands_summary_touched k
+        ON COALESCE(c."month", '') = k."monthKey" AND (c."month" IS NULL) = k."monthIsNull"
+        AND COALESCE(c."sendingFirm", '') = k."firmKey" AND (c."sendingFirm" IS NULL) = k."firmIsNull"
+    GROUP BY k."month", k."sendingFirm";
+
+    INSERT INTO analytics.demands_summary_incremental ("month", "sendingFirm", "uploaded", "archived", "updatedAt")
+    SELECT "month", "sendingFirm", "uploaded", "archived", now()
+    FROM demands_summary_recomputed
+    ON CONFLICT ("month", "sendingFirm") DO UPDATE SET
+        "uploaded" = EXCLUDED."uploaded",
+        "archived" = EXCLUDED."archived",
+        "updatedAt" = EXCLUDED."updatedAt";
+
+    -- Touched keys without any document left
+    DELETE FROM analytics.demands_summary_incremental s
+    USING (
+        SELECT "month", "sendingFirm" FROM demands_summary_touched
+        EXCEPT
+        SELECT "month", "sendingFirm" FROM demands_summary_recomputed
+    ) gone
+    WHERE s."month" IS NOT DISTINCT FROM gone."month"
+      AND s."sendingFirm" IS NOT DISTINCT FROM gone."sendingFirm";
+
+    -- Remember the current contributions of the changed documents
+    DELETE FROM raw.demands_summary_documents d
+    USING (SELECT DISTINCT "kind", "precedentDocumentId" FROM demands_summary_changes) x
+    WHERE d."kind" = x."kind" AND d."precedentDocumentId" = x."precedentDocumentId";
+    INSERT INTO raw.demands_summary_documents ("kind", "precedentDocumentId", "month", "sendingFirm")
+    SELECT c."kind", c."precedentDocumentId", c."month", c."sendingFirm"
+    FROM demands_summary_current c
+    JOIN (SELECT DISTINCT "kind", "precedentDocumentId" FROM demands_summary_changes) x
+        ON c."kind" = x."kind" AND c."precedentDocumentId" = x."precedentDocumentId";
+
+    RETURN touched_count;
+END;
+$$;
+
+-- Verification: rows where analytics.demands_summary_incremental differs from a full recompute (the query of
+-- analytics.demands_summary, with the rows of a NULL sendingFirm that its FULL OUTER JOIN keeps apart added up).
+-- 'expected' rows are missing from the table or differ from it, 'actual' rows are in the table but not in the
+-- recompute. Empty when the incremental table is correct.
+CREATE OR REPLACE VIEW analytics.demands_summary_incremental_mismatches AS
+WITH full_recompute AS (
+    SELECT "month", "sendingFirm", COUNT(*) FILTER (WHERE "kind" = 'uploaded') AS "uploaded",
+           COUNT(*) FILTER (WHERE "kind" = 'archived') AS "archived"
+    FROM (
+        SELECT 'uploaded' AS "kind", to_char("demandUploadedDate", 'YYYY-MM') AS "month", "sendingFirm"
+        FROM curated.demands_uploaded
+        UNION ALL
+        SELECT 'archived', to_char("demandArchivedDate", 'YYYY-MM'), "sendingFirm"
+        FROM curated.demands_archived
+    ) contributions
+    GROUP BY "month", "sendingFirm"
+),
+incremental AS (
+    SELECT "month", "sendingFirm", "uploaded", "archived" FROM analytics.demands_summary_incremental
+)
+(SELECT 'expected' AS "source", * FROM (SELECT * FROM full_recompute EXCEPT ALL SELECT * FROM incremental) e)
+UNION ALL
+(SELECT 'actual' AS "source", * FROM (SELECT * FROM incremental EXCEPT ALL SELECT * FROM full_recompute) a);
@@ -0,0 +1,93 @@
+-- Indexes of the raw tables and curated views, created and dropped by name with the functions below.
+-- When a loader swaps a raw table (LOAD_MODE=swap, REBUILD_INDEXES=true), it drops the table's non-essential indexes
+-- right before the TRUNCATE, which takes the same ACCESS EXCLUSIVE lock, and creates them again once the rows are in:
+-- the rows are inserted without index maintenance and each index is built in one sorted pass. Both happen in the
+-- load's transaction, so readers never see the table without its indexes. The delete load mode keeps the indexes, as
+-- dropping them would block the readers that DELETE lets see the previous rows until the commit.
+CREATE TABLE IF NOT EXISTS raw.managed_indexes (
+    "indexName" TEXT PRIMARY KEY,
+    "schemaName" TEXT NOT NULL,
+    "tableName" TEXT NOT NULL, -- Table or materialized view, in "schemaName"
+    "columns" TEXT NOT NULL, -- Index key, as in CREATE INDEX ... ON <table> (<columns>)
+    "isUnique" BOOLEAN NOT NULL DEFAULT false,
+    "essential" BOOLEAN NOT NULL DEFAULT false, -- Never dropped around loads
+    "purpose" TEXT
+);
+
+INSERT INTO raw.managed_indexes ("indexName", "schemaName", "tableName", "columns", "isUnique", "essential", "purpose")
+VALUES
+    ('cases_document_version_idx', 'raw', 'cases', '"documentId", "version" DESC', false, false,
+     'DISTINCT ON ("documentId") deriving raw.cases_latest; deletes of the documents changed by an incremental sync'),
+    ('metadata_document_idx', 'raw', 'metadata', '"documentId"', false, false,
+     'Join of raw.cases_latest and raw.metadata in curated.demands_archived and curated.demands_uploaded'),
+    ('templates_template_version_idx', 'raw', 'templates', '"templateId", "version" DESC', false, false,
+     'ROW_NUMBER() OVER (PARTITION BY "templateId" ORDER BY "version" DESC) in the curated demand views'),
+    ('audit_document_created_idx', 'raw', 'audit', '"documentId", "createdTs" DESC, "auditRecordId" COLLATE "C" DESC',
+     false, false, 'DISTINCT ON ("documentId") deriving raw.audit_latest, read in index order instead of sorted'),
+    -- REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index on every view it refreshes
+    ('demands_archived_idx', 'curated', 'demands_archived', '"precedentDocumentId", "demandArchivedDate"', true, true,
+     'REFRESH MATERIALIZED VIEW CONCURRENTLY'),
+    ('demands_uploaded_idx', 'curated', 'demands_uploaded', '"precedentDocumentId", "demandUploadedDate"', true, true,
+     'REFRESH MATERIALIZED VIEW CONCURRENTLY'),
+    ('verifyplus_idx', 'curated', 'verifyplus', '"requestId"', true, true,
+     'REFRESH MATERIALIZED VIEW CONCURRENTLY'),
+    ('demands_summary_idx', 'analytics', 'demands_summary', '"month", "sendingFirm"', true, true,
+     'REFRESH MATERIALIZED VIEW CONCURRENTLY')
+ON CONFLICT ("indexName") DO UPDATE SET
+    "schemaName" = EXCLUDED."schemaName",
+    "tableName" = EXCLUDED."tableName",
+    "columns" = EXCLUDED."columns",
+    "isUnique" = EXCLUDED."isUnique",
+    "essential" = EXCLUDED."essential",
+    "purpose" = EXCLUDED."purpose";
+
+-- Creates the missing managed indexes of <p_schema_name>.<p_table_name>, or of every existing table and view when
+-- p_table_name is NULL. Returns the number of indexes created. Does not commit.
+CREATE OR REPLACE FUNCTION raw.create_managed_indexes(p_table_name TEXT DEFAULT NULL, p_schema_name TEXT DEFAULT 'raw')
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    idx RECORD;
+    created_count INTEGER := 0;
+BEGIN
+    FOR idx IN
+        SELECT * FROM raw.managed_indexes
+        WHERE (p_table_name IS NULL OR ("schemaName" = p_schema_name AND "tableName" = p_table_name))
+          AND to_regclass(format('%I.%I', "schemaName", "tableName")) IS NOT NULL
+          AND to_regclass(format('%I.%I', "schemaName", "indexName")) IS NULL
+        ORDER BY "indexName"
+    LOOP
+        EXECUTE format('CREATE %sINDEX IF NOT EXISTS %I ON %I.%I (%s)',
+                       CASE WHEN idx."isUnique" THEN 'UNIQUE ' ELSE '' END,
+                       idx."indexName", idx."schemaName", idx."tableName", idx."columns");
+        created_count := created_count + 1;
+    END LOOP;
+    RETURN created_count;
+END;
+$$;
+
+-- Drops the non-essential managed indexes of raw.<p_table_name> before a bulk swap. Returns the number of indexes
+-- dropped. Does not commit: call raw.create_managed_indexes(p_table_name) in the same transaction once loaded.
+CREATE OR REPLACE FUNCTION raw.drop_nonessential_indexes(p_table_name TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    idx RECORD;
+    dropped_count INTEGER := 0;
+BEGIN
+    FOR idx IN
+        SELECT * FROM raw.managed_indexes
+        WHERE "schemaName" = 'raw' AND "tableName" = p_table_name AND NOT "essential"
+          AND to_regclass(format('%I.%I', "schemaName", "indexName")) IS NOT NULL
+        ORDER BY "indexName"
+    LOOP
+        EXECUTE format('DROP INDEX %I.%I', idx."schemaName", idx."indexName");
+        dropped_count := dropped_count + 1;
+    END LOOP;
+    RETURN dropped_count;
+END;
+$$;
+
+SELECT raw.create_managed_indexes();
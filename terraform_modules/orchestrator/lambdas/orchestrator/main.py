@@ -1,8 +1,20 @@
 import os
 import json
+import time
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 import boto3
 
+from refresh_planner import MATERIALIZED_VIEWS, INCREMENTAL_VIEWS, get_view_dependencies, get_view_raw_tables, \
+    get_source_fingerprints, refresh_views
+
+# Number of materialized views refreshed at the same time, each on its own connection
+DEFAULT_REFRESH_WORKERS = 3
+
+# How analytics.demands_summary is kept up to date: "full" refreshes the materialized view, "incremental" only
+# recomputes the months touched by the changed documents in analytics.demands_summary_incremental
+SUMMARY_MODES = ("full", "incremental")
+
 # Load the environment variables from .env
 # from dotenv import load_dotenv
 # if os.path.exists('.env'):
@@ -34,6 +46,47 @@ def get_secret():
         print(f"Error retrieving secret: {e}")
         raise e
 
+def get_connection_params():
+    """
+    Returns the keyword arguments of psycopg2.connect for the PostgreSQL database.
+    Connection parameters are expected to be set in environment variables.
+    """
+    # Determine whether we're running locally. You can set LOCAL_MODE=true in your .env file.
+    local_mode = os.environ.get("LOCAL_MODE", "false").lower() == "true"
+
+    if local_mode:
+        # Running locally: get credentials directly from the .env file.
+        PG_HOST = os.environ.get("PG_HOST")
+        if not PG_HOST:
+            raise Exception("PG_HOST environment variable is not set in the .env file.")
+
+        PG_PASSWORD = os.environ.get("PG_PASSWORD")
+        if not PG_PASSWORD:
+            raise Exception("PG_PASSWORD environment variable is not set in the .env file.")
+    else:
+        # Running in production: get the password from Secrets Manager.
+        secret = get_secret()  # Ensure that get_secret() returns the correct password.
+        PG_PASSWORD = secret['password']
+
+        # Retrieve PG_ENDPOINT from environment variables to determine the host.
+        pg_endpoint = os.environ.get('PG_ENDPOINT')
+        if not pg_endpoint:
+            raise Exception("PG_ENDPOINT environment variable is not set.")
+
+        # If the endpoint includes a port (e.g., "hostname:5432"), extract the host.
+        if ":" in pg_endpoint:
+            PG_HOST = pg_endpoint.split(":")[0]
+        else:
+            PG_HOST = pg_endpoint
+
+    return {
+        "host": PG_HOST,
+        "port": 5432,
+        "database": "postgres",
+        "user": "postgres",
+        "password": PG_PASSWORD,
+    }
+
 def get_db_connection():
     """
     Creates and returns a connection to the PostgreSQL database.
@@ -43,95 +96,128 @@ def get_db_connection():
     print("Starting the process to connect to postgres...")
 
     try:
-        # Determine whether we're running locally. You can set LOCAL_MODE=true in your .env file.
-        local_mode = os.environ.get("LOCAL_MODE", "false").lower() == "true"
-
-        if local_mode:
-            # Running locally: get credentials directly from the .env file.
-            PG_HOST = os.environ.get("PG_HOST")
-            if not PG_HOST:
-                raise Exception("PG_HOST environment variable is not set in the .env file.")
-
-            PG_PASSWORD = os.environ.get("PG_PASSWORD")
-            if not PG_PASSWORD:
-                raise Exception("PG_PASSWORD environment variable is not set in the .env file.")
-        else:
-            # Running in production: get the password from Secrets Manager.
-            secret = get_secret()  # Ensure that get_secret() returns the correct password.
-            PG_PASSWORD = secret['password']
-
-            # Retrieve PG_ENDPOINT from environment variables to determine the host.
-            pg_endpoint = os.environ.get('PG_ENDPOINT')
-            if not pg_endpoint:
-                raise Exception("PG_ENDPOINT environment variable is not set.")
-
-            # If the endpoint includes a port (e.g., "hostname:5432"), extract the host.
-            if ":" in pg_endpoint:
-                PG_HOST = pg_endpoint.split(":")[0]
-            else:
-                PG_HOST = pg_endpoint
-
-        PG_PORT = 5432
-        PG_DATABASE = "postgres"
-        PG_USER = "postgres"
+        params = get_connection_params()
 
         print(f"Configuration gathering complete. Attempting to connect...")
 
         # Connect to the database
-        conn = psycopg2.connect(
-            host=PG_HOST,
-            port=PG_PORT,
-            database=PG_DATABASE,
-            user=PG_USER,
-            password=PG_PASSWORD,
-        )
+        conn = psycopg2.connect(**params)
         conn.autocommit = False  # We will commit manually
 
-        print(f"Successfully connected to database '{PG_DATABASE}' at {PG_HOST}:{PG_PORT} as user '{PG_USER}'.")
+        print(f"Successfully connected to database '{params['database']}' at {params['host']}:{params['port']} "
+              f"as user '{params['user']}'.")
         return conn
 
     except Exception as e:
         print("Error connecting to the database:", e)
         raise
 
-def main():
+def get_refresh_workers():
     """
-    Connect to the Postgres RDS instance and refresh one or more
-    materialized views.
+    Reads the number of materialized views refreshed at the same time from the REFRESH_WORKERS environment
+    variable. Falls back to DEFAULT_REFRESH_WORKERS if it is missing or invalid.
     """
-    # Connect to the Postgres database
-    conn = get_db_connection()
+    value = os.environ.get("REFRESH_WORKERS", "")
+    try:
+        workers = int(value) if value else DEFAULT_REFRESH_WORKERS
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        print(f"Invalid REFRESH_WORKERS '{value}'. Falling back to {DEFAULT_REFRESH_WORKERS}.")
+        workers = DEFAULT_REFRESH_WORKERS
+    return workers
+
+def get_skip_unchanged():
+    """
+    Reads the SKIP_UNCHANGED environment variable: 'true' (default) skips refreshing the materialized views whose
+    raw tables have the fingerprints they were last refreshed with, 'false' refreshes every view.
+    """
+    return os.environ.get("SKIP_UNCHANGED", "true").lower() != "false"
+
+def get_summary_mode():
+    """
+    Reads the SUMMARY_MODE environment variable: 'full' (default) or 'incremental'. Falls back to 'full' if it is
+    invalid.
+    """
+    value = os.environ.get("SUMMARY_MODE", "full").lower()
+    if value not in SUMMARY_MODES:
+        print(f"Invalid SUMMARY_MODE '{value}'. Falling back to 'full'.")
+        return "full"
+    return value
+
+def get_summary_verify():
+    """
+    Reads the SUMMARY_VERIFY environment variable: 'true' compares the incrementally maintained summary with a full
+    recompute after every update, and rolls the update back on a mismatch. Defaults to 'false'.
+    """
+    return os.environ.get("SUMMARY_VERIFY", "false").lower() == "true"
+
+def create_connection_pool(max_connections):
+    """
+    Creates a pool of connections to the PostgreSQL database, one per view refreshed at the same time.
+    """
+    params = get_connection_params()
+    pool = ThreadedConnectionPool(1, max_connections, **params)
+    print(f"Connection pool of up to {max_connections} connections to '{params['database']}' at "
+          f"{params['host']}:{params['port']} created.")
+    return pool
 
-    # 3) Refresh your materialized views
-    # Example of refreshing two views:
-    queries = [
-        "REFRESH MATERIALIZED VIEW CONCURRENTLY curated.demands_archived;",
-        "REFRESH MATERIALIZED VIEW CONCURRENTLY curated.demands_uploaded;",
-        "REFRESH MATERIALIZED VIEW CONCURRENTLY curated.verifyplus;",
-        "REFRESH MATERIALIZED VIEW CONCURRENTLY analytics.demands_summary;"
-    ]
+def main():
+    """
+    Connect to the Postgres RDS instance and refresh the materialized views.
+    Views that don't depend on each other are refreshed at the same time on separate connections; a view that
+    reads other views (e.g. analytics.demands_summary) is refreshed once they are done.
+    With SUMMARY_MODE=incremental, analytics.demands_summary_incremental is updated in place of
+    analytics.demands_summary.
+    """
+    workers = get_refresh_workers()
+    incremental_views = INCREMENTAL_VIEWS if get_summary_mode() == "incremental" else None
+    verify = get_summary_verify()
+    pool = create_connection_pool(workers)
 
     try:
-        with conn.cursor() as cur:
-            for q in queries:
-                print(f"Running: {q}")
-                cur.execute(q)
-        conn.commit()
+        # Build the dependency graph of the views from the catalog
+        conn = pool.getconn()
+        try:
+            dependencies = get_view_dependencies(conn, MATERIALIZED_VIEWS)
+            # Fingerprints of the raw tables recorded by the pipelines, to skip the views over unchanged data
+            current_fingerprints = refreshed_fingerprints = None
+            if get_skip_unchanged():
+                current_fingerprints, refreshed_fingerprints = get_source_fingerprints(
+                    conn, get_view_raw_tables(conn, MATERIALIZED_VIEWS))
+        finally:
+            pool.putconn(conn)
+        for view in MATERIALIZED_VIEWS:
+            print(f"{view} depends on: {', '.join(sorted(dependencies[view])) or 'no other view'}")
+
+        start = time.perf_counter()
+        timings = refresh_views(pool, MATERIALIZED_VIEWS, dependencies, workers,
+                                current_fingerprints=current_fingerprints,
+                                refreshed_fingerprints=refreshed_fingerprints,
+                                incremental_views=incremental_views, verify=verify)
+        elapsed = time.perf_counter() - start
     except Exception as e:
         print(f"ERROR refreshing materialized views: {e}")
         raise e
     finally:
-        conn.close()
+        pool.closeall()
 
-    print("Materialized views refreshed successfully.")
+    print(f"Materialized views refreshed successfully in {elapsed:.2f}s:")
+    for view, seconds in timings.items():
+        print(f"  {view:<30}{'skipped':>9}" if seconds is None else f"  {view:<30}{seconds:>8.2f}s")
 
-    return {"status": "OK", "message": "Materialized views refreshed successfully"}
+    return {
+        "status": "OK",
+        "message": "Materialized views refreshed successfully",
+        "timings": {view: None if seconds is None else round(seconds, 3) for view, seconds in timings.items()},
+        "skipped": [view for view, seconds in timings.items() if seconds is None],
+    }
 
 def handler(event, context):
     """
     AWS Lambda entry point. This calls the main function.
     """
-    main()
+    return main()
 
 # Entry point for local execution
 if __name__ == '__main__':
@@ -0,0 +1,299 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Materialized views refreshed by the orchestrator. The order only matters when two views are ready at the same
+# time; dependencies are read from the catalog.
+MATERIALIZED_VIEWS = [
+    "curated.demands_archived",
+    "curated.demands_uploaded",
+    "curated.verifyplus",
+    "analytics.demands_summary",
+]
+
+# Materialized views that can be maintained incrementally instead (SUMMARY_MODE=incremental): the table kept up to
+# date in its place, the function recomputing the keys touched since the last run, and the view listing the rows
+# where the table differs from a full recompute
+INCREMENTAL_VIEWS = {
+    "analytics.demands_summary": {
+        "table": "analytics.demands_summary_incremental",
+        "function": "analytics.refresh_demands_summary_incremental",
+        "mismatches": "analytics.demands_summary_incremental_mismatches",
+    },
+}
+
+# Relations read by every view and materialized view: a view's query is stored as a pg_rewrite rule, and the rule
+# depends (pg_depend) on every relation the query reads.
+VIEW_SOURCES_QUERY = """
+    SELECT DISTINCT
+        view_ns.nspname || '.' || view_class.relname AS view_name,
+        view_class.relkind = 'm' AS is_materialized,
+        source_ns.nspname || '.' || source_class.relname AS source_name
+    FROM pg_depend dep
+    JOIN pg_rewrite rule ON rule.oid = dep.objid
+    JOIN pg_class view_class ON view_class.oid = rule.ev_class
+    JOIN pg_namespace view_ns ON view_ns.oid = view_class.relnamespace
+    JOIN pg_class source_class ON source_class.oid = dep.refobjid
+    JOIN pg_namespace source_ns ON source_ns.oid = source_class.relnamespace
+    WHERE dep.classid = 'pg_rewrite'::regclass
+      AND dep.refclassid = 'pg_class'::regclass
+      AND view_class.relkind IN ('v', 'm')
+      AND source_class.oid <> view_class.oid
+"""
+
+
+# Schema of the tables loaded by the pipelines, whose fingerprints are compared to skip unchanged views
+RAW_SCHEMA = "raw"
+
+
+def _load_view_sources(conn):
+    with conn.cursor() as cur:
+        cur.execute(VIEW_SOURCES_QUERY)
+        rows = cur.fetchall()
+    conn.commit()
+
+    sources = {}
+    plain_views = set()
+    for view_name, is_materialized, source_name in rows:
+        sources.setdefault(view_name, set()).add(source_name)
+        if not is_materialized:
+            plain_views.add(view_name)
+    return sources, plain_views
+
+
+def get_view_dependencies(conn, views):
+    """
+    Builds the dependency graph of the given materialized views from pg_depend/pg_rewrite. A view depends on
+    another one of the list if it reads it, directly or through plain views.
+
+    :param conn: psycopg2 connection object
+    :param views: list of schema-qualified materialized view names
+    :return: Dictionary of view name -> set of the views of the list it depends on.
+    """
+    sources, plain_views = _load_view_sources(conn)
+    targets = set(views)
+    dependencies = {}
+    for view in views:
+        found = set()
+        # Walk through plain views, which are expanded at refresh time; stop at tables and materialized views
+        pending = list(sources.get(view, ()))
+        seen = set()
+        while pending:
+            source = pending.pop()
+            if source in seen:
+                continue
+            seen.add(source)
+            if source in targets:
+                found.add(source)
+            elif source in plain_views:
+                pending.extend(sources.get(source, ()))
+        dependencies[view] = found
+    return dependencies
+
+
+def get_view_raw_tables(conn, views):
+    """
+    Finds the raw tables each materialized view reads, directly or through other views and materialized views.
+
+    :param conn: psycopg2 connection object
+    :param views: list of schema-qualified materialized view names
+    :return: Dictionary of view name -> set of schema-qualified raw table names.
+    """
+    sources, _ = _load_view_sources(conn)
+    raw_tables = {}
+    for view in views:
+        found = set()
+        pending = list(sources.get(view, ()))
+        seen = set()
+        while pending:
+            source = pending.pop()
+            if source in seen:
+                continue
+            seen.add(source)
+            if source in sources:
+                pending.extend(sources[source])
+            elif source.startswith(f"{RAW_SCHEMA}."):
+                found.add(source)
+        raw_tables[view] = found
+    return raw_tables
+
+
+def get_source_fingerprints(conn, raw_tables):
+    """
+    Reads the fingerprints the pipelines recorded for the raw tables of each view (raw.table_fingerprints), and the
+    ones each view was last refreshed with (raw.view_refresh_state).
+
+    :param conn: psycopg2 connection object
+    :param raw_tables: dictionary of view name -> set of raw table names (see get_view_raw_tables)
+    :return: Tuple of two dictionaries of view name -> {raw table name: fingerprint}: the current fingerprints
+             (None for a table without one), and the fingerprints of the last refresh. Both are empty if the control
+             tables don't exist.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('raw.table_fingerprints') IS NOT NULL "
+                    "AND to_regclass('raw.view_refresh_state') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            print("raw.table_fingerprints or raw.view_refresh_state does not exist. Every view is refreshed.")
+            conn.commit()
+            return {}, {}
+        cur.execute('SELECT "tableName", "fingerprint" FROM raw.table_fingerprints;')
+        table_fingerprints = {f"{RAW_SCHEMA}.{table_name}": fingerprint for table_name, fingerprint in cur.fetchall()}
+        cur.execute('SELECT "viewName", "sourceFingerprints" FROM raw.view_refresh_state;')
+        refreshed = {view_name: fingerprints for view_name, fingerprints in cur.fetchall()}
+    conn.commit()
+
+    current = {view: {table: table_fingerprints.get(table) for table in sorted(tables)}
+               for view, tables in raw_tables.items()}
+    return current, refreshed
+
+
+def _check_acyclic(dependencies):
+    remaining = {view: set(deps) for view, deps in dependencies.items()}
+    while remaining:
+        ready = [view for view, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Materialized views depend on each other in a cycle: {sorted(remaining)}")
+        for view in ready:
+            del remaining[view]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _state_key(view, incremental_views):
+    # An incrementally maintained view has its own refresh state, so switching modes never skips the first build
+    incremental = (incremental_views or {}).get(view)
+    return incremental["table"] if incremental else view
+
+
+def _update_incrementally(cur, view, incremental, verify):
+    print(f"Running: SELECT {incremental['function']}();")
+    cur.execute(f"SELECT {incremental['function']}();")
+    touched = cur.fetchone()[0]
+    print(f"Updated {touched} keys of {incremental['table']} in place of {view}.")
+    if verify:
+        cur.execute(f"SELECT COUNT(*) FROM {incremental['mismatches']};")
+        mismatches = cur.fetchone()[0]
+        if mismatches:
+            # Raised before the commit, so the table keeps its previous content
+            raise ValueError(f"{incremental['table']} differs from a full recompute of {view} in {mismatches} rows "
+                             f"(see {incremental['mismatches']}).")
+        print(f"Verified {incremental['table']} against a full recompute.")
+
+
+def _refresh_view(pool, view, concurrently, source_fingerprints=None, incremental=None, verify=False):
+    conn = pool.getconn()
+    try:
+        start = time.perf_counter()
+        with conn.cursor() as cur:
+            if incremental is not None:
+                _update_incrementally(cur, view, incremental, verify)
+            else:
+                query = f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{view};"
+                print(f"Running: {query}")
+                cur.execute(query)
+            if source_fingerprints is not None:
+                # Saved with the refresh, so a failed refresh is never taken for an up-to-date view
+                cur.execute(
+                    """
+                    INSERT INTO raw.view_refresh_state ("viewName", "sourceFingerprints", "refreshedAt")
+                    VALUES (%s, %s, now())
+                    ON CONFLICT ("viewName") DO UPDATE SET
+                        "sourceFingerprints" = EXCLUDED."sourceFingerprints",
+                        "refreshedAt" = EXCLUDED."refreshedAt";
+                    """,
+                    (incremental["table"] if incremental else view, json.dumps(source_fingerprints))
+                )
+        conn.commit()
+        return time.perf_counter() - start
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def _is_unchanged(view, current, refreshed, state_key=None):
+    fingerprints = current.get(view)
+    # A view without raw tables, or with a raw table no pipeline fingerprinted yet, is always refreshed
+    if not fingerprints or any(fingerprint is None for fingerprint in fingerprints.values()):
+        return False
+    return refreshed.get(state_key or view) == fingerprints
+
+
+def refresh_views(pool, views, dependencies, max_workers, concurrently=True, current_fingerprints=None,
+                  refreshed_fingerprints=None, incremental_views=None, verify=False):
+    """
+    Refreshes the materialized views on separate pooled connections: views that don't depend on each other run at
+    the same time, and a view starts only once the views it depends on are refreshed. Each view is committed on its
+    own. When a refresh fails, the views depending on it are skipped and the error is raised once the views already
+    running are done.
+
+    With fingerprints, a view is skipped when its raw tables have the fingerprints it was last refreshed with and
+    none of the views it depends on was refreshed in this run. The fingerprints of every refreshed view are saved
+    in raw.view_refresh_state.
+
+    A view of incremental_views is not refreshed: its function updates the table maintained in its place instead,
+    in the same transaction as the check against a full recompute when verify is set.
+
+    :param pool: psycopg2 connection pool (e.g. ThreadedConnectionPool) with at least max_workers connections
+    :param views: list of schema-qualified materialized view names
+    :param dependencies: dictionary of view name -> set of views it depends on (see get_view_dependencies)
+    :param max_workers: number of views refreshed at the same time
+    :param concurrently: use REFRESH MATERIALIZED VIEW CONCURRENTLY (needs a unique index on each view)
+    :param current_fingerprints: dictionary of view name -> current fingerprints of its raw tables, or None to
+                                 refresh every view (see get_source_fingerprints)
+    :param refreshed_fingerprints: dictionary of view name -> fingerprints of its raw tables at the last refresh
+    :param incremental_views: dictionary of view name -> {"table", "function", "mismatches"} of the views to
+                              maintain incrementally (see INCREMENTAL_VIEWS), or None to refresh every view
+    :param verify: compare each incrementally maintained table with a full recompute, and roll it back on a mismatch
+    :return: Dictionary of view name -> refresh time in seconds (None for a skipped view), in the order the views
+             were done.
+    """
+    dependencies = {view: set(dependencies.get(view, ())) & set(views) for view in views}
+    _check_acyclic(dependencies)
+
+    timings = {}
+    failed = {}
+    pending = list(views)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for view in list(pending):
+                if dependencies[view] & set(failed):
+                    print(f"Skipping {view}: a view it depends on failed to refresh.")
+                    pending.remove(view)
+                    failed[view] = None
+                elif not dependencies[view] <= set(timings):
+                    continue
+                elif (current_fingerprints is not None
+                      and not any(timings[dependency] is not None for dependency in dependencies[view])
+                      and _is_unchanged(view, current_fingerprints, refreshed_fingerprints or {},
+                                        _state_key(view, incremental_views))):
+                    print(f"Skipping {view}: its raw tables did not change since its last refresh.")
+                    pending.remove(view)
+                    timings[view] = None
+                elif len(running) < max_workers:
+                    pending.remove(view)
+                    fingerprints = None if current_fingerprints is None else current_fingerprints.get(view)
+                    incremental = (incremental_views or {}).get(view)
+                    running[executor.submit(_refresh_view, pool, view, concurrently, fingerprints, incremental,
+                                            verify)] = view
+            if not running:
+                if pending:
+                    # Views skipped in this pass may have made others ready
+                    continue
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                view = running.pop(future)
+                try:
+                    timings[view] = future.result()
+                    print(f"Refreshed {view} in {timings[view]:.2f}s.")
+                except Exception as e:
+                    print(f"ERROR refreshing {view}: {e}")
+                    failed[view] = e
+
+    errors = [e for e in failed.values() if e is not None]
+    if errors:
+        raise errors[0]
+    return timings
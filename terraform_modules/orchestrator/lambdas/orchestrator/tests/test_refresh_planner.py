@@ -0,0 +1,281 @@
+import sys
+import os
+import time
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+# You may need the following depending on your local path structure
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from refresh_planner import refresh_views, get_view_dependencies, get_view_raw_tables, get_source_fingerprints, \
+    _is_unchanged, _state_key
+
+
+class FakeCursor:
+    """Cursor recording its queries in the pool's log; refreshing a view of pool.failing raises."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        view = query.rstrip(";").split(" ")[-1] if query.startswith("REFRESH") else None
+        with self.pool.lock:
+            self.pool.log.append((query, params))
+            if view:
+                self.pool.events.append(("start", view))
+        if view:
+            time.sleep(self.pool.delays.get(view, 0.01))
+            with self.pool.lock:
+                self.pool.events.append(("end", view))
+            if view in self.pool.failing:
+                raise RuntimeError(f"could not refresh {view}")
+
+    def fetchone(self):
+        return (1,)
+
+
+class FakePool:
+    """Stand-in for ThreadedConnectionPool handing out connections whose cursors share one log."""
+
+    def __init__(self, failing=(), delays=None):
+        self.failing = set(failing)
+        self.delays = delays or {}
+        self.lock = threading.Lock()
+        self.log = []
+        self.events = []
+        self.conns = []
+        self.returned = 0
+
+    def getconn(self):
+        conn = MagicMock()
+        conn.cursor.side_effect = lambda: FakeCursor(self)
+        with self.lock:
+            self.conns.append(conn)
+        return conn
+
+    def putconn(self, conn):
+        with self.lock:
+            self.returned += 1
+
+    def refreshed(self):
+        return [view for event, view in self.events if event == "end" and view not in self.failing]
+
+
+def test_views_start_once_their_dependencies_are_refreshed():
+    """A view waits for the views it reads, while independent views refresh at the same time."""
+    pool = FakePool(delays={"curated.a": 0.2, "curated.c": 0.2})
+    views = ["curated.a", "curated.b", "curated.c", "analytics.d"]
+    dependencies = {"curated.b": {"curated.a"}, "analytics.d": {"curated.b", "curated.c"}}
+
+    timings = refresh_views(pool, views, dependencies, max_workers=2)
+
+    events = pool.events
+    assert events.index(("start", "curated.b")) > events.index(("end", "curated.a"))
+    assert events.index(("start", "analytics.d")) > max(events.index(("end", "curated.b")),
+                                                        events.index(("end", "curated.c")))
+    # a and c have no dependencies, so both start before either is done
+    assert sorted(events[:2]) == [("start", "curated.a"), ("start", "curated.c")]
+    assert list(timings)[-1] == "analytics.d"
+    assert all(seconds is not None for seconds in timings.values())
+    assert pool.returned == len(views)
+    assert "REFRESH MATERIALIZED VIEW CONCURRENTLY curated.a;" in [query for query, _ in pool.log]
+
+
+def test_failed_view_skips_its_dependents_and_is_raised_after_running_views_finish():
+    """The dependents of a failed view are skipped; the error is raised once the view running beside it is done."""
+    pool = FakePool(failing={"curated.a"}, delays={"curated.c": 0.3})
+    views = ["curated.a", "curated.c", "curated.b", "analytics.d"]
+    dependencies = {"curated.b": {"curated.a"}, "analytics.d": {"curated.b"}}
+
+    with pytest.raises(RuntimeError, match="could not refresh curated.a"):
+        refresh_views(pool, views, dependencies, max_workers=2, concurrently=False)
+
+    started = [view for event, view in pool.events if event == "start"]
+    assert sorted(started) == ["curated.a", "curated.c"]
+    assert pool.refreshed() == ["curated.c"]
+    assert pool.events[-1] == ("end", "curated.c")
+    failed_conn = next(conn for conn in pool.conns if conn.rollback.called)
+    failed_conn.commit.assert_not_called()
+    assert pool.returned == 2
+
+
+def test_cyclic_dependencies_are_rejected_before_refreshing():
+    """Views depending on each other raise ValueError without any refresh."""
+    pool = FakePool()
+    dependencies = {"curated.a": {"curated.b"}, "curated.b": {"curated.a"}, "curated.c": set()}
+
+    with pytest.raises(ValueError, match="cycle"):
+        refresh_views(pool, ["curated.a", "curated.b", "curated.c"], dependencies, max_workers=2)
+
+    assert pool.log == []
+
+
+def test_view_dependencies_walk_through_plain_views():
+    """A materialized view read through plain views is a dependency; tables and views off the list are not."""
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+        ("analytics.summary", True, "curated.summary_input"),
+        ("curated.summary_input", False, "curated.recent"),
+        ("curated.recent", False, "curated.archived"),
+        ("curated.archived", True, "raw.cases"),
+        ("curated.uploaded", True, "raw.cases"),
+        ("curated.uploaded", True, "curated.other"),
+        ("curated.other", True, "raw.metadata"),
+    ]
+
+    dependencies = get_view_dependencies(conn, ["curated.archived", "curated.uploaded", "analytics.summary"])
+
+    assert dependencies == {
+        "curated.archived": set(),
+        "curated.uploaded": set(),
+        "analytics.summary": {"curated.archived"},
+    }
+
+
+INCREMENTAL_SUMMARY = {
+    "analytics.summary": {
+        "table": "analytics.summary_incremental",
+        "function": "analytics.refresh_summary_incremental",
+        "mismatches": "analytics.summary_incremental_mismatches",
+    },
+}
+
+
+def saved_states(pool):
+    return [params for query, params in pool.log if "raw.view_refresh_state" in query]
+
+
+def test_view_with_the_fingerprints_of_its_last_refresh_is_skipped():
+    """A view whose raw tables kept their fingerprints is not refreshed, and its state is not rewritten."""
+    pool = FakePool()
+    current = {"curated.a": {"raw.cases": "f1", "raw.metadata": "m1"}, "curated.c": {"raw.verifyplus": "v2"}}
+    refreshed = {"curated.a": {"raw.cases": "f1", "raw.metadata": "m1"}, "curated.c": {"raw.verifyplus": "v1"}}
+
+    timings = refresh_views(pool, ["curated.a", "curated.c"], {}, max_workers=2, current_fingerprints=current,
+                            refreshed_fingerprints=refreshed)
+
+    assert timings["curated.a"] is None
+    assert timings["curated.c"] is not None
+    assert pool.refreshed() == ["curated.c"]
+    assert saved_states(pool) == [("curated.c", '{"raw.verifyplus": "v2"}')]
+
+
+def test_view_is_refreshed_when_a_dependency_was_refreshed_in_this_run():
+    """Unchanged raw tables do not skip a view that reads a view refreshed in this run."""
+    pool = FakePool()
+    current = {"curated.a": {"raw.cases": "f2"}, "curated.b": {"raw.cases": "f2"}}
+    refreshed = {"curated.a": {"raw.cases": "f1"}, "curated.b": {"raw.cases": "f2"}}
+
+    timings = refresh_views(pool, ["curated.a", "curated.b"], {"curated.b": {"curated.a"}}, max_workers=2,
+                            current_fingerprints=current, refreshed_fingerprints=refreshed)
+
+    assert pool.refreshed() == ["curated.a", "curated.b"]
+    assert all(seconds is not None for seconds in timings.values())
+
+
+def test_view_is_skipped_when_its_skipped_dependency_is_unchanged():
+    """A dependency skipped as unchanged does not force the refresh of the views reading it."""
+    pool = FakePool()
+    current = {"curated.a": {"raw.cases": "f1"}, "curated.b": {"raw.cases": "f1"}}
+
+    timings = refresh_views(pool, ["curated.a", "curated.b"], {"curated.b": {"curated.a"}}, max_workers=2,
+                            current_fingerprints=current, refreshed_fingerprints=dict(current))
+
+    assert timings == {"curated.a": None, "curated.b": None}
+    assert pool.log == []
+
+
+def test_view_over_a_table_without_fingerprint_is_always_refreshed():
+    """A raw table no pipeline fingerprinted yet (None) never counts as unchanged, nor does a view without raw tables."""
+    current = {"curated.a": {"raw.cases": "f1", "raw.metadata": None}, "curated.b": {}}
+    refreshed = {"curated.a": {"raw.cases": "f1", "raw.metadata": None}, "curated.b": {}}
+
+    assert not _is_unchanged("curated.a", current, refreshed)
+    assert not _is_unchanged("curated.b", current, refreshed)
+
+    pool = FakePool()
+    refresh_views(pool, ["curated.a"], {}, max_workers=1, current_fingerprints=current,
+                  refreshed_fingerprints=refreshed)
+    assert pool.refreshed() == ["curated.a"]
+
+
+def test_incremental_view_saves_and_compares_its_fingerprints_under_the_table_key():
+    """An incrementally maintained view keeps its own state, so the first run after switching modes is not skipped."""
+    assert _state_key("analytics.summary", INCREMENTAL_SUMMARY) == "analytics.summary_incremental"
+    assert _state_key("analytics.summary", None) == "analytics.summary"
+    current = {"analytics.summary": {"raw.cases": "f1"}}
+
+    # Only the materialized view was built with these fingerprints: the table still needs its first update
+    pool = FakePool()
+    timings = refresh_views(pool, ["analytics.summary"], {}, max_workers=1, current_fingerprints=current,
+                            refreshed_fingerprints={"analytics.summary": {"raw.cases": "f1"}},
+                            incremental_views=INCREMENTAL_SUMMARY)
+
+    assert timings["analytics.summary"] is not None
+    assert [query for query, _ in pool.log][0] == "SELECT analytics.refresh_summary_incremental();"
+    assert saved_states(pool) == [("analytics.summary_incremental", '{"raw.cases": "f1"}')]
+
+    pool = FakePool()
+    timings = refresh_views(pool, ["analytics.summary"], {}, max_workers=1, current_fingerprints=current,
+                            refreshed_fingerprints={"analytics.summary_incremental": {"raw.cases": "f1"}},
+                            incremental_views=INCREMENTAL_SUMMARY)
+
+    assert timings == {"analytics.summary": None}
+    assert pool.log == []
+
+
+def test_view_raw_tables_are_found_through_views_and_materialized_views():
+    """Raw tables are collected through every kind of view; relations of other schemas are ignored."""
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+        ("analytics.summary", True, "curated.archived"),
+        ("analytics.summary", True, "curated.recent"),
+        ("curated.recent", False, "raw.audit_latest"),
+        ("curated.archived", True, "raw.cases_latest"),
+        ("curated.archived", True, "public.lookup"),
+        ("curated.verifyplus", True, "raw.verifyplus"),
+    ]
+
+    raw_tables = get_view_raw_tables(conn, ["curated.archived", "analytics.summary", "curated.verifyplus"])
+
+    assert raw_tables == {
+        "curated.archived": {"raw.cases_latest"},
+        "analytics.summary": {"raw.cases_latest", "raw.audit_latest"},
+        "curated.verifyplus": {"raw.verifyplus"},
+    }
+
+
+def test_source_fingerprints_pair_each_view_with_its_tables_and_last_refresh():
+    """Current fingerprints are listed per view (None when missing) next to the ones of each view's last refresh."""
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchone.return_value = (True,)
+    cur.fetchall.side_effect = [
+        [("cases_latest", "f1"), ("verifyplus", "v1")],
+        [("curated.archived", {"raw.cases_latest": "f0"})],
+    ]
+
+    current, refreshed = get_source_fingerprints(conn, {"curated.archived": {"raw.cases_latest", "raw.audit_latest"},
+                                                        "curated.verifyplus": {"raw.verifyplus"}})
+
+    assert current == {"curated.archived": {"raw.audit_latest": None, "raw.cases_latest": "f1"},
+                       "curated.verifyplus": {"raw.verifyplus": "v1"}}
+    assert refreshed == {"curated.archived": {"raw.cases_latest": "f0"}}
+
+
+def test_source_fingerprints_are_empty_without_the_control_tables():
+    """Before 17_create_raw_table_fingerprints.sql is applied, no fingerprint is read and every view is refreshed."""
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchone.return_value = (False,)
+
+    assert get_source_fingerprints(conn, {"curated.archived": {"raw.cases_latest"}}) == ({}, {})
+    cur.fetchall.assert_not_called()
@@ -180,6 +180,10 @@ resource "aws_lambda_function" "orchestrator_lambda" {
       LOCAL_MODE      = var.local_mode
       PG_ENDPOINT     = var.pg_endpoint
       PG_SECRET_ARN   = var.pg_secret_arn
+      REFRESH_WORKERS = var.refresh_workers
+      SKIP_UNCHANGED  = var.skip_unchanged
+      SUMMARY_MODE    = var.summary_mode
+      SUMMARY_VERIFY  = var.summary_verify
     }
   }
 }
@@ -241,6 +245,106 @@ resource "aws_sfn_state_machine" "orchestration" {
     "DemandAndVerifyParallel": {
       "Type": "Parallel",
       "Branches": [
+%{ if var.demand_pipeline_distributed }
+        {
+          "StartAt": "DemandPlan",
+          "States": {
+            "DemandPlan": {
+              "Type": "Task",
+              "Resource": "arn:aws:states:::lambda:invoke",
+              "Parameters": {
+                "FunctionName": "${var.demand_pipeline_lambda_arn}",
+                "InvocationType": "RequestResponse",
+                "Payload": {
+                  "action": "plan",
+                  "run_id.$": "$$.Execution.Name"
+                }
+              },
+              "ResultSelector": {
+                "partitions.$": "$.Payload.partitions"
+              },
+              "Retry": [
+                {
+                  "ErrorEquals": ["States.ALL"],
+                  "IntervalSeconds": 2,
+                  "MaxAttempts": 3,
+                  "BackoffRate": 2.0
+                }
+              ],
+              "Next": "DemandScanPartitions"
+            },
+            "DemandScanPartitions": {
+              "Type": "Map",
+              "ItemsPath": "$.partitions",
+              "MaxConcurrency": ${var.demand_pipeline_max_concurrency},
+              "ResultPath": null,
+              "Iterator": {
+                "StartAt": "DemandScanPartition",
+                "States": {
+                  "DemandScanPartition": {
+                    "Type": "Task",
+                    "Resource": "arn:aws:states:::lambda:invoke",
+                    "Parameters": {
+                      "FunctionName": "${var.demand_pipeline_lambda_arn}",
+                      "InvocationType": "RequestResponse",
+                      "Payload.$": "$"
+                    },
+                    "ResultSelector": {
+                      "status.$": "$.Payload.status"
+                    },
+                    "ResultPath": "$.result",
+                    "Retry": [
+                      {
+                        "ErrorEquals": ["States.ALL"],
+                        "IntervalSeconds": 2,
+                        "MaxAttempts": 3,
+                        "BackoffRate": 2.0
+                      }
+                    ],
+                    "Next": "DemandScanPartitionDone"
+                  },
+                  "DemandScanPartitionDone": {
+                    "Type": "Choice",
+                    "Choices": [
+                      {
+                        "Variable": "$.result.status",
+                        "StringEquals": "IN_PROGRESS",
+                        "Next": "DemandScanPartition"
+                      }
+                    ],
+                    "Default": "DemandScanPartitionComplete"
+                  },
+                  "DemandScanPartitionComplete": {
+                    "Type": "Succeed"
+                  }
+                }
+              },
+              "Next": "DemandMerge"
+            },
+            "DemandMerge": {
+              "Type": "Task",
+              "Resource": "arn:aws:states:::lambda:invoke",
+              "Parameters": {
+                "FunctionName": "${var.demand_pipeline_lambda_arn}",
+                "InvocationType": "RequestResponse",
+                "Payload": {
+                  "action": "merge",
+                  "run_id.$": "$$.Execution.Name"
+                }
+              },
+              "Retry": [
+                {
+                  "ErrorEquals": ["States.ALL"],
+                  "IntervalSeconds": 2,
+                  "MaxAttempts": 3,
+                  "BackoffRate": 2.0
+                }
+              ],
+              "End": true
+            }
+          }
+        },
+%{ else }
         {
           "StartAt": "DemandPipeline",
           "States": {
@@ -249,7 +353,13 @@ resource "aws_sfn_state_machine" "orchestration" {
               "Resource": "arn:aws:states:::lambda:invoke",
               "Parameters": {
                 "FunctionName": "${var.demand_pipeline_lambda_arn}",
-                "InvocationType": "RequestResponse"
+                "InvocationType": "RequestResponse",
+                "Payload": {
+                  "run_id.$": "$$.Execution.Name"
+                }
+              },
+              "ResultSelector": {
+                "status.$": "$.Payload.status"
               },
               "Retry": [
                 {
@@ -259,10 +369,25 @@ resource "aws_sfn_state_machine" "orchestration" {
                   "BackoffRate": 2.0
                 }
               ],
-              "End": true
+              "Next": "DemandPipelineDone"
+            },
+            "DemandPipelineDone": {
+              "Type": "Choice",
+              "Choices": [
+                {
+                  "Variable": "$.status",
+                  "StringEquals": "IN_PROGRESS",
+                  "Next": "DemandPipeline"
+                }
+              ],
+              "Default": "DemandPipelineComplete"
+            },
+            "DemandPipelineComplete": {
+              "Type": "Succeed"
             }
           }
         },
+%{ endif }
         {
           "StartAt": "VerifyPlusPipeline",
           "States": {
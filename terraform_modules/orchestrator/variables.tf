@@ -83,4 +83,39 @@ variable "skip_layer_lookup" {
   description = "Skip the layer ARN lookup from Parameter Store for initial deployment."
   type        = string
   default     = "false"
-}
\ No newline at end of file
+}
+variable "demand_pipeline_distributed" {
+  description = "Run the demand pipeline's scans as a Map state, with one Lambda invocation per scan segment. Needs the demand pipeline's checkpoint_store."
+  type        = bool
+  default     = false
+}
+
+variable "demand_pipeline_max_concurrency" {
+  description = "Number of demand pipeline scan partitions the Map state runs at once in distributed mode."
+  type        = number
+  default     = 16
+}
+
+variable "refresh_workers" {
+  description = "Number of materialized views the Orchestrator Lambda refreshes at the same time, each on its own connection."
+  type        = string
+  default     = "3"
+}
+
+variable "skip_unchanged" {
+  description = "Skip refreshing the materialized views whose raw tables have the fingerprints they were last refreshed with ('true' or 'false')."
+  type        = string
+  default     = "true"
+}
+
+variable "summary_mode" {
+  description = "How the Orchestrator Lambda keeps the demands summary up to date: 'full' refreshes analytics.demands_summary, 'incremental' only recomputes the months touched by changed documents in analytics.demands_summary_incremental."
+  type        = string
+  default     = "full"
+}
+
+variable "summary_verify" {
+  description = "Compare the incrementally maintained demands summary with a full recompute after every update and roll it back on a mismatch ('true' or 'false')."
+  type        = string
+  default     = "false"
+}
@@ -1,57 +1,341 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from itc_common_utilities.logger.logger_setup import setup_logger
 
 # Initialize the logger for this module
 logger = setup_logger(__name__)
 
-def make_api_call(url, method='get', data=None, row_limit=None):
+QUICKBASE_REALM_HOSTNAME = "precedent.quickbase.com"
+
+# Quickbase answers 429 Too Many Requests once the rate limit of the user token is reached
+RATE_LIMIT_STATUS_CODE = 429
+# Transient server errors, retried by the connection pool
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_SECONDS = 1.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10
+DEFAULT_READ_TIMEOUT_SECONDS = 60
+
+# Report pagination: rows requested per page (0 fetches the report in a single request) and concurrent page requests
+DEFAULT_REPORT_PAGE_SIZE = 5000
+DEFAULT_REPORT_WORKERS = 4
+# Paged extractions of the report run before giving up when its rows keep changing while the pages are read
+DEFAULT_REPORT_ATTEMPTS = 3
+
+
+def _get_int_env(name, default, minimum):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        logger.warning(f"Invalid {name} '{value}'. Falling back to {default}.")
+        return default
+    if parsed < minimum:
+        logger.warning(f"{name} must be at least {minimum}, got {parsed}. Falling back to {default}.")
+        return default
+    return parsed
+
+
+def get_report_page_size():
+    """
+    Reads the REPORT_PAGE_SIZE environment variable.
+
+    Returns:
+        int: Rows requested per report page (default 5000), or 0 to fetch the report in a single request.
+    """
+    return _get_int_env("REPORT_PAGE_SIZE", DEFAULT_REPORT_PAGE_SIZE, 0)
+
+
+def get_report_workers():
+    """
+    Reads the REPORT_WORKERS environment variable.
+
+    Returns:
+        int: Number of report pages requested concurrently (default 4).
+    """
+    return _get_int_env("REPORT_WORKERS", DEFAULT_REPORT_WORKERS, 1)
+
+
+def get_request_timeout():
+    """
+    Reads the QUICKBASE_TIMEOUT environment variable.
+
+    Returns:
+        int: Seconds to wait for a Quickbase response (default 60).
+    """
+    return _get_int_env("QUICKBASE_TIMEOUT", DEFAULT_READ_TIMEOUT_SECONDS, 1)
+
+
+def get_max_retries():
+    """
+    Reads the QUICKBASE_MAX_RETRIES environment variable.
+
+    Returns:
+        int: Retries of a Quickbase request after a 429, a 5xx or a connection error (default 5).
+    """
+    return _get_int_env("QUICKBASE_MAX_RETRIES", DEFAULT_MAX_RETRIES, 0)
+
+
+def _retry_delay(response, attempt, backoff_seconds):
+    # Quickbase sends Retry-After (in seconds) with 429 responses; otherwise back off exponentially
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+    return backoff_seconds * (2 ** attempt)
+
+
+class QuickbaseClient:
+    """
+    Quickbase API client on a pooled requests.Session: connections are kept alive and reused between calls,
+    the headers are built once, and responses are sent gzip-compressed and decoded transparently.
+    Server errors and connection errors are retried by the connection pool; 429 responses by request().
+    """
+
+    def __init__(self, api_token, realm_hostname=QUICKBASE_REALM_HOSTNAME, timeout=DEFAULT_READ_TIMEOUT_SECONDS,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+                 pool_size=DEFAULT_REPORT_WORKERS):
+        """
+        Args:
+            api_token (str): Quickbase user token
+            realm_hostname (str): Quickbase realm, e.g. 'precedent.quickbase.com'
+            timeout (float): Seconds to wait for a response (connecting waits at most DEFAULT_CONNECT_TIMEOUT_SECONDS)
+            max_retries (int): Retries after a 429, a 5xx or a connection error
+            backoff_seconds (float): First retry delay, doubled on every retry
+            pool_size (int): Connections kept open, at least the number of concurrent requests
+        """
+        self.api_token = api_token
+        self.timeout = (DEFAULT_CONNECT_TIMEOUT_SECONDS, timeout)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.session = requests.Session()
+        self.session.headers.update({
+            "QB-Realm-Hostname": realm_hostname,
+            "Authorization": "QB-USER-TOKEN " + api_token,
+            "User-Agent": "Reporting Agent",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        # 429 responses are left to request(), so max_retries can be overridden per call
+        retry = Retry(total=max_retries, backoff_factor=backoff_seconds, status_forcelist=RETRY_STATUS_CODES,
+                      allowed_methods=None, respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, url, method='get', data=None, max_retries=None, backoff_seconds=None):
+        """
+        Sends a request and returns the decoded JSON body, or None if the request failed.
+
+        Args:
+            url (str): The API endpoint URL
+            method (str): HTTP method ('get' or 'post')
+            data (dict, optional): Data to send with POST requests
+            max_retries (int, optional): Retries after a 429 response, instead of the client's max_retries
+            backoff_seconds (float, optional): First 429 retry delay when the response has no Retry-After header
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        backoff_seconds = self.backoff_seconds if backoff_seconds is None else backoff_seconds
+        try:
+            attempt = 0
+            while True:
+                logger.debug(f"Making {method.upper()} request to URL: {url}")
+                if method == 'get':
+                    response = self.session.get(url, timeout=self.timeout)
+                elif method == 'post':
+                    response = self.session.post(url, json=data, timeout=self.timeout)
+                else:
+                    logger.error(f"Unsupported HTTP method: {method}")
+                    return None
+
+                if response.status_code != RATE_LIMIT_STATUS_CODE or attempt >= max_retries:
+                    break
+                delay = _retry_delay(response, attempt, backoff_seconds)
+                attempt += 1
+                logger.warning(f"Rate limited by Quickbase for URL {url}. Retry {attempt}/{max_retries} "
+                               f"in {delay:.1f}s.")
+                time.sleep(delay)
+
+            response.raise_for_status()  # Raises an error for 4xx/5xx responses
+
+            # Log an informational message on a successful API call
+            logger.info(f"API call to {url} succeeded with status code {response.status_code}")
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error making API call to {url}: {e}")
+            # Log a warning before the error for additional context on exceptions
+            logger.warning(f"Request exception encountered for URL {url}: {e}")
+            logger.error(f"Error making API call to {url}: {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+# Kept at module scope, so warm Lambda invocations reuse the open connections
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client():
     """
-    Make a call to the Quickbase API.
+    Returns the module's QuickbaseClient, created on first use (or when the API token changes).
+
+    Returns:
+        QuickbaseClient: The shared client.
+    """
+    global _CLIENT
+    # Retrieve the API token from the environment
+    api_token = os.getenv("QUICKBASE_API_TOKEN")
+    if not api_token:
+        logger.error("Quickbase API token is not set in the environment.")
+        raise Exception("Quickbase API token is not set in the environment.")
+
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT.api_token != api_token:
+            if _CLIENT is not None:
+                _CLIENT.close()
+            # Room for the report pages plus the metadata and fields calls running next to them
+            _CLIENT = QuickbaseClient(api_token, timeout=get_request_timeout(), max_retries=get_max_retries(),
+                                      pool_size=get_report_workers() + 2)
+            logger.debug("Created a new Quickbase API session.")
+        return _CLIENT
+
+
+def make_api_call(url, method='get', data=None, row_limit=None, max_retries=None, backoff_seconds=None):
+    """
+    Make a call to the Quickbase API, on the shared session (see get_client).
 
     Args:
         url (str): The API endpoint URL
         method (str): HTTP method ('get' or 'post')
         data (dict, optional): Data to send with POST requests
         row_limit (int, optional): Number of rows to return in the response
+        max_retries (int, optional): Number of retries when Quickbase answers 429 Too Many Requests
+            (default QUICKBASE_MAX_RETRIES)
+        backoff_seconds (float, optional): First retry delay when the response has no Retry-After header,
+            doubled on every retry
     """
-    # Retrieve the API token from the environment
-    API_TOKEN = os.getenv("QUICKBASE_API_TOKEN")
-    if not API_TOKEN:
-        logger.error("Quickbase API token is not set in the environment.")
-        raise Exception("Quickbase API token is not set in the environment.")
-
-    HEADERS = {
-        "QB-Realm-Hostname": "precedent.quickbase.com",
-        "Authorization": "QB-USER-TOKEN " + API_TOKEN,
-        "User-Agent": "Reporting Agent"
-    }
+    client = get_client()
 
-    # Add row limit if specified
     # Append row limit if specified and applicable
     if row_limit is not None and 'run?' in url:
         separator = '&' if '?' in url else '?'
         url = f"{url}{separator}top={row_limit}"
         logger.debug(f"Applied row_limit parameter: {row_limit}. Updated URL: {url}")
 
-    try:
-        logger.debug(f"Making {method.upper()} request to URL: {url}")
-        if method == 'get':
-            response = requests.get(url, headers=HEADERS)
-        elif method == 'post':
-            response = requests.post(url, headers=HEADERS, json=data)
-        else:
-            logger.error(f"Unsupported HTTP method: {method}")
+    return client.request(url, method=method, data=data, max_retries=max_retries, backoff_seconds=backoff_seconds)
+
+
+def _page_url(url, skip, top):
+    separator = '&' if '?' in url else '?'
+    return f"{url}{separator}skip={skip}&top={top}"
+
+
+def _fetch_report_rows(url, skip, count):
+    """
+    Fetches the rows [skip, skip + count) of a report. Quickbase may return fewer rows than asked for when the
+    response would be too large, so the rest is requested until the range is complete or the report ends.
+
+    Returns:
+        list: The rows in report order, or None if a request failed.
+    """
+    rows = []
+    while count > 0:
+        page = make_api_call(_page_url(url, skip, count), method='post')
+        if page is None:
+            return None
+        page_rows = page.get('data', [])
+        if not page_rows:
+            break
+        rows.extend(page_rows)
+        skip += len(page_rows)
+        count -= len(page_rows)
+    return rows
+
+
+def _fetch_report_pages(url, page_size, max_workers):
+    """
+    Runs a report once, page by page (see fetch_report_data).
+
+    Returns:
+        tuple: The report response with the rows of every page in 'data', and the totalRecords of its first page
+            (None when the report fit in the first page), or None if a request failed.
+    """
+    first_page = make_api_call(_page_url(url, 0, page_size), method='post')
+    if first_page is None:
+        return None
+    rows = list(first_page.get('data', []))
+    metadata = first_page.get('metadata') or {}
+    total_records = metadata.get('totalRecords')
+    if total_records is None or len(rows) >= total_records:
+        return first_page, None
+    if not rows:
+        logger.error(f"The first page of {url} is empty, but the report has {total_records} records.")
+        return None
+
+    # Follow the page size Quickbase actually returned, in case it capped the first page
+    step = len(rows)
+    skips = range(step, total_records, step)
+    logger.info(f"Fetching {total_records} records in {len(skips) + 1} pages of {step} rows "
+                f"with {max_workers} workers.")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(lambda skip: _fetch_report_rows(url, skip, min(step, total_records - skip)),
+                                  skips))
+    if any(page is None for page in pages):
+        logger.error(f"Error fetching the pages of {url}.")
+        return None
+    for page in pages:
+        rows.extend(page)
+
+    report = dict(first_page)
+    report['data'] = rows
+    report['metadata'] = dict(metadata, numRecords=len(rows), skip=0, top=len(rows))
+    return report, total_records
+
+
+def fetch_report_data(url, page_size=DEFAULT_REPORT_PAGE_SIZE, max_workers=DEFAULT_REPORT_WORKERS,
+                      max_attempts=DEFAULT_REPORT_ATTEMPTS):
+    """
+    Runs a Quickbase report page by page. The first page gives metadata.totalRecords; the remaining pages are
+    requested concurrently with skip/top and put back together in report order.
+
+    Records added or removed while the pages are read shift the skip offsets, so rows could be missed or read
+    twice. When the number of rows fetched differs from the totalRecords of the first page, the whole report is
+    fetched again, up to max_attempts times.
+
+    Args:
+        url (str): The report run URL (POST /reports/{reportId}/run?tableId=...)
+        page_size (int): Rows requested per page. 0 runs the report in a single request.
+        max_workers (int): Maximum number of page requests in flight.
+        max_attempts (int): Paged extractions run before giving up on a report whose rows keep changing.
+
+    Returns:
+        dict: The report response with the rows of every page in 'data', or None if a request failed or the rows
+            never matched the report's totalRecords.
+    """
+    if not page_size:
+        return make_api_call(url, method='post')
+
+    for attempt in range(1, max_attempts + 1):
+        result = _fetch_report_pages(url, page_size, max_workers)
+        if result is None:
             return None
+        report, total_records = result
+        if total_records is None or len(report['data']) == total_records:
+            return report
+        logger.warning(f"Fetched {len(report['data'])} rows, but the report had {total_records} records when the "
+                       f"first page was read (attempt {attempt} of {max_attempts}). Records changed during the "
+                       f"extraction.")
 
-        response.raise_for_status()  # Raises an error for 4xx/5xx responses
-
-        # Log an informational message on a successful API call
-        logger.info(f"API call to {url} succeeded with status code {response.status_code}")
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error making API call to {url}: {e}")
-        # Log a warning before the error for additional context on exceptions
-        logger.warning(f"Request exception encountered for URL {url}: {e}")
-        logger.error(f"Error making API call to {url}: {e}")
-        return None
\ No newline at end of file
+    logger.error(f"The records of {url} kept changing during {max_attempts} extractions. Giving up.")
+    return None
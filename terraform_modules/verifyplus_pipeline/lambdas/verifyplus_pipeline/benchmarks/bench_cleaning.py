@@ -0,0 +1,133 @@
+"""
+Benchmark: cleaning a synthetic Quickbase report with the vectorized utils functions vs. the previous row-wise
+versions (Series.apply with a lambda per value), including the conversion into the records given to the loader.
+No database or Quickbase access is needed.
+
+    python benchmarks/bench_cleaning.py --rows 1000000 --repeat 3
+"""
+# Standard library imports
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from utils import convert_currency_columns_to_decimal, fix_timestamp_columns, fix_date_columns, dataframe_to_records
+
+CURRENCY_COLUMNS = ["biPerPersonLimit", "biPerOccurrenceLimit", "pdLimit", "umPerPersonLimits", "umPerOccurrenceLimit"]
+TIMESTAMP_COLUMNS = ["customerCloseDatetime", "verifyCloseDatetimeOveride", "verifyStartDatetime",
+                     "verifyCloseDatetime"]
+DATE_COLUMNS = ["claimSetUpStartDate", "claimSetUpCloseDate"]
+
+# Values as the Quickbase report returns them, including the blanks and invalid values the cleaning handles.
+# Limits come from a short list of amounts; timestamps and dates are spread over two years.
+CURRENCY_VALUES = ["$25,000.00", "$50,000.00", "$100,000.00", "$1,000,000.00", " $15,000 ", "", None, "N/A"]
+BLANK_VALUES = ["", None]
+BLANK_RATE = 0.1
+
+
+def make_report(rows, seed=0):
+    """
+    Builds a DataFrame shaped like the one main.py creates from a Verify+ report of the given number of rows.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {"requestId": np.arange(rows), "requestType": rng.choice(["New", "Update"], rows).astype(object)}
+    currency_values = np.array(CURRENCY_VALUES, dtype=object)
+    for name in CURRENCY_COLUMNS:
+        columns[name] = currency_values[rng.integers(0, len(CURRENCY_VALUES), rows)]
+    start = np.datetime64("2023-01-01T00:00:00")
+    for names, unit, suffix in ((TIMESTAMP_COLUMNS, "s", "Z"), (DATE_COLUMNS, "D", "")):
+        for name in names:
+            offsets = rng.integers(0, 2 * 365 * 86400, rows).astype("timedelta64[s]")
+            values = np.char.add(np.datetime_as_string(start + offsets, unit=unit), suffix).astype(object)
+            blanks = rng.random(rows) < BLANK_RATE
+            values[blanks] = np.array(BLANK_VALUES, dtype=object)[rng.integers(0, len(BLANK_VALUES), blanks.sum())]
+            columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def rowwise_currency(df, fields_to_convert):
+    for field in fields_to_convert:
+        temp_series = df[field].copy()
+        temp_series = temp_series.replace({r'\$': '', ',': ''}, regex=True)
+        temp_series = temp_series.replace(r'^\s*$', None, regex=True)
+        temp_series = temp_series.apply(lambda x: x.strip() if isinstance(x, str) else x)
+        df[field] = pd.to_numeric(temp_series, errors='coerce').astype('float64')
+        df[field] = df[field].replace({np.nan: None})
+    return df
+
+
+def rowwise_datetimes(df, column_names, date_format, invalid):
+    for col in column_names:
+        temp_series = df[col].copy()
+        temp_series = temp_series.replace(invalid, pd.NaT)
+        temp_series = pd.to_datetime(temp_series, errors='coerce')
+        df[col] = temp_series.apply(lambda x: x.strftime(date_format) if pd.notnull(x) else None)
+    return df
+
+
+def clean_rowwise(df):
+    df = rowwise_currency(df, CURRENCY_COLUMNS)
+    df = rowwise_datetimes(df, TIMESTAMP_COLUMNS, "%Y-%m-%d %H:%M:%S", ["NaT", "", None])
+    df = rowwise_datetimes(df, DATE_COLUMNS, "%Y-%m-%d", ["NaT", "NaN", "", None])
+    return df
+
+
+def clean_vectorized(df):
+    df = convert_currency_columns_to_decimal(df, CURRENCY_COLUMNS)
+    df = fix_timestamp_columns(df, TIMESTAMP_COLUMNS)
+    df = fix_date_columns(df, DATE_COLUMNS)
+    return df
+
+
+def run(report, clean, to_records):
+    """
+    :return: Tuple of (cleaning seconds, conversion seconds, records).
+    """
+    df = report.copy()
+    start = time.perf_counter()
+    df = clean(df)
+    cleaned = time.perf_counter()
+    records = to_records(df)
+    return cleaned - start, time.perf_counter() - cleaned, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Number of synthetic report rows.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation; the best run is reported.")
+    args = parser.parse_args()
+
+    report = make_report(args.rows)
+    implementations = {
+        "rowwise": (clean_rowwise, lambda df: df.to_dict(orient='records')),
+        "vectorized": (clean_vectorized, dataframe_to_records),
+    }
+    results = {}
+    records = {}
+    for name, (clean, to_records) in implementations.items():
+        best = None
+        for _ in range(args.repeat):
+            clean_seconds, records_seconds, records[name] = run(report, clean, to_records)
+            if best is None or clean_seconds + records_seconds < sum(best):
+                best = (clean_seconds, records_seconds)
+        results[name] = best
+
+    # Both implementations must hand the loader the same values
+    assert records["rowwise"] == records["vectorized"], "the implementations produced different records"
+
+    print(f"{'implementation':<16}{'clean (s)':>12}{'records (s)':>14}{'total (s)':>12}")
+    for name, (clean_seconds, records_seconds) in results.items():
+        print(f"{name:<16}{clean_seconds:>12.2f}{records_seconds:>14.2f}{clean_seconds + records_seconds:>12.2f}")
+    print(f"\ncleaning speedup: {results['rowwise'][0] / results['vectorized'][0]:.1f}x, "
+          f"total speedup: {sum(results['rowwise']) / sum(results['vectorized']):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 import os
 import json
+import math
+from decimal import Decimal, ROUND_HALF_UP
 import boto3
 import psycopg2
 from psycopg2.extras import execute_values
@@ -8,6 +10,22 @@ from itc_common_utilities.logger.logger_setup import setup_logger
 # Initialize a logger for this module.
 logger = setup_logger(__name__)
 
+# Load rows with COPY by default; "insert" keeps the execute_values path
+LOAD_METHOD_COPY = "copy"
+LOAD_METHOD_INSERT = "insert"
+
+# How raw.verifyplus is replaced: "delete" deletes and re-inserts in place, "swap" loads a temp
+# staging table, validates it and swaps it in with TRUNCATE + INSERT ... SELECT
+LOAD_MODE_DELETE = "delete"
+LOAD_MODE_SWAP = "swap"
+
+# Number of characters handed to COPY per read of the row stream
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# PostgreSQL column types that need their values rounded to whole numbers before COPY
+INTEGER_COLUMN_TYPES = {"smallint", "integer", "bigint"}
+JSON_COLUMN_TYPES = {"json", "jsonb"}
+
 def get_secret():
     logger.info("Getting secrets.")
 
@@ -94,34 +112,185 @@ def get_db_connection():
         logger.error("Error connecting to the database: %s", e)
         raise
 
-def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_file_path="output.csv"):
+def _format_float(value):
     """
-    Deletes all existing rows in the given table and inserts new data.
+    Formats a float the way PostgreSQL prints it, so NaN and infinities are accepted by COPY.
+    """
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return repr(value)
 
-    :param conn: psycopg2 connection object
+
+def _format_array_literal(values):
+    """
+    Formats a Python list as a PostgreSQL array literal.
+    """
+    elements = []
+    for element in values:
+        if element is None:
+            elements.append("NULL")
+        else:
+            element = str(element).replace("\\", "\\\\").replace('"', '\\"')
+            elements.append(f'"{element}"')
+    return "{" + ",".join(elements) + "}"
+
+
+def _format_copy_text(value):
+    """
+    Converts a non-null Python value into the text PostgreSQL expects for it,
+    mirroring how psycopg2 adapts the same value for execute_values.
+    """
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, float):
+        return _format_float(value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, (list, tuple)):
+        return _format_array_literal(value)
+    return str(value)
+
+
+def _format_copy_integer(value):
+    """
+    Rounds numeric values for integer columns. INSERT applies an assignment cast
+    (e.g. requestId 12.0 -> 12), but COPY rejects anything that is not a whole number.
+    """
+    if isinstance(value, (float, Decimal)) and not isinstance(value, bool):
+        try:
+            return str(int(Decimal(str(value)).to_integral_value(rounding=ROUND_HALF_UP)))
+        except (ArithmeticError, ValueError):
+            return _format_copy_text(value)
+    return _format_copy_text(value)
+
+
+def _format_copy_json(value):
+    """
+    Serializes dictionaries and lists for json/jsonb columns (e.g. claimSetUpAssignee).
+    Strings are assumed to already be JSON.
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return _format_copy_text(value)
+
+
+def _get_copy_formatter(data_type):
+    """
+    Picks the value formatter for a PostgreSQL column type from information_schema.columns.
+    """
+    if data_type in INTEGER_COLUMN_TYPES:
+        return _format_copy_integer
+    if data_type in JSON_COLUMN_TYPES:
+        return _format_copy_json
+    return _format_copy_text
+
+
+def _get_column_types(cur, table_name):
+    """
+    Looks up the data type of every column in raw.<table_name>.
+    """
+    cur.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = 'raw' AND table_name = %s;",
+        (table_name,)
+    )
+    return dict(cur.fetchall())
+
+
+def _iter_copy_lines(headers, data, formatters):
+    """
+    Yields one CSV line per row. Every non-null value is quoted, so an unquoted empty
+    field unambiguously means NULL while a quoted empty field stays an empty string.
+    """
+    for row in data:
+        fields = []
+        for col, formatter in zip(headers, formatters):
+            value = row.get(col)
+            if value is None:
+                fields.append("")
+            else:
+                fields.append('"' + formatter(value).replace('"', '""') + '"')
+        yield ",".join(fields) + "\n"
+
+
+class CopyRowStream:
+    """
+    Minimal file-like object that feeds COPY ... FROM STDIN from a generator of CSV lines,
+    so rows are encoded as they are sent instead of being buffered in memory first.
+    """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = ""
+        self.line_count = 0
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size is None or size < 0 or length < size:
+            try:
+                line = next(self._lines)
+            except StopIteration:
+                break
+            self.line_count += 1
+            chunks.append(line)
+            length += len(line)
+
+        data = "".join(chunks)
+        if size is None or size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _copy_rows(cur, table_name, headers, data, target=None):
+    """
+    Streams rows into raw.<table_name> with COPY ... FROM STDIN (CSV format).
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: iterable of dictionaries where keys are column names
+    :param target: table to copy into instead of raw.<table_name> (e.g. a staging table with the same columns)
+    :return: Number of rows copied.
+    """
+    target = target or f"raw.{table_name}"
+    column_types = _get_column_types(cur, table_name)
+    formatters = [_get_copy_formatter(column_types.get(col)) for col in headers]
+
+    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
+    columns = ", ".join(quoted_headers)
+    copy_query = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    stream = CopyRowStream(_iter_copy_lines(headers, data, formatters))
+    cur.copy_expert(copy_query, stream, size=COPY_BUFFER_SIZE)
+    logger.info("Copied %d rows into %s.", stream.line_count, target)
+    return stream.line_count
+
+
+def _insert_rows(cur, table_name, headers, data, method=LOAD_METHOD_COPY, target=None):
+    """
+    Inserts rows into raw.<table_name> (or the given target table) using the given cursor.
+
+    :param cur: psycopg2 cursor
     :param table_name: name of the table in PostgreSQL
     :param headers: list of column names to insert
     :param data: list of dictionaries where keys are column names
+    :param method: "copy" to stream rows with COPY, or "insert" to use execute_values
+    :param target: table to insert into instead of raw.<table_name>
     """
-    if not data:
-        logger.info("No data to insert for table %s.", table_name)
+    target = target or f"raw.{table_name}"
+    if method == LOAD_METHOD_COPY:
+        logger.info("Copying %d rows into %s.", len(data), target)
+        _copy_rows(cur, table_name, headers, data, target)
         return
 
-    # Save data to CSV before inserting (if save_csv is True)
-    if save_csv:
-        try:
-            import pandas as pd  # Lazy import since pandas is only needed here
-            df = pd.DataFrame(data, columns=headers)
-            df.to_csv(csv_file_path, index=False)
-            logger.info("Data saved to %s.", csv_file_path)
-        except Exception as e:
-            logger.error("Error saving data to CSV: %s", e)
-            raise
-
     # Build the INSERT query string using psycopg2's execute_values for efficiency
     quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
     columns = ", ".join(quoted_headers)  # Use quoted headers in the query
-    insert_query = f"INSERT INTO raw.{table_name} ({columns}) VALUES %s"
+    insert_query = f"INSERT INTO {target} ({columns}) VALUES %s"
 
     # Prepare a list of tuples corresponding to each row's values in the same order as headers
     values = []
@@ -135,13 +304,180 @@ def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_
             row_values.append(value)
         values.append(tuple(row_values))
 
+    logger.info("Inserting %d rows into %s.", len(values), target)
+    execute_values(cur, insert_query, values)
+
+
+def get_rebuild_indexes():
+    """
+    Reads the REBUILD_INDEXES environment variable.
+
+    Returns:
+        bool: True (default) to drop the non-essential indexes of raw.verifyplus before a swap (LOAD_MODE=swap) and
+        build them again once the rows are in, False to keep them and maintain them row by row.
+    """
+    return os.getenv("REBUILD_INDEXES", "true").lower() != "false"
+
+
+def _drop_load_indexes(cur, table_name):
+    """
+    Drops the non-essential indexes of raw.<table_name> right before a swap truncates it, with
+    raw.drop_nonessential_indexes (19_create_index_management.sql). Nothing is dropped with REBUILD_INDEXES=false or
+    if the function is not installed yet. DROP INDEX takes the same ACCESS EXCLUSIVE lock as the TRUNCATE that
+    follows; the delete load mode never calls this, so its readers keep seeing the previous rows.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    :return: True if the indexes have to be built again with _create_load_indexes before the commit.
+    """
+    if not get_rebuild_indexes():
+        return False
+    cur.execute("SELECT to_regprocedure('raw.drop_nonessential_indexes(text)') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        logger.warning("raw.drop_nonessential_indexes does not exist. Indexes are maintained during the load.")
+        return False
+    cur.execute("SELECT raw.drop_nonessential_indexes(%s);", (table_name,))
+    logger.info("Dropped %d indexes of raw.%s for the load.", cur.fetchone()[0], table_name)
+    return True
+
+
+def _create_load_indexes(cur, table_name):
+    """
+    Builds the managed indexes of raw.<table_name> missing after a load, with raw.create_managed_indexes.
+
+    :param cur: psycopg2 cursor
+    :param table_name: name of the table in PostgreSQL
+    """
+    cur.execute("SELECT raw.create_managed_indexes(%s);", (table_name,))
+    logger.info("Built %d indexes of raw.%s.", cur.fetchone()[0], table_name)
+
+
+def insert_data_into_table(conn, table_name, headers, data, save_csv=False, csv_file_path="output.csv",
+                           method=LOAD_METHOD_COPY):
+    """
+    Deletes all existing rows in the given table and inserts new data.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: list of dictionaries where keys are column names
+    :param method: "copy" (default) streams rows with COPY, "insert" uses execute_values
+    """
+    if not data:
+        logger.info("No data to insert for table %s.", table_name)
+        return
+
+    # Save data to CSV before inserting (if save_csv is True)
+    if save_csv:
+        try:
+            import pandas as pd  # Lazy import since pandas is only needed here
+            df = pd.DataFrame(data, columns=headers)
+            df.to_csv(csv_file_path, index=False)
+            logger.info("Data saved to %s.", csv_file_path)
+        except Exception as e:
+            logger.error("Error saving data to CSV: %s", e)
+            raise
+
     try:
         with conn.cursor() as cur:
             logger.info("Deleting existing rows from %s.", table_name)
             cur.execute(f"DELETE FROM raw.{table_name};")
-            logger.info("Inserting %d rows into raw.%s.", len(values), table_name)
-            execute_values(cur, insert_query, values)
+            _insert_rows(cur, table_name, headers, data, method)
     except Exception as e:
         conn.rollback()
         logger.error("Error inserting data into raw.%s: %s", table_name, e)
-        raise
\ No newline at end of file
+        raise
+
+
+def get_load_mode():
+    """
+    Reads the load mode from the LOAD_MODE environment variable.
+
+    Returns:
+        str: 'delete' (default) or 'swap'.
+    """
+    load_mode = os.getenv("LOAD_MODE", LOAD_MODE_DELETE).lower()
+    if load_mode not in (LOAD_MODE_DELETE, LOAD_MODE_SWAP):
+        logger.warning("Unknown LOAD_MODE '%s'. Falling back to '%s'.", load_mode, LOAD_MODE_DELETE)
+        load_mode = LOAD_MODE_DELETE
+    return load_mode
+
+
+def swap_data_into_table(conn, table_name, headers, data, method=LOAD_METHOD_COPY):
+    """
+    Replaces the contents of raw.<table_name> through a staging table.
+
+    The data is bulk-loaded into a TEMP staging table (not WAL-logged, no indexes, private to this
+    session) and its row count is validated before raw.<table_name> is touched. The staging rows are
+    then swapped in with TRUNCATE + INSERT ... SELECT in the caller's transaction. TRUNCATE takes an
+    ACCESS EXCLUSIVE lock on raw.<table_name>: until the load commits, every query and refresh of
+    curated.verifyplus waits for it rather than reading the previous rows. A rename swap is not used
+    because curated.verifyplus references raw.verifyplus by OID and would keep pointing at the old table.
+
+    :param conn: psycopg2 connection object
+    :param table_name: name of the table in PostgreSQL
+    :param headers: list of column names to insert
+    :param data: list of dictionaries where keys are column names
+    :param method: "copy" (default) streams rows with COPY, "insert" uses execute_values
+    :return: Number of rows swapped in.
+    """
+    source_count = len(data)
+    staging_table = f"{table_name}_staging"
+    quoted_headers = [f'"{header}"' for header in headers]  # Add quotes to preserve case
+    columns = ", ".join(quoted_headers)
+
+    try:
+        with conn.cursor() as cur:
+            logger.info("Loading %d rows into staging table %s.", source_count, staging_table)
+            cur.execute(f"DROP TABLE IF EXISTS pg_temp.{staging_table};")
+            cur.execute(
+                f"CREATE TEMP TABLE {staging_table} (LIKE raw.{table_name} INCLUDING DEFAULTS) ON COMMIT DROP;"
+            )
+            _insert_rows(cur, table_name, headers, data, method, target=staging_table)
+
+            # Validate the staging table before raw.<table_name> is touched
+            cur.execute(f"SELECT COUNT(*) FROM {staging_table};")
+            staged_count = cur.fetchone()[0]
+            if staged_count != source_count:
+                raise ValueError(
+                    f"Row count mismatch in staging: {source_count} rows in source, but {staged_count} rows staged.")
+            logger.info("Row count matches in staging: %d rows in source, %d rows staged.", source_count, staged_count)
+
+            logger.info("Swapping %s into raw.%s.", staging_table, table_name)
+            rebuild_indexes = _drop_load_indexes(cur, table_name)
+            cur.execute(f"TRUNCATE raw.{table_name};")
+            cur.execute(f"INSERT INTO raw.{table_name} ({columns}) SELECT {columns} FROM {staging_table};")
+            swapped_count = cur.rowcount
+            if rebuild_indexes:
+                _create_load_indexes(cur, table_name)
+        return swapped_count
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error swapping data into raw.%s: %s", table_name, e)
+        raise
+
+
+def record_table_fingerprint(conn, table_name):
+    """
+    Records the content fingerprint and row count of a raw table in raw.table_fingerprints, with
+    raw.record_table_fingerprint (17_create_raw_table_fingerprints.sql), so the orchestrator can skip refreshing the
+    materialized views over unchanged data. This does not commit. If the function is not installed yet, nothing is
+    recorded.
+
+    Args:
+        conn: psycopg2 connection object.
+        table_name (str): Name of the table in the raw schema.
+
+    Returns:
+        str: The fingerprint, or None if it was not recorded.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regprocedure('raw.record_table_fingerprint(text)') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            logger.warning("raw.record_table_fingerprint does not exist. The fingerprint of raw.%s is not recorded.",
+                           table_name)
+            return None
+        cur.execute("SELECT raw.record_table_fingerprint(%s);", (table_name,))
+        fingerprint = cur.fetchone()[0]
+    logger.info("Recorded fingerprint %s of raw.%s.", fingerprint, table_name)
+    return fingerprint
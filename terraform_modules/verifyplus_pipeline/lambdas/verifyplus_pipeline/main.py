@@ -1,11 +1,14 @@
 import os
 import sys
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 # Local imports
-from api_handler import make_api_call
-from database_handler import insert_data_into_table, get_db_connection
-from utils import to_camel_case, convert_currency_columns_to_decimal, fix_timestamp_columns, fix_date_columns
+from api_handler import make_api_call, fetch_report_data, get_report_page_size, get_report_workers
+from database_handler import insert_data_into_table, swap_data_into_table, get_db_connection, get_load_mode, \
+    record_table_fingerprint, LOAD_MODE_SWAP
+from schema_cache import get_cached_schema, store_schema, invalidate_schema, find_unknown_field_ids
+from utils import get_column_mapping, build_report_dataframe, convert_currency_columns_to_decimal, \
+    fix_timestamp_columns, fix_date_columns, dataframe_to_records
 
 # Shared Logger
 from itc_common_utilities.logger.logger_setup import setup_logger
@@ -36,27 +39,49 @@ def main():
     REPORT_METADATA_URL = f"{BASE_URL}/reports/{REPORT_ID}?tableId={TABLE_ID}"
     FIELDS_URL = f"{BASE_URL}/fields?tableId={TABLE_ID}"
 
-    # Make API calls to get data
-    logger.info("Extracting Verify+ data...")
-    report_data = make_api_call(REPORT_DATA_URL, method='post')
-
-    logger.info("Extracting Verify+ metadata...")
-    report_metadata = make_api_call(REPORT_METADATA_URL)
-
-    logger.info("Extracting Verify+ fields info...")
-    fields_info = make_api_call(FIELDS_URL)
+    # Make API calls to get data. The metadata and fields come from the schema cache when it has them; otherwise
+    # they are fetched next to the report data call, on the same pooled session, as two calls running at the same
+    # time in background threads.
+    def submit_schema_calls(executor):
+        logger.info("Extracting Verify+ metadata and fields info...")
+        return executor.submit(make_api_call, REPORT_METADATA_URL), executor.submit(make_api_call, FIELDS_URL)
+
+    def fetch_report_schema():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return tuple(future.result() for future in submit_schema_calls(executor))
+
+    cached_schema = get_cached_schema(TABLE_ID, REPORT_ID)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        schema_futures = None if cached_schema else submit_schema_calls(executor)
+
+        logger.info("Extracting Verify+ data...")
+        # Pages of REPORT_PAGE_SIZE rows are requested concurrently and reassembled in report order
+        report_data = fetch_report_data(REPORT_DATA_URL, page_size=get_report_page_size(),
+                                        max_workers=get_report_workers())
+        report_metadata, fields_info = cached_schema or tuple(future.result() for future in schema_futures)
+
+    # A field ID missing from the cached fields means the table or the report changed: fetch the schema again
+    if cached_schema and report_data is not None:
+        unknown_field_ids = find_unknown_field_ids(report_data, fields_info)
+        if unknown_field_ids:
+            logger.info("Unknown field IDs %s in the report data. Refreshing the cached schema.", unknown_field_ids)
+            invalidate_schema(TABLE_ID, REPORT_ID)
+            cached_schema = None
+            report_metadata, fields_info = fetch_report_schema()
 
     if report_data is None or report_metadata is None or fields_info is None:
         logger.error("Error fetching data. Exiting.")
         sys.exit(1)
 
     logger.info("Merging data...")
-    # Create a mapping from field ID to field name
+    # Map the field IDs to camelCase column names once (cached across warm invocations)
     try:
-        field_id_to_name = {field['id']: field['label'] for field in fields_info}
+        column_mapping = get_column_mapping(TABLE_ID, fields_info)
     except KeyError as e:
         logger.error("KeyError: %s. Check the structure of 'fields_info'.", e)
         sys.exit(1)
+    if not cached_schema:
+        store_schema(TABLE_ID, REPORT_ID, report_metadata, fields_info)
 
     # Extract the data from the report
     data_rows = report_data['data']
@@ -64,15 +89,8 @@ def main():
     logger.info("Processing %d rows of data...", source_row_count)
 
     logger.info("Cleaning data...")
-    # Process data and convert field names to camel case
-    data = []
-    for row in data_rows:
-        processed_row = {to_camel_case(field_id_to_name[int(field_id)]): value['value']
-                         for field_id, value in row.items()}
-        data.append(processed_row)
-
-    # Convert to DataFrame
-    requests_df = pd.DataFrame(data)
+    # Build the DataFrame column by column, with the camelCase column names
+    requests_df = build_report_dataframe(data_rows, column_mapping)
 
     # List of fields to convert to decimal
     fields_to_convert = ["biPerPersonLimit", "biPerOccurrenceLimit", "pdLimit", "umPerPersonLimits",
@@ -93,15 +111,19 @@ def main():
     # Use the DataFrame columns as headers.
     headers = list(requests_df.columns)
 
-    # Convert the DataFrame into a list of dictionaries.
-    requests_data = requests_df.to_dict(orient='records')
+    # Convert the DataFrame into a list of dictionaries, with None for the missing values of the cleaned columns.
+    requests_data = dataframe_to_records(requests_df)
 
     # Connect to the Postgres database
     conn = get_db_connection()
 
     try:
         # Insert cases data into "verifyplus" table
-        insert_data_into_table(conn, "verifyplus", headers, requests_data)
+        if get_load_mode() == LOAD_MODE_SWAP and requests_data:
+            # Row counts are validated on the staging table before the swap
+            swap_data_into_table(conn, "verifyplus", headers, requests_data)
+        else:
+            insert_data_into_table(conn, "verifyplus", headers, requests_data)
 
         # Verify the actual count:
         cursor = conn.cursor()
@@ -119,6 +141,8 @@ def main():
         logger.info("Row count matches after insertion: %d rows in source, %d rows inserted.", source_row_count,
                     inserted_row_count)
         logger.info("Successfully inserted %d rows into raw.verifyplus.", inserted_row_count)
+        # Fingerprint the loaded table, so the orchestrator can skip refreshing curated.verifyplus over unchanged data
+        record_table_fingerprint(conn, "verifyplus")
         conn.commit()
 
     finally:
@@ -0,0 +1,202 @@
+import json
+import os
+import time
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from itc_common_utilities.logger.logger_setup import setup_logger
+
+# Initialize the logger for this module
+logger = setup_logger(__name__)
+
+# Seconds a cached report metadata and fields response is used for (0 disables the cache)
+DEFAULT_SCHEMA_CACHE_TTL = 86400
+
+# In-memory tier, kept across warm Lambda invocations: (table_id, report_id) -> cache entry
+_SCHEMA_CACHE = {}
+_S3_CLIENT = None
+
+
+def get_schema_cache_ttl():
+    """
+    Reads the SCHEMA_CACHE_TTL environment variable.
+
+    Returns:
+        int: Seconds a cached schema is used for (default 86400), or 0 to fetch it on every run.
+    """
+    value = os.getenv("SCHEMA_CACHE_TTL", "")
+    if value == "":
+        return DEFAULT_SCHEMA_CACHE_TTL
+    try:
+        ttl = int(value)
+    except ValueError:
+        ttl = -1
+    if ttl < 0:
+        logger.warning("Invalid SCHEMA_CACHE_TTL '%s'. Falling back to %d.", value,
+                       DEFAULT_SCHEMA_CACHE_TTL)
+        return DEFAULT_SCHEMA_CACHE_TTL
+    return ttl
+
+
+def get_schema_cache_location():
+    """
+    Reads the SCHEMA_CACHE_LOCATION environment variable.
+
+    Returns:
+        str: A directory or an s3://bucket/prefix URI for the persistent tier, or None to cache in memory only.
+    """
+    return os.getenv("SCHEMA_CACHE_LOCATION") or None
+
+
+def _entry_name(table_id, report_id):
+    return f"schema_{table_id}_{report_id}.json"
+
+
+def _split_s3_uri(location, name):
+    bucket, _, prefix = location[len("s3://"):].partition("/")
+    key = f"{prefix.rstrip('/')}/{name}" if prefix.strip("/") else name
+    return bucket, key
+
+
+def _get_s3_client():
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        _S3_CLIENT = boto3.client('s3')
+    return _S3_CLIENT
+
+
+def _read_persistent(location, name):
+    try:
+        if location.startswith("s3://"):
+            bucket, key = _split_s3_uri(location, name)
+            body = _get_s3_client().get_object(Bucket=bucket, Key=key)['Body'].read()
+            return json.loads(body)
+        path = os.path.join(location, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ("NoSuchKey", "404"):
+            logger.warning("Could not read the cached schema %s from %s: %s", name, location, e)
+    except (BotoCoreError, OSError, ValueError) as e:
+        logger.warning("Could not read the cached schema %s from %s: %s", name, location, e)
+    return None
+
+
+def _write_persistent(location, name, entry):
+    try:
+        body = json.dumps(entry)
+        if location.startswith("s3://"):
+            bucket, key = _split_s3_uri(location, name)
+            _get_s3_client().put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"),
+                                        ContentType="application/json")
+            return
+        os.makedirs(location, exist_ok=True)
+        # Write next to the target and rename, so a concurrent reader never sees half a file
+        path = os.path.join(location, name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(f"{path}.tmp", path)
+    except (BotoCoreError, ClientError, OSError) as e:
+        # The cache only saves API calls: a failed write must not fail the pipeline
+        logger.warning("Could not write the cached schema %s to %s: %s", name, location, e)
+
+
+def _delete_persistent(location, name):
+    try:
+        if location.startswith("s3://"):
+            bucket, key = _split_s3_uri(location, name)
+            _get_s3_client().delete_object(Bucket=bucket, Key=key)
+            return
+        path = os.path.join(location, name)
+        if os.path.exists(path):
+            os.remove(path)
+    except (BotoCoreError, ClientError, OSError) as e:
+        logger.warning("Could not delete the cached schema %s from %s: %s", name, location, e)
+
+
+def get_cached_schema(table_id, report_id, ttl=None, location=None):
+    """
+    Looks up the report metadata and fields of a report, first in memory, then in the persistent tier.
+
+    Args:
+        table_id (str): Quickbase table ID
+        report_id (str): Quickbase report ID
+        ttl (int, optional): Seconds an entry is used for (default SCHEMA_CACHE_TTL)
+        location (str, optional): Persistent tier (default SCHEMA_CACHE_LOCATION)
+
+    Returns:
+        tuple: (report_metadata, fields_info), or None if nothing fresh enough is cached.
+    """
+    ttl = get_schema_cache_ttl() if ttl is None else ttl
+    location = get_schema_cache_location() if location is None else location
+    if ttl == 0:
+        return None
+
+    now = time.time()
+    entry = _SCHEMA_CACHE.get((table_id, report_id))
+    tier = "memory"
+    if (entry is None or now - entry['cachedAt'] >= ttl) and location:
+        entry = _read_persistent(location, _entry_name(table_id, report_id))
+        tier = location
+    if entry is None or now - entry.get('cachedAt', 0) >= ttl:
+        return None
+
+    _SCHEMA_CACHE[(table_id, report_id)] = entry
+    logger.info("Using the report metadata and fields cached in %s %.0f seconds ago.", tier, now - entry['cachedAt'])
+    return entry['metadata'], entry['fields']
+
+
+def store_schema(table_id, report_id, report_metadata, fields_info, location=None):
+    """
+    Caches the report metadata and fields of a report in memory and in the persistent tier.
+
+    Args:
+        table_id (str): Quickbase table ID
+        report_id (str): Quickbase report ID
+        report_metadata (dict): Response of GET /reports/{reportId}
+        fields_info (list): Response of GET /fields
+        location (str, optional): Persistent tier (default SCHEMA_CACHE_LOCATION)
+    """
+    location = get_schema_cache_location() if location is None else location
+    entry = {'cachedAt': time.time(), 'metadata': report_metadata, 'fields': fields_info}
+    _SCHEMA_CACHE[(table_id, report_id)] = entry
+    if location:
+        _write_persistent(location, _entry_name(table_id, report_id), entry)
+
+
+def invalidate_schema(table_id, report_id, location=None):
+    """
+    Drops the cached report metadata and fields of a report from every tier.
+
+    Args:
+        table_id (str): Quickbase table ID
+        report_id (str): Quickbase report ID
+        location (str, optional): Persistent tier (default SCHEMA_CACHE_LOCATION)
+    """
+    location = get_schema_cache_location() if location is None else location
+    _SCHEMA_CACHE.pop((table_id, report_id), None)
+    if location:
+        _delete_persistent(location, _entry_name(table_id, report_id))
+    logger.info("Invalidated the cached report metadata and fields of report %s.", report_id)
+
+
+def find_unknown_field_ids(report_data, fields_info):
+    """
+    Lists the field IDs of a report response that are missing from the fields info, which means the table or the
+    report changed since the fields were fetched.
+
+    Args:
+        report_data (dict): Response of POST /reports/{reportId}/run
+        fields_info (list): Response of GET /fields
+
+    Returns:
+        list: The unknown field IDs (as strings), sorted.
+    """
+    known = {str(field.get('id')) for field in fields_info if isinstance(field, dict)}
+    report_ids = {str(field.get('id')) for field in report_data.get('fields') or [] if isinstance(field, dict)}
+    data_rows = report_data.get('data') or []
+    if data_rows:
+        report_ids.update(str(field_id) for field_id in data_rows[0])
+    return sorted(report_ids - known)
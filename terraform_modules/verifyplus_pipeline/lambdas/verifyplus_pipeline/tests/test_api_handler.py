@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+# Adjust sys.path to include the parent directory where api_handler.py is located.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import api_handler
+from api_handler import fetch_report_data, make_api_call, get_client
+
+
+class QuickbaseStub(ThreadingHTTPServer):
+    """
+    Serves POST /reports/{id}/run like Quickbase: skip/top paging, a row cap per response and 429s.
+    GET returns the fields, gzip-compressed when the client accepts it.
+    """
+
+    def __init__(self, total_records, max_rows_per_response, rate_limited_skips=(), removed_after_first_page=()):
+        super().__init__(("127.0.0.1", 0), QuickbaseStubHandler)
+        self.rows = [{'3': {'value': i}} for i in range(total_records)]
+        self.max_rows_per_response = max_rows_per_response
+        self.rate_limited_skips = set(rate_limited_skips)
+        # Rows deleted from the front of the report after each first page is served, as if deleted meanwhile
+        self.removed_after_first_page = list(removed_after_first_page)
+        self.requests = []
+        self.client_ports = []
+        self.accept_encodings = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/reports/7/run?tableId=tbl"
+
+
+class QuickbaseStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.client_ports.append(self.client_address[1])
+            self.server.accept_encodings.append(self.headers.get("Accept-Encoding", ""))
+        body = json.dumps([{'id': 3, 'label': 'Record ID#'}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        query = parse_qs(urlparse(self.path).query)
+        skip = int(query.get('skip', ['0'])[0])
+        top = int(query.get('top', [str(len(self.server.rows))])[0])
+        with self.server.lock:
+            self.server.requests.append((skip, top))
+            rate_limited = skip in self.server.rate_limited_skips
+            self.server.rate_limited_skips.discard(skip)
+        if rate_limited:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with self.server.lock:
+            rows = self.server.rows[skip:skip + min(top, self.server.max_rows_per_response)]
+            total_records = len(self.server.rows)
+            if skip == 0 and self.server.removed_after_first_page:
+                del self.server.rows[:self.server.removed_after_first_page.pop(0)]
+        body = json.dumps({
+            'data': rows,
+            'fields': [{'id': 3, 'label': 'Record ID#'}],
+            'metadata': {'numFields': 1, 'numRecords': len(rows), 'skip': skip, 'top': top,
+                         'totalRecords': total_records},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def quickbase_stub(monkeypatch):
+    monkeypatch.setenv("QUICKBASE_API_TOKEN", "test-token")
+    servers = []
+
+    def start(*args, **kwargs):
+        server = QuickbaseStub(*args, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pages_are_fetched_concurrently_and_kept_in_order(quickbase_stub):
+    """Pages follow the row count Quickbase returns when it caps a response, and come back in report order."""
+    stub = quickbase_stub(total_records=23, max_rows_per_response=4)
+
+    report = fetch_report_data(stub.url, page_size=5, max_workers=3)
+
+    assert [row['3']['value'] for row in report['data']] == list(range(23))
+    assert report['metadata']['numRecords'] == 23
+    assert sorted(stub.requests) == [(0, 5)] + [(skip, min(4, 23 - skip)) for skip in range(4, 23, 4)]
+
+
+def test_rate_limited_pages_are_retried(quickbase_stub):
+    """429 responses are retried after the Retry-After delay instead of failing the extraction."""
+    stub = quickbase_stub(total_records=10, max_rows_per_response=10, rate_limited_skips=[0, 6])
+
+    report = fetch_report_data(stub.url, page_size=3, max_workers=2)
+
+    assert [row['3']['value'] for row in report['data']] == list(range(10))
+    assert stub.requests.count((0, 3)) == 2 and stub.requests.count((6, 3)) == 2
+
+
+def test_report_is_fetched_again_when_records_change_during_the_extraction(quickbase_stub):
+    """Rows deleted between pages shift the offsets, so the report is re-read until its row count is consistent."""
+    stub = quickbase_stub(total_records=10, max_rows_per_response=10, removed_after_first_page=[2])
+
+    report = fetch_report_data(stub.url, page_size=3, max_workers=2)
+
+    assert [row['3']['value'] for row in report['data']] == list(range(2, 10))
+    assert report['metadata']['numRecords'] == 8
+    assert stub.requests.count((0, 3)) == 2
+
+
+def test_report_gives_up_when_records_keep_changing(quickbase_stub):
+    """A report whose row count never matches its totalRecords fails instead of loading a partial extraction."""
+    stub = quickbase_stub(total_records=20, max_rows_per_response=20, removed_after_first_page=[1, 1, 1])
+
+    assert fetch_report_data(stub.url, page_size=3, max_workers=2, max_attempts=3) is None
+    assert stub.requests.count((0, 3)) == 3
+
+
+def test_rate_limit_gives_up_after_max_retries(quickbase_stub):
+    stub = quickbase_stub(total_records=1, max_rows_per_response=1, rate_limited_skips=[0])
+
+    assert make_api_call(stub.url + "&skip=0&top=1", method='post', max_retries=0) is None
+
+
+def test_page_size_zero_runs_the_report_in_one_request(quickbase_stub):
+    stub = quickbase_stub(total_records=8, max_rows_per_response=8)
+
+    report = fetch_report_data(stub.url, page_size=0)
+
+    assert len(report['data']) == 8
+    assert stub.requests == [(0, 8)]
+
+
+def test_session_is_reused_and_decodes_gzip(quickbase_stub):
+    """Calls share one keep-alive connection of the module's session, and gzip responses are decoded."""
+    stub = quickbase_stub(total_records=0, max_rows_per_response=0)
+    fields_url = stub.url.replace("/reports/7/run?", "/fields?")
+
+    first = make_api_call(fields_url)
+    second = make_api_call(fields_url)
+
+    assert first == second == [{'id': 3, 'label': 'Record ID#'}]
+    assert len(set(stub.client_ports)) == 1
+    assert all("gzip" in accept for accept in stub.accept_encodings)
+    assert get_client() is api_handler._CLIENT
+
+
+def test_client_is_recreated_when_the_token_changes(quickbase_stub, monkeypatch):
+    quickbase_stub(total_records=0, max_rows_per_response=0)
+    client = get_client()
+
+    monkeypatch.setenv("QUICKBASE_API_TOKEN", "rotated-token")
+
+    assert get_client() is not client
+    assert get_client().session.headers["Authorization"] == "QB-USER-TOKEN rotated-token"
@@ -1,7 +1,18 @@
+import math
+import os
+import sys
+from decimal import Decimal
+
 import pytest
 from unittest.mock import patch, MagicMock
 import pandas as pd
 
+# Adjust sys.path to include the parent directory where database_handler.py is located.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database_handler import CopyRowStream, _iter_copy_lines, _get_copy_formatter, _copy_rows, \
+    swap_data_into_table, insert_data_into_table
+
 
 # Import your database handler module
 # from database_handler import insert_data_into_table, get_db_connection
@@ -182,4 +193,147 @@ def test_database_integration(mock_database, sample_data):
 
     # Verify transaction was rolled back
     conn.rollback.assert_called_once()
-    conn.commit.assert_not_called()
\ No newline at end of file
+    conn.commit.assert_not_called()
+
+
+@pytest.fixture
+def column_types():
+    """Fixture mirroring information_schema.columns for a few raw.verifyplus columns."""
+    return {
+        "requestId": "integer",
+        "claimNumber": "text",
+        "pdLimit": "double precision",
+        "claimSetUpAssignee": "jsonb",
+    }
+
+
+def encode(headers, rows, column_types):
+    formatters = [_get_copy_formatter(column_types.get(col)) for col in headers]
+    return "".join(_iter_copy_lines(headers, rows, formatters))
+
+
+def test_copy_lines_distinguish_null_from_empty_string(column_types):
+    """None must be an unquoted empty field (NULL) and '' a quoted empty field."""
+    lines = encode(["claimNumber", "pdLimit"], [{"claimNumber": "", "pdLimit": None}, {"claimNumber": None}],
+                   column_types)
+    assert lines == '"",\n,\n'
+
+
+def test_copy_lines_escape_quotes_and_separators(column_types):
+    """Values are quoted, with embedded quotes doubled, so commas and newlines stay inside the field."""
+    lines = encode(["claimNumber"], [{"claimNumber": 'C-1, "urgent"\nsecond line'}], column_types)
+    assert lines == '"C-1, ""urgent""\nsecond line"\n'
+
+
+def test_copy_lines_format_floats_like_postgres(column_types):
+    """Floats keep their repr; NaN and the infinities are spelled the way PostgreSQL reads them."""
+    rows = [{"pdLimit": value} for value in (1000.5, 0.1, math.nan, math.inf, -math.inf)]
+    lines = encode(["pdLimit"], rows, column_types)
+    assert lines == '"1000.5"\n"0.1"\n"NaN"\n"Infinity"\n"-Infinity"\n'
+
+
+def test_copy_lines_round_numbers_for_integer_columns(column_types):
+    """COPY rejects 12.0 for an integer column, so numbers are rounded half away from zero like the INSERT cast."""
+    rows = [{"requestId": value} for value in (12.0, 12.5, -2.5, Decimal("7.49"), 42, math.nan)]
+    lines = encode(["requestId"], rows, column_types)
+    assert lines == '"12"\n"13"\n"-3"\n"7"\n"42"\n"NaN"\n'
+
+
+def test_copy_lines_serialize_json_columns(column_types):
+    """Dicts and lists become JSON for jsonb columns, and strings are passed through as already encoded JSON."""
+    rows = [
+        {"claimSetUpAssignee": {"name": 'Jane "JD" Doe', "id": 7}},
+        {"claimSetUpAssignee": ["a", None]},
+        {"claimSetUpAssignee": '{"name": "Alex"}'},
+    ]
+    lines = encode(["claimSetUpAssignee"], rows, column_types)
+    assert lines == (
+        '"{""name"": ""Jane \\""JD\\"" Doe"", ""id"": 7}"\n'
+        '"[""a"", null]"\n'
+        '"{""name"": ""Alex""}"\n'
+    )
+
+
+def test_copy_row_stream_reads_in_chunks():
+    """The stream hands out exactly the requested number of characters until the rows run out."""
+    stream = CopyRowStream(["abc\n", "defgh\n", "ij\n"])
+
+    chunks = []
+    while True:
+        chunk = stream.read(4)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    assert chunks == ["abc\n", "defg", "h\nij", "\n"]
+    assert stream.line_count == 3
+
+
+def test_copy_rows_streams_csv_to_copy_expert():
+    """_copy_rows looks up the column types and sends a CSV COPY for the quoted headers."""
+    cur = MagicMock()
+    cur.fetchall.return_value = [("requestId", "integer"), ("claimNumber", "text")]
+    sent = {}
+
+    def fake_copy_expert(sql, stream, size):
+        sent["sql"] = sql
+        sent["data"] = stream.read()
+
+    cur.copy_expert.side_effect = fake_copy_expert
+
+    copied = _copy_rows(cur, "verifyplus", ["requestId", "claimNumber"], [{"requestId": 1.0, "claimNumber": "C-1"}])
+
+    assert copied == 1
+    assert sent["sql"] == 'COPY raw.verifyplus ("requestId", "claimNumber") FROM STDIN WITH (FORMAT csv)'
+    assert sent["data"] == '"1","C-1"\n'
+
+
+def test_swap_validates_staging_before_truncating_raw_table():
+    """A staging row count mismatch rolls back before raw.verifyplus is truncated."""
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("requestId", "integer")]
+    cur.fetchone.return_value = (0,)
+
+    with pytest.raises(ValueError, match="Row count mismatch in staging"):
+        swap_data_into_table(conn, "verifyplus", ["requestId"], [{"requestId": 1}])
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    assert any(sql.startswith("CREATE TEMP TABLE verifyplus_staging") for sql in executed)
+    assert not any(sql.startswith("TRUNCATE") for sql in executed)
+    conn.rollback.assert_called_once()
+
+
+def test_swap_rebuilds_nonessential_indexes_around_the_truncate(monkeypatch):
+    """The managed indexes are dropped right before the TRUNCATE and built again after the insert."""
+    monkeypatch.delenv("REBUILD_INDEXES", raising=False)
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("requestId", "integer")]
+    cur.fetchone.side_effect = [(1,), (True,), (0,), (0,)]
+    cur.rowcount = 1
+
+    assert swap_data_into_table(conn, "verifyplus", ["requestId"], [{"requestId": 1}]) == 1
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    start = executed.index("SELECT raw.drop_nonessential_indexes(%s);")
+    assert executed[start:start + 4] == [
+        "SELECT raw.drop_nonessential_indexes(%s);", "TRUNCATE raw.verifyplus;",
+        'INSERT INTO raw.verifyplus ("requestId") SELECT "requestId" FROM verifyplus_staging;',
+        "SELECT raw.create_managed_indexes(%s);",
+    ]
+    conn.rollback.assert_not_called()
+
+
+def test_delete_mode_keeps_indexes(monkeypatch):
+    """The delete load mode never drops indexes, so readers keep seeing the previous rows."""
+    monkeypatch.delenv("REBUILD_INDEXES", raising=False)
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("requestId", "integer")]
+
+    insert_data_into_table(conn, "verifyplus", ["requestId"], [{"requestId": 1}])
+
+    executed = [call.args[0] for call in cur.execute.call_args_list]
+    assert executed[0] == "DELETE FROM raw.verifyplus;"
+    assert not any("indexes" in sql for sql in executed)
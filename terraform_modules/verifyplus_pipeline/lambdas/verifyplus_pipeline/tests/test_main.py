@@ -2,12 +2,26 @@ import pytest
 from unittest.mock import patch, MagicMock
 import os
 import sys
+import threading
 
 # Adjust sys.path to include the parent directory where main.py is located.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import the main function from main.py.
 from main import main as main_function
+import schema_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_schema_cache(monkeypatch):
+    """Every test starts without a cached report schema, so the metadata and fields calls are made."""
+    monkeypatch.delenv("SCHEMA_CACHE_LOCATION", raising=False)
+    monkeypatch.setattr(schema_cache, "_SCHEMA_CACHE", {})
+
+
+def schema_responses(report_metadata, fields_info):
+    """make_api_call stand-in answering the metadata and fields calls by URL, since they run concurrently."""
+    return lambda url, *args, **kwargs: fields_info if '/fields?' in url else report_metadata
 
 
 # Fixtures for common test setups
@@ -50,15 +64,17 @@ def mock_db_connection():
 
 
 # Mock the fix_timestamp_columns function to avoid the column check error
+@patch('main.fetch_report_data')
 @patch('main.make_api_call')
 @patch('main.get_db_connection')
 @patch('main.insert_data_into_table')
 @patch('main.fix_timestamp_columns')
 @patch('main.fix_date_columns')
 def test_main_function_successfully_processes_data(mock_fix_date_columns, mock_fix_timestamps, mock_insert_data, mock_get_conn, mock_api_call,
-                                                   mock_api_response):
+                                                   mock_fetch_report, mock_api_response):
     # Setup mock returns
-    mock_api_call.side_effect = mock_api_response
+    mock_fetch_report.return_value = mock_api_response[0]
+    mock_api_call.side_effect = schema_responses(*mock_api_response[1:])
 
     # Make fix_date_columns return its input unmodified
     mock_fix_date_columns.side_effect = lambda df, cols: df
@@ -74,7 +90,8 @@ def test_main_function_successfully_processes_data(mock_fix_date_columns, mock_f
     main_function()
 
     # Verify all API calls were made
-    assert mock_api_call.call_count == 3
+    mock_fetch_report.assert_called_once()
+    assert mock_api_call.call_count == 2
 
     # Verify database connection was established
     mock_get_conn.assert_called_once()
@@ -86,10 +103,12 @@ def test_main_function_successfully_processes_data(mock_fix_date_columns, mock_f
     mock_conn.close.assert_called_once()
 
 
+@patch('main.fetch_report_data')
 @patch('main.make_api_call')
-def test_main_exits_when_api_calls_fail(mock_api_call):
+def test_main_exits_when_api_calls_fail(mock_api_call, mock_fetch_report):
     # Make one of the API calls return None
-    mock_api_call.side_effect = [None, {}, {}]
+    mock_fetch_report.return_value = None
+    mock_api_call.side_effect = schema_responses({}, {})
 
     # Assert that main_function exits with SystemExit
     with pytest.raises(SystemExit) as e:
@@ -100,15 +119,16 @@ def test_main_exits_when_api_calls_fail(mock_api_call):
 def fake_exit(code):
     raise SystemExit(code)
 
+@patch('main.fetch_report_data')
 @patch('main.make_api_call')
 @patch('sys.exit', side_effect=fake_exit)
-def test_main_exits_on_key_error(mock_exit, mock_api_call):
+def test_main_exits_on_key_error(mock_exit, mock_api_call, mock_fetch_report):
     # Setup mock returns with invalid fields_info structure
-    mock_api_call.side_effect = [
-        {'data': [{'1': {'value': 'test'}}]},  # report_data
+    mock_fetch_report.return_value = {'data': [{'1': {'value': 'test'}}]}  # report_data
+    mock_api_call.side_effect = schema_responses(
         {},  # report_metadata
         [{'wrong_key': 1}]  # fields_info with wrong structure
-    ]
+    )
 
     # Call the main function and assert SystemExit is raised with code 1
     with pytest.raises(SystemExit) as exc_info:
@@ -137,26 +157,27 @@ def test_main_exits_on_key_error(mock_exit, mock_api_call):
         ),
     ]
 )
+@patch('main.fetch_report_data')
 @patch('main.make_api_call')
 @patch('main.get_db_connection')
 @patch('main.insert_data_into_table')
 @patch('main.fix_timestamp_columns')
 @patch('main.fix_date_columns')
 def test_row_count_consistency_scenarios(mock_fix_date_columns, mock_fix_timestamps, mock_insert_data, mock_get_conn, mock_api_call,
-                                         source_data, expected_success):
+                                         mock_fetch_report, source_data, expected_success):
     """
     Test to verify that the number of rows read from the source matches
     the number of rows inserted into the target database across different scenarios.
     """
     # Setup mock API data
-    mock_api_call.side_effect = [
-        source_data,  # report_data
+    mock_fetch_report.return_value = source_data  # report_data
+    mock_api_call.side_effect = schema_responses(
         {},  # report_metadata
         [  # fields_info
             {'id': 1, 'label': 'Field One'},
             {'id': 2, 'label': 'Field Two'}
         ]
-    ]
+    )
 
     # Make fix_date_columns return its input unmodified
     mock_fix_date_columns.side_effect = lambda df, cols: df
@@ -222,4 +243,25 @@ def test_row_count_validation():
     # Test case where counts don't match
     with pytest.raises(ValueError, match="Row count mismatch"):
         validate_row_counts(None, "test_table", ["col1", "col2"],
-                            [{"col1": "val1", "col2": "val2"}], 2)
\ No newline at end of file
+                            [{"col1": "val1", "col2": "val2"}], 2)
+
+
+@patch('main.fetch_report_data')
+@patch('main.make_api_call')
+def test_schema_calls_run_concurrently(mock_api_call, mock_fetch_report):
+    """The metadata and fields calls wait on a barrier that only opens when both are in flight at the same time."""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def api_call(url, *args, **kwargs):
+        barrier.wait()
+        return schema_responses({}, [])(url)
+
+    mock_api_call.side_effect = api_call
+    mock_fetch_report.return_value = None
+
+    with pytest.raises(SystemExit):
+        main_function()
+
+    urls = [call.args[0] for call in mock_api_call.call_args_list]
+    assert len(urls) == 2
+    assert any('/fields?' in url for url in urls) and any('/reports/' in url for url in urls)
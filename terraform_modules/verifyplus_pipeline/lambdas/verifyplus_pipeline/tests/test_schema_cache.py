@@ -0,0 +1,99 @@
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+# Adjust sys.path to include the parent directory where schema_cache.py is located.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import schema_cache
+from schema_cache import get_cached_schema, store_schema, invalidate_schema, find_unknown_field_ids
+from main import main as main_function
+
+METADATA = {'id': 7, 'name': 'Requests'}
+FIELDS = [{'id': 1, 'label': 'Field One'}, {'id': 2, 'label': 'Field Two'}]
+
+
+def schema_responses(report_metadata, fields_info):
+    """make_api_call stand-in answering the metadata and fields calls by URL, since they run concurrently."""
+    return lambda url, *args, **kwargs: fields_info if '/fields?' in url else report_metadata
+
+
+@pytest.fixture(autouse=True)
+def empty_schema_cache(monkeypatch):
+    monkeypatch.delenv("SCHEMA_CACHE_LOCATION", raising=False)
+    monkeypatch.delenv("SCHEMA_CACHE_TTL", raising=False)
+    monkeypatch.setattr(schema_cache, "_SCHEMA_CACHE", {})
+
+
+def test_memory_entries_expire_after_the_ttl():
+    store_schema("tbl", "7", METADATA, FIELDS)
+
+    assert get_cached_schema("tbl", "7", ttl=60) == (METADATA, FIELDS)
+    assert get_cached_schema("tbl", "8", ttl=60) is None
+    with patch("schema_cache.time.time", return_value=schema_cache._SCHEMA_CACHE[("tbl", "7")]['cachedAt'] + 61):
+        assert get_cached_schema("tbl", "7", ttl=60) is None
+    assert get_cached_schema("tbl", "7", ttl=0) is None
+
+
+def test_disk_tier_survives_a_cold_start(tmp_path, monkeypatch):
+    """A new container finds the schema on disk; invalidation removes it from both tiers."""
+    monkeypatch.setenv("SCHEMA_CACHE_LOCATION", str(tmp_path))
+    store_schema("tbl", "7", METADATA, FIELDS)
+    monkeypatch.setattr(schema_cache, "_SCHEMA_CACHE", {})
+
+    assert get_cached_schema("tbl", "7") == (METADATA, FIELDS)
+    assert ("tbl", "7") in schema_cache._SCHEMA_CACHE
+
+    invalidate_schema("tbl", "7")
+
+    assert get_cached_schema("tbl", "7") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_s3_tier_uses_the_prefix(monkeypatch):
+    s3 = MagicMock()
+    monkeypatch.setattr(schema_cache, "_S3_CLIENT", s3)
+
+    store_schema("tbl", "7", METADATA, FIELDS, location="s3://bucket/schema-cache/")
+
+    assert s3.put_object.call_args.kwargs['Bucket'] == "bucket"
+    assert s3.put_object.call_args.kwargs['Key'] == "schema-cache/schema_tbl_7.json"
+
+
+def test_unknown_field_ids_come_from_the_report_fields_and_rows():
+    report_data = {'fields': [{'id': 1}, {'id': 9}], 'data': [{'1': {'value': 'a'}, '2': {'value': 'b'}, '10': {}}]}
+
+    assert find_unknown_field_ids(report_data, FIELDS) == ['10', '9']
+    assert find_unknown_field_ids({'data': []}, FIELDS) == []
+
+
+@patch('main.fetch_report_data')
+@patch('main.make_api_call')
+@patch('main.get_db_connection')
+@patch('main.insert_data_into_table')
+@patch('main.fix_timestamp_columns', side_effect=lambda df, cols: df)
+@patch('main.fix_date_columns', side_effect=lambda df, cols: df)
+def test_main_uses_the_cached_schema_until_an_unknown_field_appears(mock_fix_date_columns, mock_fix_timestamps,
+                                                                     mock_insert_data, mock_get_conn, mock_api_call,
+                                                                     mock_fetch_report):
+    """The second run makes no schema calls; a new field in the report data refreshes the cached schema."""
+    mock_get_conn.return_value.cursor.return_value.fetchone.return_value = [1]
+    mock_fetch_report.return_value = {'data': [{'1': {'value': 'a'}, '2': {'value': 'b'}}]}
+    mock_api_call.side_effect = schema_responses(METADATA, FIELDS)
+
+    main_function()
+    main_function()
+
+    assert mock_api_call.call_count == 2
+
+    new_fields = FIELDS + [{'id': 3, 'label': 'Field Three'}]
+    mock_fetch_report.return_value = {'data': [{'1': {'value': 'a'}, '2': {'value': 'b'}, '3': {'value': 'c'}}]}
+    mock_api_call.side_effect = schema_responses(METADATA, new_fields)
+
+    main_function()
+
+    assert mock_api_call.call_count == 4
+    assert mock_insert_data.call_args.args[2] == ['fieldOne', 'fieldTwo', 'fieldThree']
+    assert get_cached_schema(None, None) == (METADATA, new_fields)
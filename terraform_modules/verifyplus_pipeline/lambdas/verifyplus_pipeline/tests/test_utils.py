@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Adjust sys.path to include the parent directory where utils.py is located.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils
+from utils import convert_currency_columns_to_decimal, fix_timestamp_columns, fix_date_columns, dataframe_to_records, \
+    get_column_mapping, build_report_dataframe
+
+
+def test_currency_columns_are_parsed_into_nullable_floats():
+    """Symbols, separators and spaces are removed; blanks and invalid values become NULL; numbers are kept."""
+    df = pd.DataFrame({'pdLimit': ["$1,000.50", " $25,000 ", "", "   ", None, "N/A", 300, 12.5, "$1,000.50"],
+                       'other': range(9)})
+
+    df = convert_currency_columns_to_decimal(df, ['pdLimit', 'missingLimit'])
+
+    assert df['pdLimit'].dtype == 'Float64'
+    assert [row['pdLimit'] for row in dataframe_to_records(df)] == [
+        1000.5, 25000.0, None, None, None, None, 300.0, 12.5, 1000.5]
+
+
+def test_timestamp_and_date_columns_are_formatted_for_postgres():
+    """Valid values are formatted (keeping the wall time of UTC timestamps); "NaT", "NaN", "" and junk become NULL."""
+    df = pd.DataFrame({
+        'verifyStartDatetime': ["2025-02-27T13:05:09Z", "NaT", "", None, "not a date"],
+        'claimSetUpStartDate': ["2025-02-27", "NaN", "", None, "2024-12-31T23:00:00"],
+    })
+
+    df = fix_timestamp_columns(df, ['verifyStartDatetime'])
+    df = fix_date_columns(df, ['claimSetUpStartDate'])
+
+    records = dataframe_to_records(df)
+    assert [row['verifyStartDatetime'] for row in records] == ["2025-02-27 13:05:09", None, None, None, None]
+    # pd.to_datetime infers the format from the first date, so a timestamp in a column of dates becomes NULL,
+    # as it did with the former row-wise version
+    assert [row['claimSetUpStartDate'] for row in records] == ["2025-02-27", None, None, None, None]
+
+
+def test_records_match_to_dict_for_other_columns():
+    """Only the missing values of nullable columns change; other columns come out as DataFrame.to_dict gives them."""
+    df = pd.DataFrame({'requestId': [1, 2], 'numberOfClaimants': [1.0, None], 'claimSetUpAssignee': [{'a': 1}, None],
+                       'pdLimit': pd.array([None, 2.5], dtype='Float64')})
+
+    records = dataframe_to_records(df)
+
+    assert records[0] == {'requestId': 1, 'numberOfClaimants': 1.0, 'claimSetUpAssignee': {'a': 1}, 'pdLimit': None}
+    assert records[1]['pdLimit'] == 2.5 and records[1]['claimSetUpAssignee'] is None
+    # NaN in a float64 column stays NaN, as in to_dict
+    assert pd.isna(records[1]['numberOfClaimants']) and records[1]['numberOfClaimants'] is not None
+    assert type(records[0]['requestId']) is int
+
+
+def test_column_mapping_is_cached_per_table_and_fields(monkeypatch):
+    """The mapping is computed once per table and set of labels; relabeling a field gives a new mapping."""
+    monkeypatch.setattr(utils, "_COLUMN_MAPPING_CACHE", {})
+    fields = [{'id': 3, 'label': 'Request ID'}, {'id': 7, 'label': 'PD Limit ($)'}]
+
+    mapping = get_column_mapping("tbl", fields)
+
+    assert mapping == {'3': 'requestId', '7': 'pdLimit'}
+    assert get_column_mapping("tbl", list(reversed(fields))) is mapping
+    assert get_column_mapping("other", fields) is not mapping
+    assert get_column_mapping("tbl", [fields[0], {'id': 7, 'label': 'PD Limit New'}])['7'] == 'pdLimitNew'
+    assert len(utils._COLUMN_MAPPING_CACHE) == 3
+
+
+def test_report_dataframe_is_built_column_wise():
+    """Columns follow the fields of the rows; rows with other fields fall back to filling the gaps with None."""
+    mapping = {'3': 'requestId', '7': 'pdLimit', '9': 'firmName'}
+    rows = [{'3': {'value': 1}, '7': {'value': '$5'}}, {'3': {'value': 2}, '7': {'value': None}}]
+
+    df = build_report_dataframe(rows, mapping)
+    assert df.to_dict(orient='list') == {'requestId': [1, 2], 'pdLimit': ['$5', None]}
+
+    ragged = build_report_dataframe(rows + [{'9': {'value': 'Firm'}, '3': {'value': 3}}], mapping)
+    assert list(ragged.columns) == ['requestId', 'pdLimit', 'firmName']
+    assert ragged['firmName'].tolist() == [None, None, 'Firm']
+
+    assert build_report_dataframe([], mapping).empty
+    with pytest.raises(KeyError):
+        build_report_dataframe([{'42': {'value': 1}}], mapping)
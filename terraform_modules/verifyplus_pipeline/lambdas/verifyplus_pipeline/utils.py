@@ -1,6 +1,12 @@
+import hashlib
+import json
 import re
-import pandas as pd
 import numpy as np
+import pandas as pd
+
+# Column names of the report fields, kept across warm Lambda invocations. Keyed by (table id, fields hash),
+# so a change to the fields' labels gives a new entry instead of stale names.
+_COLUMN_MAPPING_CACHE = {}
 
 
 def to_camel_case(s):
@@ -15,49 +21,126 @@ def to_camel_case(s):
     return parts[0].lower() + ''.join(word.capitalize() for word in parts[1:])
 
 
+def get_column_mapping(table_id, fields_info):
+    """
+    Maps the field ids of a Quickbase table to the camelCase column names of their labels. The mapping is
+    computed once per table and set of fields, and cached for the next warm invocations.
+
+    :param table_id: The Quickbase table id.
+    :param fields_info: The table's fields, as returned by the fields API (dictionaries with 'id' and 'label').
+    :return: Dictionary of field id (as the string used by the report data) to column name.
+    :raises KeyError: If a field has no 'id' or 'label'.
+    """
+    labels = sorted((str(field['id']), field['label']) for field in fields_info)
+    fields_hash = hashlib.sha256(json.dumps(labels).encode("utf-8")).hexdigest()
+    key = (table_id, fields_hash)
+    mapping = _COLUMN_MAPPING_CACHE.get(key)
+    if mapping is None:
+        mapping = {field_id: to_camel_case(label) for field_id, label in labels}
+        _COLUMN_MAPPING_CACHE[key] = mapping
+    return mapping
+
+
+def build_report_dataframe(data_rows, column_mapping):
+    """
+    Builds a DataFrame from the 'data' array of a Quickbase report, one column at a time, without making a
+    dictionary per row. Columns are in the order of the fields in the rows, and named by column_mapping.
+
+    :param data_rows: List of report rows, each a dictionary of field id to {'value': ...}.
+    :param column_mapping: Dictionary of field id to column name (see get_column_mapping).
+    :return: The DataFrame, with None where a row has no value for a field.
+    :raises KeyError: If a row has a field id that is not in column_mapping.
+    """
+    field_ids = list(data_rows[0]) if data_rows else []
+    names = [column_mapping[field_id] for field_id in field_ids]
+    if all(len(row) == len(field_ids) for row in data_rows):
+        try:
+            # Report rows normally all hold the same fields
+            columns = {}
+            for field_id, name in zip(field_ids, names):
+                columns[name] = [row[field_id]['value'] for row in data_rows]
+            return pd.DataFrame(columns)
+        except KeyError:
+            pass  # The rows do not all hold the same fields
+
+    columns = {}
+    for index, row in enumerate(data_rows):
+        for field_id, cell in row.items():
+            name = column_mapping[field_id]
+            values = columns.get(name)
+            if values is None:
+                values = columns[name] = [None] * len(data_rows)
+            values[index] = cell['value']
+    return pd.DataFrame(columns)
+
+
 def convert_currency_columns_to_decimal(df, fields_to_convert):
     """
     Convert specified currency columns in a DataFrame to decimal format.
 
+    The columns are cleaned with vectorized string operations: "$" and "," are removed from the string values,
+    which are then stripped and parsed. Values that are already numbers are kept, and empty or unparseable
+    values become missing. Limits repeat a lot, so each distinct value is only cleaned once.
+
     Parameters:
         df (pd.DataFrame): The DataFrame containing the data.
         fields_to_convert (list): A list of column names to convert.
 
     Returns:
-        pd.DataFrame: The updated DataFrame with specified columns converted to decimal.
+        pd.DataFrame: The updated DataFrame with specified columns converted to the nullable Float64 dtype
+        (missing values are pd.NA, see dataframe_to_records).
     """
     for field in fields_to_convert:
         if field in df.columns:
-            # First, create a copy of the column to avoid SettingWithCopyWarning
-            temp_series = df[field].copy()
-
-            # Remove $ and commas
-            temp_series = temp_series.replace({r'\$': '', ',': ''}, regex=True)
+            # Missing values get the code -1
+            codes, uniques = pd.factorize(df[field])
+            uniques = pd.Series(uniques, dtype=uniques.dtype)
+            if not pd.api.types.is_numeric_dtype(uniques):
+                try:
+                    # .str yields NaN for the values that are not strings, which keep their original value
+                    cleaned = uniques.str.replace(r'[$,]', '', regex=True).str.strip()
+                    uniques = cleaned.where(cleaned.notna(), uniques)
+                except AttributeError:
+                    pass  # No string values (.str refuses the column)
+
+            # Empty strings and other invalid values become NaN
+            numbers = pd.to_numeric(uniques, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            values = np.where(codes >= 0, numbers[codes] if len(numbers) else np.nan, np.nan)
+            df[field] = pd.Series(values, index=df.index).astype('Float64')
 
-            # Replace empty strings with None (instead of np.nan)
-            temp_series = temp_series.replace(r'^\s*$', None, regex=True)
-
-            # Strip extra spaces for string values
-            temp_series = temp_series.apply(lambda x: x.strip() if isinstance(x, str) else x)
+    return df
 
-            # Convert to numeric with explicit float64 dtype
-            df[field] = pd.to_numeric(temp_series, errors='coerce').astype('float64')
 
-            # Explicitly handle any remaining NaN values
-            df[field] = df[field].replace({np.nan: None})
+def _format_datetime_column(series, unit):
+    """
+    Parses a column into datetimes, any missing or invalid value becoming NaT (including the "NaT", "NaN" and
+    empty strings), and formats the valid ones as ISO strings with numpy: 'YYYY-MM-DD HH:MM:SS' for unit 's',
+    'YYYY-MM-DD' for unit 'D'. Timezone-aware values keep their wall time, as strftime prints them.
 
-    return df
+    :return: Series of the nullable string dtype, with pd.NA for the missing values.
+    """
+    parsed = pd.to_datetime(series, errors='coerce')
+    if not pd.api.types.is_datetime64_any_dtype(parsed):
+        # Timestamps with different UTC offsets only parse into a column of objects
+        date_format = "%Y-%m-%d %H:%M:%S" if unit == 's' else "%Y-%m-%d"
+        return parsed.map(lambda x: x.strftime(date_format) if pd.notnull(x) else None).astype('string')
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_localize(None)
+    text = np.datetime_as_string(parsed.to_numpy(), unit=unit)
+    if unit == 's':
+        text = np.char.replace(text, 'T', ' ')
+    return pd.Series(text, index=series.index, dtype='string').mask(parsed.isna())
 
 
 def fix_timestamp_columns(df, column_names):
     """
     This function fixes multiple timestamp columns that are read as text due to missing values.
     It converts each column to datetime, handling any missing or invalid values gracefully,
-    and replaces them with None for compatibility with PostgreSQL.
+    and formats the valid ones as 'YYYY-MM-DD HH:MM:SS' strings for PostgreSQL.
 
     :param df: The DataFrame containing the columns
     :param column_names: A list of column names to fix
-    :return: The DataFrame with the fixed timestamp columns
+    :return: The DataFrame with the fixed timestamp columns (nullable string dtype, missing values are pd.NA)
     """
     for col in column_names:
 
@@ -65,17 +148,7 @@ def fix_timestamp_columns(df, column_names):
         if col not in df.columns:
             raise ValueError(f"Missing expected column '{col}' to fix. Failing.")
 
-        # Create a copy of the column
-        temp_series = df[col].copy()
-
-        # Replace literal "NaT" strings and empty strings with None
-        temp_series = temp_series.replace(["NaT", "", None], pd.NaT)
-
-        # Convert to datetime; any invalid values become pd.NaT
-        temp_series = pd.to_datetime(temp_series, errors='coerce')
-
-        # Convert to an ISO formatted string if valid, otherwise None
-        df[col] = temp_series.apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S") if pd.notnull(x) else None)
+        df[col] = _format_datetime_column(df[col], 's')
 
     return df
 
@@ -83,25 +156,35 @@ def fix_timestamp_columns(df, column_names):
 def fix_date_columns(df, column_names):
     """
     Fix date columns that might contain empty strings or invalid date representations.
-    The function replaces these with pd.NaT, converts each column to datetime (coercing errors),
-    and finally formats valid dates to the 'YYYY-MM-DD' string format.
-    Missing values are converted to None so that PostgreSQL correctly interprets them as NULL.
+    The function converts each column to datetime (invalid values become NaT)
+    and formats valid dates to the 'YYYY-MM-DD' string format.
 
     :param df: The DataFrame containing the date columns.
     :param column_names: A list of column names to fix.
-    :return: The DataFrame with the fixed date columns.
+    :return: The DataFrame with the fixed date columns (nullable string dtype, missing values are pd.NA)
     """
     for col in column_names:
-        # Create a copy of the column
-        temp_series = df[col].copy()
+        df[col] = _format_datetime_column(df[col], 'D')
 
-        # Replace common invalid date representations with pd.NaT
-        temp_series = temp_series.replace(["NaT", "NaN", "", None], pd.NaT)
+    return df
 
-        # Convert the column to datetime; errors become pd.NaT
-        temp_series = pd.to_datetime(temp_series, errors='coerce')
 
-        # Format the date as a string "YYYY-MM-DD" if valid, otherwise None
-        df[col] = temp_series.apply(lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) else None)
+def dataframe_to_records(df):
+    """
+    Converts a DataFrame into the list of dictionaries taken by the database handler, column by column rather
+    than row by row (DataFrame.to_dict). The missing values of the nullable columns (pd.NA, e.g. from
+    convert_currency_columns_to_decimal) become None, so PostgreSQL receives them as NULL. The values of other
+    columns are converted as to_dict converts them.
 
-    return df
\ No newline at end of file
+    :param df: The DataFrame to convert.
+    :return: List of dictionaries, one per row.
+    """
+    columns = list(df.columns)
+    values = []
+    for col in columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            values.append(series.to_numpy(dtype=object, na_value=None).tolist())
+        else:
+            values.append(series.tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
@@ -102,3 +102,51 @@ variable "region" {
   description = "The region."
   type        = string
 }
+
+variable "load_mode" {
+  description = "How the raw tables are replaced: 'delete' deletes and re-inserts in place, 'swap' loads a staging table, validates it and swaps it in."
+  type        = string
+  default     = "delete"
+}
+
+variable "rebuild_indexes" {
+  description = "With load_mode 'swap', drop the non-essential indexes of raw.verifyplus right before it is truncated and build them again once it is loaded ('true' or 'false')."
+  type        = string
+  default     = "true"
+}
+
+variable "report_page_size" {
+  description = "Rows requested per Quickbase report page; 0 runs the report in a single request."
+  type        = string
+  default     = "5000"
+}
+
+variable "report_workers" {
+  description = "Number of Quickbase report pages requested concurrently."
+  type        = string
+  default     = "4"
+}
+
+variable "quickbase_timeout" {
+  description = "Seconds to wait for a Quickbase API response."
+  type        = string
+  default     = "60"
+}
+
+variable "quickbase_max_retries" {
+  description = "Retries of a Quickbase API request after a 429, a 5xx or a connection error."
+  type        = string
+  default     = "5"
+}
+
+variable "schema_cache_ttl" {
+  description = "Seconds the Quickbase report metadata and fields are cached for; 0 fetches them on every run."
+  type        = string
+  default     = "86400"
+}
+
+variable "schema_cache_location" {
+  description = "Persistent tier of the report schema cache: a directory or an s3://bucket/prefix URI (the Lambda may write under schema-cache/ in its code bucket). Empty caches in memory only."
+  type        = string
+  default     = ""
+}
@@ -131,6 +131,12 @@ resource "aws_iam_policy" "verifyplus_pipeline_lambda_policy" {
             "arn:aws:s3:::${aws_s3_bucket.verifyplus_lambda_layer_bucket.bucket}",
             "arn:aws:s3:::${aws_s3_bucket.verifyplus_lambda_layer_bucket.bucket}/*"
           ]
+        },
+        {
+          # Persistent tier of the report schema cache (SCHEMA_CACHE_LOCATION)
+          Effect   = "Allow"
+          Action   = ["s3:PutObject", "s3:DeleteObject"]
+          Resource = "arn:aws:s3:::${aws_s3_bucket.verifyplus_lambda_layer_bucket.bucket}/schema-cache/*"
         }
       ],
     )
@@ -209,6 +215,14 @@ resource "aws_lambda_function" "verifyplus_pipeline_lambda" {
       QUICKBASE_API_TOKEN   = var.quickbase_token
       REPORT_ID             = var.report_id
       TABLE_ID              = var.table_id
+      LOAD_MODE             = var.load_mode
+      REBUILD_INDEXES       = var.rebuild_indexes
+      REPORT_PAGE_SIZE      = var.report_page_size
+      REPORT_WORKERS        = var.report_workers
+      QUICKBASE_TIMEOUT     = var.quickbase_timeout
+      QUICKBASE_MAX_RETRIES = var.quickbase_max_retries
+      SCHEMA_CACHE_TTL      = var.schema_cache_ttl
+      SCHEMA_CACHE_LOCATION = var.schema_cache_location
     }
   }
 }